@@ -83,13 +83,15 @@ def build_vimax_adapter_specs(workspace_root: str | Path, session_index: Any) ->
             name="vimax_render_video",
             description=(
                 "Render keyframes, video clips, and final video for the active ViMax session. "
-                "This checks that structured text artifacts exist before rendering and reports missing dependencies instead of pretending render started."
+                "This checks that structured text artifacts exist before rendering and reports missing dependencies instead of pretending render started. "
+                "deadline_seconds bounds the whole render (0 for none; defaults to VIMAX_RENDER_DEADLINE_SECONDS)."
             ),
             handler=adapter.vimax_render_video,
             schema={
                 "session_id": ToolArgumentSchema(str, required=False, default=""),
                 "mode": ToolArgumentSchema(str, required=False, default="foreground"),
                 "force": ToolArgumentSchema(bool, required=False, default=False),
+                "deadline_seconds": ToolArgumentSchema(int, required=False),
             },
         ),
     ]
@@ -349,6 +351,7 @@ class ViMaxAdapters:
             _write_render_status(working_dir, status="dependency_missing", payload=payload)
             return ToolResult("vimax_render_video", False, f"Dependency missing: {', '.join(missing)}", payload)
 
+        render_deadline = _render_deadline_seconds(args.get("deadline_seconds"))
         self.session_index.update_stage(session_id, "rendering", "Rendering video artifacts")
         _write_render_status(working_dir, status="rendering", payload={"session_id": session_id, "render_started": True, "render_completed": False})
         try:
@@ -356,11 +359,11 @@ class ViMaxAdapters:
             image_generator = _build_image_generator()
             video_generator = _build_video_generator()
             if runtime:
-                runtime.emit_progress("Starting video render", stage="rendering", metadata={"session_id": session_id})
+                runtime.emit_progress("Starting video render", stage="rendering", metadata={"session_id": session_id, "deadline_seconds": render_deadline})
             if _idea_mode_ready(checklist):
                 idea_pipeline = Idea2VideoPipeline(chat_model=chat_model, image_generator=image_generator, video_generator=video_generator, working_dir=str(working_dir / "idea2video"))
                 with _suppress_pipeline_output():
-                    final_video = await idea_pipeline(idea=str(session.get("idea", "")), user_requirement=str(session.get("user_requirement", "")), style=str(session.get("style", "")), quiet=True)
+                    final_video = await idea_pipeline(idea=str(session.get("idea", "")), user_requirement=str(session.get("user_requirement", "")), style=str(session.get("style", "")), quiet=True, deadline_seconds=render_deadline)
                 self.session_index.update_stage(session_id, "rendered", "Final video rendered")
                 payload = {"session_id": session_id, "render_mode": "idea2video", "render_started": True, "render_completed": True, "final_video_path": str(Path(final_video).relative_to(self.workspace_root)), "missing": []}
                 _write_render_status(working_dir, status="rendered", payload=payload)
@@ -371,7 +374,7 @@ class ViMaxAdapters:
                 characters = _load_characters(script_dir / "characters.json")
                 pipeline = Script2VideoPipeline(chat_model=chat_model, image_generator=image_generator, video_generator=video_generator, working_dir=str(script_dir))
                 with _suppress_pipeline_output():
-                    final_video = await pipeline(script=script_text, user_requirement=str(session.get("user_requirement", "")), style=str(session.get("style", "")), characters=characters, quiet=True, progress=_pipeline_progress(runtime, session_id))
+                    final_video = await pipeline(script=script_text, user_requirement=str(session.get("user_requirement", "")), style=str(session.get("style", "")), characters=characters, quiet=True, progress=_pipeline_progress(runtime, session_id), deadline_seconds=render_deadline)
                 self.session_index.update_stage(session_id, "rendered", "Final video rendered")
                 payload = {"session_id": session_id, "render_mode": "script2video", "render_started": True, "render_completed": True, "final_video_path": str(Path(final_video).relative_to(self.workspace_root)), "missing": []}
                 _write_render_status(working_dir, status="rendered", payload=payload)
@@ -380,7 +383,7 @@ class ViMaxAdapters:
                 novel_dir = working_dir / "novel2video"
                 pipeline = _build_novel_render_pipeline(novel_dir, chat_model, image_generator, video_generator)
                 with _suppress_pipeline_output():
-                    render_result = await pipeline.render_video_artifacts(style=str(session.get("style", "")), user_requirement=str(session.get("user_requirement", "")), quiet=True, progress=_pipeline_progress(runtime, session_id))
+                    render_result = await pipeline.render_video_artifacts(style=str(session.get("style", "")), user_requirement=str(session.get("user_requirement", "")), quiet=True, progress=_pipeline_progress(runtime, session_id), deadline_seconds=render_deadline)
                 scene_videos_dir = Path(render_result["scene_videos_dir"])
                 self.session_index.update_stage(session_id, "novel_scene_rendered", "Novel scene videos rendered")
                 payload = {
@@ -494,6 +497,14 @@ def _narrative_step_timeout_seconds() -> float:
         return 900.0
 
 
+def _render_deadline_seconds(requested: Any = None) -> float:
+    raw = requested if requested is not None else os.environ.get("VIMAX_RENDER_DEADLINE_SECONDS", "0")
+    try:
+        return max(0.0, float(raw))
+    except (TypeError, ValueError):
+        return 0.0
+
+
 async def _run_planning_step(
     message: str,
     stage: str,
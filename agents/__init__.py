@@ -4,6 +4,7 @@ from .camera_image_generator import CameraImageGenerator
 from .character_extractor import CharacterExtractor
 from .character_portraits_generator import CharacterPortraitsGenerator
 from .reference_image_selector import ReferenceImageSelector
+from .environment_plate_registry import EnvironmentPlateRegistry
 
 __all__ = [
     "Screenwriter",
@@ -12,4 +13,5 @@ __all__ = [
     "CharacterExtractor",
     "CharacterPortraitsGenerator",
     "ReferenceImageSelector",
+    "EnvironmentPlateRegistry",
 ]
\ No newline at end of file
@@ -1,14 +1,36 @@
+import asyncio
 import logging
 from typing import List, Tuple
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt
+from utils.retry import retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.output_parsers import PydanticOutputParser
 from utils.robust_json_parser import TrailingCommaTolerantPydanticOutputParser as PydanticOutputParser
 from langchain.chat_models import init_chat_model
-from utils.image import image_path_to_b64
+from utils.image import image_path_to_b64_downscaled
+from utils.image_quality import assess_image, score_candidates
 
 
+# Images sent to the model are capped at this many pixels on the long side;
+# consistency judgements do not need the full render resolution.
+MODEL_IMAGE_MAX_DIMENSION = 768
+
+# Candidates exposed worse than this (washed out, black or heavily clipped)
+# fail the local quality gate. The model is only skipped when a single
+# candidate passes the gate: the local score is dominated by sharpness, which
+# noise inflates, so a lead in score alone does not overrule the model.
+LOCAL_MIN_EXPOSURE = 0.3
+
+# Candidates scoring this far below the local best are dropped before the
+# model call (the best two always go), and at most LOCAL_MAX_SURVIVORS are sent.
+LOCAL_LOSER_MARGIN = 0.3
+LOCAL_MAX_SURVIVORS = 4
+
+# Allowed relative deviation from the candidates' median aspect ratio.
+ASPECT_RATIO_TOLERANCE = 0.1
+
 
 system_prompt_template_select_most_consistent_image = \
 """
@@ -75,10 +97,6 @@ class BestImageSelector:
         )
 
 
-    @retry(
-        stop=stop_after_attempt(3),
-        after=lambda retry_state: logging.warning(f"Retrying best image selection due to {retry_state.outcome.exception()}"),
-    )
     async def __call__(
         self,
         reference_image_path_and_text_pairs: List[Tuple[str, str]],
@@ -95,6 +113,12 @@ class BestImageSelector:
 
             candidate_image_paths:
             A list of paths to the candidate images to be evaluated.
+
+        Candidates are first scored locally (sharpness, exposure, aspect ratio
+        and perceptual-hash distance to the references). Candidates failing
+        the quality gate and clear losers are dropped, a sole candidate
+        passing the gate is returned without a model call, and the survivors
+        are sent to the model downscaled to MODEL_IMAGE_MAX_DIMENSION.
         """
 
         if not candidate_image_paths:
@@ -103,6 +127,73 @@ class BestImageSelector:
 
         logging.info(f"Selecting the best image from candidates: {candidate_image_paths}")
 
+        survivors = self.prerank_candidates(reference_image_path_and_text_pairs, candidate_image_paths)
+        if len(survivors) == 1:
+            logging.info(f"Best image selected locally: {survivors[0]}")
+            return survivors[0]
+
+        return await self.select_with_model(reference_image_path_and_text_pairs, target_description, survivors)
+
+
+    def prerank_candidates(
+        self,
+        reference_image_path_and_text_pairs: List[Tuple[str, str]],
+        candidate_image_paths: List[str],
+    ) -> List[str]:
+        """Return the candidates worth sending to the model, best first.
+
+        A single path means only one candidate passed the quality gate.
+        Candidates that cannot be read, whose aspect ratio is off or whose
+        exposure is below LOCAL_MIN_EXPOSURE are dropped; if
+        nothing can be measured the original list is returned unchanged.
+        """
+        if len(candidate_image_paths) == 1:
+            return list(candidate_image_paths)
+
+        candidates = []
+        for path in candidate_image_paths:
+            try:
+                candidates.append(assess_image(path))
+            except Exception as e:
+                logging.warning(f"Could not assess candidate image {path} locally: {e}")
+        if not candidates:
+            return list(candidate_image_paths)
+
+        references = []
+        for ref_image_path, _ in reference_image_path_and_text_pairs:
+            try:
+                references.append(assess_image(ref_image_path))
+            except Exception as e:
+                logging.warning(f"Could not assess reference image {ref_image_path} locally: {e}")
+
+        scores = score_candidates(candidates, references, aspect_ratio_tolerance=ASPECT_RATIO_TOLERANCE)
+        ranked = sorted(
+            (
+                (score, candidate.path) for score, candidate in zip(scores, candidates)
+                if score is not None and candidate.exposure >= LOCAL_MIN_EXPOSURE
+            ),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        if not ranked:
+            return [candidate.path for candidate in candidates]
+        logging.info(f"Local candidate scores: {[(path, round(score, 3)) for score, path in ranked]}")
+
+        best_score = ranked[0][0]
+        return [path for idx, (score, path) in enumerate(ranked) if idx < 2 or best_score - score < LOCAL_LOSER_MARGIN][:LOCAL_MAX_SURVIVORS]
+
+
+    @retry(
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
+        after=lambda retry_state: logging.warning(f"Retrying best image selection due to {retry_state.outcome.exception()}"),
+    )
+    async def select_with_model(
+        self,
+        reference_image_path_and_text_pairs: List[Tuple[str, str]],
+        target_description: str,
+        candidate_image_paths: List[str],
+    ) -> str:
         human_content = []
         for idx, (ref_image_path, text) in enumerate(reference_image_path_and_text_pairs):
             human_content.append({
@@ -111,7 +202,7 @@ class BestImageSelector:
             })
             human_content.append({
                 "type": "image_url",
-                "image_url": {"url": image_path_to_b64(ref_image_path, mime=True)}
+                "image_url": {"url": image_path_to_b64_downscaled(ref_image_path, MODEL_IMAGE_MAX_DIMENSION, mime=True)}
             })
 
         for idx, candidate_image_path in enumerate(candidate_image_paths):
@@ -121,7 +212,7 @@ class BestImageSelector:
             })
             human_content.append({
                 "type": "image_url",
-                "image_url": {"url": image_path_to_b64(candidate_image_path, mime=True)}
+                "image_url": {"url": image_path_to_b64_downscaled(candidate_image_path, MODEL_IMAGE_MAX_DIMENSION, mime=True)}
             })
         human_content.append({
             "type": "text",
@@ -137,7 +228,7 @@ class BestImageSelector:
 
         chain = self.chat_model | parser
 
-        response = await chain.ainvoke(messages)
+        response = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
         idx = response.best_image_index
         if not isinstance(idx, int) or idx < 0 or idx >= len(candidate_image_paths):
             logging.warning(f"Received invalid best_image_index={idx}; defaulting to 0")
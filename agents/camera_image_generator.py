@@ -1,7 +1,10 @@
 import os
+import re
+import asyncio
 import logging
 import cv2
-from typing import List, Tuple, Union, Optional
+import numpy as np
+from typing import Dict, List, Set, Tuple, Union, Optional
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -11,6 +14,9 @@ from scenedetect import open_video, SceneManager, split_video_ffmpeg
 from scenedetect.detectors import ContentDetector
 
 from interfaces import ShotDescription, ShotBriefDescription, Camera, ImageOutput, VideoOutput
+from utils.image_quality import assess_image, hash_distance
+from utils.retry import after_func, retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 
 
 from moviepy import VideoFileClip
@@ -117,6 +123,7 @@ class CameraImageGenerator:
         self.chat_model = chat_model
         self.image_generator = image_generator
         self.video_generator = video_generator
+        self.image_size = "1600x900"
 
 
     async def construct_camera_tree(
@@ -124,8 +131,77 @@ class CameraImageGenerator:
         cameras: List[Camera],
         shot_descs: List[Union[ShotDescription, ShotBriefDescription]],
     ) -> List[Camera]:
-        parser = PydanticOutputParser(pydantic_object=CameraTreeResponse)
+        if len(cameras) >= HIERARCHICAL_CAMERA_TREE_MIN_CAMERAS:
+            return await self.construct_camera_tree_hierarchical(cameras, shot_descs)
+
+        shot_desc_by_idx = {shot.idx: shot for shot in shot_descs}
+        parent_items = await self._request_camera_parent_items(cameras, shot_desc_by_idx)
+        for cam, parent_cam_item in zip(cameras, parent_items):
+            _apply_camera_parent_item(cam, parent_cam_item)
+        return cameras
+
+
+    async def construct_camera_tree_hierarchical(
+        self,
+        cameras: List[Camera],
+        shot_descs: List[Union[ShotDescription, ShotBriefDescription]],
+    ) -> List[Camera]:
+        """Build the camera tree in two levels for scenes with many cameras.
+
+        Cameras are first clustered locally by shot adjacency and first-shot
+        text similarity. The model then orders each cluster (its first camera
+        is the local root) and, in a separate call, links the cluster roots
+        into one tree. All calls run concurrently and each is validated and
+        retried on its own, so a malformed answer only repeats a small prompt.
+        """
         shot_desc_by_idx = {shot.idx: shot for shot in shot_descs}
+        clusters = cluster_cameras(cameras, shot_descs)
+        roots = [cluster[0] for cluster in clusters]
+
+        requests = [
+            self._request_camera_parent_items_with_retry(cluster, shot_desc_by_idx)
+            for cluster in clusters
+            if len(cluster) > 1
+        ]
+        if len(roots) > 1:
+            requests.append(self._request_camera_parent_items_with_retry(roots, shot_desc_by_idx))
+        responses = await asyncio.gather(*requests)
+
+        multi_camera_clusters = [cluster for cluster in clusters if len(cluster) > 1]
+        for cluster, parent_items in zip(multi_camera_clusters, responses):
+            # The first camera of a group is its root whatever the model said about it.
+            for cam, parent_cam_item in zip(cluster[1:], parent_items[1:]):
+                _apply_camera_parent_item(cam, parent_cam_item)
+        for cluster in clusters:
+            _apply_camera_parent_item(cluster[0], None)
+        if len(roots) > 1:
+            for cam, parent_cam_item in zip(roots[1:], responses[-1][1:]):
+                _apply_camera_parent_item(cam, parent_cam_item)
+
+        _validate_camera_tree(cameras)
+        return cameras
+
+
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, after=after_func)
+    async def _request_camera_parent_items_with_retry(
+        self,
+        cameras: List[Camera],
+        shot_desc_by_idx: Dict[int, Union[ShotDescription, ShotBriefDescription]],
+    ) -> List[Optional[CameraParentItem]]:
+        allowed_shot_idxs = {shot_idx for cam in cameras for shot_idx in cam.active_shot_idxs}
+        parent_items = await self._request_camera_parent_items(cameras, shot_desc_by_idx)
+        for cam, parent_cam_item in zip(cameras, parent_items):
+            if parent_cam_item is not None and parent_cam_item.parent_cam_idx is not None and parent_cam_item.parent_shot_idx not in allowed_shot_idxs:
+                raise ValueError(f"Camera {cam.idx} depends on shot {parent_cam_item.parent_shot_idx} outside its group")
+        return parent_items
+
+
+    async def _request_camera_parent_items(
+        self,
+        cameras: List[Camera],
+        shot_desc_by_idx: Dict[int, Union[ShotDescription, ShotBriefDescription]],
+    ) -> List[Optional[CameraParentItem]]:
+        parser = PydanticOutputParser(pydantic_object=CameraTreeResponse)
 
         camera_seq_str = "<CAMERA_SEQ>\n"
         for cam in cameras:
@@ -144,7 +220,7 @@ class CameraImageGenerator:
         ]
 
         chain = self.chat_model | parser
-        response: CameraTreeResponse = await chain.ainvoke(messages)
+        response: CameraTreeResponse = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
         parent_items = response.camera_parent_items
         if len(parent_items) != len(cameras):
             raise ValueError(f"Camera tree response length mismatch: expected {len(cameras)}, got {len(parent_items)}")
@@ -172,13 +248,7 @@ class CameraImageGenerator:
                     raise ValueError(f"Camera tree contains a cycle involving camera {cam.idx}")
                 seen.add(current)
 
-        for cam, parent_cam_item in zip(cameras, parent_items):
-            cam.parent_cam_idx = parent_cam_item.parent_cam_idx if parent_cam_item is not None else None
-            cam.parent_shot_idx = parent_cam_item.parent_shot_idx if parent_cam_item is not None else None
-            cam.reason = parent_cam_item.reason if parent_cam_item is not None else None
-            cam.is_parent_fully_covers_child = parent_cam_item.is_parent_fully_covers_child if parent_cam_item is not None else None
-            cam.missing_info = parent_cam_item.missing_info if parent_cam_item is not None else None
-        return cameras
+        return parent_items
 
 
     async def generate_transition_video(
@@ -247,12 +317,171 @@ class CameraImageGenerator:
         image_output = await self.image_generator.generate_single_image(
             prompt=prompt,
             reference_image_paths=reference_image_paths,
-            size="1600x900",
+            size=self.image_size,
+        )
+        return image_output
+
+
+    async def generate_new_camera_image_by_edit(
+        self,
+        first_shot_visual_desc: str,
+        second_shot_visual_desc: str,
+        first_shot_ff_path: str,
+    ) -> ImageOutput:
+        """Re-frame the parent shot's first frame as the child camera with one image edit.
+
+        A cheaper stand-in for generate_transition_video + get_new_camera_image:
+        the parent frame is passed as the reference and the model is asked for
+        the same moment seen from the child camera.
+        """
+        prompt = "Image 0: The first frame of the current shot."
+        prompt += "\nGenerate the first frame of the next shot, which shows the same scene at the same moment from a different camera position. Keep the setting, lighting, colors, style and the appearance of every character consistent with Image 0; only the framing and camera angle change."
+        prompt += f"\nThe current shot description: {first_shot_visual_desc}."
+        prompt += f"\nThe next shot description: {second_shot_visual_desc}."
+        image_output = await self.image_generator.generate_single_image(
+            prompt=prompt,
+            reference_image_paths=[first_shot_ff_path],
+            size=self.image_size,
         )
         return image_output
 
 
 
+# An edited new-camera image closer than this (in perceptual-hash bits) to the
+# parent frame is treated as an unchanged copy rather than a new angle.
+NEW_CAMERA_MIN_HASH_DISTANCE = 4
+# Minimum hue/saturation histogram correlation with the parent frame for the
+# edit to count as the same set under the same lighting.
+NEW_CAMERA_MIN_HISTOGRAM_CORRELATION = 0.5
+NEW_CAMERA_MIN_SHARPNESS = 30.0
+NEW_CAMERA_MIN_EXPOSURE = 0.5
+
+
+def _hue_saturation_histogram(path: str):
+    with Image.open(path) as image:
+        rgb = np.asarray(image.convert("RGB"))
+    hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    histogram = cv2.calcHist([hsv], [0, 1], None, [32, 32], [0, 180, 0, 256])
+    return cv2.normalize(histogram, histogram)
+
+
+def new_camera_image_is_consistent(parent_ff_path: str, new_camera_image_path: str) -> bool:
+    """Local check that an edited new-camera image is usable.
+
+    The image must be sharp and well exposed, keep the parent frame's aspect
+    ratio, differ from the parent (a new angle, not a copy) and share its
+    colour distribution (the same set and lighting).
+    """
+    try:
+        parent = assess_image(parent_ff_path)
+        edited = assess_image(new_camera_image_path)
+        correlation = cv2.compareHist(_hue_saturation_histogram(parent_ff_path), _hue_saturation_histogram(new_camera_image_path), cv2.HISTCMP_CORREL)
+    except Exception as e:
+        logging.warning(f"Could not check new camera image {new_camera_image_path}: {e}")
+        return False
+
+    distance = hash_distance(parent.phash, edited.phash)
+    checks = {
+        "sharpness": edited.sharpness >= NEW_CAMERA_MIN_SHARPNESS,
+        "exposure": edited.exposure >= NEW_CAMERA_MIN_EXPOSURE,
+        "aspect_ratio": abs(edited.aspect_ratio / parent.aspect_ratio - 1.0) <= 0.1,
+        "new_angle": distance >= NEW_CAMERA_MIN_HASH_DISTANCE,
+        "same_set": correlation >= NEW_CAMERA_MIN_HISTOGRAM_CORRELATION,
+    }
+    failed = [name for name, passed in checks.items() if not passed]
+    if failed:
+        logging.info(f"New camera image {new_camera_image_path} failed consistency checks {failed} (hash distance {distance}, histogram correlation {correlation:.2f})")
+    return not failed
+
+
+# Scenes with at least this many cameras use the two-level camera-tree builder.
+HIERARCHICAL_CAMERA_TREE_MIN_CAMERAS = 12
+# Largest cluster handed to the model in one call by the two-level builder.
+CAMERA_CLUSTER_MAX_SIZE = 8
+# Weight of first-shot text similarity relative to one adjacent shot pair.
+_CAMERA_TEXT_SIMILARITY_WEIGHT = 2.0
+_CAMERA_CLUSTER_MIN_SCORE = 0.3
+
+
+def _apply_camera_parent_item(cam: Camera, parent_cam_item: Optional[CameraParentItem]) -> None:
+    cam.parent_cam_idx = parent_cam_item.parent_cam_idx if parent_cam_item is not None else None
+    cam.parent_shot_idx = parent_cam_item.parent_shot_idx if parent_cam_item is not None else None
+    cam.reason = parent_cam_item.reason if parent_cam_item is not None else None
+    cam.is_parent_fully_covers_child = parent_cam_item.is_parent_fully_covers_child if parent_cam_item is not None else None
+    cam.missing_info = parent_cam_item.missing_info if parent_cam_item is not None else None
+
+
+def _text_features(text: str) -> Set[str]:
+    text = text.lower()
+    words = set(re.findall(r"[a-z0-9]{3,}", text))
+    # CJK text has no spaces; character bigrams stand in for words.
+    cjk_runs = re.findall(r"[\u4e00-\u9fff]+", text)
+    bigrams = {run[i:i + 2] for run in cjk_runs for i in range(len(run) - 1)}
+    return words | bigrams
+
+
+def cluster_cameras(
+    cameras: List[Camera],
+    shot_descs: List[Union[ShotDescription, ShotBriefDescription]],
+    max_cluster_size: int = CAMERA_CLUSTER_MAX_SIZE,
+) -> List[List[Camera]]:
+    """Group cameras that cut to each other or frame similar content.
+
+    Two cameras score one point per pair of consecutive shots that cut
+    between them, plus the weighted Jaccard similarity of their first shots'
+    text (first-frame description when decomposed, else visual description).
+    Pairs are merged greedily, best score first, as long as the merged
+    cluster stays within `max_cluster_size`. Clusters and the cameras inside
+    them are ordered by first shot, so each cluster's first camera is the
+    one that appears earliest.
+    """
+    shot_desc_by_idx = {shot.idx: shot for shot in shot_descs}
+    cam_by_shot = {shot_idx: cam.idx for cam in cameras for shot_idx in cam.active_shot_idxs}
+    first_shot = {cam.idx: min(cam.active_shot_idxs) if cam.active_shot_idxs else float("inf") for cam in cameras}
+
+    scores: Dict[Tuple[int, int], float] = {}
+    ordered_shot_idxs = sorted(cam_by_shot)
+    for prev_idx, next_idx in zip(ordered_shot_idxs, ordered_shot_idxs[1:]):
+        a, b = cam_by_shot[prev_idx], cam_by_shot[next_idx]
+        if a != b:
+            key = (min(a, b), max(a, b))
+            scores[key] = scores.get(key, 0.0) + 1.0
+
+    features = {}
+    for cam in cameras:
+        shot = shot_desc_by_idx.get(first_shot[cam.idx])
+        text = (getattr(shot, "ff_desc", None) or getattr(shot, "visual_desc", "")) if shot is not None else ""
+        features[cam.idx] = _text_features(text)
+    for i, cam_a in enumerate(cameras):
+        for cam_b in cameras[i + 1:]:
+            union = features[cam_a.idx] | features[cam_b.idx]
+            if not union:
+                continue
+            similarity = len(features[cam_a.idx] & features[cam_b.idx]) / len(union)
+            key = (min(cam_a.idx, cam_b.idx), max(cam_a.idx, cam_b.idx))
+            scores[key] = scores.get(key, 0.0) + _CAMERA_TEXT_SIMILARITY_WEIGHT * similarity
+
+    cluster_of = {cam.idx: cam.idx for cam in cameras}
+    members = {cam.idx: [cam.idx] for cam in cameras}
+    for (a, b), score in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+        if score < _CAMERA_CLUSTER_MIN_SCORE:
+            break
+        root_a, root_b = cluster_of[a], cluster_of[b]
+        if root_a == root_b or len(members[root_a]) + len(members[root_b]) > max_cluster_size:
+            continue
+        for cam_idx in members[root_b]:
+            cluster_of[cam_idx] = root_a
+        members[root_a].extend(members.pop(root_b))
+
+    cam_by_idx = {cam.idx: cam for cam in cameras}
+    clusters = [
+        sorted((cam_by_idx[cam_idx] for cam_idx in cam_idxs), key=lambda cam: (first_shot[cam.idx], cam.idx))
+        for cam_idxs in members.values()
+    ]
+    clusters.sort(key=lambda cluster: (first_shot[cluster[0].idx], cluster[0].idx))
+    return clusters
+
+
 def _validate_camera_tree(cameras: List[Camera]) -> None:
     """Reject parent assignments that would deadlock frame generation."""
     by_idx = {cam.idx: cam for cam in cameras}
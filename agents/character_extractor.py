@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
@@ -10,7 +11,8 @@ from tenacity import retry, stop_after_attempt
 from interfaces import CharacterInScene
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from utils.retry import after_func
+from utils.retry import after_func, retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 
 
 system_prompt_template_extract_characters = \
@@ -70,7 +72,8 @@ class CharacterExtractor:
         self.chat_model = chat_model
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=after_func,
     )
     async def extract_characters(self, script: str) -> List[CharacterInScene]:
@@ -84,7 +87,7 @@ class CharacterExtractor:
 
         chain = self.chat_model | parser
 
-        response: ExtractCharactersResponse = await chain.ainvoke(messages)
+        response: ExtractCharactersResponse = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
 
         return response.characters
 
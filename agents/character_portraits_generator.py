@@ -7,6 +7,8 @@ from langchain.chat_models.base import BaseChatModel
 from langchain.chat_models import init_chat_model
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
+import numpy as np
+from PIL import Image
 from interfaces import CharacterInScene, ImageOutput
 from langchain_core.messages import HumanMessage, SystemMessage
 
@@ -29,6 +31,75 @@ prompt_template_back = \
 Generate a full-body, back-view portrait of character {identifier} based on the provided front-view portrait, with a pure white background. Use a wide 16:9 landscape canvas, not a vertical portrait canvas. The character should be centered in the image, occupying the middle of the wide frame with enough horizontal empty space. No facial features should be visible.
 """
 
+prompt_template_turnaround = \
+"""
+Generate a character turnaround sheet of character {identifier} based on the following description, with a pure white background. Use a very wide landscape canvas showing the same character three times side by side, from left to right: a full-body front view gazing straight ahead, a full-body side view facing left, and a full-body back view with no facial features visible. Standing with arms relaxed at sides in every view. Keep the three views the same size, evenly spaced, and clearly separated by white space; they must not overlap. No text, labels, borders or dividing lines.
+Features: {features}
+Style: {style}
+"""
+
+# Order of the views on a turnaround sheet, left to right.
+TURNAROUND_VIEWS = ("front", "side", "back")
+
+# Gray levels above this count as the sheet's white background.
+_TURNAROUND_WHITE_THRESHOLD = 235
+
+# Content runs narrower than this fraction of the sheet width are specks, not figures.
+_TURNAROUND_MIN_RUN_FRACTION = 0.01
+
+
+def split_turnaround_sheet(sheet: Image.Image) -> Dict[str, Image.Image]:
+    """Cut a turnaround sheet into front/side/back portraits.
+
+    Cuts go through the two widest white column gaps between figures; if the
+    sheet does not show at least three separated figures it is cut into equal
+    thirds instead. Each view is cropped to its content and centred on a white
+    16:9 canvas like the per-view portraits. Raises ValueError if the sheet
+    has no white background or a view is empty.
+    """
+    rgb = sheet.convert("RGB")
+    gray = np.asarray(rgb.convert("L"))
+    height, width = gray.shape
+    content = gray < _TURNAROUND_WHITE_THRESHOLD
+    if max(content[0].mean(), content[-1].mean(), content[:, 0].mean(), content[:, -1].mean()) > 0.5:
+        raise ValueError("Turnaround sheet does not have a white background")
+    content_columns = content.any(axis=0)
+
+    runs = []
+    start = None
+    for x, has_content in enumerate(content_columns):
+        if has_content and start is None:
+            start = x
+        elif not has_content and start is not None:
+            runs.append((start, x))
+            start = None
+    if start is not None:
+        runs.append((start, width))
+    runs = [run for run in runs if run[1] - run[0] >= width * _TURNAROUND_MIN_RUN_FRACTION]
+
+    if len(runs) >= len(TURNAROUND_VIEWS):
+        gaps = sorted(
+            ((runs[i + 1][0] - runs[i][1], (runs[i][1] + runs[i + 1][0]) // 2) for i in range(len(runs) - 1)),
+            reverse=True,
+        )
+        cuts = sorted(middle for _, middle in gaps[:len(TURNAROUND_VIEWS) - 1])
+    else:
+        cuts = [width * i // len(TURNAROUND_VIEWS) for i in range(1, len(TURNAROUND_VIEWS))]
+
+    bounds = [0] + cuts + [width]
+    views = {}
+    for view, left, right in zip(TURNAROUND_VIEWS, bounds, bounds[1:]):
+        ys, xs = np.nonzero(content[:, left:right])
+        if len(xs) == 0:
+            raise ValueError(f"Turnaround sheet has no {view} view")
+        figure = rgb.crop((left + int(xs.min()), int(ys.min()), left + int(xs.max()) + 1, int(ys.max()) + 1))
+        canvas_height = int(figure.height * 1.2)
+        canvas_width = max(canvas_height * 16 // 9, int(figure.width * 1.2))
+        canvas = Image.new("RGB", (canvas_width, canvas_height), (255, 255, 255))
+        canvas.paste(figure, ((canvas_width - figure.width) // 2, (canvas_height - figure.height) // 2))
+        views[view] = canvas
+    return views
+
 
 class CharacterPortraitsGenerator:
     def __init__(
@@ -84,4 +155,63 @@ class CharacterPortraitsGenerator:
             reference_image_paths=[front_image_path],
             # size="512x512",
         )
-        return image_output
\ No newline at end of file
+        return image_output
+
+
+    async def generate_turnaround_portraits(
+        self,
+        character: CharacterInScene,
+        style: str,
+        character_dir: str,
+    ) -> Dict[str, str]:
+        """Generate all three portraits from one turnaround sheet.
+
+        The sheet is kept as turnaround.png; views whose file already exists
+        are left untouched. Returns the path of every view. Raises if the
+        sheet cannot be generated or split, so callers can fall back to the
+        per-view methods.
+        """
+        features = "(static) " + (character.static_features or "") + "; (dynamic) " + (character.dynamic_features or "")
+        prompt = prompt_template_turnaround.format(
+            identifier=character.identifier_in_scene,
+            features=features,
+            style=style,
+        )
+        sheet_output = await self.image_generator.generate_single_image(
+            prompt=prompt,
+            reference_image_paths=[],
+            aspect_ratio="21:9",
+        )
+        sheet_path = os.path.join(character_dir, "turnaround.png")
+        sheet_output.save(sheet_path)
+        with Image.open(sheet_path) as sheet:
+            views = split_turnaround_sheet(sheet)
+
+        paths = {}
+        for view, image in views.items():
+            paths[view] = os.path.join(character_dir, f"{view}.png")
+            if not os.path.exists(paths[view]):
+                image.save(paths[view])
+        return paths
+
+
+    async def fill_missing_views_from_turnaround(
+        self,
+        character: CharacterInScene,
+        style: str,
+        character_dir: str,
+    ) -> bool:
+        """Portrait mode "turnaround": draw the missing views as one sheet.
+
+        Does nothing when every view already exists. A sheet that cannot be
+        generated or split is only logged and False is returned; the caller
+        then fills whatever is still missing with the per-view methods.
+        """
+        if all(os.path.exists(os.path.join(character_dir, f"{view}.png")) for view in TURNAROUND_VIEWS):
+            return False
+        try:
+            await self.generate_turnaround_portraits(character, style, character_dir)
+        except Exception as e:
+            logging.warning(f"Turnaround sheet failed for {character.identifier_in_scene} ({e}); falling back to per-view portraits.")
+            return False
+        return True
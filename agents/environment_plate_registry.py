@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from interfaces import ImageOutput
+from interfaces.environment import EnvironmentInScene
+from utils.text import safe_path_component
+
+
+prompt_template_environment_plate = \
+"""
+Generate a wide establishing shot of the following location, with no people or characters in it. Use a wide 16:9 landscape canvas. Show the whole set clearly, with natural lighting that matches the time of day, so it can serve as the visual reference for every shot that takes place here.
+Location: {slugline}
+Setting: {description}
+Style: {style}
+"""
+
+# Plate size when the caller does not pass the size of its render tier.
+DEFAULT_PLATE_SIZE = "1600x900"
+
+# Continuity suffixes that do not change what the location looks like.
+_SLUGLINE_CONTINUITY_SUFFIXES = ("CONTINUOUS", "MOMENTS LATER", "LATER", "SAME TIME", "SAME")
+
+
+def normalize_slugline(slugline: str) -> str:
+    """Canonical form of a slugline, used as the environment registry key.
+
+    "int. coffee shop – night (continuous)" and "INT. COFFEE SHOP - NIGHT"
+    both become "INT. COFFEE SHOP - NIGHT": case, whitespace and dash
+    variants are unified, and parentheticals and continuity suffixes dropped.
+    """
+    text = re.sub(r"\([^)]*\)", " ", slugline.upper())
+    text = re.sub(r"\s*[-–—]+\s*", " - ", text)
+    text = re.sub(r"\s+", " ", text).strip(" -")
+    parts = [part for part in text.split(" - ") if part and part not in _SLUGLINE_CONTINUITY_SUFFIXES]
+    return " - ".join(parts)
+
+
+def environment_plate_description(slugline: str) -> str:
+    return f"An establishing plate of the location {slugline}, with no characters."
+
+
+class EnvironmentPlateRegistry:
+    """One establishing plate per location, shared by every scene set there.
+
+    Plates live in `registry_dir` next to environment_plates.json, which maps
+    each normalized slugline to its plate, so a later session (or another
+    pipeline pointed at the same directory) reuses them instead of drawing
+    the set again. Concurrent requests for one location share one image call.
+    Plates are drawn at `image_size`, the keyframe size of the render tier
+    they are used in.
+    """
+
+    def __init__(
+        self,
+        image_generator,
+        registry_dir: str,
+        image_size: str = DEFAULT_PLATE_SIZE,
+    ):
+        self.image_generator = image_generator
+        self.registry_dir = registry_dir
+        self.image_size = image_size
+        os.makedirs(self.registry_dir, exist_ok=True)
+        self.registry_path = os.path.join(self.registry_dir, "environment_plates.json")
+        self.registry: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(self.registry_path):
+            with open(self.registry_path, "r", encoding="utf-8") as f:
+                self.registry = json.load(f)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+
+    def get(self, slugline: str) -> Optional[Tuple[str, str]]:
+        """The (path, description) pair of a cached plate, if one exists on disk."""
+        item = self.registry.get(normalize_slugline(slugline))
+        if item is None or not os.path.exists(item["path"]):
+            return None
+        return item["path"], item["description"]
+
+
+    async def get_or_create(
+        self,
+        environment: EnvironmentInScene,
+        style: str,
+    ) -> Tuple[str, str]:
+        key = normalize_slugline(environment.slugline)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+            prompt = prompt_template_environment_plate.format(
+                slugline=key,
+                description=environment.description,
+                style=style,
+            )
+            plate: ImageOutput = await self.image_generator.generate_single_image(
+                prompt=prompt,
+                reference_image_paths=[],
+                size=self.image_size,
+            )
+            plate_path = os.path.join(self.registry_dir, f"{safe_path_component(key)}.png")
+            plate.save(plate_path)
+            logging.info(f"Generated environment plate for {key}: {plate_path}")
+
+            self.registry[key] = {
+                "slugline": key,
+                "path": plate_path,
+                "description": environment_plate_description(key),
+            }
+            with open(self.registry_path, "w", encoding="utf-8") as f:
+                json.dump(self.registry, f, ensure_ascii=False, indent=4)
+            return plate_path, self.registry[key]["description"]
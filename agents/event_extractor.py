@@ -8,6 +8,7 @@ from utils.robust_json_parser import TrailingCommaTolerantPydanticOutputParser a
 from langchain.chat_models import init_chat_model
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt
+from utils.retry import retry_counting_successes, stop_on_retry_budget
 
 from interfaces import Event
 
@@ -121,7 +122,8 @@ class EventExtractor:
 
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=lambda retry_state: logging.warning(f"Retrying extract_next_event due to error: {retry_state.outcome.exception()}"),
     )
     def extract_next_event(
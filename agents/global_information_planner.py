@@ -9,6 +9,8 @@ from langchain.output_parsers import PydanticOutputParser
 from interfaces import Event, Scene
 from interfaces import CharacterInScene, CharacterInEvent, CharacterInNovel
 from tenacity import retry, stop_after_attempt
+from utils.retry import retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 
 
 system_prompt_template_merge_characters_across_scenes_in_event = \
@@ -152,7 +154,8 @@ class GlobalInformationPlanner:
         )
     
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=lambda retry_state: logging.warning(f"Retrying due to {retry_state.outcome.exception()}"),
     )
     async def merge_characters_across_scenes_in_event(
@@ -191,7 +194,7 @@ class GlobalInformationPlanner:
         ]
 
         chain = self.chat_model | parser
-        response: MergeCharactersAcrossScenesInEventResponse = await chain.ainvoke(messages)
+        response: MergeCharactersAcrossScenesInEventResponse = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
         characters_in_event = response.characters
 
         # check the output is valid
@@ -214,7 +217,8 @@ class GlobalInformationPlanner:
         return characters_in_event
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=lambda retry_state: logging.warning(f"Retrying due to {retry_state.outcome.exception()}"),
     )
     def merge_characters_to_existing_characters_in_novel(
@@ -5,6 +5,8 @@ from typing import List, Tuple
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain.chat_models import init_chat_model
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.novel_stream import NovelStream
+from utils.deadline import cap_timeout
 
 
 
@@ -93,6 +95,8 @@ class NovelCompressor:
             model_provider="openai",
         )
 
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -107,6 +111,15 @@ class NovelCompressor:
         return novel_chunks
 
 
+    def split_stream(
+        self,
+        stream: NovelStream,
+        manifest_path: str | None = None,
+    ):
+        """Lazily split a memory-mapped novel into chunk views with the same sizes as `split`."""
+        return stream.iter_chunks(self.chunk_size, self.chunk_overlap, manifest_path=manifest_path)
+
+
     async def compress(
         self,
         index_chunk_pairs: List[Tuple[int, str]],
@@ -140,7 +153,7 @@ class NovelCompressor:
                     )
                 ),
             ]
-            response = await self.chat_model.ainvoke(messages)
+            response = await asyncio.wait_for(self.chat_model.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
             compressed_novel_chunk = response.content
             logging.info(f"Compressed novel chunk {index}")
         return index, compressed_novel_chunk
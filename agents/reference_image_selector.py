@@ -1,5 +1,10 @@
+import asyncio
+import copy
+import hashlib
+import json
 import logging
-from typing import List, Tuple
+import re
+from typing import Dict, List, Optional, Tuple
 from tenacity import retry, stop_after_attempt
 from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -8,7 +13,8 @@ from utils.robust_json_parser import TrailingCommaTolerantPydanticOutputParser a
 from langchain.chat_models import init_chat_model
 from utils.image import image_path_to_b64
 
-from utils.retry import after_func
+from utils.retry import after_func, retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 
 system_prompt_template_select_reference_images_only_text = \
 """
@@ -109,6 +115,12 @@ You need to select the most relevant reference images based on the user's descri
 """
 
 
+system_prompt_template_select_reference_images_multimodal_batch = system_prompt_template_select_reference_images_multimodal.replace(
+    "You will receive a text description of the target frame, along with a sequence of reference images.\n- The text description of the target frame is enclosed within <FRAME_DESC> and </FRAME_DESC>.",
+    "You will receive the text descriptions of several target frames, along with one sequence of reference images shared by all of them.\n- The text description of each target frame is enclosed within <FRAME_i_DESC> and </FRAME_i_DESC>, where i is the frame index to copy into frame_idx. Make an independent selection and text prompt for every frame, choosing only among the images listed as allowed right after that frame's description.",
+)
+
+
 human_prompt_template_select_reference_images = \
 """
 <FRAME_DESC>
@@ -136,6 +148,126 @@ class RefImageIndicesAndTextPrompt(BaseModel):
 
 
 
+class FrameRefImageIndicesAndTextPrompt(RefImageIndicesAndTextPrompt):
+    frame_idx: int = Field(
+        description="The index of the target frame this selection belongs to, copied from the <FRAME_i_DESC> tag of the input.",
+        examples=[0, 1],
+    )
+
+
+class BatchRefImageSelectionResponse(BaseModel):
+    selections: List[FrameRefImageIndicesAndTextPrompt] = Field(
+        description="One selection per target frame, in the same order as the input frames.",
+    )
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _candidate_set_hash(image_path_and_text_pairs: List[Tuple[str, str]]) -> str:
+    return _sha256(json.dumps(sorted([list(pair) for pair in image_path_and_text_pairs]), ensure_ascii=False))
+
+
+# Portrait descriptions written by the pipelines' portrait registries:
+# "A front view portrait of X." (Idea2Video, Script2Video) or the view-less
+# "A portrait of X" (Novel2Movie), which is a front view.
+_PORTRAIT_DESCRIPTION_RE = re.compile(r"^A (?:(front|side|back) view )?portrait of (.+?)\.?$")
+
+# Frames the render pipeline writes under shots/<idx>/: a camera's earlier
+# frames and the camera-tree parent's new-camera image.
+_SCENE_IMAGE_PATH_RE = re.compile(r"(?:^|[\\/])(?:first_frame|last_frame|new_camera_\d+)\.png$")
+
+# Descriptions written by EnvironmentPlateRegistry for location plates.
+_ENVIRONMENT_PLATE_DESCRIPTION_PREFIX = "An establishing plate of the location "
+
+# View keywords looked up in the frame description, checked back/side before
+# front because phrases like "back to the camera" also mention the camera.
+_VIEW_KEYWORDS = {
+    "back": ["from behind", "back to the camera", "back toward the camera", "back towards the camera", "back view", "facing away", "rear view", "背对", "背影", "背面"],
+    "side": ["in profile", "profile view", "side view", "side profile", "facing left", "facing right", "侧面", "侧身", "侧脸"],
+    "front": ["facing the camera", "faces the camera", "facing forward", "front view", "frontal", "looking at the camera", "looks at the camera", "正面", "面向镜头", "面对镜头"],
+}
+
+
+class LocalReferenceResolver:
+    """Rule-based reference selection for frames whose choice is obvious.
+
+    A frame is resolved without a model call when its candidates hold the
+    portraits of at most one character and at most one scene image (the
+    camera's earlier frame or the camera-tree parent's new-camera image; a
+    location plate counts only when neither is offered), and the frame
+    description does not name conflicting views. The portrait view
+    follows the view keywords (front when none is named). Anything else,
+    including a candidate that is none of these, is ambiguous and returns
+    None so the caller falls back to the model.
+    """
+
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def resolve(
+        self,
+        available_image_path_and_text_pairs: List[Tuple[str, str]],
+        frame_description: str,
+    ) -> Optional[dict]:
+        self.lookups += 1
+        result = self._resolve(available_image_path_and_text_pairs, frame_description)
+        if result is not None:
+            self.hits += 1
+        logging.info(f"Local reference resolver {'hit' if result is not None else 'miss'} (hit rate {self.hit_rate:.0%} over {self.lookups} frames)")
+        return result
+
+    def _resolve(self, available_image_path_and_text_pairs, frame_description):
+        portraits: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        scene_images = []
+        plates = []
+        for pair in available_image_path_and_text_pairs:
+            match = _PORTRAIT_DESCRIPTION_RE.match(pair[1].strip())
+            if match:
+                portraits.setdefault(match.group(2), {})[match.group(1) or "front"] = pair
+            elif pair[1].startswith(_ENVIRONMENT_PLATE_DESCRIPTION_PREFIX):
+                plates.append(pair)
+            elif _SCENE_IMAGE_PATH_RE.search(pair[0]):
+                scene_images.append(pair)
+            else:
+                return None
+        # An earlier frame of the camera already anchors the set better than the plate.
+        if not scene_images:
+            scene_images = plates
+
+        if len(portraits) > 1 or len(scene_images) > 1 or (not portraits and not scene_images):
+            return None
+
+        selected = list(scene_images)
+        lines = ["Create an image based on the following description:", frame_description.strip()]
+        if scene_images:
+            lines.append("Keep the composition, background, lighting and style of Image 0.")
+        if portraits:
+            (identifier, views), = portraits.items()
+            description = frame_description.lower()
+            named_views = [view for view, keywords in _VIEW_KEYWORDS.items() if any(keyword in description for keyword in keywords)]
+            if len(named_views) > 1:
+                return None
+            view = named_views[0] if named_views else "front"
+            if view not in views:
+                if "front" not in views:
+                    return None
+                view = "front"
+            selected.append(views[view])
+            lines.append(f"The appearance of {identifier} should reference Image {len(selected) - 1}.")
+
+        return {
+            "reference_image_path_and_text_pairs": [tuple(pair) for pair in selected],
+            "text_prompt": "\n".join(lines),
+        }
+
+
 class ReferenceImageSelector:
     def __init__(
         self,
@@ -143,10 +275,116 @@ class ReferenceImageSelector:
     ):
 
         self.chat_model = chat_model
+        self.local_resolver = LocalReferenceResolver()
+        # (frame description hash, candidate set hash) -> selector output
+        self._selection_cache: Dict[Tuple[str, str], dict] = {}
+
+
+    def _cache_key(self, available_image_path_and_text_pairs, frame_description: str) -> Tuple[str, str]:
+        return _sha256(frame_description), _candidate_set_hash(available_image_path_and_text_pairs)
+
+
+    def get_cached_selection(self, available_image_path_and_text_pairs, frame_description: str) -> Optional[dict]:
+        cached = self._selection_cache.get(self._cache_key(available_image_path_and_text_pairs, frame_description))
+        return copy.deepcopy(cached) if cached is not None else None
 
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
+        after=after_func,
+    )
+    async def select_reference_images_and_generate_prompts_batch(
+        self,
+        available_image_path_and_text_pairs: List[Tuple[str, str]],
+        frame_descriptions: List[str],
+        frame_image_path_and_text_pairs: Optional[List[List[Tuple[str, str]]]] = None,
+    ) -> List[dict]:
+        """Select references for several frames that share one candidate pool.
+
+        Every candidate image is uploaded once for the whole batch rather than
+        once per frame, but each frame may only pick from its own candidates
+        (`frame_image_path_and_text_pairs`, defaulting to the shared pool):
+        the prompt lists a frame's allowed images and a selection outside them
+        is rejected. Frames already in the selection cache, which is keyed on
+        the frame's own candidates, or that the local resolver settles are
+        answered without the model; the result has one selector output per
+        frame description, in order, shaped like
+        select_reference_images_and_generate_prompt's.
+        """
+        frame_pairs_list = [
+            frame_image_path_and_text_pairs[idx] if frame_image_path_and_text_pairs else available_image_path_and_text_pairs
+            for idx in range(len(frame_descriptions))
+        ]
+        results: List[Optional[dict]] = [
+            self.get_cached_selection(frame_pairs, frame_description)
+            for frame_pairs, frame_description in zip(frame_pairs_list, frame_descriptions)
+        ]
+        for idx, frame_description in enumerate(frame_descriptions):
+            if results[idx] is None:
+                results[idx] = self.local_resolver.resolve(frame_pairs_list[idx], frame_description)
+        pending = [idx for idx, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        human_content = []
+        for idx, (image_path, text) in enumerate(available_image_path_and_text_pairs):
+            human_content.append({
+                "type": "text",
+                "text": f"Image {idx}: {text}"
+            })
+            human_content.append({
+                "type": "image_url",
+                "image_url": {"url": image_path_to_b64(image_path)}
+            })
+        allowed_indices = {
+            frame_idx: [idx for idx, pair in enumerate(available_image_path_and_text_pairs) if pair in frame_pairs_list[frame_idx]]
+            for frame_idx in pending
+        }
+        for frame_idx in pending:
+            human_content.append({
+                "type": "text",
+                "text": f"<FRAME_{frame_idx}_DESC>\n{frame_descriptions[frame_idx]}\n</FRAME_{frame_idx}_DESC>\n"
+                        f"Allowed images for frame {frame_idx}: {', '.join(str(idx) for idx in allowed_indices[frame_idx])}"
+            })
+
+        parser = PydanticOutputParser(pydantic_object=BatchRefImageSelectionResponse)
+
+        messages = [
+            SystemMessage(content=system_prompt_template_select_reference_images_multimodal_batch.format(format_instructions=parser.get_format_instructions())),
+            HumanMessage(content=human_content)
+        ]
+
+        chain = self.chat_model | parser
+
+        try:
+            response = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
+        except Exception as e:
+            logging.error(f"Error get batch image prompts: \n{e}")
+            raise e
+
+        selections = {selection.frame_idx: selection for selection in response.selections}
+        missing = [frame_idx for frame_idx in pending if frame_idx not in selections]
+        if missing:
+            raise ValueError(f"batch reference selection is missing frames {missing}")
+        for frame_idx in pending:
+            selection = selections[frame_idx]
+            disallowed = [idx for idx in selection.ref_image_indices if idx not in allowed_indices[frame_idx]]
+            if disallowed:
+                raise ValueError(f"batch reference selection for frame {frame_idx} picked images {disallowed} outside its candidates {allowed_indices[frame_idx]}")
+        for frame_idx in pending:
+            selection = selections[frame_idx]
+            results[frame_idx] = {
+                "reference_image_path_and_text_pairs": select_pairs_by_indices(available_image_path_and_text_pairs, selection.ref_image_indices),
+                "text_prompt": selection.text_prompt,
+            }
+            self._selection_cache[self._cache_key(frame_pairs_list[frame_idx], frame_descriptions[frame_idx])] = copy.deepcopy(results[frame_idx])
+        return results
+
+
+    @retry(
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=after_func,
     )
     async def select_reference_images_and_generate_prompt(
@@ -154,6 +392,13 @@ class ReferenceImageSelector:
         available_image_path_and_text_pairs: List[Tuple[str, str]],
         frame_description: str,
     ):
+        cached = self.get_cached_selection(available_image_path_and_text_pairs, frame_description)
+        if cached is not None:
+            return cached
+        resolved = self.local_resolver.resolve(available_image_path_and_text_pairs, frame_description)
+        if resolved is not None:
+            return resolved
+
         filtered_image_path_and_text_pairs = available_image_path_and_text_pairs
 
         # 1. filter images using text-only model
@@ -178,7 +423,7 @@ class ReferenceImageSelector:
             chain = self.chat_model | parser
 
             try:
-                ref = await chain.ainvoke(messages)
+                ref = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
                 filtered_image_path_and_text_pairs = select_pairs_by_indices(available_image_path_and_text_pairs, ref.ref_image_indices)
                 logging.info(f"Filtered image idx:{ref.ref_image_indices}")
                 
@@ -212,12 +457,14 @@ class ReferenceImageSelector:
         chain = self.chat_model | parser
 
         try:
-            response = await chain.ainvoke(messages)
+            response = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
             reference_image_path_and_text_pairs = select_pairs_by_indices(filtered_image_path_and_text_pairs, response.ref_image_indices)
-            return {
+            selector_output = {
                 "reference_image_path_and_text_pairs": reference_image_path_and_text_pairs,
                 "text_prompt": response.text_prompt,
             }
+            self._selection_cache[self._cache_key(available_image_path_and_text_pairs, frame_description)] = copy.deepcopy(selector_output)
+            return selector_output
 
         except Exception as e:
             logging.error(f"Error get image prompt: \n{e}")
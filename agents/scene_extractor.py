@@ -1,3 +1,4 @@
+import asyncio
 from langchain_community.vectorstores import FAISS
 from interfaces import Event, Scene
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -7,6 +8,8 @@ from typing import List, Optional, Literal, Tuple, Dict
 from langchain_core.output_parsers import PydanticOutputParser
 from utils.robust_json_parser import TrailingCommaTolerantPydanticOutputParser as PydanticOutputParser
 from tenacity import retry, stop_after_attempt
+from utils.retry import retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 import logging
 
 system_prompt_template_get_next_scene = \
@@ -74,7 +77,8 @@ class SceneExtractor:
         )
 
     @retry(
-        stop=stop_after_attempt(5),
+        stop=stop_after_attempt(5) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=lambda retry_state: logging.warning(f"Retrying SceneExtractor.get_next_scene due to error: {retry_state.outcome.exception()}"),
     )
     async def get_next_scene(
@@ -106,5 +110,5 @@ class SceneExtractor:
         ]
 
         chain = self.chat_model | parser
-        scene = await chain.ainvoke(messages)
+        scene = await asyncio.wait_for(chain.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
         return scene
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import List, Optional
 from langchain_core.prompts import ChatPromptTemplate
@@ -7,7 +8,8 @@ from langchain.chat_models import init_chat_model
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from utils.retry import after_func
+from utils.retry import after_func, retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 
 
 
@@ -133,12 +135,12 @@ class Screenwriter:
             ("system", system_prompt_template_develop_story),
             ("human", human_prompt_template_develop_story.format(idea=idea, user_requirement=user_requirement)),
         ]
-        response = await self.chat_model.ainvoke(messages)
+        response = await asyncio.wait_for(self.chat_model.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
         story = response.content
         return story
 
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=30), after=after_func)
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, wait=wait_exponential(multiplier=1, max=30), after=after_func)
     async def write_script_based_on_story(
         self,
         story: str,
@@ -159,7 +161,7 @@ class Screenwriter:
             ("system", system_prompt_template_write_script_based_on_story.format(format_instructions=format_instructions)),
             ("human", human_prompt_template_write_script_based_on_story.format(story=story, user_requirement=user_requirement)),
         ]
-        response = await self.chat_model.ainvoke(messages)
+        response = await asyncio.wait_for(self.chat_model.ainvoke(messages), timeout=cap_timeout(None, "an LLM call"))
         response = parser.parse(response.content)
         script = response.script
         return script
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
@@ -5,6 +6,8 @@ from utils.robust_json_parser import TrailingCommaTolerantPydanticOutputParser a
 from langchain.chat_models import init_chat_model
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt
+from utils.retry import retry_counting_successes, stop_on_retry_budget
+from utils.deadline import cap_timeout
 
 
 system_prompt_template_script_enhancer = \
@@ -87,7 +90,8 @@ class ScriptEnhancer:
         )
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        retry=retry_counting_successes,
         after=lambda retry_state: logging.warning(f"Retrying enhance_script due to error: {retry_state.outcome.exception()}"),
     )
     async def enhance_script(
@@ -108,11 +112,14 @@ class ScriptEnhancer:
 
         try:
             logging.info("Enhancing planned script...")
-            response: EnhancedScriptResponse = await chain.ainvoke(
-                {
-                    "format_instructions": parser.get_format_instructions(),
-                    "planned_script": planned_script,
-                }
+            response: EnhancedScriptResponse = await asyncio.wait_for(
+                chain.ainvoke(
+                    {
+                        "format_instructions": parser.get_format_instructions(),
+                        "planned_script": planned_script,
+                    }
+                ),
+                timeout=cap_timeout(None, "an LLM call"),
             )
             logging.info("Script enhancement completed.")
             return response.enhanced_script
@@ -7,7 +7,8 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Literal
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from utils.retry import after_func
+from utils.retry import after_func, retry_counting_successes, stop_on_retry_budget
+from utils.deadline import check_deadline
 
 
 narrative_script_prompt_template = \
@@ -344,7 +345,7 @@ class ScriptPlanner:
             api_key=api_key,
         )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=30), after=after_func)
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, wait=wait_exponential(multiplier=1, max=30), after=after_func)
     def plan_script(
         self,
         basic_idea: str,
@@ -380,6 +381,8 @@ class ScriptPlanner:
         )
         router_chain = router_prompt_template | self.chat_model | router_parser
 
+        # These chains run synchronously, so the deadline can only stop them from starting.
+        check_deadline("routing the idea")
         routing = router_chain.invoke(
             {
                 "format_instructions": router_parser.get_format_instructions(),
@@ -419,6 +422,7 @@ class ScriptPlanner:
 
         try:
             logging.info(f"Planning script from basic idea: {basic_idea[:100]}...")
+            check_deadline("planning the script")
             response = planning_chain.invoke(
                 {
                     "format_instructions": planning_parser.get_format_instructions(),
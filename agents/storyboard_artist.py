@@ -1,5 +1,6 @@
 from typing import List, Optional, Literal
 import asyncio
+import re
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt
 
@@ -8,7 +9,10 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from interfaces import CharacterInScene, ShotDescription, ShotBriefDescription
 
-from utils.retry import after_func
+from utils.json_stream import JsonArrayStreamParser
+from utils.deadline import cap_timeout
+from utils.resilience import RETRY_BUDGET
+from utils.retry import after_func, retry_counting_successes, stop_on_retry_budget
 
 
 
@@ -70,6 +74,38 @@ human_prompt_template_design_storyboard = \
 
 
 
+# Camera index a storyboard chunk gives a shot that carries on the camera the
+# previous chunk ended with; every other index in a chunk is a new camera.
+CONTINUED_CAMERA_IDX = -1
+
+system_prompt_template_design_storyboard_chunk = system_prompt_template_design_storyboard.replace(
+    "The script focuses on only one scene; there is no need to handle multiple scene transitions. The script input is enclosed within <SCRIPT> and </SCRIPT>.",
+    "The script focuses on only one scene; there is no need to handle multiple scene transitions. The script input is enclosed within <SCRIPT> and </SCRIPT>. It may be one part of a longer scene; in that case design shots for this part only, starting from shot index 0.\n"
+    "- Preceding context (optional): What happens right before this part of the scene, such as the last shot already designed for it. Use it for continuity only and do not storyboard it again. It is enclosed within <PRECEDING_CONTEXT> and </PRECEDING_CONTEXT>.\n"
+    f"Number this part's cameras from 0. When there is preceding context and a shot is taken by the camera that films the end of it (same position and framing, carrying straight on), give that shot camera index {CONTINUED_CAMERA_IDX} instead.",
+)
+
+
+human_prompt_template_design_storyboard_chunk = \
+"""
+<PRECEDING_CONTEXT>
+{context_str}
+</PRECEDING_CONTEXT>
+
+<SCRIPT>
+{script_str}
+</SCRIPT>
+
+<CHARACTERS>
+{characters_str}
+</CHARACTERS>
+
+<USER_REQUIREMENT>
+{user_requirement_str}
+</USER_REQUIREMENT>
+"""
+
+
 system_prompt_template_decompose_visual_description = \
 """
 [Role]
@@ -167,6 +203,119 @@ class VisDescDecompositionResponse(BaseModel):
 
 
 
+class StoryboardResponse(BaseModel):
+    storyboard: List[ShotBriefDescription] = Field(
+        description="A complete storyboard of the scene, including the visual and audio description of each shot.",
+    )
+
+
+def split_script_into_beats(script: str, max_chars: int) -> List[str]:
+    """Split a scene script into chunks of whole beats of at most ~max_chars.
+
+    A beat is a blank-line separated paragraph (a single line when the script
+    has no blank lines). Beats are never cut; one longer than `max_chars`
+    becomes a chunk on its own.
+    """
+    script = script.strip()
+    beats = [beat.strip() for beat in re.split(r"\n\s*\n", script) if beat.strip()]
+    if len(beats) <= 1:
+        beats = [line.strip() for line in script.splitlines() if line.strip()]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for beat in beats:
+        if current and current_len + len(beat) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, current_len = [], 0
+        current.append(beat)
+        current_len += len(beat) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class VisDescDecompositionBatchItem(VisDescDecompositionResponse):
+    shot_idx: int = Field(
+        description="The index of the shot this decomposition belongs to, copied from the <SHOT_i> tag of the input.",
+        examples=[0, 1, 2],
+    )
+
+
+class VisDescDecompositionBatchResponse(BaseModel):
+    decompositions: List[VisDescDecompositionBatchItem] = Field(
+        description="One decomposition per input shot, in the same order as the input shots.",
+    )
+
+
+system_prompt_template_decompose_visual_descriptions_batch = system_prompt_template_decompose_visual_description.replace(
+    "You will receive a single visual text description of a shot that typically implicitly or explicitly contains information about the starting state, the motion process, and the ending state.",
+    "You will receive the visual text descriptions of several shots. Each typically implicitly or explicitly contains information about the starting state, the motion process, and the ending state. Decompose every shot independently.",
+).replace(
+    "- The description is enclosed within <VISUAL_DESC> and </VISUAL_DESC>.",
+    "- Each description is enclosed within <SHOT_i> and </SHOT_i>, where i is the shot index to copy into shot_idx.",
+)
+
+
+human_prompt_template_decompose_visual_descriptions_batch = \
+"""
+{visual_descs}
+
+<CHARACTERS>
+{characters_str}
+</CHARACTERS>
+"""
+
+
+# Parsers and prompt templates are stateless; build them once instead of per call.
+_storyboard_parser = PydanticOutputParser(pydantic_object=StoryboardResponse)
+_decomposition_parser = PydanticOutputParser(pydantic_object=VisDescDecompositionResponse)
+_decomposition_batch_parser = PydanticOutputParser(pydantic_object=VisDescDecompositionBatchResponse)
+_decomposition_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ('system', system_prompt_template_decompose_visual_description),
+        ('human', human_prompt_template_decompose_visual_description),
+    ]
+).partial(format_instructions=_decomposition_parser.get_format_instructions())
+_decomposition_batch_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ('system', system_prompt_template_decompose_visual_descriptions_batch),
+        ('human', human_prompt_template_decompose_visual_descriptions_batch),
+    ]
+).partial(format_instructions=_decomposition_batch_parser.get_format_instructions())
+
+
+def _message_text(message) -> str:
+    content = getattr(message, "content", message)
+    if isinstance(content, list):
+        return "".join(item.get("text", "") if isinstance(item, dict) else str(item) for item in content)
+    return str(content)
+
+
+def _characters_str_for_decomposition(characters: List[CharacterInScene]) -> str:
+    return "\n".join([f"{char.identifier_in_scene}: (static) {char.static_features}; (dynamic) {char.dynamic_features}" for char in characters])
+
+
+def _to_shot_description(
+    shot_brief_desc: ShotBriefDescription,
+    decomposition: VisDescDecompositionResponse,
+) -> ShotDescription:
+    return ShotDescription(
+        idx=shot_brief_desc.idx,
+        is_last=shot_brief_desc.is_last,
+        cam_idx=shot_brief_desc.cam_idx,
+        visual_desc=shot_brief_desc.visual_desc,
+        variation_type=decomposition.variation_type,
+        variation_reason=decomposition.variation_reason,
+        ff_desc=decomposition.ff_desc,
+        ff_vis_char_idxs=decomposition.ff_vis_char_idxs,
+        lf_desc=decomposition.lf_desc,
+        lf_vis_char_idxs=decomposition.lf_vis_char_idxs,
+        motion_desc=decomposition.motion_desc,
+        audio_desc=shot_brief_desc.audio_desc,
+    )
+
+
 class StoryboardArtist:
     def __init__(
         self,
@@ -175,7 +324,7 @@ class StoryboardArtist:
         self.chat_model = chat_model
 
 
-    @retry(stop=stop_after_attempt(3), after=after_func)
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, after=after_func)
     async def design_storyboard(
         self,
         script: str,
@@ -184,16 +333,11 @@ class StoryboardArtist:
         retry_timeout: int = 150,
     ) -> List[ShotBriefDescription]:
 
-        class StoryboardResponse(BaseModel):
-            storyboard: List[ShotBriefDescription] = Field(
-                description="A complete storyboard of the scene, including the visual and audio description of each shot.",
-            )
-
         script_str = script.strip()
         characters_str = "\n".join([f"Character {index}: {char}" for index, char in enumerate(characters)])
         user_requirement_str = user_requirement.strip() if user_requirement else ""
 
-        parser = PydanticOutputParser(pydantic_object=StoryboardResponse)
+        parser = _storyboard_parser
         messages = [
             ('system', system_prompt_template_design_storyboard.format(format_instructions=parser.get_format_instructions())),
             ('human', human_prompt_template_design_storyboard.format(script_str=script_str, characters_str=characters_str, user_requirement_str=user_requirement_str)),
@@ -201,7 +345,7 @@ class StoryboardArtist:
         chain = self.chat_model | parser
         response: StoryboardResponse = await asyncio.wait_for(
             chain.ainvoke(messages),
-            timeout=retry_timeout,
+            timeout=cap_timeout(retry_timeout),
         )
         storyboard = response.storyboard
 
@@ -210,54 +354,163 @@ class StoryboardArtist:
 
 
 
-    @retry(stop=stop_after_attempt(3), after=after_func)
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, after=after_func)
+    async def stream_storyboard(
+        self,
+        script: str,
+        characters: List[CharacterInScene],
+        shot_queue: asyncio.Queue,
+        user_requirement: Optional[str] = None,
+        retry_timeout: int = 150,
+    ) -> List[ShotBriefDescription]:
+        """Design the storyboard like `design_storyboard`, streaming shots as they complete.
+
+        Each shot object is put on `shot_queue` as soon as its closing brace
+        arrives in the token stream, so consumers can start on it while the
+        rest of the storyboard is still being generated. The returned list is
+        parsed from the full response. On a retry the shots are streamed
+        again, so consumers should key them by idx.
+        """
+        script_str = script.strip()
+        characters_str = "\n".join([f"Character {index}: {char}" for index, char in enumerate(characters)])
+        user_requirement_str = user_requirement.strip() if user_requirement else ""
+
+        parser = _storyboard_parser
+        messages = [
+            ('system', system_prompt_template_design_storyboard.format(format_instructions=parser.get_format_instructions())),
+            ('human', human_prompt_template_design_storyboard.format(script_str=script_str, characters_str=characters_str, user_requirement_str=user_requirement_str)),
+        ]
+
+        async def consume_stream() -> str:
+            stream_parser = JsonArrayStreamParser(key="storyboard")
+            parts = []
+            async for message_chunk in self.chat_model.astream(messages):
+                text = _message_text(message_chunk)
+                parts.append(text)
+                for item in stream_parser.feed(text):
+                    try:
+                        shot = ShotBriefDescription.model_validate(item)
+                    except ValueError:
+                        continue
+                    await shot_queue.put(shot)
+            return "".join(parts)
+
+        full_text = await asyncio.wait_for(consume_stream(), timeout=cap_timeout(retry_timeout))
+        response: StoryboardResponse = parser.parse(full_text)
+        return response.storyboard
+
+
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, after=after_func)
+    async def design_storyboard_chunk(
+        self,
+        script_chunk: str,
+        characters: List[CharacterInScene],
+        user_requirement: Optional[str] = None,
+        preceding_context: Optional[str] = None,
+        retry_timeout: int = 150,
+    ) -> List[ShotBriefDescription]:
+        """Design the shots for one part of a long scene.
+
+        Shot and camera indices in the result start from 0, except that a shot
+        continuing the camera the preceding context ends with has camera index
+        CONTINUED_CAMERA_IDX. The caller stitches and renumbers them.
+        """
+        script_str = script_chunk.strip()
+        characters_str = "\n".join([f"Character {index}: {char}" for index, char in enumerate(characters)])
+        user_requirement_str = user_requirement.strip() if user_requirement else ""
+        context_str = preceding_context.strip() if preceding_context else "None. This is the beginning of the scene."
+
+        parser = _storyboard_parser
+        messages = [
+            ('system', system_prompt_template_design_storyboard_chunk.format(format_instructions=parser.get_format_instructions())),
+            ('human', human_prompt_template_design_storyboard_chunk.format(context_str=context_str, script_str=script_str, characters_str=characters_str, user_requirement_str=user_requirement_str)),
+        ]
+        chain = self.chat_model | parser
+        response: StoryboardResponse = await asyncio.wait_for(
+            chain.ainvoke(messages),
+            timeout=cap_timeout(retry_timeout),
+        )
+        return response.storyboard
+
+
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, retry=retry_counting_successes, after=after_func)
     async def decompose_visual_description(
         self,
         shot_brief_desc: ShotBriefDescription,
         characters: List[CharacterInScene],
         retry_timeout: int = 150,
     ) -> ShotDescription:
-        parser = PydanticOutputParser(pydantic_object=VisDescDecompositionResponse)
-        prompt_template = ChatPromptTemplate.from_messages(
-            [
-                ('system', system_prompt_template_decompose_visual_description),
-                ('human', human_prompt_template_decompose_visual_description),
-            ]
-        )
-        chain = prompt_template | self.chat_model | parser
+        chain = _decomposition_prompt_template | self.chat_model | _decomposition_parser
 
         visual_desc = shot_brief_desc.visual_desc.strip()
-
-        characters_str = "\n".join([f"{char.identifier_in_scene}: (static) {char.static_features}; (dynamic) {char.dynamic_features}" for char in characters])
+        characters_str = _characters_str_for_decomposition(characters)
 
         decomposition: VisDescDecompositionResponse = await asyncio.wait_for(
             chain.ainvoke(
                 input={
-                    "format_instructions": parser.get_format_instructions(),
                     "visual_desc": visual_desc,
                     "characters_str": characters_str,
                 },
             ),
-            timeout=retry_timeout,
+            timeout=cap_timeout(retry_timeout),
         )
 
         validate_char_idxs(decomposition.ff_vis_char_idxs, len(characters), "ff_vis_char_idxs")
         validate_char_idxs(decomposition.lf_vis_char_idxs, len(characters), "lf_vis_char_idxs")
 
-        return ShotDescription(
-            idx=shot_brief_desc.idx,
-            is_last=shot_brief_desc.is_last,
-            cam_idx=shot_brief_desc.cam_idx,
-            visual_desc=shot_brief_desc.visual_desc,
-            variation_type=decomposition.variation_type,
-            variation_reason=decomposition.variation_reason,
-            ff_desc=decomposition.ff_desc,
-            ff_vis_char_idxs=decomposition.ff_vis_char_idxs,
-            lf_desc=decomposition.lf_desc,
-            lf_vis_char_idxs=decomposition.lf_vis_char_idxs,
-            motion_desc=decomposition.motion_desc,
-            audio_desc=shot_brief_desc.audio_desc,
+        return _to_shot_description(shot_brief_desc, decomposition)
+
+
+    # Not retried: a batch that comes back with the wrong shots is malformed,
+    # not unlucky, and the caller's per-shot fallback is cheaper than
+    # re-asking for the whole batch.
+    async def decompose_visual_descriptions_batch(
+        self,
+        shot_brief_descs: List[ShotBriefDescription],
+        characters: List[CharacterInScene],
+        retry_timeout: int = 240,
+    ) -> List[ShotDescription]:
+        """Decompose several shots with one structured call.
+
+        The response must cover exactly the requested shots; anything else
+        raises, as does an invalid character index, and the caller falls
+        back to per-shot calls.
+        """
+        chain = _decomposition_batch_prompt_template | self.chat_model | _decomposition_batch_parser
+
+        visual_descs = "\n\n".join(
+            f"<SHOT_{shot.idx}>\n{shot.visual_desc.strip()}\n</SHOT_{shot.idx}>"
+            for shot in shot_brief_descs
         )
+        characters_str = _characters_str_for_decomposition(characters)
+
+        response: VisDescDecompositionBatchResponse = await asyncio.wait_for(
+            chain.ainvoke(
+                input={
+                    "visual_descs": visual_descs,
+                    "characters_str": characters_str,
+                },
+            ),
+            timeout=cap_timeout(retry_timeout),
+        )
+
+        decompositions = {item.shot_idx: item for item in response.decompositions}
+        requested = [shot.idx for shot in shot_brief_descs]
+        if sorted(decompositions) != sorted(requested) or len(response.decompositions) != len(requested):
+            raise ValueError(
+                f"batch decomposition returned shots {[item.shot_idx for item in response.decompositions]}; "
+                f"expected exactly {requested}"
+            )
+
+        shot_descriptions = []
+        for shot in shot_brief_descs:
+            decomposition = decompositions[shot.idx]
+            validate_char_idxs(decomposition.ff_vis_char_idxs, len(characters), "ff_vis_char_idxs")
+            validate_char_idxs(decomposition.lf_vis_char_idxs, len(characters), "lf_vis_char_idxs")
+            shot_descriptions.append(_to_shot_description(shot, decomposition))
+        # Credited by hand, as the decorated calls do through retry_counting_successes.
+        RETRY_BUDGET.record_success()
+        return shot_descriptions
 
 
 def validate_char_idxs(idxs, num_characters, field_name):
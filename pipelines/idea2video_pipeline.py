@@ -2,14 +2,16 @@ import os
 import shutil
 import logging
 from agents import Screenwriter, CharacterExtractor, CharacterPortraitsGenerator
-from pipelines.script2video_pipeline import Script2VideoPipeline
+from pipelines.render_planner import RenderPlan
+from pipelines.script2video_pipeline import RENDER_PLAN_FILE, Script2VideoPipeline
 from interfaces import CharacterInScene
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 import asyncio
 import json
 import yaml
 from langchain.chat_models import init_chat_model
 from tools.render_backend import RenderBackend
+from utils.deadline import with_deadline
 from utils.provider_presets import resolve_chat_model_config
 from utils.text import safe_path_component
 from utils.video import concatenate_video_files
@@ -27,12 +29,15 @@ class Idea2VideoPipeline:
         image_generator: str,
         video_generator: str,
         working_dir: str,
+        portrait_mode: str = "per_view",
     ):
         self.chat_model = chat_model
         self.image_generator = image_generator
         self.video_generator = video_generator
         self.working_dir = working_dir
         os.makedirs(self.working_dir, exist_ok=True)
+        # "per_view" or "turnaround", see CharacterPortraitsGenerator.fill_missing_views_from_turnaround.
+        self.portrait_mode = portrait_mode
 
         self.screenwriter = Screenwriter(chat_model=self.chat_model)
         self.character_extractor = CharacterExtractor(
@@ -48,12 +53,14 @@ class Idea2VideoPipeline:
         chat_model_args = resolve_chat_model_config(config["chat_model"]["init_args"])
         chat_model = init_chat_model(**chat_model_args)
         backend = RenderBackend.from_config(config)
+        portrait_config = config.get("portraits") or {}
 
         return cls(
             chat_model=chat_model,
             image_generator=backend.image_generator,
             video_generator=backend.video_generator,
             working_dir=config["working_dir"],
+            portrait_mode=portrait_config.get("mode", "per_view"),
         )
 
     async def extract_characters(
@@ -166,6 +173,9 @@ class Idea2VideoPipeline:
             self.working_dir, "character_portraits", f"{character.idx}_{safe_path_component(character.identifier_in_scene)}")
         os.makedirs(character_dir, exist_ok=True)
 
+        if self.portrait_mode == "turnaround":
+            await self.character_portraits_generator.fill_missing_views_from_turnaround(character, style, character_dir)
+
         front_portrait_path = os.path.join(character_dir, "front.png")
         if os.path.exists(front_portrait_path):
             pass
@@ -220,6 +230,93 @@ class Idea2VideoPipeline:
             }
         }
 
+    def plan_render(
+        self,
+        plan_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Write a dry-run render plan without calling any model.
+
+        Scenes whose script is on disk are planned by their Script2VideoPipeline
+        and folded in one after another; before the script exists only the
+        story, character and portrait requests can be counted.
+        """
+        plan = RenderPlan(working_dir=self.working_dir)
+        text_chain = []
+        for file_name, purpose in (("story.txt", "develop_story"), ("characters.json", "extract_characters"), ("script.json", "write_script")):
+            path = os.path.join(self.working_dir, file_name)
+            if not os.path.exists(path):
+                plan.add("llm", purpose, "text", [path])
+                text_chain.append("llm")
+        plan.extend_chain("text", text_chain)
+
+        characters = None
+        characters_path = os.path.join(self.working_dir, "characters.json")
+        if os.path.exists(characters_path):
+            with open(characters_path, "r", encoding="utf-8") as f:
+                characters = [CharacterInScene.model_validate(character) for character in json.load(f)]
+            character_portraits_registry_path = os.path.join(self.working_dir, "character_portraits_registry.json")
+            character_portraits_registry = {}
+            if os.path.exists(character_portraits_registry_path):
+                with open(character_portraits_registry_path, "r", encoding="utf-8") as f:
+                    character_portraits_registry = json.load(f)
+            for character in characters:
+                if character.identifier_in_scene in character_portraits_registry or not character.is_visible:
+                    continue
+                character_dir = os.path.join(self.working_dir, "character_portraits", f"{character.idx}_{safe_path_component(character.identifier_in_scene)}")
+                missing_paths = [os.path.join(character_dir, f"{view}.png") for view in ("front", "side", "back") if not os.path.exists(os.path.join(character_dir, f"{view}.png"))]
+                if self.portrait_mode == "turnaround" and missing_paths:
+                    plan.add("image", "turnaround_sheet", "portraits", missing_paths)
+                    plan.extend_chain("portraits", ["image"])
+                else:
+                    for path in missing_paths:
+                        plan.add("image", f"{os.path.splitext(os.path.basename(path))[0]}_portrait", "portraits", [path])
+                    plan.extend_chain("portraits", ["image"] * min(2, len(missing_paths)))
+        else:
+            plan.note("Characters are not extracted yet; portrait requests are not counted.", exact=False)
+
+        script2video_pipeline = None
+        script_path = os.path.join(self.working_dir, "script.json")
+        if os.path.exists(script_path):
+            with open(script_path, "r", encoding="utf-8") as f:
+                scene_scripts = json.load(f)
+            for idx, scene_script in enumerate(scene_scripts):
+                script2video_pipeline = Script2VideoPipeline(
+                    chat_model=self.chat_model,
+                    image_generator=self.image_generator,
+                    video_generator=self.video_generator,
+                    working_dir=os.path.join(self.working_dir, f"scene_{idx}"),
+                    make_working_dir=False,
+                )
+                # Portraits are shared by all scenes and already planned above.
+                plan.merge(script2video_pipeline.collect_render_plan(
+                    script=scene_script,
+                    characters=characters,
+                    character_portraits_registry={character.identifier_in_scene: {} for character in characters or []},
+                ))
+        else:
+            plan.note("No scene scripts on disk yet; scene renders are not counted.", exact=False)
+
+        final_video_path = os.path.join(self.working_dir, "final_video.mp4")
+        if not os.path.exists(final_video_path):
+            plan.local_artifacts.append(final_video_path)
+
+        if script2video_pipeline is None:
+            script2video_pipeline = Script2VideoPipeline(
+                chat_model=self.chat_model,
+                image_generator=self.image_generator,
+                video_generator=self.video_generator,
+                working_dir=self.working_dir,
+                make_working_dir=False,
+            )
+        plan_path = plan_path or os.path.join(self.working_dir, RENDER_PLAN_FILE)
+        render_plan = plan.save(plan_path, script2video_pipeline.render_providers(), script2video_pipeline.latency_stats)
+        estimate = render_plan["estimate"]
+        print(f"📋 Render plan: {estimate['request_counts']} requests, ~{estimate['llm_tokens']} LLM tokens, ~{estimate['wall_clock_seconds'] / 60:.1f} min; saved to {plan_path}.")
+        for warning in estimate["quota_warnings"]:
+            print(f"⚠️ {warning}")
+        return render_plan
+
+    @with_deadline
     async def __call__(
         self,
         idea: str,
@@ -227,6 +324,7 @@ class Idea2VideoPipeline:
         style: str,
         quiet: bool = False,
     ):
+        """Develop the idea and render every scene; `deadline_seconds` bounds the whole run."""
 
         story = await self.develop_story(idea=idea, user_requirement=user_requirement, quiet=quiet)
 
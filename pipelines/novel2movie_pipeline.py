@@ -6,10 +6,11 @@ import yaml
 import json
 import importlib
 import asyncio
-from typing import Any, Callable, List, Dict
+import contextlib
+import hashlib
+from typing import Any, Callable, Dict
 from langchain.embeddings import CacheBackedEmbeddings
 from langchain.storage import LocalFileStore
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from PIL import Image
 
@@ -22,6 +23,9 @@ from interfaces import (
 )
 from tenacity import retry
 
+from agents.environment_plate_registry import EnvironmentPlateRegistry, normalize_slugline
+from utils.deadline import with_deadline
+from utils.novel_stream import NovelStream, merge_relevant_chunks
 from utils.text import safe_path_component
 
 
@@ -36,6 +40,25 @@ def _emit_text_plan_progress(progress, stage: str, message: str, metadata: dict
         progress(stage, message, metadata or {})
 
 
+def _batched(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _generator_semaphore(generator: Any, fixed: int):
+    """Bound a stage that calls `generator`, unless its limiter adapts concurrency itself."""
+    rate_limiter = getattr(generator, "rate_limiter", None)
+    if getattr(rate_limiter, "adaptive_concurrency", None) is not None:
+        return contextlib.nullcontext()
+    return asyncio.Semaphore(fixed)
+
+
 def _event_file_index(path: str) -> int:
     return int(os.path.basename(path).split("_")[1].split(".")[0])
 
@@ -43,6 +66,16 @@ def _event_file_index(path: str) -> int:
 def _scene_file_index(path: str) -> int:
     return int(os.path.basename(path).split("_")[1].split(".")[0])
 
+
+def _compressed_chunk_path(working_dir_novel: str, index: int, chunk_text: str) -> str:
+    """Where the compression of one chunk is saved, keyed by a hash of its text.
+
+    A working dir left by a splitter that cut chunks elsewhere (or by another
+    novel) then misses instead of reusing the compression of another span.
+    """
+    digest = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(working_dir_novel, f"novel_chunk_{index}_{digest}_compressed.txt")
+
 class Novel2MoviePipeline:
     def __init__(
         self,
@@ -89,38 +122,46 @@ class Novel2MoviePipeline:
         _emit_text_plan_progress(progress, "save_novel", "Saving and splitting novel text")
         working_dir_novel = os.path.join(self.working_dir, "novel")
         os.makedirs(working_dir_novel, exist_ok=True)
-        with open(os.path.join(working_dir_novel, "novel.txt"), "w", encoding="utf-8") as f:
+        novel_path = os.path.join(working_dir_novel, "novel.txt")
+        with open(novel_path, "w", encoding="utf-8") as f:
             f.write(novel_text)
-
-        novel_chunks = self.novel_compressor.split(novel_text)
-        for idx, novel_chunk in enumerate(novel_chunks):
-            with open(os.path.join(working_dir_novel, f"novel_chunk_{idx}.txt"), "w", encoding="utf-8") as f:
-                f.write(novel_chunk)
-        _pipeline_print(quiet, f"Split novel into {len(novel_chunks)} chunks.")
-
-        _emit_text_plan_progress(progress, "compress_novel", "Compressing novel chunks", {"chunk_count": len(novel_chunks)})
-        compressed_novel_chunks: list[str | None] = [None] * len(novel_chunks)
-        unfinished_pairs = []
-        for index, novel_chunk in enumerate(novel_chunks):
-            path = os.path.join(working_dir_novel, f"novel_chunk_{index}_compressed.txt")
-            if os.path.exists(path):
-                compressed_novel_chunks[index] = open(path, "r", encoding="utf-8").read()
-            else:
-                unfinished_pairs.append((index, novel_chunk))
-        if unfinished_pairs:
-            sem = asyncio.Semaphore(5)
-            outputs = await asyncio.gather(*[
-                self.novel_compressor.compress_single_novel_chunk(sem, index, novel_chunk)
-                for index, novel_chunk in unfinished_pairs
-            ])
-            for index, compressed in outputs:
-                path = os.path.join(working_dir_novel, f"novel_chunk_{index}_compressed.txt")
-                with open(path, "w", encoding="utf-8") as f:
-                    f.write(compressed)
-                compressed_novel_chunks[index] = compressed
+        # Everything below reads the novel through a memory map of novel.txt
+        # rather than the in-memory string, so chunks are decoded one at a time.
+
+        compressed_novel_chunks: list[str | None] = []
+        unfinished_chunks = []
+        with NovelStream(novel_path) as novel_stream:
+            chunk_stream = self.novel_compressor.split_stream(
+                novel_stream,
+                manifest_path=os.path.join(working_dir_novel, "novel_chunks.jsonl"),
+            )
+            chunk_paths = {}
+            for novel_chunk in chunk_stream:
+                path = chunk_paths[novel_chunk.index] = _compressed_chunk_path(working_dir_novel, novel_chunk.index, novel_chunk.text)
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        compressed_novel_chunks.append(f.read())
+                else:
+                    compressed_novel_chunks.append(None)
+                    unfinished_chunks.append(novel_chunk)
+            _pipeline_print(quiet, f"Split novel into {len(compressed_novel_chunks)} chunks.")
+
+            _emit_text_plan_progress(progress, "compress_novel", "Compressing novel chunks", {"chunk_count": len(compressed_novel_chunks)})
+            if unfinished_chunks:
+                sem = asyncio.Semaphore(5)
+                outputs = await asyncio.gather(*[
+                    # The chunk view is only decoded when the compressor formats
+                    # its prompt, i.e. after it has acquired the semaphore.
+                    self.novel_compressor.compress_single_novel_chunk(sem, novel_chunk.index, novel_chunk)
+                    for novel_chunk in unfinished_chunks
+                ])
+                for index, compressed in outputs:
+                    with open(chunk_paths[index], "w", encoding="utf-8") as f:
+                        f.write(compressed)
+                    compressed_novel_chunks[index] = compressed
 
         compressed_path = os.path.join(working_dir_novel, "novel_compressed.txt")
-        if os.path.exists(compressed_path):
+        if os.path.exists(compressed_path) and not unfinished_chunks:
             compressed_novel = open(compressed_path, "r", encoding="utf-8").read()
         else:
             compressed_novel = self.novel_compressor.aggregate([chunk or "" for chunk in compressed_novel_chunks])
@@ -161,16 +202,34 @@ class Novel2MoviePipeline:
             namespace=getattr(self.embeddings, "model", "default"),
             key_encoder="sha256",
         )
-        novel_splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=128)
-        knowledge_chunks = novel_splitter.split_text(novel_text)
-        knowledge_base = FAISS.from_texts(texts=knowledge_chunks, embedding=embeddings)
+        knowledge_base = None
+        with NovelStream(novel_path) as novel_stream:
+            knowledge_chunks = novel_stream.iter_chunks(
+                chunk_size=512,
+                chunk_overlap=128,
+                manifest_path=os.path.join(working_dir_novel, "knowledge_chunks.jsonl"),
+            )
+            for batch in _batched(knowledge_chunks, KNOWLEDGE_BASE_BATCH_SIZE):
+                texts = [chunk.text for chunk in batch]
+                metadatas = [chunk.manifest_entry() for chunk in batch]
+                if knowledge_base is None:
+                    knowledge_base = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
+                else:
+                    knowledge_base.add_texts(texts=texts, metadatas=metadatas)
+        if knowledge_base is None:
+            raise RuntimeError("novel text is empty; nothing to index for chunk retrieval")
         event_idx_to_relevant_chunk_score_dict: dict[int, dict[str, float]] = {}
 
         async def retrieve_relevant_chunks(sem, event: Event):
             async with sem:
                 relevant: dict[str, float] = {}
+                offsets: dict[str, tuple[int, int]] = {}
                 for process in event.process_chain:
                     chunks = knowledge_base.similarity_search(process, k=10)
+                    for chunk in chunks:
+                        metadata = getattr(chunk, "metadata", None) or {}
+                        if "start" in metadata and "end" in metadata:
+                            offsets[chunk.page_content] = (metadata["start"], metadata["end"])
                     chunk_texts = [chunk.page_content for chunk in chunks if chunk.page_content not in relevant]
                     if not chunk_texts:
                         continue
@@ -178,7 +237,7 @@ class Novel2MoviePipeline:
                     for chunk, score in chunk_score_pairs:
                         if score >= 0.7:
                             relevant[chunk] = relevant.get(chunk, 0.0) + score
-                return event.index, relevant
+                return event.index, relevant, offsets
 
         retrieve_tasks = []
         retrieve_sem = asyncio.Semaphore(10)
@@ -195,7 +254,15 @@ class Novel2MoviePipeline:
             else:
                 retrieve_tasks.append(retrieve_relevant_chunks(retrieve_sem, event))
         if retrieve_tasks:
-            for event_index, relevant in await asyncio.gather(*retrieve_tasks):
+            retrieve_outputs = await asyncio.gather(*retrieve_tasks)
+            with NovelStream(novel_path) as novel_stream:
+                # Overlapping 512-character chunks would otherwise repeat the same
+                # text in the scene-extraction prompt; collapse them into passages.
+                retrieve_outputs = [
+                    (event_index, merge_relevant_chunks(novel_stream, relevant, offsets, char_budget=RELEVANT_PASSAGE_CHAR_BUDGET))
+                    for event_index, relevant, offsets in retrieve_outputs
+                ]
+            for event_index, relevant in retrieve_outputs:
                 chunks_dir = os.path.join(working_dir_retrieve, f"event_{event_index}")
                 os.makedirs(chunks_dir, exist_ok=True)
                 for idx, (chunk, score) in enumerate(relevant.items()):
@@ -309,6 +376,7 @@ class Novel2MoviePipeline:
         }
 
 
+    @with_deadline
     async def render_video_artifacts(
         self,
         style: str,
@@ -320,7 +388,7 @@ class Novel2MoviePipeline:
 
         This helper assumes plan_text_artifacts has already completed. It does not
         re-run compression, event extraction, RAG retrieval, scene extraction, or
-        character merging.
+        character merging. `deadline_seconds` bounds the whole render.
         """
         del user_requirement
 
@@ -401,7 +469,7 @@ class Novel2MoviePipeline:
                 image.save(image_path)
                 return image_path
 
-        sem = asyncio.Semaphore(5)
+        sem = _generator_semaphore(self.image_generator, 5)
         await asyncio.gather(*[generate_base_portrait(sem, character) for character in characters_in_novel])
         _emit_text_plan_progress(progress, "novel_portraits_base_done", "Base character portraits ready", {"character_count": len(characters_in_novel)})
 
@@ -425,7 +493,7 @@ class Novel2MoviePipeline:
 
         _emit_text_plan_progress(progress, "novel_portraits_scene_start", "Generating scene character portraits")
         scene_portrait_tasks = []
-        sem = asyncio.Semaphore(3)
+        sem = _generator_semaphore(self.image_generator, 3)
         for character in characters_in_novel:
             base_path = os.path.join(base_character_portrait_dir, f"character_{character.index}_{safe_path_component(character.identifier_in_novel)}.png")
             for event_idx, identifier_in_event in character.active_events.items():
@@ -439,6 +507,32 @@ class Novel2MoviePipeline:
             await asyncio.gather(*scene_portrait_tasks)
         _emit_text_plan_progress(progress, "novel_portraits_done", "Scene character portraits ready")
 
+        # One establishing plate per distinct location, shared by all scenes set
+        # there. Plates follow the scene pipeline's render tier: a draft run draws
+        # them with the draft generator at the draft size, into their own folder
+        # so the final tier never reuses a draft plate.
+        plates_dir = os.path.join(self.working_dir, "environment_plates")
+        if self.script2video_pipeline.render_tier == "draft":
+            plates_dir = os.path.join(plates_dir, "draft")
+        environment_plate_registry = EnvironmentPlateRegistry(
+            image_generator=self.script2video_pipeline.image_generator,
+            registry_dir=plates_dir,
+            image_size=self.script2video_pipeline.image_size,
+        )
+        scenes_by_location: dict[str, Scene] = {}
+        for event in extracted_events:
+            for scene in event_idx_to_scenes[event.index]:
+                scenes_by_location.setdefault(normalize_slugline(scene.environment.slugline), scene)
+        _emit_text_plan_progress(progress, "novel_environment_plates_start", "Generating environment plates", {"location_count": len(scenes_by_location)})
+
+        async def generate_environment_plate(sem, scene: Scene):
+            async with sem:
+                return await environment_plate_registry.get_or_create(scene.environment, style or "realistic movie style")
+
+        sem = _generator_semaphore(environment_plate_registry.image_generator, 3)
+        await asyncio.gather(*[generate_environment_plate(sem, scene) for scene in scenes_by_location.values()])
+        _emit_text_plan_progress(progress, "novel_environment_plates_done", "Environment plates ready", {"location_count": len(scenes_by_location)})
+
         working_dir_scene_videos = os.path.join(self.working_dir, "videos")
         os.makedirs(working_dir_scene_videos, exist_ok=True)
         scene_video_dirs: list[str] = []
@@ -464,6 +558,7 @@ class Novel2MoviePipeline:
                     character_portraits_registry=character_portraits_registry,
                     quiet=quiet,
                     progress=progress,
+                    environment_plate_path_and_text_pair=environment_plate_registry.get(scene.environment.slugline),
                 )
                 scene_video_dirs.append(scene_video_dir)
                 _emit_text_plan_progress(progress, "novel_scene_render_done", "Rendered novel scene video", {"event_idx": event.index, "scene_idx": scene.idx, "path": scene_video_dir})
@@ -480,520 +575,18 @@ class Novel2MoviePipeline:
         self,
         novel_text: str,
         style: str,
-    ):
-        print("🎬 Novel to Movie Pipeline Started".center(80, "="))
-
-        # Step 1: Compress the novel text
-        print()
-        print("📋 Step 1: Compress the novel text".center(80, "-"))
-
-        working_dir_novel_compressor = os.path.join(self.working_dir, "novel")
-        os.makedirs(working_dir_novel_compressor, exist_ok=True)
-        with open(os.path.join(working_dir_novel_compressor, "novel.txt"), "w", encoding="utf-8") as f:
-            f.write(novel_text)
-        print(f"🗂️ Working directory: {working_dir_novel_compressor}")
-
-        print("🔖 Splitting the novel into chunks...")
-        novel_chunks = self.novel_compressor.split(novel_text)
-        for idx, novel_chunk in enumerate(novel_chunks):
-            with open(os.path.join(working_dir_novel_compressor, f"novel_chunk_{idx}.txt"), "w", encoding="utf-8") as f:
-                f.write(novel_chunk)
-        print(f"🔖 Split the novel into {len(novel_chunks)} chunks, all saved to {working_dir_novel_compressor}.")
-
-
-        print()
-        print("🔖 Compressing the novel chunks...")
-        compressed_novel_chunks = [None] * len(novel_chunks)
-        index_chunk_pairs_unfinished = []
-        for index, novel_chunk in enumerate(novel_chunks):
-            path = os.path.join(working_dir_novel_compressor, f"novel_chunk_{index}_compressed.txt")
-            if os.path.exists(path):
-                compressed_novel_chunks[index] = open(path, "r", encoding="utf-8").read()
-                print(f"⏭️ Skipping compression for chunk {index} as it already exists.")
-            else:
-                index_chunk_pairs_unfinished.append((index, novel_chunk))
-
-        sem = asyncio.Semaphore(5)
-        tasks = [
-            self.novel_compressor.compress_single_novel_chunk(sem, index, novel_chunk)
-            for index, novel_chunk in index_chunk_pairs_unfinished
-        ]
-        task_outputs = await asyncio.gather(*tasks)
-        for index, novel_chunk_compressed in task_outputs:
-            save_path = os.path.join(working_dir_novel_compressor, f"novel_chunk_{index}_compressed.txt")
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(novel_chunk_compressed)
-            print(f"✅ Compressed chunk {index}, saved to {save_path}")
-            compressed_novel_chunks[index] = novel_chunk_compressed
-        print("🔖 Compressed all novel chunks.")
-
-
-        print()
-        print("🔖 Merging the compressed novel chunks...")
-        path = os.path.join(working_dir_novel_compressor, "novel_compressed.txt")
-        if os.path.exists(path):
-            compressed_novel = open(path, "r", encoding="utf-8").read()
-            print(f"⏭️ Skipping merging as {path} already exists.")
-        else:
-            compressed_novel = self.novel_compressor.aggregate(compressed_novel_chunks)
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(compressed_novel)
-            print(f"✅ Merged the compressed novel chunks, saved to {path}")
-        print(f"🔖 Merging completed.")
-
-        # summary
-        print()
-        print("📌 Summary:")
-        print(f"📌 Before Compression: {len(novel_text)} characters")
-        print(f"📌 After Compression: {len(compressed_novel)} characters")
-        print(f"📌 Compression Ratio: {len(compressed_novel) / len(novel_text):.2%}")
-
-        print("📋 Step 1: Compress the novel text".center(80, "-"))
-
-
-        # Step 2: Extract events from the compressed novel
-        print()
-        print("📋 Step 2: Extract events from the compressed novel".center(80, "-"))
-        working_dir_event_extractor = os.path.join(self.working_dir, "events")
-        os.makedirs(working_dir_event_extractor, exist_ok=True)
-        print(f"🗂️ Working directory: {working_dir_event_extractor}")
-
-        extracted_events = []
-        for event_json_fname in sorted(os.listdir(working_dir_event_extractor), key=lambda x: int(x.split('_')[1].split('.')[0])):
-            event_json_path = os.path.join(working_dir_event_extractor, event_json_fname)
-            if os.path.exists(event_json_path):
-                with open(event_json_path, "r", encoding="utf-8") as f:
-                    event_data = json.load(f)
-                event: Event = Event.model_validate(event_data)
-                extracted_events.append(event)
-
-        if len(extracted_events) > 0:
-            if extracted_events[-1].is_last:
-                print(f"⏭️ Skipping event extraction as all events already exist in {working_dir_event_extractor}.")
-            else:
-                print(f"🔖 Continuing event extraction from {len(extracted_events)} existing events...")
-        else:
-            print("🔖 Starting event extraction ...")
-
-        while len(extracted_events) == 0 or not extracted_events[-1].is_last:
-            next_event = self.event_extractor.extract_next_event(
-                novel_text=compressed_novel,
-                extracted_events=extracted_events,
-            )
-            event_json_path = os.path.join(working_dir_event_extractor, f"event_{len(extracted_events)}.json")
-            with open(event_json_path, "w", encoding="utf-8") as f:
-                json.dump(next_event.model_dump(), f, ensure_ascii=False, indent=4)
-            print(f"✅ Extracted event {next_event.index}, saved to {event_json_path}")
-
-            extracted_events.append(next_event)
-
-        # summary
-        print()
-        print("📌 Summary:")
-        print(f"📌 Extracted a total of {len(extracted_events)} events.")
-
-        print("📋 Step 2: Extract events from the compressed novel".center(80, "-"))
-
-
-        # Step 3:  Extract relevant chunks for each event
-        print()
-        print("📋 Step 3: Retrieve relevant chunks for each event".center(80, "-"))
-        working_dir_knowledge_base = os.path.join(self.working_dir, "knowledge_base")
-        working_dir_retrieve = os.path.join(self.working_dir, "relevant_chunks")
-        os.makedirs(working_dir_knowledge_base, exist_ok=True)
-        os.makedirs(working_dir_retrieve, exist_ok=True)
-        print(f"🗂️ Working directory: {working_dir_knowledge_base} and {working_dir_retrieve}")
-
-        print("🔖 Constructing knowledge base from the raw novel text...")
-        embeddings = CacheBackedEmbeddings.from_bytes_store(
-            underlying_embeddings=self.embeddings,
-            document_embedding_cache=LocalFileStore(
-                root_path=working_dir_knowledge_base,
-            ),
-            namespace=self.embeddings.model,
-            key_encoder="sha256",
-        )
-        novel_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=512,
-            chunk_overlap=128,
-        )
-        novel_chunks = novel_splitter.split_text(novel_text)
-        knowledge_base = FAISS.from_texts(texts=novel_chunks, embedding=embeddings)
-        print(f"🔖 Constructed knowledge base with {len(novel_chunks)} chunks, saved to {working_dir_knowledge_base}")
-
-
-        print("🔖 Retrieving relevant chunks for each event...")
-        async def retrieve_relevant_chunks(sem, knowledge_base, event):
-            async with sem:
-                relevant_chunk_score_dict = {}
-                for process in event.process_chain:
-                    chunks = knowledge_base.similarity_search(process, k=10)
-                    chunks = [chunk.page_content for chunk in chunks if chunk.page_content not in relevant_chunk_score_dict]
-
-                    chunk_score_pairs = await self.rerank_model(
-                        documents=chunks,
-                        query=process,
-                        top_n=10,
-                    )
-
-                    threshold = 0.7
-                    for chunk, score in chunk_score_pairs:
-                        if score >= threshold:
-                            if chunk not in relevant_chunk_score_dict:
-                                relevant_chunk_score_dict[chunk] = score
-                            else:
-                                relevant_chunk_score_dict[chunk] += score
-
-            return event.index, relevant_chunk_score_dict
-
-        event_idx_to_relevant_chunk_score_dict = {}
-
-        sem = asyncio.Semaphore(10)
-        tasks = []
-        for event in extracted_events:
-            chunks_dir = os.path.join(working_dir_retrieve, f"event_{event.index}")
-            if os.path.exists(chunks_dir) and len(os.listdir(chunks_dir)) > 0:
-                relevant_chunk_score_dict = {}
-                for chunk_fname in os.listdir(chunks_dir):
-                    chunk_path = os.path.join(chunks_dir, chunk_fname)
-                    score = float(chunk_fname.split('-score_')[1].split('.txt')[0])
-                    with open(chunk_path, "r", encoding="utf-8") as f:
-                        chunk = f.read()
-                    relevant_chunk_score_dict[chunk] = score
-                event_idx_to_relevant_chunk_score_dict[event.index] = relevant_chunk_score_dict
-                print(f"⏭️ Skipping retrieval for event {event.index} as it already exists.")
-            else:
-                tasks.append(retrieve_relevant_chunks(sem, knowledge_base, event))
-
-        if len(tasks) > 0:
-            for task in asyncio.as_completed(tasks):
-                event_index, relevant_chunk_score_dict = await task
-                chunks_dir = os.path.join(working_dir_retrieve, f"event_{event_index}")
-                os.makedirs(chunks_dir, exist_ok=True)
-                for idx, (chunk, score) in enumerate(relevant_chunk_score_dict.items()):
-                    chunk_path = os.path.join(chunks_dir, f"chunk_{idx}-score_{score:.2f}.txt")
-                    with open(chunk_path, "w", encoding="utf-8") as f:
-                        f.write(chunk)
-                event_idx_to_relevant_chunk_score_dict[event_index] = relevant_chunk_score_dict
-                print(f"✅ Retrieved {len(relevant_chunk_score_dict)} relevant chunks for event {event_index}, saved to {chunks_dir}")
-
-        print("🔖 Retrieved relevant chunks for all events.")
-        print("📋 Step 3: Retrieve relevant chunks for each event".center(80, "-"))
-
-
-
-        # Step 4: Extract scenes for each event, design the script for each scene
-        print()
-        print("📋 Step 4: Extract scenes for each event, design the script for each scene".center(80, "-"))
-        working_dir_scene_extractor = os.path.join(self.working_dir, "scenes")
-        os.makedirs(working_dir_scene_extractor, exist_ok=True)
-        print(f"🗂️ Working directory: {working_dir_scene_extractor}")
-
-
-        unfinished_event_indices = []
-        event_idx_to_scenes = {event.index: [] for event in extracted_events}
-        for event in extracted_events:
-            scenes_dir = os.path.join(working_dir_scene_extractor, f"event_{event.index}")
-            if os.path.exists(scenes_dir):
-                for scene_json_fname in sorted(os.listdir(scenes_dir), key=lambda x: int(x.split('_')[1].split('.')[0])):
-                    scene_json_path = os.path.join(scenes_dir, scene_json_fname)
-                    with open(scene_json_path, "r", encoding="utf-8") as f:
-                        scene_data = json.load(f)
-                    scene = Scene.model_validate(scene_data)
-                    event_idx_to_scenes[event.index].append(scene)
-
-            if len(event_idx_to_scenes[event.index]) > 0 and event_idx_to_scenes[event.index][-1].is_last:
-                print(f"⏭️ Skipping scene extraction for event {event.index} as all scenes already exist in {scenes_dir}.")
-            else:
-                unfinished_event_indices.append(event.index)
-
-        if len(unfinished_event_indices) > 0:
-            if len(unfinished_event_indices) == len(extracted_events):
-                print(f"🔖 Starting scene extraction for all events...")
-            else:
-                print(f"🔖 Continuing scene extraction for events: {unfinished_event_indices}")
-
-
-        async def extract_scenes_for_event(sem, relevant_chunks, event, previous_scenes):
-            async with sem:
-                os.makedirs(os.path.join(working_dir_scene_extractor, f"event_{event.index}"), exist_ok=True)
-
-                while len(previous_scenes) == 0 or not previous_scenes[-1].is_last:
-                    next_scene = await self.scene_extractor.get_next_scene(
-                        relevant_chunks=relevant_chunks,
-                        event=event,
-                        previous_scenes=previous_scenes,
-                    )
-                    scene_json_path = os.path.join(working_dir_scene_extractor, f"event_{event.index}", f"scene_{len(previous_scenes)}.json")
-                    with open(scene_json_path, "w", encoding="utf-8") as f:
-                        json.dump(next_scene.model_dump(), f, ensure_ascii=False, indent=4)
-                    print(f"✔️​ Extracted scene {next_scene.idx} for event {event.index}, saved to {scene_json_path}")
-                    previous_scenes.append(next_scene)
-
-            print(f"✅ Extracted all {len(previous_scenes)} scenes for event {event.index}.")
-            return event.index, previous_scenes
-
-
-        sem = asyncio.Semaphore(8)
-        for event_index in unfinished_event_indices:
-            relevant_chunks = list(event_idx_to_relevant_chunk_score_dict[event_index].keys())
-            tasks.append(extract_scenes_for_event(sem, relevant_chunks, extracted_events[event_index], event_idx_to_scenes[event_index]))
-
-        task_outputs = await asyncio.gather(*tasks)
-        for event_index, previous_scenes in task_outputs:
-            event_idx_to_scenes[event_index] = previous_scenes
-
-        print("🔖 Extracted scenes for all events.")
-        print("📋 Step 4: Extract scenes for each event, design the script for each scene".center(80, "-"))
-
-
-
-        # Step 5: Merge characters from scene-level to event-level, then to novel-level
-        print()
-        print("📋 Step 5: Merge characters from scene-level to novel-level".center(80, "-"))
-        working_dir_global_information_planner = os.path.join(self.working_dir, "global_information")
-        os.makedirs(working_dir_global_information_planner, exist_ok=True)
-        print(f"🗂️ Working directory: {working_dir_global_information_planner}")
-
-        # Step 5.1: Merge characters from scene-level to event-level
-        print("🔖 Merging characters across scenes in each event...")
-        working_dir_characters = os.path.join(working_dir_global_information_planner, "characters")
-        os.makedirs(working_dir_characters, exist_ok=True)
-
-        async def merge_characters_across_scenes_in_event(sem, event_idx, scenes):
-            async with sem:
-                merged_characters = await self.global_information_planner.merge_characters_across_scenes_in_event(
-                    event_idx=event_idx,
-                    scenes=scenes,
-                )
-                path = os.path.join(working_dir_characters, "event_level", f"event_{event_idx}_characters.json")
-                os.makedirs(os.path.dirname(path), exist_ok=True)
-                with open(path, "w", encoding="utf-8") as f:
-                    json.dump([char.model_dump() for char in merged_characters], f, ensure_ascii=False, indent=4)
-                print(f"✅ Merged characters for event {event_idx}, saved to {path}")
-
-            return event_idx, merged_characters
-
-
-        event_idx_to_characters_in_event = {}
-
-        sem = asyncio.Semaphore(8)
-        tasks = []
-        for event in extracted_events:
-            path = os.path.join(working_dir_characters, "event_level", f"event_{event.index}_characters.json")
-            if os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as f:
-                    character_data = json.load(f)
-                characters = [CharacterInEvent.model_validate(char) for char in character_data]
-                event_idx_to_characters_in_event[event.index] = characters
-                print(f"⏭️ Skipping character merging for event {event.index} as it already exists.")
-            else:
-                tasks.append(merge_characters_across_scenes_in_event(sem, event.index, event_idx_to_scenes[event.index]))
-
-        task_outputs = await asyncio.gather(*tasks)
-        for event_index, merged_characters in task_outputs:
-            event_idx_to_characters_in_event[event_index] = merged_characters
-
-        print("🔖 Merged characters across scenes in each event.")
-
-        # Step 5.2: Merge characters from event-level to novel-level
-        print("🔖 Merging characters across events in the novel...")
-
-        working_dir_characters_novel = os.path.join(working_dir_characters, f"novel_level")
-        os.makedirs(working_dir_characters_novel, exist_ok=True)
-
-        fnames = os.listdir(working_dir_characters_novel)
-        existing_characters_in_novel = []
-        if len(fnames) > 0:
-            fname = max(fnames, key=lambda x: int(x.split('_')[-1].split('.json')[0]))
-            start_event_idx = int(fname.split('_')[-1].split('.json')[0]) + 1
-            path = os.path.join(working_dir_characters_novel, fname)
-            with open(path, "r", encoding="utf-8") as f:
-                character_data = json.load(f)
-            existing_characters_in_novel = [CharacterInNovel.model_validate(char) for char in character_data]
-            
-            if start_event_idx == len(extracted_events):
-                print(f"⏭️ Skipping merging as all events already merged to novel-level in {working_dir_characters_novel}.")
-            else:
-                print(f"🔖 Continuing merging from event {start_event_idx}, currently {len(existing_characters_in_novel)} characters in novel.")
-
-        else:
-            existing_characters_in_novel = []
-            start_event_idx = 0
-
-        for event in extracted_events[start_event_idx:]:
-            characters_in_event = event_idx_to_characters_in_event[event.index]
-            path = os.path.join(working_dir_characters_novel, f"novel_characters_after_event_{event.index}.json")
-            existing_characters_in_novel = self.global_information_planner.merge_characters_to_existing_characters_in_novel(
-                event_idx=event.index,
-                existing_characters_in_novel=existing_characters_in_novel,
-                characters_in_event=characters_in_event,
-            )
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump([char.model_dump() for char in existing_characters_in_novel], f, ensure_ascii=False, indent=4)
-            print(f"✅ Merged characters from event {event.index} to novel-level, now {len(existing_characters_in_novel)} characters in novel, saved to {path}")
-
-        print("🔖 Merged characters across events in the novel.")
-
-        characters_in_novel = existing_characters_in_novel
-
-        print("📋 Step 5: Merge characters from scene-level to novel-level".center(80, "-"))
-
-
-
-
-        # Step 6: Generate the portrait for all characters in the novel
-        print()
-        print("📋 Step 6: Generate the reference images for all characters in the specific scene")
-
-        working_dir_character_portrait = os.path.join(self.working_dir, "character_portraits")
-        os.makedirs(working_dir_character_portrait, exist_ok=True)
-        print(f"🗂️ Working directory: {working_dir_character_portrait}")
-
-        print("🔖 Generating character portraits based on static features ...")
-        base_character_portrait_dir = os.path.join(working_dir_character_portrait, "base")
-        os.makedirs(base_character_portrait_dir, exist_ok=True)
-
-        async def generate_portrait_for_character(sem, character: CharacterInNovel):
-            async with sem:
-                image_path = os.path.join(base_character_portrait_dir, f"character_{character.index}_{safe_path_component(character.identifier_in_novel)}.png")
-                
-                if os.path.exists(image_path):
-                    print(f"⏭️ Skipping portrait generation for character {character.idx} as it already exists.")
-                    return
-
-                prompt = f"Generate a full-body, front-view portrait based on the following description, in the style of {style}:"
-                prompt += f"\nCharacter Identifier: {character.identifier_in_novel}"
-                prompt += f"\nFeatures: {character.static_features}"
-                prompt += f"\nThe character should be centered in the image, occupying most of the frame. Gazing straight ahead. Standing with arms relaxed at sides. Natural expression. The background should be plain white."
-
-                image = await self.image_generator.generate_single_image(
-                    prompt=prompt,
-                    size="512x512",
-                )
-                image.save(image_path)
-                print(f"✅ Generated portrait for character {character.index} ({character.identifier_in_novel}), saved to {image_path}")
-
-
-        sem = asyncio.Semaphore(5)
-        tasks = [
-            generate_portrait_for_character(sem, character)
-            for character in characters_in_novel
-        ]
-
-        await asyncio.gather(*tasks)
-        print("🔖 Generated character portraits based on static features.")
-
-
-        print("🔖 Generating character portraits based on dynamic features in the specific scene")
-
-        async def generate_portrait_for_character_in_scene(
-            sem,
-            base_character_image_path: str,
-            character: CharacterInScene,
-            event_idx: int,
-            scene_idx: int,
-        ):
-            async with sem:
-                image_path = os.path.join(
-                    working_dir_character_portrait,
-                    f"event_{event_idx}",
-                    f"scene_{scene_idx}",
-                    f"character_{character.idx}_{character.identifier_in_scene}.png",
-                )
-                os.makedirs(os.path.dirname(image_path), exist_ok=True)
-
-                if os.path.exists(image_path):
-                    print(f"⏭️ Skipping portrait generation for event {event_idx}, scene {scene_idx}, character {character.idx} as it already exists.")
-                    return
-
-                if not character.is_visible:
-                    shutil.copy(base_character_image_path, image_path)
-                    print(f"⏭️ For event {event_idx}, scene {scene_idx}, character {character.idx} ({character.identifier_in_scene}) is not visible, copied base portrait to {image_path}")
-                    return
-
-                if character.dynamic_features is None:
-                    shutil.copy(base_character_image_path, image_path)
-                    print(f"⏭️ For event {event_idx}, scene {scene_idx}, character {character.idx} ({character.identifier_in_scene}) has no dynamic features, copied base portrait to {image_path}")
-                    return
-
-                prompt = f"Generate a full-body, front-view portrait based on the provided base image. Modify the base image according to the following dynamic features, in the style of {style}. Keep the character's identity consistent with the base image:"
-                prompt += f"\nCharacter Identifier: {character.identifier_in_scene}"
-                prompt += f"\nDynamic Features: {character.dynamic_features}"
-                prompt += f"\nThe character should be centered in the image, occupying most of the frame. Gazing straight ahead. Standing with arms relaxed at sides. Natural expression. The background should be plain white."
-
-                prompt = await self.rewriter(prompt)
-
-
-                image = await self.image_generator.generate_single_image(
-                    prompt=prompt,
-                    reference_image_paths=[base_character_image_path],
-                    size="512x512",
-                )
-                image.save(image_path)
-                print(f"✅ For event {event_idx}, scene {scene_idx}, generated portrait for character {character.idx} ({character.identifier_in_scene}), saved to {image_path}")
-
-
-        sem = asyncio.Semaphore(3)
-        tasks = []
-        for character in characters_in_novel:
-            character_base_image_path = os.path.join(base_character_portrait_dir, f"character_{character.index}_{safe_path_component(character.identifier_in_novel)}.png")
-            for event_idx, identifier_in_event in character.active_events.items():
-                characters_in_event: List[CharacterInEvent] = event_idx_to_characters_in_event[event_idx]
-                character_in_event = [char for char in characters_in_event if char.identifier_in_event == identifier_in_event][0]  # TODO: 这里的数据结构没有做好，居然还要遍历查找。。。
-                for scene_idx, identifier_in_scene in character_in_event.active_scenes.items():
-                    scene = event_idx_to_scenes[event_idx][scene_idx]
-                    character_in_scene: CharacterInScene = [char for char in scene.characters if char.identifier_in_scene == identifier_in_scene][0]  # TODO: 这里的数据结构也没有做好
-                    tasks.append(
-                        generate_portrait_for_character_in_scene(
-                            sem,
-                            character_base_image_path,
-                            character_in_scene,
-                            event_idx,
-                            scene_idx,
-                        )
-                    )
-        await asyncio.gather(*tasks)
-        print("🔖 Generated character portraits based on dynamic features in the specific scene")
-
-        print("📋 Step 6: Generate the reference images for all characters in the specific scene".center(80, "-"))
-
-
-
-        # Step 7: Generate video for each scene
-        print("📋 Step 7: Generate the video for each scene".center(80, "-"))
-        working_dir_scene_videos = os.path.join(self.working_dir, "videos")
-        os.makedirs(working_dir_scene_videos, exist_ok=True)
-
-        for event in extracted_events:
-            scenes: List[Scene] = event_idx_to_scenes[event.index]
-            for scene in scenes:
-                scene_video_dir = os.path.join(working_dir_scene_videos, f"event_{event.index}", f"scene_{scene.idx}")
-                os.makedirs(scene_video_dir, exist_ok=True)
+        user_requirement: str = "",
+        quiet: bool = False,
+    ) -> dict[str, Any]:
+        """Plan the novel, then render portraits and a video per scene.
 
-                self.script2video_pipeline.working_dir = scene_video_dir
-                script = scene.script
-                style = "realistic movie style"
-                character_registry = {}
-                for character in scene.characters:
-                    character_registry[character.identifier_in_scene] = [
-                        {
-                            "path": os.path.join(
-                                working_dir_character_portrait,
-                                f"event_{event.index}",
-                                f"scene_{scene.idx}",
-                                f"character_{character.idx}_{character.identifier_in_scene}.png",
-                            ),
-                            "description": f"A portrait of {character.identifier_in_scene}",
-                        }
-                    ]
-                await self.script2video_pipeline(
-                    script=script,
-                    style=style,
-                    character_registry=character_registry
-                )
-                print(f"✅ Generated video for event {event.index}, scene {scene.idx}, saved to {scene_video_dir}")
-        print("📋 Step 7: Generate the video for each scene".center(80, "-"))
+        Runs plan_text_artifacts and render_video_artifacts back to back, so
+        the novel is read through the same memory-mapped stream and never
+        split into in-memory copies here either.
+        """
+        _pipeline_print(quiet, "🎬 Novel to Movie Pipeline Started".center(80, "="))
+        await self.plan_text_artifacts(novel_text, user_requirement=user_requirement, style=style, quiet=quiet)
+        return await self.render_video_artifacts(style=style, user_requirement=user_requirement, quiet=quiet)
 
 
 # is_last flags are asserted by the LLM only; cap the extraction loops so a
@@ -1001,6 +594,14 @@ class Novel2MoviePipeline:
 MAX_EXTRACTED_EVENTS = 50
 MAX_SCENES_PER_EVENT = 30
 
+# Knowledge chunks are embedded and added to FAISS in batches of this size so
+# the full list of chunk texts never has to exist at once.
+KNOWLEDGE_BASE_BATCH_SIZE = 256
+
+# Per-event character budget for retrieved passages handed to the scene
+# extractor; the best-scoring passages are kept first.
+RELEVANT_PASSAGE_CHAR_BUDGET = 8000
+
 
 def _ensure_extraction_cap(count: int, cap: int, what: str) -> None:
     if count >= cap:
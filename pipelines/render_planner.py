@@ -0,0 +1,231 @@
+"""Dry-run render plans: which artifacts a render still has to produce and what it will cost.
+
+A pipeline walks its resume state on disk and records every request the
+render would issue (``RenderPlan.add``). ``RenderPlan.estimate`` then turns
+the request counts into tokens and wall-clock time using per-provider
+latency statistics and the current concurrency and rate limits, and
+``RenderPlan.save`` writes the result as a JSON render plan.
+"""
+
+import json
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils.latency_stats import LatencyStats
+
+
+# Per-call latency (seconds) assumed for a provider with no recorded samples.
+DEFAULT_LATENCY_SECONDS = {"llm": 20.0, "image": 30.0, "video": 180.0}
+
+# Rough prompt + completion tokens of one LLM call, by purpose. Batched calls
+# are counted per item they cover.
+LLM_TOKENS_PER_CALL = {
+    "develop_story": 4000,
+    "write_script": 6000,
+    "extract_characters": 3000,
+    "storyboard": 6000,
+    "decompose": 2500,
+    "camera_tree": 3000,
+    "reference_selection": 3000,
+}
+
+# Used to guess the shot count of a script whose storyboard is not designed yet.
+SCRIPT_CHARS_PER_SHOT = 300
+
+# Stages run one after another; requests within a stage run concurrently.
+RENDER_STAGES = ("text", "portraits", "frames", "videos", "scenes")
+
+
+@dataclass
+class ProviderLimits:
+    """How fast one kind of request can be issued."""
+
+    name: str
+    concurrency: Optional[int] = None
+    max_requests_per_minute: Optional[int] = None
+    max_requests_per_day: Optional[int] = None
+
+
+@dataclass
+class PlannedRequest:
+    kind: str
+    purpose: str
+    stage: str
+    artifacts: List[str]
+    count: int = 1
+    tokens: int = 0
+
+
+@dataclass
+class RenderPlan:
+    """Requests a render still has to issue, grouped by stage."""
+
+    working_dir: str
+    render_tier: str = "final"
+    exact: bool = True
+    requests: List[PlannedRequest] = field(default_factory=list)
+    local_artifacts: List[str] = field(default_factory=list)
+    # Longest chain of dependent requests per stage, as request kinds.
+    chains: Dict[str, List[str]] = field(default_factory=dict)
+    notes: List[str] = field(default_factory=list)
+
+    def add(self, kind: str, purpose: str, stage: str, artifacts: List[str], count: int = 1) -> None:
+        """Record `count` requests that together produce `artifacts`."""
+        if count <= 0:
+            return
+        tokens = LLM_TOKENS_PER_CALL.get(purpose, 0) * max(count, len(artifacts)) if kind == "llm" else 0
+        self.requests.append(PlannedRequest(kind=kind, purpose=purpose, stage=stage, artifacts=list(artifacts), count=count, tokens=tokens))
+
+    def note(self, message: str, exact: bool = True) -> None:
+        if message not in self.notes:
+            self.notes.append(message)
+        self.exact = self.exact and exact
+
+    def extend_chain(self, stage: str, chain: List[str]) -> None:
+        """Keep the longer of the stage's current and the given dependency chain."""
+        if len(chain) > len(self.chains.get(stage, [])):
+            self.chains[stage] = list(chain)
+
+    def merge(self, other: "RenderPlan", stage: str = "scenes") -> None:
+        """Fold a sub-plan (e.g. one scene of an idea2video render) into this one.
+
+        The sub-plan's requests are moved to `stage` and its stages are
+        chained, since each scene renders after the previous one.
+        """
+        for request in other.requests:
+            self.requests.append(PlannedRequest(**{**asdict(request), "stage": stage}))
+        self.local_artifacts.extend(other.local_artifacts)
+        chain = self.chains.get(stage, []) + [kind for sub_stage in RENDER_STAGES for kind in other.chains.get(sub_stage, [])]
+        self.chains[stage] = chain
+        for message in other.notes:
+            self.note(message, exact=other.exact)
+
+    @property
+    def missing_artifacts(self) -> List[str]:
+        artifacts = []
+        for artifact in [artifact for request in self.requests for artifact in request.artifacts] + self.local_artifacts:
+            if artifact not in artifacts:
+                artifacts.append(artifact)
+        return artifacts
+
+    def request_counts(self) -> Dict[str, int]:
+        counts = {kind: 0 for kind in DEFAULT_LATENCY_SECONDS}
+        for request in self.requests:
+            counts[request.kind] = counts.get(request.kind, 0) + request.count
+        return counts
+
+    def estimate(
+        self,
+        providers: Dict[str, ProviderLimits],
+        latency_stats: Optional[LatencyStats] = None,
+    ) -> Dict[str, Any]:
+        """Estimate tokens, wall-clock time and quota use under the given limits.
+
+        A stage takes as long as the slower of its dependency chain and its
+        most throttled request kind (waves of `concurrency` requests, or the
+        per-minute rate limit); stages add up.
+        """
+        latencies = {}
+        for kind, default in DEFAULT_LATENCY_SECONDS.items():
+            limits = providers.get(kind)
+            measured = latency_stats.mean(limits.name) if latency_stats is not None and limits is not None else None
+            latencies[kind] = {
+                "provider": limits.name if limits else None,
+                "seconds": measured if measured is not None else default,
+                "samples": latency_stats.count(limits.name) if latency_stats is not None and limits is not None else 0,
+            }
+
+        stages = {}
+        for stage in RENDER_STAGES:
+            counts: Dict[str, int] = {}
+            for request in self.requests:
+                if request.stage == stage:
+                    counts[request.kind] = counts.get(request.kind, 0) + request.count
+            chain = self.chains.get(stage, [])
+            if not counts and not chain:
+                continue
+            chain_seconds = sum(latencies[kind]["seconds"] for kind in chain)
+            throughput_seconds = max(
+                [_throughput_seconds(count, latencies[kind]["seconds"], providers.get(kind)) for kind, count in counts.items()],
+                default=0.0,
+            )
+            stages[stage] = {"requests": counts, "seconds": round(max(chain_seconds, throughput_seconds), 1)}
+
+        counts = self.request_counts()
+        quota_warnings = []
+        for kind, count in counts.items():
+            limits = providers.get(kind)
+            if limits is not None and limits.max_requests_per_day and count > limits.max_requests_per_day:
+                quota_warnings.append(
+                    f"{count} {kind} requests exceed the daily quota of {limits.max_requests_per_day} for {limits.name}; "
+                    f"the render would stall for about {math.ceil(count / limits.max_requests_per_day) - 1} day(s)."
+                )
+
+        return {
+            "request_counts": counts,
+            "llm_tokens": sum(request.tokens for request in self.requests),
+            "latency_seconds": latencies,
+            "stages": stages,
+            "wall_clock_seconds": round(sum(stage["seconds"] for stage in stages.values()), 1),
+            "quota_warnings": quota_warnings,
+        }
+
+    def to_dict(
+        self,
+        providers: Dict[str, ProviderLimits],
+        latency_stats: Optional[LatencyStats] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "working_dir": self.working_dir,
+            "render_tier": self.render_tier,
+            "exact": self.exact,
+            "providers": {kind: asdict(limits) for kind, limits in providers.items()},
+            "estimate": self.estimate(providers, latency_stats),
+            "missing_artifacts": self.missing_artifacts,
+            "requests": [asdict(request) for request in self.requests],
+            "notes": self.notes,
+        }
+
+    def save(
+        self,
+        path: str,
+        providers: Dict[str, ProviderLimits],
+        latency_stats: Optional[LatencyStats] = None,
+    ) -> Dict[str, Any]:
+        plan = self.to_dict(providers, latency_stats)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False, indent=4)
+        return plan
+
+
+def provider_limits(generator: Any, concurrency: Optional[int] = None) -> ProviderLimits:
+    """Describe a generator or chat model by class name and its rate limiter, if any."""
+    # Wrappers such as CandidateImageGenerator keep the provider they call.
+    inner = getattr(generator, "image_generator", None)
+    if inner is not None and not hasattr(generator, "rate_limiter"):
+        generator = inner
+    rate_limiter = getattr(generator, "rate_limiter", None)
+    name = type(generator).__name__
+    model = getattr(generator, "model_name", None) or getattr(generator, "model", None)
+    if isinstance(model, str) and model:
+        name = f"{name}:{model}"
+    if concurrency is None:
+        concurrency = getattr(rate_limiter, "concurrency_limit", None)
+    return ProviderLimits(
+        name=name,
+        concurrency=concurrency,
+        max_requests_per_minute=getattr(rate_limiter, "max_requests_per_minute", None),
+        max_requests_per_day=getattr(rate_limiter, "max_requests_per_day", None),
+    )
+
+
+def _throughput_seconds(count: int, latency: float, limits: Optional[ProviderLimits]) -> float:
+    concurrency = limits.concurrency if limits is not None and limits.concurrency else count
+    seconds = math.ceil(count / max(1, concurrency)) * latency
+    if limits is not None and limits.max_requests_per_minute:
+        # The last request still has to run after the limiter lets it through.
+        seconds = max(seconds, (count - 1) * 60.0 / limits.max_requests_per_minute + latency)
+    return seconds
@@ -1,18 +1,29 @@
 import os
+import math
 import shutil
 import json
 import logging
 import asyncio
 import time
-from typing import Any, Callable, Optional, Dict, List, Tuple, Literal, Type, TypeVar
+from typing import Any, Callable, Optional, Dict, List, Tuple, Set, Literal, Type, TypeVar
 from moviepy import VideoFileClip, concatenate_videoclips
+from tenacity import RetryError
 from PIL import Image
 from agents import *
+from agents.camera_image_generator import new_camera_image_is_consistent
+from agents.storyboard_artist import CONTINUED_CAMERA_IDX, split_script_into_beats
 import yaml
 from interfaces import *
 from langchain.chat_models import init_chat_model
+from tools.candidate_image_generator import CandidateImageGenerator
 from tools.render_backend import RenderBackend
+from pipelines.render_planner import SCRIPT_CHARS_PER_SHOT, ProviderLimits, RenderPlan, provider_limits
+from utils.deadline import with_deadline
+from utils.latency_stats import LatencyStats
 from utils.provider_presets import resolve_chat_model_config
+from utils.resilience import counts_as_provider_failure, error_status
+from utils.task_group import DependencyEvent, DependencyFailed, fail_events, run_task_group
+from utils.video import concatenate_with_slates
 
 
 
@@ -46,11 +57,52 @@ def _group_shots_into_cameras(shot_descriptions: List[ShotDescription]) -> List[
         camera.active_shot_idxs.append(shot_description.idx)
     return list(cameras_by_idx.values())
 
+def _cameras_for_shots(camera_tree: List[Camera], shot_idxs: List[int]) -> List[Camera]:
+    """Cameras that hold the given shots, plus every ancestor whose frames they build on."""
+    by_idx = {camera.idx: camera for camera in camera_tree}
+    needed = set()
+    for camera in camera_tree:
+        if set(camera.active_shot_idxs) & set(shot_idxs):
+            current = camera
+            while current is not None and current.idx not in needed:
+                needed.add(current.idx)
+                current = by_idx.get(current.parent_cam_idx) if current.parent_cam_idx is not None else None
+    return [camera for camera in camera_tree if camera.idx in needed]
+
+
+def _frames_for_shots(camera_tree: List[Camera], shot_idxs: List[int]) -> Set[Tuple[int, str]]:
+    """Following frames (after each camera's first frame) that rendering the given shots needs.
+
+    Both frames of the given shots, plus the first frame of every parent shot
+    a camera from _cameras_for_shots is re-framed from; the other shots of
+    ancestor cameras are not rendered.
+    """
+    frames = {(shot_idx, frame_type) for shot_idx in shot_idxs for frame_type in ("first_frame", "last_frame")}
+    for camera in _cameras_for_shots(camera_tree, shot_idxs):
+        if camera.parent_shot_idx is not None:
+            frames.add((camera.parent_shot_idx, "first_frame"))
+    return frames
+
+
 def _collect_priority_shot_idxs(camera_tree: List[Camera]) -> List[int]:
     """Shot indices that other cameras depend on."""
     return [camera.parent_shot_idx for camera in camera_tree if camera.parent_shot_idx is not None]
 
 
+def _frame_candidate_pairs(
+    visible_characters: List[CharacterInScene],
+    character_portraits_registry: Dict[str, Dict[str, Dict[str, str]]],
+    first_shot_ff_path_and_text_pair: Tuple[str, str],
+) -> List[Tuple[str, str]]:
+    pairs = []
+    for visible_character in visible_characters:
+        registry_item = character_portraits_registry[visible_character.identifier_in_scene]
+        for view, item in registry_item.items():
+            pairs.append((item["path"], item["description"]))
+    pairs.append(tuple(first_shot_ff_path_and_text_pair))
+    return pairs
+
+
 def _pipeline_print(quiet: bool, message: str) -> None:
     if not quiet:
         print(message)
@@ -66,6 +118,19 @@ def _emit_render_progress(progress, stage: str, message: str, metadata: Dict[str
         progress(stage, message, metadata or {})
 
 
+def _failure_is_retryable(error: BaseException) -> bool:
+    """Whether rendering a failed shot again may succeed: everything but a request the provider rejected (a 4xx).
+
+    Malformed model output (parser or validation errors, a missing image in
+    the response) is retryable: the next sample may well be fine.
+    """
+    if isinstance(error, DependencyFailed):
+        return _failure_is_retryable(error.cause)
+    if isinstance(error, RetryError) and error.last_attempt.failed:
+        return _failure_is_retryable(error.last_attempt.exception())
+    return counts_as_provider_failure(error_status(error))
+
+
 def _scoped_progress(progress, **scope):
     if progress is None:
         return None
@@ -78,6 +143,60 @@ def _scoped_progress(progress, **scope):
     return emit
 
 
+# Scripts longer than this many characters are storyboarded in beat-aligned
+# chunks instead of one call that must finish within a single timeout.
+STORYBOARD_CHUNK_MAX_CHARS = 4000
+STORYBOARD_CHUNK_MAX_CONCURRENCY = 4
+# Tail of the previous chunk's script passed as context when its shots are not known yet.
+STORYBOARD_CONTEXT_CHARS = 600
+
+# Frames of one camera whose references are selected in one shared call, and
+# the largest candidate pool that is still uploaded as a batch.
+REFERENCE_SELECTION_BATCH_SIZE = 6
+REFERENCE_SELECTION_BATCH_MAX_CANDIDATES = 12
+
+# Shots per structured decomposition call start at the configured batch size
+# and move between 1 and this cap depending on how long batches take.
+DECOMPOSE_MAX_BATCH_SIZE = 8
+# A batch slower than this (seconds) halves the batch size; one faster than
+# half of it grows the batch by one shot.
+DECOMPOSE_TARGET_BATCH_SECONDS = 90.0
+
+# Keyframe sizes of the two render tiers. Draft media are written under
+# working_dir/DRAFT_RENDER_DIR so promoting a shot never overwrites its draft.
+FINAL_IMAGE_SIZE = "1600x900"
+DRAFT_IMAGE_SIZE = "800x450"
+DRAFT_RENDER_DIR = "draft"
+
+# Observed provider latencies (working_dir) and the dry-run plan (render_dir).
+LATENCY_STATS_FILE = "latency_stats.json"
+RENDER_PLAN_FILE = "render_plan.json"
+
+# Keep-going renders list the shots that failed (render_dir) and cut the
+# others together with a placeholder slate in place of each failed shot.
+FAILURE_MANIFEST_FILE = "failed_shots.json"
+PARTIAL_VIDEO_FILE = "final_video_partial.mp4"
+
+
+class _AdaptiveBatchSize:
+    def __init__(self, initial: int, maximum: int, target_seconds: float = DECOMPOSE_TARGET_BATCH_SECONDS):
+        self.maximum = max(1, maximum)
+        self.value = min(max(1, initial), self.maximum)
+        self.target_seconds = target_seconds
+
+    def record(self, shots: int, seconds: float) -> None:
+        if shots < self.value:
+            # A short tail batch says little about how a full batch performs.
+            return
+        if seconds > self.target_seconds:
+            self.shrink()
+        elif seconds < self.target_seconds / 2:
+            self.value = min(self.maximum, self.value + 1)
+
+    def shrink(self) -> None:
+        self.value = max(1, self.value // 2)
+
+
 class Script2VideoPipeline:
 
     def __init__(
@@ -86,11 +205,33 @@ class Script2VideoPipeline:
         image_generator,
         video_generator,
         working_dir: str,
+        decompose_max_concurrency: int = 4,
+        decompose_batch_size: int = 4,
+        frame_candidates: int = 1,
+        frame_candidate_cost: float = 1.0,
+        portrait_mode: Literal["per_view", "turnaround"] = "per_view",
+        new_camera_strategy: Literal["transition_video", "image_edit"] = "transition_video",
+        draft_image_generator=None,
+        draft_video_generator=None,
+        draft_image_size: str = DRAFT_IMAGE_SIZE,
+        render_tier: Literal["draft", "final"] = "final",
+        keep_going: bool = False,
+        make_working_dir: bool = True,
     ):
 
         self.chat_model = chat_model
         self.image_generator = image_generator
         self.video_generator = video_generator
+        # Keyframes race `frame_candidates` requests and keep the first that
+        # passes the local quality gate; 1 keeps the single-request path.
+        self.frame_candidates = frame_candidates
+        self.frame_candidate_cost = frame_candidate_cost
+        # Generators per render tier; a tier without its own falls back to the
+        # final ones. set_render_tier, at the end, picks the tier's generators.
+        self.tier_generators = {
+            "final": (image_generator, video_generator, FINAL_IMAGE_SIZE),
+            "draft": (draft_image_generator or image_generator, draft_video_generator or video_generator, draft_image_size),
+        }
 
         self.character_extractor = CharacterExtractor(chat_model=self.chat_model)
         self.character_portraits_generator = CharacterPortraitsGenerator(image_generator=self.image_generator)
@@ -98,11 +239,86 @@ class Script2VideoPipeline:
         self.camera_image_generator = CameraImageGenerator(chat_model=self.chat_model, image_generator=self.image_generator, video_generator=self.video_generator)
         self.reference_image_selector = ReferenceImageSelector(chat_model=self.chat_model)
 
+        # "per_view" or "turnaround", see CharacterPortraitsGenerator.fill_missing_views_from_turnaround.
+        self.portrait_mode = portrait_mode
+        # "image_edit" re-frames the parent frame with one image call and only
+        # generates a transition video when the edit fails the consistency check.
+        self.new_camera_strategy = new_camera_strategy
+        self.decompose_max_concurrency = max(1, decompose_max_concurrency)
+        self.decompose_batch_size = max(1, decompose_batch_size)
+        # Shared by the streamed and the regular decomposition so both learn from the same latencies.
+        self.adaptive_decompose_batch_size = _AdaptiveBatchSize(initial=self.decompose_batch_size, maximum=max(self.decompose_batch_size, DECOMPOSE_MAX_BATCH_SIZE))
+        # A failed shot no longer stops the render: it is written to the
+        # failure manifest and the other shots are cut together around it.
+        self.keep_going = keep_going
+
         self.working_dir = working_dir
-        os.makedirs(self.working_dir, exist_ok=True)
+        # False leaves the file system untouched, for dry-run planning.
+        if make_working_dir:
+            os.makedirs(self.working_dir, exist_ok=True)
         self.character_portrait_events = {}
         self.shot_desc_events = {}
         self.frame_events = {}
+        # Establishing plate of the scene's location, offered to root cameras.
+        self.environment_plate_path_and_text_pair: Optional[Tuple[str, str]] = None
+        self.latency_stats = LatencyStats(os.path.join(self.working_dir, LATENCY_STATS_FILE))
+        self.set_render_tier(render_tier)
+
+
+    @property
+    def render_dir(self) -> str:
+        """Where rendered media of the current tier live.
+
+        Text artifacts (storyboard, shot descriptions, camera tree, reference
+        selections) stay in working_dir and are shared by both tiers; images
+        and videos of the draft tier go to working_dir/draft.
+        """
+        if self.render_tier == "draft":
+            return os.path.join(self.working_dir, DRAFT_RENDER_DIR)
+        return self.working_dir
+
+
+    def set_render_tier(self, render_tier: Literal["draft", "final"]) -> None:
+        if render_tier not in self.tier_generators:
+            raise ValueError(f"Unknown render tier {render_tier!r}; expected 'draft' or 'final'")
+        image_generator, video_generator, image_size = self.tier_generators[render_tier]
+        self.render_tier = render_tier
+        self.image_size = image_size
+        self.image_generator = image_generator
+        self.video_generator = video_generator
+        self.frame_image_generator = (
+            CandidateImageGenerator(image_generator, candidates=self.frame_candidates, cost_per_request=self.frame_candidate_cost)
+            if self.frame_candidates > 1 else image_generator
+        )
+        self.character_portraits_generator.image_generator = image_generator
+        self.camera_image_generator.image_generator = image_generator
+        self.camera_image_generator.video_generator = video_generator
+        self.camera_image_generator.image_size = image_size
+
+
+    def _record_latency(self, provider: Any, started: float) -> None:
+        self.latency_stats.record(provider_limits(provider).name, time.monotonic() - started)
+
+
+    def _retarget_render_path(self, path: str) -> str:
+        """Map a rendered file of either tier to the same file in the current tier."""
+        relative = os.path.relpath(path, self.working_dir)
+        if relative.startswith(os.pardir):
+            return path
+        parts = relative.split(os.sep)
+        if parts[0] == DRAFT_RENDER_DIR:
+            parts = parts[1:]
+        return os.path.join(self.render_dir, *parts)
+
+
+    def _retarget_selector_output(self, selector_output: dict) -> dict:
+        """Reuse a reference selection made in the other tier with this tier's images."""
+        selector_output = dict(selector_output)
+        selector_output["reference_image_path_and_text_pairs"] = [
+            (self._retarget_render_path(path), text)
+            for path, text in selector_output["reference_image_path_and_text_pairs"]
+        ]
+        return selector_output
 
 
     async def plan_text_artifacts(
@@ -184,14 +400,30 @@ class Script2VideoPipeline:
         chat_model_args = resolve_chat_model_config(config["chat_model"]["init_args"])
         chat_model = init_chat_model(**chat_model_args)
         backend = RenderBackend.from_config(config)
+        decompose_config = config.get("decompose") or {}
+        frame_config = config.get("frame_generation") or {}
+        portrait_config = config.get("portraits") or {}
+        camera_config = config.get("camera") or {}
 
         return cls(
             chat_model=chat_model,
             image_generator=backend.image_generator,
             video_generator=backend.video_generator,
             working_dir=config["working_dir"],
+            decompose_max_concurrency=decompose_config.get("max_concurrency", 4),
+            decompose_batch_size=decompose_config.get("batch_size", 4),
+            frame_candidates=frame_config.get("candidates", 1),
+            frame_candidate_cost=frame_config.get("cost_per_request", 1.0),
+            portrait_mode=portrait_config.get("mode", "per_view"),
+            new_camera_strategy=camera_config.get("new_camera_strategy", "transition_video"),
+            draft_image_generator=backend.draft_image_generator,
+            draft_video_generator=backend.draft_video_generator,
+            draft_image_size=backend.draft_image_size or DRAFT_IMAGE_SIZE,
+            render_tier=config.get("render_tier", "final"),
+            keep_going=config.get("keep_going", False),
         )
 
+    @with_deadline
     async def __call__(
         self,
         script: str,
@@ -201,8 +433,54 @@ class Script2VideoPipeline:
         character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None,
         quiet: bool = False,
         progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+        environment_plate_path_and_text_pair: Optional[Tuple[str, str]] = None,
+        shot_idxs: Optional[List[int]] = None,
     ):
-        _emit_render_progress(progress, "render_start", "Starting script2video render")
+        """Render the script in the current tier.
+
+        With `shot_idxs`, only those shots get video clips, and only the
+        cameras they need (their own and every ancestor in the camera tree)
+        get keyframes, ancestors only the first frames their descendants are
+        re-framed from; the final cut is concatenated once every shot has a
+        clip in this tier, otherwise None is returned. In keep-going mode a
+        failed shot is recorded in the failure manifest instead of aborting
+        the render; once every other shot has a clip, a partial cut with a
+        placeholder slate per failed shot is returned (see
+        retry_failed_shots). With `deadline_seconds`,
+        every agent, poll and retry below gives up once that budget is spent
+        (see utils.deadline).
+        """
+        try:
+            return await self._render(
+                script=script,
+                user_requirement=user_requirement,
+                style=style,
+                characters=characters,
+                character_portraits_registry=character_portraits_registry,
+                quiet=quiet,
+                progress=progress,
+                environment_plate_path_and_text_pair=environment_plate_path_and_text_pair,
+                shot_idxs=shot_idxs,
+            )
+        finally:
+            # Latency samples are saved in batches; write out the rest.
+            self.latency_stats.flush()
+
+
+    async def _render(
+        self,
+        script: str,
+        user_requirement: str,
+        style: str,
+        characters: List[CharacterInScene] = None,
+        character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None,
+        quiet: bool = False,
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+        environment_plate_path_and_text_pair: Optional[Tuple[str, str]] = None,
+        shot_idxs: Optional[List[int]] = None,
+    ):
+        _emit_render_progress(progress, "render_start", "Starting script2video render", {"render_tier": self.render_tier})
+        self.environment_plate_path_and_text_pair = environment_plate_path_and_text_pair
         if characters is None:
             _emit_render_progress(progress, "extract_characters", "Extracting characters before render")
             characters = await self.extract_characters(script=script, quiet=quiet)
@@ -225,7 +503,7 @@ class Script2VideoPipeline:
                 self.character_portrait_events[character.idx] = asyncio.Event()
 
         if character_portraits_registry is None:
-            character_portraits_registry_path = os.path.join(self.working_dir, "character_portraits_registry.json")
+            character_portraits_registry_path = os.path.join(self.render_dir, "character_portraits_registry.json")
             if os.path.exists(character_portraits_registry_path):
                 with open(character_portraits_registry_path, "r", encoding="utf-8") as f:
                     character_portraits_registry = json.load(f)
@@ -275,8 +553,22 @@ class Script2VideoPipeline:
         )
         _emit_render_progress(progress, "camera_tree_ready", "Camera tree ready", {"camera_count": len(camera_tree)})
 
+        rendered_shot_descriptions = shot_descriptions
+        rendered_cameras = camera_tree
+        rendered_frames = None
+        if shot_idxs is not None:
+            unknown = set(shot_idxs) - {shot_description.idx for shot_description in shot_descriptions}
+            if unknown:
+                raise ValueError(f"Unknown shot indices to render: {sorted(unknown)}")
+            rendered_shot_descriptions = [shot_description for shot_description in shot_descriptions if shot_description.idx in set(shot_idxs)]
+            rendered_cameras = _cameras_for_shots(camera_tree, shot_idxs)
+            rendered_frames = _frames_for_shots(camera_tree, shot_idxs)
+
+        for shot_description in shot_descriptions:
+            os.makedirs(os.path.join(self.render_dir, "shots", f"{shot_description.idx}"), exist_ok=True)
+
         priority_shot_idxs = [camera.parent_cam_idx for camera in camera_tree if camera.parent_cam_idx is not None]
-        _emit_render_progress(progress, "frames_start", "Generating frames for cameras", {"camera_count": len(camera_tree), "shot_count": len(shot_descriptions)})
+        _emit_render_progress(progress, "frames_start", "Generating frames for cameras", {"camera_count": len(rendered_cameras), "shot_count": len(rendered_shot_descriptions)})
         tasks = [
             self.generate_frames_for_single_camera(
                 camera=camera,
@@ -285,22 +577,51 @@ class Script2VideoPipeline:
                 character_portraits_registry=character_portraits_registry,
                 priority_shot_idxs=priority_shot_idxs,
                 progress=progress,
+                frames=rendered_frames,
             )
-            for camera in camera_tree
+            for camera in rendered_cameras
         ]
 
-        _emit_render_progress(progress, "video_clips_start", "Generating video clips for shots", {"shot_count": len(shot_descriptions)})
+        _emit_render_progress(progress, "video_clips_start", "Generating video clips for shots", {"shot_count": len(rendered_shot_descriptions)})
         video_tasks = [
             self.generate_video_for_single_shot(
                 shot_description=shot_description,
                 progress=progress,
             )
-            for shot_description in shot_descriptions
+            for shot_description in rendered_shot_descriptions
         ]
+        camera_task_count = len(tasks)
         tasks.extend(video_tasks)
-        await asyncio.gather(*tasks)
-
-        final_video_path = os.path.join(self.working_dir, "final_video.mp4")
+        try:
+            # Unless keeping going, one failure cancels every other frame and
+            # clip, and the video generators cancel their submitted jobs upstream.
+            results = await run_task_group(tasks, keep_going=self.keep_going)
+        except BaseException as e:
+            fail_events([event for events in self.frame_events.values() for event in events.values()], e)
+            raise
+
+        failed_shots = {}
+        if self.keep_going:
+            # A failed camera surfaces here too, as DependencyFailed of the clips waiting on its frames.
+            for shot_description, result in zip(rendered_shot_descriptions, results[camera_task_count:]):
+                if isinstance(result, BaseException):
+                    print(f"⚠️ Shot {shot_description.idx} failed: {result}")
+                    _emit_render_progress(progress, "video_clip_failed", f"Video clip for shot {shot_description.idx} failed", {"shot_idx": shot_description.idx, "error": str(result), "retryable": _failure_is_retryable(result)})
+                    failed_shots[shot_description.idx] = result
+            failed_shots = self._update_failure_manifest([shot_description.idx for shot_description in rendered_shot_descriptions], failed_shots)
+
+        final_video_path = os.path.join(self.render_dir, "final_video.mp4")
+        pending_shot_idxs = [
+            shot_description.idx
+            for shot_description in shot_descriptions
+            if not os.path.exists(os.path.join(self.render_dir, "shots", f"{shot_description.idx}", "video.mp4"))
+        ]
+        if pending_shot_idxs and not os.path.exists(final_video_path):
+            if failed_shots and set(pending_shot_idxs) <= set(failed_shots):
+                return self._assemble_partial_video(shot_descriptions, failed_shots, progress)
+            print(f"⏸️ Rendered {len(rendered_shot_descriptions)} shots in the {self.render_tier} tier; shots {pending_shot_idxs} are still missing, skipping concatenation.")
+            _emit_render_progress(progress, "render_partial", "Rendered the requested shots; final cut pending", {"render_tier": self.render_tier, "shot_idxs": [shot_description.idx for shot_description in rendered_shot_descriptions], "pending_shot_idxs": pending_shot_idxs})
+            return None
         if os.path.exists(final_video_path):
             print(f"🚀 Skipped concatenating videos, already exists.")
             _emit_render_progress(progress, "final_video_exists", "Final video already exists", {"path": final_video_path})
@@ -308,18 +629,406 @@ class Script2VideoPipeline:
             print(f"🎬 Starting concatenating videos...")
             _emit_render_progress(progress, "concat_start", "Concatenating video clips", {"shot_count": len(shot_descriptions)})
             video_clips = [
-                VideoFileClip(os.path.join(self.working_dir, "shots", f"{shot_description.idx}", "video.mp4"))
+                VideoFileClip(os.path.join(self.render_dir, "shots", f"{shot_description.idx}", "video.mp4"))
                 for shot_description in shot_descriptions
             ]
             final_video = concatenate_videoclips(video_clips)
             final_video.write_videofile(final_video_path, codec="libx264", preset="medium")
+            # The partial cut of an earlier keep-going run is stale now.
+            partial_video_path = os.path.join(self.render_dir, PARTIAL_VIDEO_FILE)
+            if os.path.exists(partial_video_path):
+                os.remove(partial_video_path)
             print(f"☑️ Concatenated videos, saved to {final_video_path}.")
             _emit_render_progress(progress, "concat_done", "Final video concatenated", {"path": final_video_path})
 
-        _emit_render_progress(progress, "render_done", "Script2video render complete", {"final_video_path": final_video_path})
+        _emit_render_progress(progress, "render_done", "Script2video render complete", {"final_video_path": final_video_path, "render_tier": self.render_tier})
         return final_video_path
 
 
+    async def promote_shots(
+        self,
+        script: str,
+        user_requirement: str,
+        style: str,
+        shot_idxs: List[int],
+        characters: List[CharacterInScene] = None,
+        character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None,
+        quiet: bool = False,
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+        environment_plate_path_and_text_pair: Optional[Tuple[str, str]] = None,
+    ):
+        """Render approved draft shots again in the final tier.
+
+        The storyboard, shot descriptions, camera tree and reference selections
+        written by the draft pass are loaded rather than regenerated; only the
+        images and clips are redone with the final generators. Returns the
+        final cut once every shot has been promoted, otherwise None.
+        """
+        self.set_render_tier("final")
+        return await self(
+            script=script,
+            user_requirement=user_requirement,
+            style=style,
+            characters=characters,
+            character_portraits_registry=character_portraits_registry,
+            quiet=quiet,
+            progress=progress,
+            environment_plate_path_and_text_pair=environment_plate_path_and_text_pair,
+            shot_idxs=shot_idxs,
+        )
+
+
+    async def retry_failed_shots(
+        self,
+        script: str,
+        user_requirement: str,
+        style: str,
+        characters: List[CharacterInScene] = None,
+        character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None,
+        quiet: bool = False,
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+        environment_plate_path_and_text_pair: Optional[Tuple[str, str]] = None,
+        include_non_retryable: bool = False,
+    ):
+        """Render again only the shots in the current tier's failure manifest.
+
+        Shots whose failure is not retryable (a rejected request, bad input)
+        are left out unless `include_non_retryable`. Returns what __call__
+        returns for those shots, or None when there is nothing to retry.
+        """
+        shot_idxs = [entry["shot_idx"] for entry in self.load_failure_manifest() if entry["retryable"] or include_non_retryable]
+        if not shot_idxs:
+            print("🚀 No failed shots to retry.")
+            return None
+        print(f"🔁 Retrying failed shots {shot_idxs}...")
+        return await self(
+            script=script,
+            user_requirement=user_requirement,
+            style=style,
+            characters=characters,
+            character_portraits_registry=character_portraits_registry,
+            quiet=quiet,
+            progress=progress,
+            environment_plate_path_and_text_pair=environment_plate_path_and_text_pair,
+            shot_idxs=shot_idxs,
+        )
+
+
+    def load_failure_manifest(self) -> List[Dict[str, Any]]:
+        """The failed shots recorded by keep-going renders of the current tier."""
+        manifest_path = os.path.join(self.render_dir, FAILURE_MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return []
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)["failed_shots"]
+
+
+    def _update_failure_manifest(self, rendered_shot_idxs: List[int], failures: Dict[int, BaseException]) -> Dict[int, Dict[str, Any]]:
+        """Replace the entries of the shots rendered in this pass; others keep their earlier failure."""
+        manifest = {
+            entry["shot_idx"]: entry
+            for entry in self.load_failure_manifest()
+            if entry["shot_idx"] not in rendered_shot_idxs
+        }
+        for shot_idx, error in failures.items():
+            manifest[shot_idx] = {
+                "shot_idx": shot_idx,
+                "error_type": type(error).__name__,
+                "error": str(error) or type(error).__name__,
+                "failed_dependency": error.dependency if isinstance(error, DependencyFailed) else None,
+                "retryable": _failure_is_retryable(error),
+            }
+        manifest_path = os.path.join(self.render_dir, FAILURE_MANIFEST_FILE)
+        if manifest:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"render_tier": self.render_tier, "failed_shots": [manifest[shot_idx] for shot_idx in sorted(manifest)]}, f, ensure_ascii=False, indent=4)
+            print(f"📝 {len(manifest)} failed shot(s) recorded in {manifest_path}.")
+        elif os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        return manifest
+
+
+    def _assemble_partial_video(
+        self,
+        shot_descriptions: List[ShotDescription],
+        failed_shots: Dict[int, Dict[str, Any]],
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+    ) -> Optional[str]:
+        """Cut the rendered clips together with a placeholder slate for each failed shot."""
+        failed_shot_idxs = sorted(failed_shots)
+        metadata = {
+            "render_tier": self.render_tier,
+            "failed_shot_idxs": failed_shot_idxs,
+            "retryable_shot_idxs": [shot_idx for shot_idx in failed_shot_idxs if failed_shots[shot_idx]["retryable"]],
+            "manifest_path": os.path.join(self.render_dir, FAILURE_MANIFEST_FILE),
+        }
+        if len(failed_shot_idxs) == len(shot_descriptions):
+            print(f"⚠️ Every shot failed; no partial cut to assemble.")
+            _emit_render_progress(progress, "render_failed_shots", "Every shot failed; see the failure manifest", metadata)
+            return None
+
+        partial_video_path = os.path.join(self.render_dir, PARTIAL_VIDEO_FILE)
+        print(f"🎬 Assembling a partial cut with placeholders for failed shots {failed_shot_idxs}...")
+        video_paths = [
+            None if shot_description.idx in failed_shots else os.path.join(self.render_dir, "shots", f"{shot_description.idx}", "video.mp4")
+            for shot_description in shot_descriptions
+        ]
+        slate_texts = [
+            f"Shot {shot_description.idx} failed to render\n{failed_shots[shot_description.idx]['error_type']}" if shot_description.idx in failed_shots else ""
+            for shot_description in shot_descriptions
+        ]
+        concatenate_with_slates(video_paths, slate_texts, partial_video_path)
+        print(f"☑️ Assembled partial cut, saved to {partial_video_path}; retry the failed shots with retry_failed_shots.")
+        metadata["path"] = partial_video_path
+        _emit_render_progress(progress, "render_partial_with_failures", "Assembled a partial cut with placeholder slates", metadata)
+        return partial_video_path
+
+
+    def plan_render(
+        self,
+        script: str,
+        characters: List[CharacterInScene] = None,
+        character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None,
+        shot_idxs: Optional[List[int]] = None,
+        plan_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Write a dry-run render plan for the current tier without calling any model.
+
+        The plan lists the artifacts still missing on disk, the image, video
+        and LLM requests needed to produce them, and estimated tokens and
+        wall-clock time from the recorded provider latencies under the
+        current rate limits. It is saved to render_dir/render_plan.json
+        unless `plan_path` is given, and returned as a dict.
+        """
+        plan = self.collect_render_plan(
+            script=script,
+            characters=characters,
+            character_portraits_registry=character_portraits_registry,
+            shot_idxs=shot_idxs,
+        )
+        plan_path = plan_path or os.path.join(self.render_dir, RENDER_PLAN_FILE)
+        render_plan = plan.save(plan_path, self.render_providers(), self.latency_stats)
+        estimate = render_plan["estimate"]
+        print(f"📋 Render plan: {estimate['request_counts']} requests, ~{estimate['llm_tokens']} LLM tokens, ~{estimate['wall_clock_seconds'] / 60:.1f} min; saved to {plan_path}.")
+        for warning in estimate["quota_warnings"]:
+            print(f"⚠️ {warning}")
+        return render_plan
+
+
+    def render_providers(self) -> Dict[str, ProviderLimits]:
+        return {
+            "llm": provider_limits(self.chat_model),
+            "image": provider_limits(self.image_generator),
+            "video": provider_limits(self.video_generator),
+        }
+
+
+    def collect_render_plan(
+        self,
+        script: str,
+        characters: List[CharacterInScene] = None,
+        character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None,
+        shot_idxs: Optional[List[int]] = None,
+    ) -> RenderPlan:
+        """Walk the resume state on disk and record every request __call__ would issue.
+
+        Text artifacts that are not on disk yet are planned from the script
+        (one shot per SCRIPT_CHARS_PER_SHOT characters, each shot its own
+        camera), which marks the plan as an estimate rather than exact.
+        """
+        plan = RenderPlan(working_dir=self.working_dir, render_tier=self.render_tier)
+        text_chain: List[str] = []
+
+        if characters is None:
+            characters_path = os.path.join(self.working_dir, "characters.json")
+            if os.path.exists(characters_path):
+                with open(characters_path, "r", encoding="utf-8") as f:
+                    characters = [CharacterInScene.model_validate(character) for character in json.load(f)]
+            else:
+                plan.add("llm", "extract_characters", "text", [characters_path])
+                text_chain.append("llm")
+        else:
+            characters = _normalize_model_list(characters, CharacterInScene, "characters")
+
+        storyboard_path = os.path.join(self.working_dir, "storyboard.json")
+        if os.path.exists(storyboard_path):
+            with open(storyboard_path, "r", encoding="utf-8") as f:
+                all_shot_idxs = [ShotBriefDescription.model_validate(shot).idx for shot in json.load(f)]
+        else:
+            script_chunks = split_script_into_beats(script, STORYBOARD_CHUNK_MAX_CHARS)
+            plan.add("llm", "storyboard", "text", [storyboard_path], count=len(script_chunks))
+            text_chain.extend(["llm"] * math.ceil(len(script_chunks) / STORYBOARD_CHUNK_MAX_CONCURRENCY))
+            all_shot_idxs = list(range(max(1, math.ceil(len(script) / SCRIPT_CHARS_PER_SHOT))))
+            plan.note(f"No storyboard on disk; assuming {len(all_shot_idxs)} shots from the script length.", exact=False)
+
+        shot_descriptions = {shot_idx: self._load_shot_description(shot_idx) for shot_idx in all_shot_idxs}
+        undecomposed = [shot_idx for shot_idx, shot_description in shot_descriptions.items() if shot_description is None]
+        if undecomposed:
+            decompose_calls = math.ceil(len(undecomposed) / self.decompose_batch_size)
+            plan.add("llm", "decompose", "text", [self._shot_description_path(shot_idx) for shot_idx in undecomposed], count=decompose_calls)
+            text_chain.extend(["llm"] * math.ceil(decompose_calls / self.decompose_max_concurrency))
+
+        camera_tree_path = os.path.join(self.working_dir, "camera_tree.json")
+        camera_tree = None
+        if os.path.exists(camera_tree_path):
+            with open(camera_tree_path, "r", encoding="utf-8") as f:
+                camera_tree = [Camera.model_validate(camera) for camera in json.load(f)]
+        else:
+            plan.add("llm", "camera_tree", "text", [camera_tree_path])
+            text_chain.append("llm")
+        plan.extend_chain("text", text_chain)
+
+        self._plan_portraits(plan, characters, character_portraits_registry)
+
+        rendered_shot_idxs = all_shot_idxs if shot_idxs is None else [shot_idx for shot_idx in all_shot_idxs if shot_idx in set(shot_idxs)]
+        if camera_tree is None or undecomposed:
+            plan.note("Shot descriptions or the camera tree are not on disk yet; frames are planned as one first frame per shot.", exact=False)
+            for shot_idx in rendered_shot_idxs:
+                self._plan_frame(plan, shot_idx, "first_frame", chain=[])
+        else:
+            self._plan_camera_frames(plan, camera_tree, shot_descriptions, rendered_shot_idxs)
+
+        for shot_idx in rendered_shot_idxs:
+            video_path = os.path.join(self.render_dir, "shots", f"{shot_idx}", "video.mp4")
+            if not os.path.exists(video_path):
+                plan.add("video", "video_clip", "videos", [video_path])
+                plan.extend_chain("videos", ["video"])
+
+        final_video_path = os.path.join(self.render_dir, "final_video.mp4")
+        if len(rendered_shot_idxs) == len(all_shot_idxs) and not os.path.exists(final_video_path):
+            plan.local_artifacts.append(final_video_path)
+        return plan
+
+
+    def _plan_portraits(
+        self,
+        plan: RenderPlan,
+        characters: Optional[List[CharacterInScene]],
+        character_portraits_registry: Optional[Dict[str, Dict[str, Dict[str, str]]]],
+    ) -> None:
+        if characters is None:
+            plan.note("Characters are not extracted yet; portrait requests are not counted.", exact=False)
+            return
+        if character_portraits_registry is None:
+            character_portraits_registry_path = os.path.join(self.render_dir, "character_portraits_registry.json")
+            character_portraits_registry = {}
+            if os.path.exists(character_portraits_registry_path):
+                with open(character_portraits_registry_path, "r", encoding="utf-8") as f:
+                    character_portraits_registry = json.load(f)
+
+        for character in characters:
+            if character.identifier_in_scene in character_portraits_registry:
+                continue
+            character_dir = os.path.join(self.render_dir, "character_portraits", f"{character.idx}_{character.identifier_in_scene}")
+            missing_views = [view for view in ("front", "side", "back") if not os.path.exists(os.path.join(character_dir, f"{view}.png"))]
+            if not missing_views:
+                continue
+            missing_paths = [os.path.join(character_dir, f"{view}.png") for view in missing_views]
+            if self.portrait_mode == "turnaround":
+                plan.add("image", "turnaround_sheet", "portraits", missing_paths)
+                plan.extend_chain("portraits", ["image"])
+                plan.note("Turnaround sheets that cannot be split fall back to one request per view.", exact=False)
+                continue
+            for view, path in zip(missing_views, missing_paths):
+                plan.add("image", f"{view}_portrait", "portraits", [path])
+            # Side and back views are drawn from the front one.
+            plan.extend_chain("portraits", ["image", "image"] if "front" in missing_views and len(missing_views) > 1 else ["image"])
+
+
+    def _plan_frame(self, plan: RenderPlan, shot_idx: int, frame_type: str, chain: List[str], select_references: bool = True) -> List[str]:
+        """Plan one keyframe and return the requests it adds to `chain`."""
+        frame_image_path = os.path.join(self.render_dir, "shots", f"{shot_idx}", f"{frame_type}.png")
+        if os.path.exists(frame_image_path):
+            return []
+        steps = []
+        selector_output_path = os.path.join(self.working_dir, "shots", f"{shot_idx}", f"{frame_type}_selector_output.json")
+        if select_references and not os.path.exists(selector_output_path):
+            plan.add("llm", "reference_selection", "frames", [selector_output_path])
+            steps.append("llm")
+        plan.add("image", frame_type, "frames", [frame_image_path], count=self.frame_candidates)
+        steps.append("image")
+        plan.extend_chain("frames", chain + steps)
+        return steps
+
+
+    def _plan_camera_frames(
+        self,
+        plan: RenderPlan,
+        camera_tree: List[Camera],
+        shot_descriptions: Dict[int, ShotDescription],
+        rendered_shot_idxs: List[int],
+    ) -> None:
+        cameras_by_idx = {camera.idx: camera for camera in camera_tree}
+        first_frame_chains: Dict[int, List[str]] = {}
+
+        def first_frame_chain(camera: Camera) -> List[str]:
+            # Requests on the way to this camera's first frame, ancestors included.
+            if camera.idx in first_frame_chains:
+                return first_frame_chains[camera.idx]
+            first_shot_idx = camera.active_shot_idxs[0]
+            parent = cameras_by_idx.get(camera.parent_cam_idx) if camera.parent_cam_idx is not None else None
+            chain = list(first_frame_chain(parent)) if parent is not None else []
+            first_shot_ff_path = os.path.join(self.render_dir, "shots", f"{first_shot_idx}", "first_frame.png")
+            if not os.path.exists(first_shot_ff_path):
+                if camera.parent_shot_idx is not None:
+                    chain.extend(self._plan_new_camera_image(plan, camera))
+                if camera.parent_shot_idx is None or camera.missing_info is not None:
+                    chain.extend(self._plan_frame(plan, first_shot_idx, "first_frame", chain))
+                else:
+                    plan.extend_chain("frames", chain)
+            first_frame_chains[camera.idx] = chain
+            return chain
+
+        rendered_frames = _frames_for_shots(camera_tree, rendered_shot_idxs)
+        for camera in _cameras_for_shots(camera_tree, rendered_shot_idxs):
+            chain = first_frame_chain(camera)
+            first_shot_idx = camera.active_shot_idxs[0]
+            following_frames = []
+            if shot_descriptions[first_shot_idx].variation_type in ["medium", "large"]:
+                following_frames.append((first_shot_idx, "last_frame"))
+            for shot_idx in camera.active_shot_idxs[1:]:
+                following_frames.append((shot_idx, "first_frame"))
+                if shot_descriptions[shot_idx].variation_type in ["medium", "large"]:
+                    following_frames.append((shot_idx, "last_frame"))
+            following_frames = [frame for frame in following_frames if frame in rendered_frames]
+
+            # Mirrors prefetch_reference_selections: two or more pending
+            # selections share batch calls instead of one call each.
+            pending_selections = [
+                os.path.join(self.working_dir, "shots", f"{shot_idx}", f"{frame_type}_selector_output.json")
+                for shot_idx, frame_type in following_frames
+                if not os.path.exists(os.path.join(self.render_dir, "shots", f"{shot_idx}", f"{frame_type}.png"))
+                and not os.path.exists(os.path.join(self.working_dir, "shots", f"{shot_idx}", f"{frame_type}_selector_output.json"))
+            ]
+            batched = len(pending_selections) >= 2
+            if batched:
+                plan.add("llm", "reference_selection", "frames", pending_selections, count=math.ceil(len(pending_selections) / REFERENCE_SELECTION_BATCH_SIZE))
+            for shot_idx, frame_type in following_frames:
+                self._plan_frame(plan, shot_idx, frame_type, chain + (["llm"] if batched else []), select_references=not batched)
+        if any(request.purpose == "reference_selection" for request in plan.requests):
+            plan.note("Reference selections the local resolver can settle skip their LLM call; those counts are an upper bound.", exact=False)
+
+
+    def _plan_new_camera_image(self, plan: RenderPlan, camera: Camera) -> List[str]:
+        first_shot_idx = camera.active_shot_idxs[0]
+        shot_dir = os.path.join(self.render_dir, "shots", f"{first_shot_idx}")
+        new_camera_image_path = os.path.join(shot_dir, f"new_camera_{camera.idx}.png")
+        if os.path.exists(new_camera_image_path):
+            return []
+        if self.new_camera_strategy == "image_edit":
+            plan.note("New camera edits that fail the consistency check add one transition video each.", exact=False)
+            if os.path.exists(os.path.join(shot_dir, f"new_camera_{camera.idx}_edit.png")):
+                return []
+            plan.add("image", "new_camera_edit", "frames", [new_camera_image_path])
+            return ["image"]
+        transition_video_path = os.path.join(shot_dir, f"transition_video_from_shot_{camera.parent_shot_idx}.mp4")
+        plan.local_artifacts.append(new_camera_image_path)
+        if os.path.exists(transition_video_path):
+            return []
+        plan.add("video", "transition_video", "frames", [transition_video_path])
+        return ["video"]
+
+
     async def generate_frames_for_single_camera(
         self,
         camera: Camera,
@@ -328,10 +1037,41 @@ class Script2VideoPipeline:
         character_portraits_registry: Dict[str, Dict[str, Dict[str, str]]],
         priority_shot_idxs: List[int],
         progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+        frames: Optional[Set[Tuple[int, str]]] = None,
+    ):
+        """Render the camera's first frame and then its following frames.
+
+        `frames` limits the following frames to those (shot_idx, frame_type)
+        pairs, see _frames_for_shots; None renders all of them.
+        """
+        try:
+            await self._generate_frames_for_single_camera(
+                camera=camera,
+                shot_descriptions=shot_descriptions,
+                characters=characters,
+                character_portraits_registry=character_portraits_registry,
+                priority_shot_idxs=priority_shot_idxs,
+                progress=progress,
+                frames=frames,
+            )
+        except BaseException as e:
+            # Child cameras and video clips waiting on this camera's frames fail instead of hanging.
+            fail_events([event for shot_idx in camera.active_shot_idxs for event in self.frame_events.get(shot_idx, {}).values()], e)
+            raise
+
+    async def _generate_frames_for_single_camera(
+        self,
+        camera: Camera,
+        shot_descriptions: List[ShotDescription],
+        characters: List[CharacterInScene],
+        character_portraits_registry: Dict[str, Dict[str, Dict[str, str]]],
+        priority_shot_idxs: List[int],
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+        frames: Optional[Set[Tuple[int, str]]] = None,
     ):
         # 1. generate the first_frame of the first shot of the camera
         first_shot_idx = camera.active_shot_idxs[0]
-        first_shot_ff_path = os.path.join(self.working_dir, "shots", f"{first_shot_idx}", "first_frame.png")
+        first_shot_ff_path = os.path.join(self.render_dir, "shots", f"{first_shot_idx}", "first_frame.png")
         _emit_render_progress(progress, "camera_frames_start", f"Generating frames for camera {camera.idx}", {"camera_idx": camera.idx, "active_shot_idxs": camera.active_shot_idxs})
 
         if os.path.exists(first_shot_ff_path):
@@ -349,42 +1089,57 @@ class Script2VideoPipeline:
                 registry_item = character_portraits_registry[identifier_in_scene]
                 for view, item in registry_item.items():
                     available_image_path_and_text_pairs.append((item["path"], item["description"]))
+            if camera.parent_shot_idx is None and self.environment_plate_path_and_text_pair is not None:
+                available_image_path_and_text_pairs.append(tuple(self.environment_plate_path_and_text_pair))
             
             # generate the first_frame based on the shot_description.ff_desc
             if camera.parent_shot_idx is not None:
-                # generate the first_frame based on the transition video
+                # generate the first_frame based on the new camera image (image edit or transition video)
                 parent_shot_idx = camera.parent_shot_idx
                 await self.frame_events[parent_shot_idx]["first_frame"].wait()
-                parent_shot_ff_path = os.path.join(self.working_dir, "shots", f"{parent_shot_idx}", "first_frame.png")
-                transition_video_path = os.path.join(self.working_dir, "shots", f"{first_shot_idx}", f"transition_video_from_shot_{parent_shot_idx}.mp4")
-
-                if os.path.exists(transition_video_path):
-                    print(f"🚀 Skipped generating transition video for shot {first_shot_idx} from shot {parent_shot_idx}, already exists.")
-                    _emit_render_progress(progress, "transition_video_exists", f"Transition video for shot {first_shot_idx} already exists", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx, "path": transition_video_path})
-                else:
-                    print(f"🖼️ Starting transition video generation for shot {first_shot_idx} from shot {parent_shot_idx}...")
-                    _emit_render_progress(progress, "transition_video_start", f"Generating transition video for shot {first_shot_idx}", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx})
-                    transition_video_output = await self.camera_image_generator.generate_transition_video(
-                        first_shot_visual_desc=shot_descriptions[parent_shot_idx].visual_desc,
-                        second_shot_visual_desc=shot_descriptions[first_shot_idx].visual_desc,
-                        first_shot_ff_path=parent_shot_ff_path,
-                        progress=_scoped_progress(progress, camera_idx=camera.idx, shot_idx=first_shot_idx, parent_shot_idx=parent_shot_idx, artifact="transition_video"),
-                    )
-                    transition_video_output.save(transition_video_path)
-                    print(f"☑️ Generated transition video for shot {first_shot_idx} from shot {parent_shot_idx}, saved to {transition_video_path}.")
-                    _emit_render_progress(progress, "transition_video_done", f"Transition video for shot {first_shot_idx} generated", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx, "path": transition_video_path})
-
-                new_camera_image_path = os.path.join(self.working_dir, "shots", f"{first_shot_idx}", f"new_camera_{camera.idx}.png")
+                parent_shot_ff_path = os.path.join(self.render_dir, "shots", f"{parent_shot_idx}", "first_frame.png")
+                new_camera_image_path = os.path.join(self.render_dir, "shots", f"{first_shot_idx}", f"new_camera_{camera.idx}.png")
                 if os.path.exists(new_camera_image_path):
                     print(f"🚀 Skipped generating new camera image for shot {first_shot_idx}, already exists.")
                     _emit_render_progress(progress, "new_camera_image_exists", f"New camera image for shot {first_shot_idx} already exists", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "path": new_camera_image_path})
                 else:
-                    print(f"🖼️ Starting new camera image generation for shot {first_shot_idx}...")
-                    _emit_render_progress(progress, "new_camera_image_start", f"Extracting new camera image for shot {first_shot_idx}", {"camera_idx": camera.idx, "shot_idx": first_shot_idx})
-                    new_camera_image = self.camera_image_generator.get_new_camera_image(transition_video_path)
-                    new_camera_image.save(new_camera_image_path)
-                    print(f"☑️ Generated new camera image for shot {first_shot_idx} (not completed), saved to {new_camera_image_path}.")
-                    _emit_render_progress(progress, "new_camera_image_done", f"New camera image for shot {first_shot_idx} extracted", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "path": new_camera_image_path})
+                    if self.new_camera_strategy == "image_edit":
+                        await self.generate_new_camera_image_by_edit(
+                            camera=camera,
+                            shot_descriptions=shot_descriptions,
+                            parent_shot_ff_path=parent_shot_ff_path,
+                            new_camera_image_path=new_camera_image_path,
+                            progress=progress,
+                        )
+
+                    # the edit is skipped or was rejected: fall back to the transition video
+                    if not os.path.exists(new_camera_image_path):
+                        transition_video_path = os.path.join(self.render_dir, "shots", f"{first_shot_idx}", f"transition_video_from_shot_{parent_shot_idx}.mp4")
+
+                        if os.path.exists(transition_video_path):
+                            print(f"🚀 Skipped generating transition video for shot {first_shot_idx} from shot {parent_shot_idx}, already exists.")
+                            _emit_render_progress(progress, "transition_video_exists", f"Transition video for shot {first_shot_idx} already exists", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx, "path": transition_video_path})
+                        else:
+                            print(f"🖼️ Starting transition video generation for shot {first_shot_idx} from shot {parent_shot_idx}...")
+                            _emit_render_progress(progress, "transition_video_start", f"Generating transition video for shot {first_shot_idx}", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx})
+                            started = time.monotonic()
+                            transition_video_output = await self.camera_image_generator.generate_transition_video(
+                                first_shot_visual_desc=shot_descriptions[parent_shot_idx].visual_desc,
+                                second_shot_visual_desc=shot_descriptions[first_shot_idx].visual_desc,
+                                first_shot_ff_path=parent_shot_ff_path,
+                                progress=_scoped_progress(progress, camera_idx=camera.idx, shot_idx=first_shot_idx, parent_shot_idx=parent_shot_idx, artifact="transition_video"),
+                            )
+                            self._record_latency(self.video_generator, started)
+                            transition_video_output.save(transition_video_path)
+                            print(f"☑️ Generated transition video for shot {first_shot_idx} from shot {parent_shot_idx}, saved to {transition_video_path}.")
+                            _emit_render_progress(progress, "transition_video_done", f"Transition video for shot {first_shot_idx} generated", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx, "path": transition_video_path})
+
+                        print(f"🖼️ Starting new camera image generation for shot {first_shot_idx}...")
+                        _emit_render_progress(progress, "new_camera_image_start", f"Extracting new camera image for shot {first_shot_idx}", {"camera_idx": camera.idx, "shot_idx": first_shot_idx})
+                        new_camera_image = self.camera_image_generator.get_new_camera_image(transition_video_path)
+                        new_camera_image.save(new_camera_image_path)
+                        print(f"☑️ Generated new camera image for shot {first_shot_idx} (not completed), saved to {new_camera_image_path}.")
+                        _emit_render_progress(progress, "new_camera_image_done", f"New camera image for shot {first_shot_idx} extracted", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "path": new_camera_image_path})
 
                 available_image_path_and_text_pairs.append(
                     (
@@ -399,7 +1154,7 @@ class Script2VideoPipeline:
                 ff_selector_output_path = os.path.join(self.working_dir, "shots", f"{first_shot_idx}", "first_frame_selector_output.json")
                 if os.path.exists(ff_selector_output_path):
                     with open(ff_selector_output_path, 'r', encoding='utf-8') as f:
-                        ff_selector_output = json.load(f)
+                        ff_selector_output = self._retarget_selector_output(json.load(f))
                     print(f"🚀 Loaded existing reference image selection and prompt for first_frame of shot {first_shot_idx} from {ff_selector_output_path}.")
                     _emit_render_progress(progress, "frame_prompt_exists", f"First frame prompt for shot {first_shot_idx} already exists", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "frame_type": "first_frame", "path": ff_selector_output_path})
                 else:
@@ -421,15 +1176,20 @@ class Script2VideoPipeline:
                     prefix_prompt += f"Image {i}: {text}\n"
                 prompt = f"{prefix_prompt}\n{prompt}"
                 reference_image_paths = [item[0] for item in reference_image_path_and_text_pairs]
-                ff_image: ImageOutput = await self.image_generator.generate_single_image(
+                started = time.monotonic()
+                ff_image: ImageOutput = await self.frame_image_generator.generate_single_image(
                     prompt=prompt,
                     reference_image_paths=reference_image_paths,
-                    size="1600x900",
+                    size=self.image_size,
                 )
+                self._record_latency(self.frame_image_generator, started)
                 ff_image.save(first_shot_ff_path)
                 self.frame_events[first_shot_idx]["first_frame"].set()
                 print(f"☑️ Generated first_frame for shot {first_shot_idx}, saved to {first_shot_ff_path}.")
-                _emit_render_progress(progress, "frame_done", f"Generated first frame for shot {first_shot_idx}", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "frame_type": "first_frame", "path": first_shot_ff_path})
+                metadata = {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "frame_type": "first_frame", "path": first_shot_ff_path}
+                if isinstance(self.frame_image_generator, CandidateImageGenerator):
+                    metadata["cost_per_accepted_frame"] = self.frame_image_generator.cost_per_accepted_frame
+                _emit_render_progress(progress, "frame_done", f"Generated first frame for shot {first_shot_idx}", metadata)
             else:
                 shutil.copy(new_camera_image_path, first_shot_ff_path)
                 self.frame_events[first_shot_idx]["first_frame"].set()
@@ -438,10 +1198,28 @@ class Script2VideoPipeline:
 
 
         # 2. generate the following frames of the camera
+        def wanted(shot_idx: int, frame_type: str) -> bool:
+            return frames is None or (shot_idx, frame_type) in frames
+
+        first_shot_ff_path_and_text_pair = (first_shot_ff_path, shot_descriptions[first_shot_idx].ff_desc)
+        following_frames = []
+        if shot_descriptions[first_shot_idx].variation_type in ["medium", "large"] and wanted(first_shot_idx, "last_frame"):
+            following_frames.append((first_shot_idx, "last_frame", shot_descriptions[first_shot_idx].lf_desc, [characters[idx] for idx in shot_descriptions[first_shot_idx].lf_vis_char_idxs]))
+        for shot_idx in camera.active_shot_idxs[1:]:
+            if wanted(shot_idx, "first_frame"):
+                following_frames.append((shot_idx, "first_frame", shot_descriptions[shot_idx].ff_desc, [characters[idx] for idx in shot_descriptions[shot_idx].ff_vis_char_idxs]))
+            if shot_descriptions[shot_idx].variation_type in ["medium", "large"] and wanted(shot_idx, "last_frame"):
+                following_frames.append((shot_idx, "last_frame", shot_descriptions[shot_idx].lf_desc, [characters[idx] for idx in shot_descriptions[shot_idx].lf_vis_char_idxs]))
+        await self.prefetch_reference_selections(
+            frames=following_frames,
+            first_shot_ff_path_and_text_pair=first_shot_ff_path_and_text_pair,
+            character_portraits_registry=character_portraits_registry,
+        )
+
         priority_tasks = []
         normal_tasks = []
 
-        if shot_descriptions[first_shot_idx].variation_type in ["medium", "large"]:
+        if shot_descriptions[first_shot_idx].variation_type in ["medium", "large"] and wanted(first_shot_idx, "last_frame"):
             task = self.generate_frame_for_single_shot(
                 shot_idx=first_shot_idx, 
                 frame_type="last_frame", 
@@ -454,22 +1232,23 @@ class Script2VideoPipeline:
             normal_tasks.append(task)
 
         for shot_idx in camera.active_shot_idxs[1:]:
-            first_frame_task = self.generate_frame_for_single_shot(
-                    shot_idx=shot_idx, 
-                    frame_type="first_frame", 
-                    first_shot_ff_path_and_text_pair=(first_shot_ff_path, shot_descriptions[first_shot_idx].ff_desc),
-                    frame_desc=shot_descriptions[shot_idx].ff_desc,
-                    visible_characters=[characters[idx] for idx in shot_descriptions[shot_idx].ff_vis_char_idxs],
-                    character_portraits_registry=character_portraits_registry,
-                    progress=progress,
-                )
-            if shot_idx in priority_shot_idxs:
-                priority_tasks.append(first_frame_task)
-            else:
-                normal_tasks.append(first_frame_task)
+            if wanted(shot_idx, "first_frame"):
+                first_frame_task = self.generate_frame_for_single_shot(
+                        shot_idx=shot_idx, 
+                        frame_type="first_frame", 
+                        first_shot_ff_path_and_text_pair=(first_shot_ff_path, shot_descriptions[first_shot_idx].ff_desc),
+                        frame_desc=shot_descriptions[shot_idx].ff_desc,
+                        visible_characters=[characters[idx] for idx in shot_descriptions[shot_idx].ff_vis_char_idxs],
+                        character_portraits_registry=character_portraits_registry,
+                        progress=progress,
+                    )
+                if shot_idx in priority_shot_idxs:
+                    priority_tasks.append(first_frame_task)
+                else:
+                    normal_tasks.append(first_frame_task)
 
 
-            if shot_descriptions[shot_idx].variation_type in ["medium", "large"]:
+            if shot_descriptions[shot_idx].variation_type in ["medium", "large"] and wanted(shot_idx, "last_frame"):
                 last_frame_task = self.generate_frame_for_single_shot(
                     shot_idx=shot_idx, 
                     frame_type="last_frame", 
@@ -482,18 +1261,68 @@ class Script2VideoPipeline:
                 normal_tasks.append(last_frame_task)
 
 
-        await asyncio.gather(*priority_tasks)
-        await asyncio.gather(*normal_tasks)
+        results = await run_task_group(priority_tasks, keep_going=self.keep_going)
+        results += await run_task_group(normal_tasks, keep_going=self.keep_going)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            # Keeping going: the camera's other frames are done; report the first failure.
+            raise errors[0]
         _emit_render_progress(progress, "camera_frames_done", f"Frames for camera {camera.idx} ready", {"camera_idx": camera.idx, "active_shot_idxs": camera.active_shot_idxs})
 
 
 
+    async def generate_new_camera_image_by_edit(
+        self,
+        camera: Camera,
+        shot_descriptions: List[ShotDescription],
+        parent_shot_ff_path: str,
+        new_camera_image_path: str,
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+    ) -> None:
+        """Re-frame the parent shot's first frame as the new camera with one image edit.
+
+        The edit is saved to new_camera_image_path only if it passes the local
+        consistency check against the parent frame; otherwise nothing is
+        written there and the caller falls back to the transition video.
+        """
+        first_shot_idx = camera.active_shot_idxs[0]
+        parent_shot_idx = camera.parent_shot_idx
+        edited_image_path = os.path.join(self.render_dir, "shots", f"{first_shot_idx}", f"new_camera_{camera.idx}_edit.png")
+        os.makedirs(os.path.dirname(edited_image_path), exist_ok=True)
+
+        if os.path.exists(edited_image_path):
+            print(f"🚀 Loaded existing new camera image edit for shot {first_shot_idx}.")
+        else:
+            print(f"🖼️ Starting new camera image edit for shot {first_shot_idx} from shot {parent_shot_idx}...")
+            _emit_render_progress(progress, "new_camera_edit_start", f"Editing new camera image for shot {first_shot_idx}", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "parent_shot_idx": parent_shot_idx})
+            try:
+                edited_image = await self.camera_image_generator.generate_new_camera_image_by_edit(
+                    first_shot_visual_desc=shot_descriptions[parent_shot_idx].visual_desc,
+                    second_shot_visual_desc=shot_descriptions[first_shot_idx].visual_desc,
+                    first_shot_ff_path=parent_shot_ff_path,
+                )
+                edited_image.save(edited_image_path)
+            except Exception as e:
+                print(f"⚠️ New camera image edit for shot {first_shot_idx} failed ({e}); falling back to a transition video.")
+                _emit_render_progress(progress, "new_camera_edit_failed", f"New camera image edit for shot {first_shot_idx} failed", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "error": str(e)})
+                return
+
+        if not new_camera_image_is_consistent(parent_shot_ff_path, edited_image_path):
+            print(f"⚠️ New camera image edit for shot {first_shot_idx} failed the consistency check; falling back to a transition video.")
+            _emit_render_progress(progress, "new_camera_edit_rejected", f"New camera image edit for shot {first_shot_idx} failed the consistency check", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "path": edited_image_path})
+            return
+
+        shutil.copy(edited_image_path, new_camera_image_path)
+        print(f"☑️ Generated new camera image for shot {first_shot_idx} by image edit, saved to {new_camera_image_path}.")
+        _emit_render_progress(progress, "new_camera_image_done", f"New camera image for shot {first_shot_idx} edited", {"camera_idx": camera.idx, "shot_idx": first_shot_idx, "path": new_camera_image_path, "strategy": "image_edit"})
+
+
     async def generate_video_for_single_shot(
         self,
         shot_description: ShotDescription,
         progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
     ):
-        video_path = os.path.join(self.working_dir, "shots", f"{shot_description.idx}", "video.mp4")
+        video_path = os.path.join(self.render_dir, "shots", f"{shot_description.idx}", "video.mp4")
         if os.path.exists(video_path):
             print(f"🚀 Skipped generating video for shot {shot_description.idx}, already exists.")
             _emit_render_progress(progress, "video_clip_exists", f"Video clip for shot {shot_description.idx} already exists", {"shot_idx": shot_description.idx, "path": video_path})
@@ -504,21 +1333,75 @@ class Script2VideoPipeline:
                 await self.frame_events[shot_description.idx]["last_frame"].wait()
 
             frame_paths = []
-            frame_paths.append(os.path.join(self.working_dir, "shots", f"{shot_description.idx}", "first_frame.png"))
+            frame_paths.append(os.path.join(self.render_dir, "shots", f"{shot_description.idx}", "first_frame.png"))
             if shot_description.variation_type in ["medium", "large"]:
-                frame_paths.append(os.path.join(self.working_dir, "shots", f"{shot_description.idx}", "last_frame.png"))
+                frame_paths.append(os.path.join(self.render_dir, "shots", f"{shot_description.idx}", "last_frame.png"))
 
             print(f"🎬 Starting video generation for shot {shot_description.idx}...")
             _emit_render_progress(progress, "video_clip_start", f"Generating video clip for shot {shot_description.idx}", {"shot_idx": shot_description.idx, "frame_count": len(frame_paths)})
+            started = time.monotonic()
             video_output = await self.video_generator.generate_single_video(
                 prompt=shot_description.motion_desc + "\n" + shot_description.audio_desc,
                 reference_image_paths=frame_paths,
                 progress=_scoped_progress(progress, shot_idx=shot_description.idx, artifact="video_clip"),
             )
+            self._record_latency(self.video_generator, started)
             video_output.save(video_path)
             print(f"☑️ Generated video for shot {shot_description.idx}, saved to {video_path}.")
             _emit_render_progress(progress, "video_clip_done", f"Generated video clip for shot {shot_description.idx}", {"shot_idx": shot_description.idx, "path": video_path})
 
+    async def prefetch_reference_selections(
+        self,
+        frames: List[Tuple[int, str, str, List[CharacterInScene]]],
+        first_shot_ff_path_and_text_pair: Tuple[str, str],
+        character_portraits_registry: Dict[str, Dict[str, Dict[str, str]]],
+    ) -> None:
+        """Select references for a camera's following frames in shared batch calls.
+
+        Frames of one camera draw on nearly the same candidates (the visible
+        characters' portraits and the camera's first frame), so their union is
+        uploaded once per batch of REFERENCE_SELECTION_BATCH_SIZE frames and
+        each result is written to the frame's selector output file, which
+        generate_frame_for_single_shot then loads. Each frame's own candidates
+        are passed along so the selector only lets a frame pick (and its
+        local resolver only judges a frame by) what it can actually see, not
+        the whole pool. Frames that already have
+        a file are skipped; if the pool is too large or a batch fails, those
+        frames keep the per-frame selection path.
+        """
+        pending = []
+        pool: List[Tuple[str, str]] = []
+        for shot_idx, frame_type, frame_desc, visible_characters in frames:
+            frame_image_path = os.path.join(self.render_dir, "shots", f"{shot_idx}", f"{frame_type}.png")
+            selector_output_path = os.path.join(self.working_dir, "shots", f"{shot_idx}", f"{frame_type}_selector_output.json")
+            if os.path.exists(frame_image_path) or os.path.exists(selector_output_path):
+                continue
+            frame_pairs = _frame_candidate_pairs(visible_characters, character_portraits_registry, first_shot_ff_path_and_text_pair)
+            pending.append((selector_output_path, frame_desc, frame_pairs))
+            for pair in frame_pairs:
+                if pair not in pool:
+                    pool.append(pair)
+
+        if len(pending) < 2 or len(pool) > REFERENCE_SELECTION_BATCH_MAX_CANDIDATES:
+            return
+
+        for start in range(0, len(pending), REFERENCE_SELECTION_BATCH_SIZE):
+            batch = pending[start:start + REFERENCE_SELECTION_BATCH_SIZE]
+            try:
+                selector_outputs = await self.reference_image_selector.select_reference_images_and_generate_prompts_batch(
+                    available_image_path_and_text_pairs=pool,
+                    frame_descriptions=[frame_desc for _, frame_desc, _ in batch],
+                    frame_image_path_and_text_pairs=[frame_pairs for _, _, frame_pairs in batch],
+                )
+            except Exception as e:
+                logging.warning(f"Batch reference selection failed ({e}); falling back to per-frame selection.")
+                continue
+            for (selector_output_path, _, _), selector_output in zip(batch, selector_outputs):
+                os.makedirs(os.path.dirname(selector_output_path), exist_ok=True)
+                with open(selector_output_path, 'w', encoding='utf-8') as f:
+                    json.dump(selector_output, f, ensure_ascii=False, indent=4)
+
+
     async def generate_frame_for_single_shot(
         self,
         shot_idx: int,
@@ -529,8 +1412,33 @@ class Script2VideoPipeline:
         character_portraits_registry: Dict[str, Dict[str, Dict[str, str]]],
         progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
     ) -> ImageOutput:
+        try:
+            return await self._generate_frame_for_single_shot(
+                shot_idx=shot_idx,
+                frame_type=frame_type,
+                first_shot_ff_path_and_text_pair=first_shot_ff_path_and_text_pair,
+                frame_desc=frame_desc,
+                visible_characters=visible_characters,
+                character_portraits_registry=character_portraits_registry,
+                progress=progress,
+            )
+        except BaseException as e:
+            # The video clip waiting on this frame fails now rather than when the whole camera is done.
+            fail_events([event for name, event in self.frame_events.get(shot_idx, {}).items() if name == frame_type], e)
+            raise
+
+    async def _generate_frame_for_single_shot(
+        self,
+        shot_idx: int,
+        frame_type: Literal["first_frame", "last_frame"],
+        first_shot_ff_path_and_text_pair: Tuple[str, str],
+        frame_desc: str,
+        visible_characters: List[CharacterInScene],
+        character_portraits_registry: Dict[str, Dict[str, Dict[str, str]]],
+        progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
+    ) -> ImageOutput:
 
-        frame_image_path = os.path.join(self.working_dir, "shots", f"{shot_idx}", f"{frame_type}.png")
+        frame_image_path = os.path.join(self.render_dir, "shots", f"{shot_idx}", f"{frame_type}.png")
 
         if os.path.exists(frame_image_path):
             print(f"🚀 Skipped generating {frame_type} for shot {shot_idx}, already exists.")
@@ -539,19 +1447,12 @@ class Script2VideoPipeline:
         else:
             print(f"🖼️ Starting {frame_type} generation for shot {shot_idx}...")
             _emit_render_progress(progress, "frame_start", f"Generating {frame_type} for shot {shot_idx}", {"shot_idx": shot_idx, "frame_type": frame_type})
-            available_image_path_and_text_pairs = []
-            for visible_character in visible_characters:
-                identifier_in_scene = visible_character.identifier_in_scene
-                registry_item = character_portraits_registry[identifier_in_scene]
-                for view, item in registry_item.items():
-                    available_image_path_and_text_pairs.append((item["path"], item["description"]))
-
-            available_image_path_and_text_pairs.append(first_shot_ff_path_and_text_pair)
+            available_image_path_and_text_pairs = _frame_candidate_pairs(visible_characters, character_portraits_registry, first_shot_ff_path_and_text_pair)
 
             selector_output_path = os.path.join(self.working_dir, "shots", f"{shot_idx}", f"{frame_type}_selector_output.json")
             if os.path.exists(selector_output_path):
                 with open(selector_output_path, 'r', encoding='utf-8') as f:
-                    selector_output = json.load(f)
+                    selector_output = self._retarget_selector_output(json.load(f))
                 print(f"🚀 Loaded existing reference image selection and prompt for {frame_type} frame of shot {shot_idx} from {selector_output_path}.")
                 _emit_render_progress(progress, "frame_prompt_exists", f"Prompt for {frame_type} of shot {shot_idx} already exists", {"shot_idx": shot_idx, "frame_type": frame_type, "path": selector_output_path})
             else:
@@ -573,14 +1474,19 @@ class Script2VideoPipeline:
             prompt = f"{prefix_prompt}\n{prompt}"
             reference_image_paths = [item[0] for item in reference_image_path_and_text_pairs]
 
-            frame_image: ImageOutput = await self.image_generator.generate_single_image(
+            started = time.monotonic()
+            frame_image: ImageOutput = await self.frame_image_generator.generate_single_image(
                 prompt=prompt,
                 reference_image_paths=reference_image_paths,
-                size="1600x900",
+                size=self.image_size,
             )
+            self._record_latency(self.frame_image_generator, started)
             frame_image.save(frame_image_path)
             print(f"☑️ Generated {frame_type} frame for shot {shot_idx}, saved to {frame_image_path}.")
-            _emit_render_progress(progress, "frame_done", f"Generated {frame_type} for shot {shot_idx}", {"shot_idx": shot_idx, "frame_type": frame_type, "path": frame_image_path})
+            metadata = {"shot_idx": shot_idx, "frame_type": frame_type, "path": frame_image_path}
+            if isinstance(self.frame_image_generator, CandidateImageGenerator):
+                metadata["cost_per_accepted_frame"] = self.frame_image_generator.cost_per_accepted_frame
+            _emit_render_progress(progress, "frame_done", f"Generated {frame_type} for shot {shot_idx}", metadata)
 
 
         self.frame_events[shot_idx][frame_type].set()
@@ -645,7 +1551,7 @@ class Script2VideoPipeline:
         style: str,
         progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
     ):
-        character_portraits_registry_path = os.path.join(self.working_dir, "character_portraits_registry.json")
+        character_portraits_registry_path = os.path.join(self.render_dir, "character_portraits_registry.json")
         if character_portraits_registry is None:
             if os.path.exists(character_portraits_registry_path):
                 with open(character_portraits_registry_path, 'r', encoding='utf-8') as f:
@@ -679,10 +1585,13 @@ class Script2VideoPipeline:
         style: str,
         progress: Callable[[str, str, Dict[str, Any] | None], None] | None = None,
     ):
-        character_dir = os.path.join(self.working_dir, "character_portraits", f"{character.idx}_{character.identifier_in_scene}")
+        character_dir = os.path.join(self.render_dir, "character_portraits", f"{character.idx}_{character.identifier_in_scene}")
         os.makedirs(character_dir, exist_ok=True)
         _emit_render_progress(progress, "character_portrait_start", f"Generating portraits for {character.identifier_in_scene}", {"character_idx": character.idx, "identifier": character.identifier_in_scene})
 
+        if self.portrait_mode == "turnaround" and await self.character_portraits_generator.fill_missing_views_from_turnaround(character, style, character_dir):
+            _emit_render_progress(progress, "character_portrait_turnaround_done", f"Split turnaround sheet for {character.identifier_in_scene}", {"character_idx": character.idx, "identifier": character.identifier_in_scene, "path": os.path.join(character_dir, "turnaround.png")})
+
         front_portrait_path = os.path.join(character_dir, "front.png")
         if os.path.exists(front_portrait_path):
             pass
@@ -750,12 +1659,21 @@ class Script2VideoPipeline:
             _pipeline_print(quiet, f"🚀 Loaded {len(storyboard)} shot brief descriptions from existing file.")
         else:
             _pipeline_print(quiet, f"🔍 Designing storyboard...")
-            storyboard = await self.storyboard_artist.design_storyboard(
-                script=script,
-                characters=characters,
-                user_requirement=user_requirement,
-                retry_timeout=150,
-            )
+            script_chunks = split_script_into_beats(script, STORYBOARD_CHUNK_MAX_CHARS)
+            if len(script_chunks) > 1:
+                storyboard = await self.design_storyboard_in_chunks(
+                    script_chunks=script_chunks,
+                    characters=characters,
+                    user_requirement=user_requirement,
+                    quiet=quiet,
+                )
+            else:
+                storyboard = await self.stream_storyboard_with_early_decomposition(
+                    script=script,
+                    characters=characters,
+                    user_requirement=user_requirement,
+                    quiet=quiet,
+                )
             storyboard = _normalize_model_list(storyboard, ShotBriefDescription, "storyboard")
             with open(storyboard_path, 'w', encoding='utf-8') as f:
                 json.dump([shot.model_dump() for shot in storyboard], f, ensure_ascii=False, indent=4)
@@ -768,33 +1686,290 @@ class Script2VideoPipeline:
 
 
 
+    async def stream_storyboard_with_early_decomposition(
+        self,
+        script: str,
+        characters: List[CharacterInScene],
+        user_requirement: str,
+        quiet: bool = False,
+    ) -> List[ShotBriefDescription]:
+        """Design the storyboard in one streamed call, decomposing shots as they arrive.
+
+        Shots come off the storyboard artist's queue while the rest of the
+        storyboard is still generating. They are gathered into batches of the
+        adaptive decomposition batch size (the last one flushed when the
+        stream ends) and each batch is decomposed in one call into
+        shots/{idx}/shot_description.json under the decomposition concurrency
+        cap. decompose_visual_descriptions later loads those files like any
+        resumed run. A streamed shot that does not match the final storyboard
+        (e.g. from an attempt that was retried) has its file removed so the
+        decomposition stage redoes it.
+        """
+        shot_queue: asyncio.Queue = asyncio.Queue()
+        streamed: Dict[int, ShotBriefDescription] = {}
+        decompose_tasks: List[asyncio.Task] = []
+        unbatched: List[ShotBriefDescription] = []
+        sem = asyncio.Semaphore(self.decompose_max_concurrency)
+
+        async def decompose_early(batch: List[ShotBriefDescription]):
+            async with sem:
+                try:
+                    await self._decompose_batch(batch, characters, quiet=quiet)
+                except Exception as e:
+                    # Not fatal: the decomposition stage retries any shot left without a file.
+                    logging.warning(f"Early decomposition of shots {[shot.idx for shot in batch]} failed ({e}); deferring to the decomposition stage.")
+
+        def flush():
+            if unbatched:
+                decompose_tasks.append(asyncio.create_task(decompose_early(list(unbatched))))
+                unbatched.clear()
+
+        async def consume_shots():
+            while True:
+                shot_brief_description = await shot_queue.get()
+                if shot_brief_description is None:
+                    flush()
+                    return
+                if shot_brief_description.idx in streamed:
+                    continue
+                streamed[shot_brief_description.idx] = shot_brief_description
+                unbatched.append(shot_brief_description)
+                if len(unbatched) >= self.adaptive_decompose_batch_size.value:
+                    flush()
+
+        consumer = asyncio.create_task(consume_shots())
+        try:
+            storyboard = await self.storyboard_artist.stream_storyboard(
+                script=script,
+                characters=characters,
+                shot_queue=shot_queue,
+                user_requirement=user_requirement,
+                retry_timeout=150,
+            )
+        except BaseException:
+            consumer.cancel()
+            for task in decompose_tasks:
+                task.cancel()
+            await asyncio.gather(consumer, *decompose_tasks, return_exceptions=True)
+            raise
+        await shot_queue.put(None)
+        await consumer
+        await asyncio.gather(*decompose_tasks)
+
+        final_by_idx = {shot.idx: shot for shot in _normalize_model_list(storyboard, ShotBriefDescription, "storyboard")}
+        for idx, streamed_shot in streamed.items():
+            final_shot = final_by_idx.get(idx)
+            if final_shot != streamed_shot:
+                shot_description_path = self._shot_description_path(idx)
+                if os.path.exists(shot_description_path):
+                    os.remove(shot_description_path)
+        _pipeline_print(quiet, f"☑️ Streamed storyboard with {len(storyboard)} shots; {len(streamed)} decomposed while streaming.")
+        return storyboard
+
+
+    async def design_storyboard_in_chunks(
+        self,
+        script_chunks: List[str],
+        characters: List[CharacterInScene],
+        user_requirement: str,
+        quiet: bool = False,
+    ) -> List[ShotBriefDescription]:
+        """Design a long scene's storyboard one beat-aligned chunk at a time.
+
+        Chunks are designed concurrently and each is saved to
+        storyboard_chunks/chunk_{i}.json, so a timeout only repeats its own
+        chunk. As preceding context, a chunk gets the last shot of the previous
+        chunk when that chunk is already on disk, and the end of the previous
+        chunk's script otherwise. The chunks are then stitched with sequential
+        shot indices. Every chunk numbers its cameras from 0 and each of them
+        becomes a new camera, except CONTINUED_CAMERA_IDX, which a chunk gives
+        a shot that carries on the camera the previous part ended with.
+        """
+        chunks_dir = os.path.join(self.working_dir, "storyboard_chunks")
+        os.makedirs(chunks_dir, exist_ok=True)
+
+        chunk_storyboards: List[Optional[List[ShotBriefDescription]]] = []
+        for chunk_idx in range(len(script_chunks)):
+            chunk_path = os.path.join(chunks_dir, f"chunk_{chunk_idx}.json")
+            if os.path.exists(chunk_path):
+                with open(chunk_path, 'r', encoding='utf-8') as f:
+                    chunk_storyboards.append([ShotBriefDescription.model_validate(shot) for shot in json.load(f)])
+            else:
+                chunk_storyboards.append(None)
+
+        def preceding_context(chunk_idx: int) -> Optional[str]:
+            if chunk_idx == 0:
+                return None
+            previous = chunk_storyboards[chunk_idx - 1]
+            if previous:
+                return f"Last shot designed for the previous part: {previous[-1].visual_desc}"
+            return f"End of the previous part of the script: {script_chunks[chunk_idx - 1][-STORYBOARD_CONTEXT_CHARS:]}"
+
+        async def design_chunk(sem, chunk_idx: int):
+            async with sem:
+                shots = await self.storyboard_artist.design_storyboard_chunk(
+                    script_chunk=script_chunks[chunk_idx],
+                    characters=characters,
+                    user_requirement=user_requirement,
+                    preceding_context=preceding_context(chunk_idx),
+                    retry_timeout=150,
+                )
+            shots = _normalize_model_list(shots, ShotBriefDescription, "storyboard_chunk")
+            with open(os.path.join(chunks_dir, f"chunk_{chunk_idx}.json"), 'w', encoding='utf-8') as f:
+                json.dump([shot.model_dump() for shot in shots], f, ensure_ascii=False, indent=4)
+            _pipeline_print(quiet, f"☑️ Designed storyboard chunk {chunk_idx + 1}/{len(script_chunks)} with {len(shots)} shots.")
+            return chunk_idx, shots
+
+        missing = [chunk_idx for chunk_idx, shots in enumerate(chunk_storyboards) if shots is None]
+        if missing:
+            sem = asyncio.Semaphore(STORYBOARD_CHUNK_MAX_CONCURRENCY)
+            for chunk_idx, shots in await asyncio.gather(*[design_chunk(sem, chunk_idx) for chunk_idx in missing]):
+                chunk_storyboards[chunk_idx] = shots
+
+        storyboard: List[ShotBriefDescription] = []
+        next_cam_idx = 0
+        for chunk_idx, shots in enumerate(chunk_storyboards):
+            # Only an explicit claim joins the previous part's last camera; every
+            # other index is new, whatever number the chunk happened to use.
+            cam_mapping: Dict[int, int] = {}
+            if storyboard and chunk_idx > 0:
+                cam_mapping[CONTINUED_CAMERA_IDX] = storyboard[-1].cam_idx
+            for shot in shots or []:
+                if shot.cam_idx not in cam_mapping:
+                    cam_mapping[shot.cam_idx] = next_cam_idx
+                    next_cam_idx += 1
+                storyboard.append(shot.model_copy(update={
+                    "idx": len(storyboard),
+                    "cam_idx": cam_mapping[shot.cam_idx],
+                    "is_last": False,
+                }))
+        if storyboard:
+            storyboard[-1] = storyboard[-1].model_copy(update={"is_last": True})
+        return storyboard
+
+
     async def decompose_visual_descriptions(
         self,
         shot_brief_descriptions: List[ShotBriefDescription],
         characters: List[CharacterInScene],
         quiet: bool = False,
     ):
-        tasks = [
-            self.decompose_visual_description_for_single_shot_brief_description(shot_brief_description, characters, quiet=quiet)
-            for shot_brief_description in shot_brief_descriptions
-        ]
+        """Decompose shot visual descriptions in bounded, batched structured calls.
 
-        shot_descriptions = await asyncio.gather(*tasks)
+        Shots already on disk are loaded as before. The rest are pulled by at
+        most `decompose_max_concurrency` workers, each sending one batch call
+        whose size follows provider latency, and every shot is persisted as
+        soon as its batch returns. A batch that still fails after its retries
+        falls back to per-shot calls for just those shots.
+        """
+        shot_descriptions: Dict[int, ShotDescription] = {}
+        pending: List[ShotBriefDescription] = []
+        for shot_brief_description in shot_brief_descriptions:
+            shot_description = self._load_shot_description(shot_brief_description.idx)
+            if shot_description is not None:
+                _pipeline_print(quiet, f"🚀 Loaded shot {shot_brief_description.idx} description from existing file.")
+                shot_descriptions[shot_brief_description.idx] = self._register_shot_description(shot_description)
+            else:
+                pending.append(shot_brief_description)
+
+        async def worker():
+            while pending:
+                batch = pending[:self.adaptive_decompose_batch_size.value]
+                del pending[:len(batch)]
+                for shot_description in await self._decompose_batch(batch, characters, quiet=quiet):
+                    shot_descriptions[shot_description.idx] = shot_description
+
+        if pending:
+            await asyncio.gather(*[worker() for _ in range(min(self.decompose_max_concurrency, len(pending)))])
+
+        return [shot_descriptions[shot_brief_description.idx] for shot_brief_description in shot_brief_descriptions]
+
+
+    async def _decompose_batch(
+        self,
+        batch: List[ShotBriefDescription],
+        characters: List[CharacterInScene],
+        quiet: bool = False,
+    ) -> List[ShotDescription]:
+        """Decompose shots in one call (per-shot calls if it fails), persisting and registering each."""
+        batch_size = self.adaptive_decompose_batch_size
+        started = time.monotonic()
+        try:
+            if len(batch) == 1:
+                decomposed = [await self.storyboard_artist.decompose_visual_description(
+                    shot_brief_desc=batch[0],
+                    characters=characters,
+                    retry_timeout=120,
+                )]
+            else:
+                decomposed = await self.storyboard_artist.decompose_visual_descriptions_batch(
+                    shot_brief_descs=batch,
+                    characters=characters,
+                )
+        except Exception as e:
+            if len(batch) == 1:
+                raise
+            logging.warning(f"Batch decomposition of shots {[shot.idx for shot in batch]} failed ({e}); falling back to per-shot calls.")
+            batch_size.shrink()
+            return [
+                await self.decompose_visual_description_for_single_shot_brief_description(shot_brief_description, characters, quiet=quiet)
+                for shot_brief_description in batch
+            ]
+        batch_size.record(len(batch), time.monotonic() - started)
+        shot_descriptions = []
+        for shot_description in _normalize_model_list(decomposed, ShotDescription, "shot_descriptions"):
+            self._save_shot_description(shot_description)
+            _pipeline_print(quiet, f"✅ Decomposed visual description for shot {shot_description.idx}.")
+            shot_descriptions.append(self._register_shot_description(shot_description))
         return shot_descriptions
 
 
+    def _shot_description_path(self, shot_idx: int) -> str:
+        return os.path.join(self.working_dir, "shots", f"{shot_idx}", "shot_description.json")
+
+
+    def _load_shot_description(self, shot_idx: int) -> Optional[ShotDescription]:
+        shot_description_path = self._shot_description_path(shot_idx)
+        if not os.path.exists(shot_description_path):
+            return None
+        with open(shot_description_path, 'r', encoding='utf-8') as f:
+            return ShotDescription.model_validate(json.load(f))
+
+
+    def _save_shot_description(self, shot_description: ShotDescription) -> str:
+        shot_description_path = self._shot_description_path(shot_description.idx)
+        os.makedirs(os.path.dirname(shot_description_path), exist_ok=True)
+        with open(shot_description_path, 'w', encoding='utf-8') as f:
+            json.dump(shot_description.model_dump(), f, ensure_ascii=False, indent=4)
+        return shot_description_path
+
+
+    def _register_shot_description(self, shot_description: ShotDescription) -> ShotDescription:
+        if shot_description.idx not in self.shot_desc_events:
+            self.shot_desc_events[shot_description.idx] = asyncio.Event()
+        self.shot_desc_events[shot_description.idx].set()
+
+        if shot_description.variation_type in ["medium", "large"]:
+            self.frame_events[shot_description.idx] = {
+                "first_frame": DependencyEvent(f"first_frame of shot {shot_description.idx}"),
+                "last_frame": DependencyEvent(f"last_frame of shot {shot_description.idx}"),
+            }
+        else:
+            self.frame_events[shot_description.idx] = {
+                "first_frame": DependencyEvent(f"first_frame of shot {shot_description.idx}"),
+            }
+
+        return shot_description
+
+
     async def decompose_visual_description_for_single_shot_brief_description(
         self,
         shot_brief_description: ShotBriefDescription,
         characters: List[CharacterInScene],
         quiet: bool = False,
     ):
-        shot_description_path = os.path.join(self.working_dir, "shots", f"{shot_brief_description.idx}", "shot_description.json")
-        os.makedirs(os.path.dirname(shot_description_path), exist_ok=True)
-
-        if os.path.exists(shot_description_path):
-            with open(shot_description_path, 'r', encoding='utf-8') as f:
-                shot_description = ShotDescription.model_validate(json.load(f))
+        shot_description = self._load_shot_description(shot_brief_description.idx)
+        if shot_description is not None:
             _pipeline_print(quiet, f"🚀 Loaded shot {shot_brief_description.idx} description from existing file.")
         else:
             shot_description = await self.storyboard_artist.decompose_visual_description(
@@ -803,20 +1978,7 @@ class Script2VideoPipeline:
                 retry_timeout=120,
             )
             shot_description = _normalize_model_list([shot_description], ShotDescription, "shot_description")[0]
-            with open(shot_description_path, 'w', encoding='utf-8') as f:
-                json.dump(shot_description.model_dump(), f, ensure_ascii=False, indent=4)
+            shot_description_path = self._save_shot_description(shot_description)
             _pipeline_print(quiet, f"✅ Decomposed visual description for shot {shot_brief_description.idx} and saved to {shot_description_path}.")
 
-        self.shot_desc_events[shot_brief_description.idx].set()
-
-        if shot_description.variation_type in ["medium", "large"]:
-            self.frame_events[shot_brief_description.idx] = {
-                "first_frame": asyncio.Event(),
-                "last_frame": asyncio.Event(),
-            }
-        else:
-            self.frame_events[shot_brief_description.idx] = {
-                "first_frame": asyncio.Event(),
-            }
-
-        return shot_description
+        return self._register_shot_description(shot_description)
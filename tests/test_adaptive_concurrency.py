@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from utils.adaptive_concurrency import AdaptiveConcurrency
+from utils.rate_limiter import RateLimiter
+
+
+class AdaptiveConcurrencyTests(unittest.IsolatedAsyncioTestCase):
+    async def test_healthy_saturated_requests_raise_the_limit(self):
+        limiter = AdaptiveConcurrency(initial=2, max_limit=4)
+        for _ in range(4):
+            starts = [await limiter.acquire() for _ in range(limiter.limit)]
+            for started in starts:
+                limiter.release(started)
+
+        self.assertEqual(limiter.limit, 4)
+
+    async def test_overload_cuts_the_limit_once_per_cohort(self):
+        limiter = AdaptiveConcurrency(initial=8)
+        starts = [await limiter.acquire() for _ in range(8)]
+        for started in starts:
+            limiter.release(started, "overload")
+
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.decreases, 1)
+
+        limiter.release(await limiter.acquire(), "overload")
+        self.assertEqual(limiter.limit, 2)
+
+    async def test_latency_spike_counts_as_overload(self):
+        limiter = AdaptiveConcurrency(initial=4)
+        for _ in range(5):
+            limiter.release(await limiter.acquire())
+        self.assertEqual(limiter.limit, 4)
+
+        limiter.release(await limiter.acquire() - 10.0)
+
+        self.assertEqual(limiter.limit, 2)
+
+    async def test_waiters_beyond_the_limit_queue(self):
+        limiter = AdaptiveConcurrency(initial=1)
+        started = await limiter.acquire()
+        blocked = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        self.assertFalse(blocked.done())
+        self.assertEqual(limiter.snapshot()["queued"], 1)
+
+        limiter.release(started, "error")
+
+        await asyncio.wait_for(blocked, timeout=1)
+        self.assertEqual(limiter.in_flight, 1)
+
+    async def test_slot_reports_429s_and_timeouts_to_the_limit(self):
+        rate_limiter = RateLimiter(adaptive_concurrency=AdaptiveConcurrency(initial=8))
+        async with rate_limiter.slot():
+            rate_limiter.report_rate_limited(retry_after=0)
+        self.assertEqual(rate_limiter.concurrency_limit, 4)
+        self.assertEqual(rate_limiter.wait_stats()["concurrency_limit"], 4)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            async with rate_limiter.slot():
+                raise asyncio.TimeoutError()
+        self.assertEqual(rate_limiter.concurrency_limit, 2)
+
+        with self.assertRaises(RuntimeError):
+            async with rate_limiter.slot():
+                raise RuntimeError("HTTP 429: Too Many Requests")
+        self.assertEqual(rate_limiter.concurrency_limit, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
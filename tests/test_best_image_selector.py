@@ -0,0 +1,96 @@
+import base64
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from agents.best_image_selector import BestImageResponse, BestImageSelector, MODEL_IMAGE_MAX_DIMENSION
+
+
+class FakeChain:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages[-1].content)
+        return BestImageResponse(best_image_index=1, reason="closest to the references")
+
+
+class FakeChatModel:
+    def __init__(self):
+        self.calls = []
+
+    def __or__(self, parser):
+        return FakeChain(self.calls)
+
+
+def _selector():
+    selector = BestImageSelector.__new__(BestImageSelector)
+    selector.chat_model = FakeChatModel()
+    return selector
+
+
+def _save(image, path):
+    image.save(path)
+    return str(path)
+
+
+def _textured(size, seed):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(40, 215, size=(size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+class BestImageSelectorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_sole_candidate_passing_the_quality_gate_skips_the_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sharp = _save(_textured((320, 180), 0), Path(tmp) / "sharp.png")
+            washed_out = _save(
+                _textured((320, 180), 0).filter(ImageFilter.GaussianBlur(8)).point(lambda value: min(255, value + 150)),
+                Path(tmp) / "washed_out.png",
+            )
+            selector = _selector()
+
+            best = await selector([], "a busy street", [washed_out, sharp])
+
+            self.assertEqual(best, sharp)
+            self.assertEqual(selector.chat_model.calls, [])
+
+    async def test_a_sharper_noisy_candidate_does_not_overrule_the_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            clean = _save(_textured((320, 180), 5).filter(ImageFilter.GaussianBlur(2)), Path(tmp) / "clean.png")
+            noisy = _save(_textured((320, 180), 6), Path(tmp) / "noisy.png")
+            selector = _selector()
+
+            best = await selector([], "a busy street", [noisy, clean])
+
+            self.assertEqual(len(selector.chat_model.calls), 1)
+            self.assertEqual(best, clean)
+
+    async def test_wrong_aspect_ratio_is_dropped_and_survivors_are_downscaled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = _save(_textured((1600, 900), 1), Path(tmp) / "first.png")
+            second = _save(_textured((1600, 900), 2), Path(tmp) / "second.png")
+            third = _save(_textured((1600, 900), 3), Path(tmp) / "third.png")
+            portrait = _save(_textured((900, 1600), 4), Path(tmp) / "portrait.png")
+            selector = _selector()
+
+            best = await selector([], "a busy street", [first, portrait, second, third])
+
+            self.assertEqual(len(selector.chat_model.calls), 1)
+            content = selector.chat_model.calls[0]
+            labels = [item["text"] for item in content if item["type"] == "text" and item["text"].startswith("Candidate")]
+            self.assertEqual(len(labels), 3)
+            self.assertIn(best, [first, second, third])
+            for item in content:
+                if item["type"] == "image_url":
+                    data = base64.b64decode(item["image_url"]["url"].split(",", 1)[1])
+                    with Image.open(BytesIO(data)) as image:
+                        self.assertLessEqual(max(image.size), MODEL_IMAGE_MAX_DIMENSION)
+
+
+if __name__ == "__main__":
+    unittest.main()
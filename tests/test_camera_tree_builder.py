@@ -0,0 +1,86 @@
+import re
+import unittest
+
+from agents.camera_image_generator import (
+    CameraImageGenerator,
+    CameraParentItem,
+    CameraTreeResponse,
+    cluster_cameras,
+)
+from interfaces import Camera, ShotBriefDescription
+
+
+class FakeTreeChain:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def ainvoke(self, messages):
+        camera_seq = messages[-1].content
+        cam_idxs = [int(idx) for idx in re.findall(r"<CAMERA_(\d+)>", camera_seq)]
+        first_shot = int(re.search(r"Shot (\d+):", camera_seq).group(1))
+        self.calls.append(cam_idxs)
+        items = [None] + [
+            CameraParentItem(parent_cam_idx=cam_idxs[0], parent_shot_idx=first_shot, reason="wider")
+            for _ in cam_idxs[1:]
+        ]
+        return CameraTreeResponse(camera_parent_items=items)
+
+
+class FakeTreeChatModel:
+    def __init__(self):
+        self.calls = []
+
+    def __or__(self, parser):
+        return FakeTreeChain(self.calls)
+
+
+def _scene(camera_count):
+    shots = []
+    cameras = []
+    for cam_idx in range(camera_count):
+        # Pairs of cameras cut back and forth: (0, 1), (2, 3), ...
+        base = (cam_idx // 2) * 4
+        shot_idxs = [base + cam_idx % 2, base + 2 + cam_idx % 2]
+        cameras.append(Camera(idx=cam_idx, active_shot_idxs=shot_idxs))
+        for shot_idx in shot_idxs:
+            shots.append(ShotBriefDescription(idx=shot_idx, is_last=False, cam_idx=cam_idx, visual_desc=f"room {cam_idx // 2} view {cam_idx}", audio_desc="none"))
+    return cameras, sorted(shots, key=lambda shot: shot.idx)
+
+
+class CameraTreeBuilderTests(unittest.IsolatedAsyncioTestCase):
+    def test_cluster_cameras_groups_intercut_cameras(self):
+        cameras, shots = _scene(6)
+        clusters = cluster_cameras(cameras, shots, max_cluster_size=2)
+        self.assertEqual([[cam.idx for cam in cluster] for cluster in clusters], [[0, 1], [2, 3], [4, 5]])
+
+    async def test_hierarchical_tree_links_cluster_roots(self):
+        chat_model = FakeTreeChatModel()
+        generator = CameraImageGenerator(chat_model=chat_model, image_generator=None, video_generator=None)
+        cameras, shots = _scene(14)
+
+        tree = await generator.construct_camera_tree(cameras, shots)
+
+        self.assertTrue(all(len(call) <= 8 for call in chat_model.calls))
+        self.assertGreater(len(chat_model.calls), 1)
+        roots = [cam.idx for cam in tree if cam.parent_cam_idx is None]
+        self.assertEqual(roots, [0])
+        by_idx = {cam.idx: cam for cam in tree}
+        for cam in tree:
+            seen = set()
+            current = cam
+            while current.parent_cam_idx is not None:
+                self.assertNotIn(current.idx, seen)
+                seen.add(current.idx)
+                current = by_idx[current.parent_cam_idx]
+            self.assertEqual(current.idx, 0)
+
+    async def test_small_scenes_keep_single_call(self):
+        chat_model = FakeTreeChatModel()
+        generator = CameraImageGenerator(chat_model=chat_model, image_generator=None, video_generator=None)
+        cameras, shots = _scene(4)
+        await generator.construct_camera_tree(cameras, shots)
+        self.assertEqual(chat_model.calls, [[0, 1, 2, 3]])
+
+
+if __name__ == "__main__":
+    unittest.main()
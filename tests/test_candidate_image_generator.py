@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+from interfaces.image_output import ImageOutput
+from tools.candidate_image_generator import CandidateImageGenerator
+
+
+def _sharp(size=(320, 180), seed=0):
+    rng = np.random.default_rng(seed)
+    return ImageOutput(fmt="pil", ext="png", data=Image.fromarray(rng.integers(40, 215, size=(size[1], size[0], 3), dtype=np.uint8)))
+
+
+def _flat(size=(320, 180)):
+    return ImageOutput(fmt="pil", ext="png", data=Image.new("RGB", size, (128, 128, 128)))
+
+
+class ScriptedImageGenerator:
+    """Returns scripted (delay, image) results in call order and records cancellations."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_single_image(self, prompt, reference_image_paths, **kwargs):
+        delay, image = self.script[self.calls]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return image
+
+
+class CandidateImageGeneratorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_first_passing_candidate_wins_and_the_rest_are_cancelled(self):
+        good = _sharp()
+        inner = ScriptedImageGenerator([(0.01, _flat()), (0.02, good), (5.0, _sharp(seed=1))])
+        generator = CandidateImageGenerator(inner, candidates=3, cost_per_request=0.04)
+
+        image = await generator.generate_single_image(prompt="p", reference_image_paths=[], size="320x180")
+
+        self.assertIs(image, good)
+        self.assertEqual(inner.cancelled, 1)
+        self.assertEqual(generator.cancelled, 1)
+        self.assertAlmostEqual(generator.cost_per_accepted_frame, 0.12)
+
+    async def test_best_scoring_candidate_is_returned_when_none_passes(self):
+        landscape = _flat(size=(320, 180))
+        inner = ScriptedImageGenerator([(0.0, _flat(size=(180, 320))), (0.01, landscape)])
+        generator = CandidateImageGenerator(inner, candidates=2)
+
+        image = await generator.generate_single_image(prompt="p", reference_image_paths=[], size="1600x900")
+
+        # Both are too flat to pass; only the landscape one matches the requested ratio.
+        self.assertIs(image, landscape)
+        self.assertEqual(inner.cancelled, 0)
+
+    async def test_uses_multi_image_requests_when_offered(self):
+        good = _sharp()
+
+        class MultiImageGenerator:
+            requested = []
+
+            async def generate_multiple_images(self, prompt, reference_image_paths, n, **kwargs):
+                self.requested.append(n)
+                return [_flat(), good]
+
+        inner = MultiImageGenerator()
+        generator = CandidateImageGenerator(inner, candidates=2)
+
+        image = await generator.generate_single_image(prompt="p", reference_image_paths=[])
+
+        self.assertIs(image, good)
+        self.assertEqual(inner.requested, [2])
+        self.assertEqual(generator.cost_per_accepted_frame, 2.0)
+
+    async def test_url_candidates_are_downloaded_and_gated(self):
+        downloads = {"https://img/flat.png": _flat().data, "https://img/sharp.png": _sharp().data}
+        inner = ScriptedImageGenerator([
+            (0.0, ImageOutput(fmt="url", ext="png", data="https://img/flat.png")),
+            (0.01, ImageOutput(fmt="url", ext="png", data="https://img/sharp.png")),
+        ])
+        generator = CandidateImageGenerator(inner, candidates=2)
+
+        with patch("tools.candidate_image_generator.fetch_image", side_effect=downloads.__getitem__):
+            image = await generator.generate_single_image(prompt="p", reference_image_paths=[], size="320x180")
+
+        # The first URL back is too flat; the sharp one wins, already downloaded.
+        self.assertEqual(image.fmt, "pil")
+        self.assertIs(image.data, downloads["https://img/sharp.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image, ImageDraw
+
+from agents.character_portraits_generator import CharacterPortraitsGenerator, split_turnaround_sheet
+from interfaces import CharacterInScene, ImageOutput
+from pipelines.idea2video_pipeline import Idea2VideoPipeline
+
+
+def _sheet(figures):
+    sheet = Image.new("RGB", (2100, 900), (255, 255, 255))
+    draw = ImageDraw.Draw(sheet)
+    for left, right, color in figures:
+        draw.rectangle((left, 150, right, 800), fill=color)
+    return sheet
+
+
+def _character():
+    return CharacterInScene(idx=0, identifier_in_scene="Alice", is_visible=True, static_features="tall", dynamic_features="red coat")
+
+
+class SheetImageGenerator:
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.calls = []
+
+    async def generate_single_image(self, prompt, reference_image_paths=None, **kwargs):
+        self.calls.append(prompt)
+        if self.sheet is None:
+            return ImageOutput(fmt="pil", ext="png", data=Image.new("RGB", (1600, 900), (10, 10, 10)))
+        return ImageOutput(fmt="pil", ext="png", data=self.sheet)
+
+
+class TurnaroundSheetTests(unittest.TestCase):
+    def test_cuts_through_the_widest_gaps_between_figures(self):
+        # The side view has a narrow gap (between its legs) that must not become a cut.
+        sheet = _sheet([(200, 500, (200, 0, 0)), (900, 1050, (0, 200, 0)), (1060, 1200, (0, 200, 0)), (1600, 1900, (0, 0, 200))])
+
+        views = split_turnaround_sheet(sheet)
+
+        self.assertEqual(list(views), ["front", "side", "back"])
+        self.assertEqual(views["front"].getpixel((views["front"].width // 2, views["front"].height // 2)), (200, 0, 0))
+        self.assertEqual(views["side"].getpixel((views["side"].width // 2 - 100, views["side"].height // 2)), (0, 200, 0))
+        self.assertEqual(views["back"].getpixel((views["back"].width // 2, views["back"].height // 2)), (0, 0, 200))
+        for view in views.values():
+            self.assertGreater(view.width, view.height)
+
+    def test_missing_view_raises(self):
+        with self.assertRaises(ValueError):
+            split_turnaround_sheet(_sheet([(200, 500, (200, 0, 0))]))
+
+
+class TurnaroundPortraitPipelineTests(unittest.IsolatedAsyncioTestCase):
+    async def test_one_call_produces_all_three_portraits(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = SheetImageGenerator(_sheet([(200, 500, (200, 0, 0)), (900, 1200, (0, 200, 0)), (1600, 1900, (0, 0, 200))]))
+            pipeline = Idea2VideoPipeline(chat_model=object(), image_generator=generator, video_generator=object(), working_dir=tmp, portrait_mode="turnaround")
+
+            registry = await pipeline.generate_portraits_for_single_character(_character(), style="anime")
+
+            self.assertEqual(len(generator.calls), 1)
+            for view in ("front", "side", "back"):
+                self.assertTrue(os.path.exists(registry["Alice"][view]["path"]))
+
+    async def test_unsplittable_sheet_falls_back_to_per_view_calls(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = SheetImageGenerator(None)
+            pipeline = Idea2VideoPipeline(chat_model=object(), image_generator=generator, video_generator=object(), working_dir=tmp, portrait_mode="turnaround")
+            pipeline.character_portraits_generator = CharacterPortraitsGenerator(generator)
+
+            await pipeline.generate_portraits_for_single_character(_character(), style="anime")
+
+            # One sheet attempt, then front, side and back.
+            self.assertEqual(len(generator.calls), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
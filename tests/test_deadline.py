@@ -0,0 +1,86 @@
+import asyncio
+import time
+import unittest
+
+from tenacity import retry, stop_after_attempt
+
+from utils.deadline import DeadlineExceeded, cap_timeout, check_deadline, deadline, remaining, with_deadline
+from utils.rate_limiter import RateLimiter
+from utils.retry import stop_on_retry_budget
+
+
+class DeadlineTests(unittest.IsolatedAsyncioTestCase):
+    def test_nested_deadlines_only_tighten(self):
+        self.assertIsNone(remaining())
+        with deadline(10):
+            with deadline(100) as left:
+                self.assertLessEqual(left, 10)
+            with deadline(1):
+                self.assertLessEqual(remaining(), 1)
+            with deadline(None):
+                self.assertGreater(remaining(), 1)
+        self.assertIsNone(remaining())
+
+    def test_cap_timeout(self):
+        self.assertEqual(cap_timeout(30), 30)
+        with deadline(5):
+            self.assertEqual(cap_timeout(1), 1)
+            self.assertLessEqual(cap_timeout(30), 5)
+            self.assertLessEqual(cap_timeout(None), 5)
+        with deadline(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceeded):
+                cap_timeout(30, "a poll")
+            with self.assertRaises(TimeoutError):
+                check_deadline()
+
+    async def test_with_deadline_bounds_the_call_and_its_tasks(self):
+        seen = []
+
+        @with_deadline
+        async def render():
+            seen.append(await asyncio.create_task(_remaining_later()))
+
+        await render(deadline_seconds=3)
+        await render()
+
+        self.assertLessEqual(seen[0], 3)
+        self.assertIsNone(seen[1])
+
+    async def test_with_deadline_cancels_work_that_ignores_it(self):
+        @with_deadline
+        async def stuck():
+            await asyncio.sleep(60)
+
+        with self.assertRaises(DeadlineExceeded):
+            await stuck(deadline_seconds=0.05)
+
+    def test_retry_stops_when_another_attempt_cannot_finish_in_time(self):
+        calls = []
+
+        @retry(stop=stop_after_attempt(10) | stop_on_retry_budget, reraise=True)
+        def slow_and_failing():
+            calls.append(1)
+            time.sleep(0.05)
+            raise RuntimeError("HTTP 503")
+
+        with deadline(0.08):
+            with self.assertRaises(RuntimeError):
+                slow_and_failing()
+        self.assertEqual(len(calls), 1)
+
+    async def test_rate_limiter_slot_fails_fast_past_the_deadline(self):
+        limiter = RateLimiter()
+        limiter.report_rate_limited(retry_after=60)
+        with deadline(5):
+            with self.assertRaises(DeadlineExceeded):
+                async with limiter.slot():
+                    self.fail("the slot must not wait past the deadline")
+
+
+async def _remaining_later():
+    return remaining()
+
+
+if __name__ == "__main__":
+    unittest.main()
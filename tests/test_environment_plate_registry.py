@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from agents.environment_plate_registry import EnvironmentPlateRegistry, normalize_slugline
+from agents.reference_image_selector import LocalReferenceResolver
+from interfaces import ImageOutput
+from interfaces.environment import EnvironmentInScene
+
+
+class CountingImageGenerator:
+    def __init__(self):
+        self.calls = 0
+        self.sizes = []
+
+    async def generate_single_image(self, prompt, reference_image_paths=None, **kwargs):
+        self.calls += 1
+        self.sizes.append(kwargs.get("size"))
+        await asyncio.sleep(0.01)
+        return ImageOutput(fmt="pil", ext="png", data=Image.new("RGB", (160, 90), (90, 60, 30)))
+
+
+class EnvironmentPlateRegistryTests(unittest.IsolatedAsyncioTestCase):
+    def test_normalize_slugline(self):
+        self.assertEqual(normalize_slugline("int. coffee shop – night (continuous)"), "INT. COFFEE SHOP - NIGHT")
+        self.assertEqual(normalize_slugline("INT.  COFFEE SHOP -- NIGHT - CONTINUOUS"), "INT. COFFEE SHOP - NIGHT")
+        self.assertNotEqual(normalize_slugline("INT. COFFEE SHOP - DAY"), normalize_slugline("INT. COFFEE SHOP - NIGHT"))
+
+    async def test_one_plate_per_location_reused_across_scenes_and_sessions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = CountingImageGenerator()
+            registry = EnvironmentPlateRegistry(generator, tmp)
+            first = EnvironmentInScene(slugline="INT. COFFEE SHOP - NIGHT", description="Brick walls, neon rain.")
+            again = EnvironmentInScene(slugline="int. coffee shop - night (later)", description="Same shop.")
+
+            plates = await asyncio.gather(registry.get_or_create(first, "noir"), registry.get_or_create(again, "noir"))
+
+            self.assertEqual(generator.calls, 1)
+            self.assertEqual(plates[0], plates[1])
+            self.assertTrue(os.path.exists(plates[0][0]))
+
+            reloaded = EnvironmentPlateRegistry(generator, tmp)
+            self.assertEqual(await reloaded.get_or_create(first, "noir"), plates[0])
+            self.assertEqual(generator.calls, 1)
+
+    async def test_plates_are_drawn_at_the_requested_size(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = CountingImageGenerator()
+            registry = EnvironmentPlateRegistry(generator, tmp, image_size="800x450")
+
+            await registry.get_or_create(EnvironmentInScene(slugline="EXT. PIER - DAY", description="Gulls."), "noir")
+
+            self.assertEqual(generator.sizes, ["800x450"])
+
+    def test_resolver_uses_the_plate_only_without_an_earlier_frame(self):
+        resolver = LocalReferenceResolver()
+        portrait = ("alice_front.png", "A front view portrait of Alice.")
+        plate = ("plate.png", "An establishing plate of the location INT. COFFEE SHOP - NIGHT, with no characters.")
+        earlier_frame = ("shots/0/first_frame.png", "Alice sits at the counter.")
+
+        root_frame = resolver.resolve([portrait, plate], "Alice walks in.")
+        later_frame = resolver.resolve([portrait, plate, earlier_frame], "Alice sits down.")
+
+        self.assertEqual(root_frame["reference_image_path_and_text_pairs"], [plate, portrait])
+        self.assertEqual(later_frame["reference_image_path_and_text_pairs"], [earlier_frame, portrait])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -95,6 +95,7 @@ class _FakeResponse:
     def __init__(self, payload, status=200):
         self.payload = payload
         self.status = status
+        self.headers = {}
 
     async def __aenter__(self):
         return self
@@ -0,0 +1,31 @@
+import json
+import unittest
+
+from utils.json_stream import JsonArrayStreamParser
+
+
+class JsonArrayStreamParserTests(unittest.TestCase):
+    def test_emits_each_object_once_it_closes(self):
+        payload = '```json\n{"storyboard": [{"idx": 0, "visual_desc": "a {brace} \\"quote\\""}, {"idx": 1, "nested": {"k": [1, 2]},}]}\n```'
+        parser = JsonArrayStreamParser(key="storyboard")
+        emitted = []
+        for pos in range(0, len(payload), 7):
+            emitted.extend(parser.feed(payload[pos:pos + 7]))
+        self.assertEqual(emitted, [
+            {"idx": 0, "visual_desc": 'a {brace} "quote"'},
+            {"idx": 1, "nested": {"k": [1, 2]}},
+        ])
+
+    def test_nothing_is_emitted_before_an_object_closes(self):
+        parser = JsonArrayStreamParser(key="storyboard")
+        self.assertEqual(parser.feed('{"storyboard": [{"idx": 0, "visual_desc": "wide'), [])
+        self.assertEqual(parser.feed(' shot"}'), [{"idx": 0, "visual_desc": "wide shot"}])
+
+    def test_stops_at_end_of_target_array(self):
+        parser = JsonArrayStreamParser(key="items")
+        text = json.dumps({"items": [{"a": 1}], "other": [{"b": 2}]})
+        self.assertEqual(parser.feed(text), [{"a": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
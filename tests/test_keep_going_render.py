@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from moviepy import ColorClip, VideoFileClip
+from PIL import Image
+
+from interfaces import Camera, ImageOutput, ShotDescription, VideoOutput
+from pipelines.script2video_pipeline import FAILURE_MANIFEST_FILE, Script2VideoPipeline, _failure_is_retryable
+from utils.task_group import DependencyFailed
+from utils.video import concatenate_with_slates
+
+
+def _write_clip(path, color=(255, 0, 0)):
+    clip = ColorClip((64, 48), color, duration=0.5).with_fps(10)
+    clip.write_videofile(path, codec="libx264", logger=None)
+    clip.close()
+
+
+def _shot(idx):
+    return ShotDescription(idx=idx, is_last=idx == 2, cam_idx=idx, visual_desc=f"shot {idx}", variation_type="small", variation_reason="same", ff_desc="f", ff_vis_char_idxs=[], lf_desc="l", lf_vis_char_idxs=[], motion_desc=f"motion {idx}", audio_desc="none")
+
+
+class FakeImageGenerator:
+    async def generate_single_image(self, prompt, reference_image_paths=[], **kwargs):
+        return ImageOutput(fmt="pil", ext="png", data=Image.new("RGB", (64, 48)))
+
+
+class FlakyVideoGenerator:
+    def __init__(self, clip_path, failing_shot_idxs):
+        self.clip_path = clip_path
+        self.failing_shot_idxs = set(failing_shot_idxs)
+        self.prompts = []
+
+    async def generate_single_video(self, prompt, reference_image_paths=[], **kwargs):
+        self.prompts.append(prompt)
+        if any(prompt.startswith(f"motion {idx}") for idx in self.failing_shot_idxs):
+            raise RuntimeError("Video generation failed with HTTP 503")
+        with open(self.clip_path, "rb") as f:
+            return VideoOutput(fmt="bytes", ext="mp4", data=f.read())
+
+
+class KeepGoingRenderTests(unittest.IsolatedAsyncioTestCase):
+    def _pipeline(self, tmp, video_generator):
+        pipeline = Script2VideoPipeline(chat_model=MagicMock(), image_generator=FakeImageGenerator(), video_generator=video_generator, working_dir=tmp, keep_going=True)
+        shots = [_shot(idx) for idx in range(3)]
+
+        async def decompose(**kwargs):
+            return [pipeline._register_shot_description(shot) for shot in shots]
+
+        pipeline.design_storyboard = AsyncMock(return_value=[])
+        pipeline.decompose_visual_descriptions = decompose
+        pipeline.construct_camera_tree = AsyncMock(return_value=[Camera(idx=idx, active_shot_idxs=[idx]) for idx in range(3)])
+        pipeline.reference_image_selector = MagicMock(select_reference_images_and_generate_prompt=AsyncMock(return_value={"reference_image_path_and_text_pairs": [], "text_prompt": "p"}))
+        return pipeline
+
+    async def test_failed_shot_is_recorded_slated_and_retried_alone(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            clip_path = os.path.join(tmp, "clip.mp4")
+            _write_clip(clip_path)
+            video_generator = FlakyVideoGenerator(clip_path, failing_shot_idxs=[1])
+            pipeline = self._pipeline(tmp, video_generator)
+            render_args = dict(script="s", user_requirement="", style="", characters=[], character_portraits_registry={})
+
+            partial_path = await pipeline(**render_args)
+
+            self.assertEqual(os.path.basename(partial_path), "final_video_partial.mp4")
+            self.assertFalse(os.path.exists(os.path.join(tmp, "final_video.mp4")))
+            with VideoFileClip(partial_path) as partial:
+                self.assertAlmostEqual(partial.duration, 1.5, delta=0.2)
+            manifest = pipeline.load_failure_manifest()
+            self.assertEqual([entry["shot_idx"] for entry in manifest], [1])
+            self.assertTrue(manifest[0]["retryable"])
+            self.assertIn("HTTP 503", manifest[0]["error"])
+
+            video_generator.failing_shot_idxs.clear()
+            video_generator.prompts.clear()
+            final_path = await pipeline.retry_failed_shots(**render_args)
+
+            self.assertEqual(final_path, os.path.join(tmp, "final_video.mp4"))
+            self.assertFalse(os.path.exists(partial_path))
+            self.assertEqual(len(video_generator.prompts), 1)
+            self.assertTrue(video_generator.prompts[0].startswith("motion 1"))
+            self.assertFalse(os.path.exists(os.path.join(tmp, FAILURE_MANIFEST_FILE)))
+
+    async def test_failed_frame_fails_only_its_own_clip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            clip_path = os.path.join(tmp, "clip.mp4")
+            _write_clip(clip_path)
+            pipeline = self._pipeline(tmp, FlakyVideoGenerator(clip_path, failing_shot_idxs=[]))
+            frame_calls = []
+
+            async def image(prompt, reference_image_paths=[], **kwargs):
+                frame_calls.append(prompt)
+                if len(frame_calls) == 1:
+                    raise PermissionError("HTTP 403: key revoked")
+                return ImageOutput(fmt="pil", ext="png", data=Image.new("RGB", (64, 48)))
+
+            pipeline.image_generator.generate_single_image = image
+
+            await pipeline(script="s", user_requirement="", style="", characters=[], character_portraits_registry={})
+
+            manifest = pipeline.load_failure_manifest()
+            self.assertEqual(len(manifest), 1)
+            self.assertEqual(manifest[0]["error_type"], "DependencyFailed")
+            self.assertFalse(manifest[0]["retryable"])
+            self.assertEqual(sum(os.path.exists(os.path.join(tmp, "shots", str(idx), "video.mp4")) for idx in range(3)), 2)
+
+    def test_only_rejected_requests_are_not_retryable(self):
+        self.assertTrue(_failure_is_retryable(ValueError("OpenRouter image response missing data[0].b64_json: {}")))
+        self.assertTrue(_failure_is_retryable(ValueError("Generated image is portrait-oriented")))
+        self.assertTrue(_failure_is_retryable(DependencyFailed("frame", RuntimeError("HTTP 429"))))
+        self.assertFalse(_failure_is_retryable(DependencyFailed("frame", RuntimeError("HTTP 400: bad prompt"))))
+
+    def test_slates_take_the_place_of_missing_clips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            clip_path = os.path.join(tmp, "clip.mp4")
+            _write_clip(clip_path)
+            output_path = os.path.join(tmp, "out.mp4")
+
+            concatenate_with_slates([clip_path, None], ["", "Shot 1 failed"], output_path)
+
+            with VideoFileClip(output_path) as output:
+                self.assertEqual(output.size, [64, 48])
+                self.assertAlmostEqual(output.duration, 1.0, delta=0.2)
+            with self.assertRaises(ValueError):
+                concatenate_with_slates([None], ["Shot 0 failed"], output_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
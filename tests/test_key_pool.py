@@ -0,0 +1,131 @@
+import unittest
+
+from tenacity import retry, stop_after_attempt
+
+from tools.key_pool import KeyPool, error_status, key_label
+from tools.render_backend import RenderBackend
+from utils.rate_limiter import RateLimiter
+from utils.retry import stop_on_retry_budget
+
+
+class HTTPError(RuntimeError):
+    def __init__(self, code):
+        self.code = code
+        super().__init__(f"HTTP {code}")
+
+
+class FakeImageGenerator:
+    def __init__(self, api_key, rate_limiter=None, error=None):
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.error = error
+        self.calls = 0
+
+    async def generate_single_image(self, prompt, reference_image_paths=[], **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            if self.error.code == 429:
+                self.rate_limiter.report_rate_limited(retry_after=60)
+            raise self.error
+        return self.api_key
+
+
+class BrieflyRateLimitedImageGenerator(FakeImageGenerator):
+    """Answers its first request with a 429 that asks for a short pause."""
+
+    async def generate_single_image(self, prompt, reference_image_paths=[], **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            self.rate_limiter.report_rate_limited(retry_after=0.05)
+            raise HTTPError(429)
+        return self.api_key
+
+
+class RetryingImageGenerator(FakeImageGenerator):
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, reraise=True)
+    async def generate_single_image(self, prompt, reference_image_paths=[], **kwargs):
+        return await super().generate_single_image(prompt, reference_image_paths, **kwargs)
+
+
+class KeyPoolTests(unittest.IsolatedAsyncioTestCase):
+    async def test_rate_limited_key_hands_over_to_the_next(self):
+        limited = FakeImageGenerator("key-a", error=HTTPError(429))
+        healthy = FakeImageGenerator("key-b")
+        pool = KeyPool([limited, healthy], labels=["a", "b"])
+
+        self.assertEqual(await pool.generate_single_image(prompt="p"), "key-b")
+        # The paused key is skipped from now on.
+        self.assertEqual(await pool.generate_single_image(prompt="p"), "key-b")
+        self.assertEqual(limited.calls, 1)
+        self.assertEqual(pool.usage()["a"]["rate_limited"], 1)
+        self.assertGreater(pool.usage()["a"]["available_in_seconds"], 50)
+
+    async def test_waits_out_a_429_on_every_key(self):
+        first = BrieflyRateLimitedImageGenerator("key-a")
+        second = BrieflyRateLimitedImageGenerator("key-b")
+        pool = KeyPool([first, second], labels=["a", "b"])
+
+        self.assertIn(await pool.generate_single_image(prompt="p"), {"key-a", "key-b"})
+        self.assertEqual(first.calls + second.calls, 3)
+        # A pool of one key rides out the burst the same way.
+        self.assertEqual(await KeyPool([BrieflyRateLimitedImageGenerator("key-c")]).generate_single_image(prompt="p"), "key-c")
+
+    async def test_rejected_key_is_excluded(self):
+        revoked = FakeImageGenerator("key-a", error=HTTPError(401))
+        healthy = FakeImageGenerator("key-b")
+        pool = KeyPool([revoked, healthy], labels=["a", "b"])
+        await pool.generate_single_image(prompt="p")
+        revoked.error = None
+
+        await pool.generate_single_image(prompt="p")
+
+        self.assertEqual(revoked.calls, 1)
+        self.assertGreater(pool.usage()["a"]["excluded_seconds"], 0)
+
+    async def test_rotates_towards_the_key_with_most_quota_left(self):
+        spent = FakeImageGenerator("key-a", RateLimiter(max_requests_per_day=10))
+        fresh = FakeImageGenerator("key-b", RateLimiter(max_requests_per_day=10))
+        pool = KeyPool([spent, fresh])
+        for _ in range(4):
+            await spent.rate_limiter.acquire()
+
+        self.assertEqual(await pool.generate_single_image(prompt="p"), "key-b")
+
+    async def test_a_429_moves_on_without_retrying_the_same_key(self):
+        limited = RetryingImageGenerator("key-a", rate_limiter=RateLimiter(), error=HTTPError(429))
+        flaky = RetryingImageGenerator("key-b", error=HTTPError(503))
+        pool = KeyPool([limited, FakeImageGenerator("key-c")], labels=["a", "c"])
+
+        self.assertEqual(await pool.generate_single_image(prompt="p"), "key-c")
+        self.assertEqual(limited.calls, 1)
+        # Other failures are still retried by the generator.
+        with self.assertRaises(HTTPError):
+            await KeyPool([flaky]).generate_single_image(prompt="p")
+        self.assertEqual(flaky.calls, 3)
+
+    async def test_other_errors_propagate(self):
+        pool = KeyPool([FakeImageGenerator("key-a", error=HTTPError(400)), FakeImageGenerator("key-b")])
+        with self.assertRaises(HTTPError):
+            await pool.generate_single_image(prompt="p")
+
+    def test_helpers_and_render_backend_wiring(self):
+        self.assertEqual(error_status(RuntimeError("creation failed with HTTP 403: {}")), 403)
+        self.assertEqual(key_label("sk-abcdefgh1234"), "...1234")
+
+        section = {
+            "class_path": "tests.test_key_pool.FakeImageGenerator",
+            "api_keys": ["sk-first-key-1111", "sk-second-key-2222"],
+            "max_requests_per_day": 5,
+        }
+        backend = RenderBackend.from_config({"image_generator": section, "video_generator": section})
+
+        pool = backend.image_generator
+        self.assertIsInstance(pool, KeyPool)
+        self.assertEqual([generator.api_key for generator in pool.generators], section["api_keys"])
+        self.assertIsNot(pool.generators[0].rate_limiter, pool.generators[1].rate_limiter)
+        self.assertIsNot(pool.generators[0].rate_limiter.circuit_breaker, pool.generators[1].rate_limiter.circuit_breaker)
+        self.assertEqual(list(pool.usage()), ["...1111", "...2222"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,6 +21,9 @@ class FakeCompressor:
     def split(self, novel_text):
         return [novel_text]
 
+    def split_stream(self, stream, manifest_path=None):
+        return stream.iter_chunks(chunk_size=65536, manifest_path=manifest_path)
+
     async def compress_single_novel_chunk(self, semaphore, index, novel_chunk):
         return index, f"compressed {novel_chunk}"
 
@@ -168,12 +171,38 @@ class Novel2MoviePlanningTests(unittest.IsolatedAsyncioTestCase):
             self.assertFalse((root / "videos").exists())
             self.assertEqual(len(result["events"]), 1)
 
+    async def test_compressed_chunks_from_another_split_are_not_reused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Novel2MoviePipeline(
+                novel_compressor=FakeCompressor(),
+                event_extractor=FakeEventExtractor(),
+                embeddings=SimpleNamespace(model="fake-embedding"),
+                rerank_model=FakeReranker(),
+                scene_extractor=FakeSceneExtractor(),
+                global_information_planner=FakeGlobalPlanner(),
+                image_generator=object(),
+                rewriter=object(),
+                script2video_pipeline=object(),
+                working_dir=tmp,
+            )
+            novel = Path(tmp) / "novel"
+            novel.mkdir()
+            # Left by a splitter that cut chunk 0 at another boundary.
+            (novel / "novel_chunk_0_compressed.txt").write_text("compressed Hero opens", encoding="utf-8")
+            (novel / "novel_compressed.txt").write_text("compressed Hero opens", encoding="utf-8")
+            with patch("pipelines.novel2movie_pipeline.CacheBackedEmbeddings.from_bytes_store", return_value=object()), \
+                 patch("pipelines.novel2movie_pipeline.FAISS.from_texts", return_value=FakeKnowledgeBase()):
+                await pipeline.plan_text_artifacts("Hero opens a door.", quiet=True)
+
+            self.assertEqual((novel / "novel_compressed.txt").read_text(encoding="utf-8"), "compressed Hero opens a door.")
+            self.assertEqual(len(list(novel.glob("novel_chunk_0_*_compressed.txt"))), 1)
+
 
 class FakeNovelRenderPipeline:
     def __init__(self, working_dir: Path):
         self.working_dir = Path(working_dir)
 
-    async def render_video_artifacts(self, style, user_requirement="", progress=None, quiet=False):
+    async def render_video_artifacts(self, style, user_requirement="", progress=None, quiet=False, deadline_seconds=None):
         if progress:
             progress("novel_portraits_start", "portraits", {})
             progress("novel_scene_render_start", "scene", {"event_idx": 0, "scene_idx": 0})
@@ -0,0 +1,86 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from utils.novel_stream import NovelStream, merge_relevant_chunks
+
+
+def _write(tmp: str, text: str) -> str:
+    path = Path(tmp) / "novel.txt"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+class NovelStreamTests(unittest.TestCase):
+    def test_chunks_cover_text_with_byte_offsets(self):
+        text = "\n\n".join(f"Paragraph {i}: the hero walks through the gate." for i in range(50))
+        with tempfile.TemporaryDirectory() as tmp:
+            with NovelStream(_write(tmp, text)) as stream:
+                chunks = list(stream.iter_chunks(chunk_size=200, chunk_overlap=40))
+                texts = [chunk.text for chunk in chunks]
+            self.assertGreater(len(chunks), 1)
+            self.assertTrue(all(len(chunk_text) <= 200 for chunk_text in texts))
+            self.assertEqual([chunk.index for chunk in chunks], list(range(len(chunks))))
+            self.assertEqual(chunks[0].start, 0)
+            self.assertEqual(chunks[-1].end, len(text.encode("utf-8")))
+            for previous, current in zip(chunks, chunks[1:]):
+                self.assertLess(previous.start, current.start)
+                self.assertLessEqual(current.start, previous.end)
+
+    def test_multibyte_text_never_splits_characters(self):
+        text = "英雄推开了古老的木门。" * 300
+        with tempfile.TemporaryDirectory() as tmp:
+            with NovelStream(_write(tmp, text)) as stream:
+                texts = [chunk.text for chunk in stream.iter_chunks(chunk_size=100, chunk_overlap=20)]
+        self.assertNotIn("�", "".join(texts))
+        self.assertTrue(all(chunk_text.endswith("。") for chunk_text in texts))
+
+    def test_manifest_is_written_per_chunk(self):
+        text = "word " * 1000
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_path = Path(tmp) / "chunks.jsonl"
+            with NovelStream(_write(tmp, text)) as stream:
+                chunk_iter = stream.iter_chunks(chunk_size=100, manifest_path=str(manifest_path))
+                first = next(chunk_iter)
+                self.assertEqual(json.loads(manifest_path.read_text(encoding="utf-8").strip()), first.manifest_entry())
+                rest = list(chunk_iter)
+            lines = manifest_path.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(len(lines), 1 + len(rest))
+
+    def test_empty_novel_yields_no_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with NovelStream(_write(tmp, "")) as stream:
+                self.assertEqual(list(stream.iter_chunks(chunk_size=100)), [])
+
+
+class MergeRelevantChunksTests(unittest.TestCase):
+    def test_overlapping_chunks_merge_into_one_passage_with_max_score(self):
+        text = "alpha beta gamma delta epsilon zeta eta theta"
+        with tempfile.TemporaryDirectory() as tmp:
+            with NovelStream(_write(tmp, text)) as stream:
+                merged = merge_relevant_chunks(
+                    stream,
+                    {text[0:16]: 0.8, text[11:28]: 0.9, text[36:]: 0.75},
+                    {text[0:16]: (0, 16), text[11:28]: (11, 28), text[36:]: (36, len(text))},
+                )
+        self.assertEqual(list(merged.items()), [(text[0:28], 0.9), (text[36:], 0.75)])
+
+    def test_budget_keeps_best_passages_in_novel_order(self):
+        text = "a" * 100 + "b" * 100 + "c" * 100
+        scores = {"a" * 100: 0.7, "b" * 50: 0.95, "c" * 100: 0.8}
+        offsets = {"a" * 100: (0, 100), "b" * 50: (120, 170), "c" * 100: (200, 300)}
+        with tempfile.TemporaryDirectory() as tmp:
+            with NovelStream(_write(tmp, text)) as stream:
+                merged = merge_relevant_chunks(stream, scores, offsets, char_budget=160)
+        self.assertEqual(list(merged.values()), [0.95, 0.8])
+
+    def test_chunks_without_offsets_are_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with NovelStream(_write(tmp, "some novel")) as stream:
+                merged = merge_relevant_chunks(stream, {"loose chunk": 0.9}, {})
+        self.assertEqual(merged, {"loose chunk": 0.9})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,11 +5,15 @@ from tools.video_generator_omni_yunwu_api import (
     VideoGeneratorOmniYunwuAPI,
     VideoGeneratorOminiYunwuAPI,
 )
+from utils.rate_limiter import RateLimiter
+from utils.resilience import CircuitBreaker
 
 
 class _FakeResponse:
-    def __init__(self, payload):
+    def __init__(self, payload, status=200):
         self.payload = payload
+        self.status = status
+        self.headers = {}
 
     async def __aenter__(self):
         return self
@@ -36,6 +40,10 @@ class _FakeSession:
         self.calls.append(("get", url, kwargs))
         return _FakeResponse(self.payload)
 
+    def post(self, url, **kwargs):
+        self.calls.append(("post", url, kwargs))
+        return _FakeResponse(self.payload, status=503)
+
 
 class TestVideoGeneratorOmniYunwuAPI(unittest.IsolatedAsyncioTestCase):
     def test_text_to_video_payload(self):
@@ -128,6 +136,19 @@ class TestVideoGeneratorOmniYunwuAPI(unittest.IsolatedAsyncioTestCase):
             with self.assertRaises(RuntimeError):
                 await generator.query_video_generation_task("task-1", "omni-flash")
 
+    async def test_server_errors_count_against_the_endpoint(self):
+        breaker = CircuitBreaker("omni", failure_threshold=3, reset_seconds=60)
+        generator = VideoGeneratorOmniYunwuAPI(api_key="test-key", rate_limiter=RateLimiter(circuit_breaker=breaker))
+        session = _FakeSession({"error": "overloaded"})
+
+        with patch("tools.video_generator_omni_yunwu_api.aiohttp.ClientSession", return_value=session), \
+                patch("tools.video_generator_omni_yunwu_api.asyncio.sleep"):
+            with self.assertRaisesRegex(RuntimeError, "after 3 attempts"):
+                await generator.create_video_generation_task("p", [])
+
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual(breaker.state, "open")
+
     def test_omini_alias(self):
         self.assertTrue(issubclass(VideoGeneratorOminiYunwuAPI, VideoGeneratorOmniYunwuAPI))
 
@@ -13,6 +13,7 @@ from tools.image_generator_openrouter_api import (
     OpenRouterImageAPIError,
     _is_retryable_image_error,
 )
+from utils.deadline import deadline
 
 
 def _encoded_png(size: tuple[int, int] = (16, 9)) -> str:
@@ -27,7 +28,7 @@ class OpenRouterImageGeneratorTests(unittest.IsolatedAsyncioTestCase):
 
         async def fake_post(url, *, headers, payload, timeout):
             captured.update(url=url, headers=headers, payload=payload, timeout=timeout)
-            return 200, {"data": [{"b64_json": _encoded_png(), "media_type": "image/png"}]}
+            return 200, {"data": [{"b64_json": _encoded_png(), "media_type": "image/png"}]}, {}
 
         progress = []
         generator = ImageGeneratorOpenRouterAPI(api_key="secret", model="openai/gpt-image-2")
@@ -51,7 +52,7 @@ class OpenRouterImageGeneratorTests(unittest.IsolatedAsyncioTestCase):
         with tempfile.TemporaryDirectory() as tmp:
             reference_path = Path(tmp) / "reference.png"
             Image.new("RGB", (16, 9), "red").save(reference_path)
-            post = AsyncMock(return_value=(200, {"data": [{"b64_json": _encoded_png()}]}))
+            post = AsyncMock(return_value=(200, {"data": [{"b64_json": _encoded_png()}]}, {}))
             generator = ImageGeneratorOpenRouterAPI(api_key="secret")
             with patch("tools.image_generator_openrouter_api._post_json", post):
                 await generator.generate_single_image("edit this", [str(reference_path)])
@@ -60,8 +61,16 @@ class OpenRouterImageGeneratorTests(unittest.IsolatedAsyncioTestCase):
         reference_url = payload["input_references"][0]["image_url"]["url"]
         self.assertTrue(reference_url.startswith("data:image/png;base64,"))
 
+    async def test_request_timeout_is_capped_by_the_deadline(self):
+        post = AsyncMock(return_value=(200, {"data": [{"b64_json": _encoded_png()}]}, {}))
+        generator = ImageGeneratorOpenRouterAPI(api_key="secret")
+        with patch("tools.image_generator_openrouter_api._post_json", post), deadline(20):
+            await generator.generate_single_image("a beach")
+
+        self.assertLessEqual(post.await_args.kwargs["timeout"].total, 20)
+
     async def test_non_retryable_client_error_is_not_repeated(self):
-        post = AsyncMock(return_value=(400, {"error": {"message": "bad request"}}))
+        post = AsyncMock(return_value=(400, {"error": {"message": "bad request"}}, {}))
         generator = ImageGeneratorOpenRouterAPI(api_key="secret")
         with patch("tools.image_generator_openrouter_api._post_json", post):
             with self.assertRaises(OpenRouterImageAPIError):
@@ -0,0 +1,141 @@
+import asyncio
+import time
+import unittest
+from contextlib import suppress
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from google.genai.errors import ClientError
+from PIL import Image
+
+from tools.image_generator_nanobanana_google_api import ImageGeneratorNanobananaGoogleAPI
+from utils.adaptive_concurrency import AdaptiveConcurrency
+from utils.rate_limiter import RateLimiter, parse_reset, parse_retry_after
+
+
+class RateLimiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_waiters_are_served_in_arrival_order(self):
+        limiter = RateLimiter(max_requests_per_minute=1200)  # one token every 50ms
+        order = []
+
+        async def request(idx):
+            await limiter.acquire()
+            order.append(idx)
+
+        tasks = []
+        for idx in range(5):
+            tasks.append(asyncio.create_task(request(idx)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+        stats = limiter.wait_stats()
+        self.assertEqual(stats["acquired"], 5)
+        self.assertEqual(stats["waited"], 4)
+        self.assertGreaterEqual(stats["max_wait_seconds"], 0.15)
+
+    async def test_weight_consumes_several_tokens(self):
+        limiter = RateLimiter(max_requests_per_minute=600, burst=4)  # one token every 100ms
+        loop = asyncio.get_running_loop()
+        await limiter.acquire(weight=4)
+        start = loop.time()
+        await limiter.acquire(weight=2)
+        self.assertGreaterEqual(loop.time() - start, 0.18)
+
+    async def test_cancelled_waiter_does_not_block_the_queue(self):
+        limiter = RateLimiter(max_requests_per_minute=600)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire(weight=1))
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with suppress(asyncio.CancelledError):
+            await first
+
+        waited = await asyncio.wait_for(second, timeout=1)
+
+        self.assertLess(waited, 0.2)
+        self.assertEqual(limiter.wait_stats()["queued"], 0)
+
+    async def test_daily_budget_is_enforced(self):
+        limiter = RateLimiter(max_requests_per_day=2)
+        await limiter.acquire()
+        await limiter.acquire()
+        blocked = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.05)
+        self.assertFalse(blocked.done())
+        blocked.cancel()
+        with suppress(asyncio.CancelledError):
+            await blocked
+
+
+class ProviderFeedbackTests(unittest.IsolatedAsyncioTestCase):
+    def test_header_parsing(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertEqual(parse_reset("6m0s"), 360.0)
+        self.assertEqual(parse_reset("250ms"), 0.25)
+        self.assertAlmostEqual(parse_reset(str(time.time() + 30)), 30.0, delta=1.0)
+
+    async def test_retry_after_pauses_every_caller(self):
+        limiter = RateLimiter()
+        limiter.report_response(429, {"Retry-After": "0.2"})
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        await asyncio.gather(limiter.acquire(), limiter.acquire())
+
+        self.assertGreaterEqual(loop.time() - start, 0.18)
+        self.assertEqual(limiter.wait_stats()["waited"], 2)
+
+    def test_a_burst_of_429s_counts_as_one(self):
+        limiter = RateLimiter()
+        pauses = [limiter.report_rate_limited() for _ in range(20)]
+
+        self.assertEqual(set(pauses), {5.0})
+        self.assertEqual(limiter.consecutive_rate_limited, 1)
+
+    async def test_successful_slot_ends_the_429_streak(self):
+        limiter = RateLimiter()
+        limiter.consecutive_rate_limited = 3
+
+        async with limiter.slot():
+            pass
+
+        self.assertEqual(limiter.consecutive_rate_limited, 0)
+
+    async def test_exhausted_quota_header_pauses_until_reset(self):
+        limiter = RateLimiter(max_requests_per_minute=6000)
+        limiter.report_response(200, {"X-RateLimit-Remaining-Requests": "0", "X-RateLimit-Reset-Requests": "150ms"})
+
+        waited = await limiter.acquire()
+
+        self.assertGreaterEqual(waited, 0.12)
+
+    async def test_google_429_pauses_the_shared_limiter_before_retrying(self):
+        error = ClientError(429, {"error": {"code": 429, "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "0.1s"}]}})
+        part = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=b""))
+        responses = [error, SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])]
+
+        async def generate_content(**kwargs):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        generator = ImageGeneratorNanobananaGoogleAPI.__new__(ImageGeneratorNanobananaGoogleAPI)
+        generator.model = "m"
+        generator.rate_limiter = RateLimiter(adaptive_concurrency=AdaptiveConcurrency(initial=8))
+        generator.client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with patch("tools.image_generator_nanobanana_google_api.image_from_response_part", return_value=Image.new("RGB", (16, 9))):
+            await generator.generate_single_image("p", [])
+
+        self.assertGreaterEqual(loop.time() - start, 0.08)
+        self.assertEqual(generator.rate_limiter.rate_limited, 1)
+        self.assertEqual(generator.rate_limiter.concurrency_limit, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from tenacity import RetryError
+
+from agents.reference_image_selector import (
+    BatchRefImageSelectionResponse,
+    FrameRefImageIndicesAndTextPrompt,
+    LocalReferenceResolver,
+    ReferenceImageSelector,
+)
+
+
+class FakeBatchChain:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def ainvoke(self, messages):
+        content = messages[-1].content
+        self.calls.append(content)
+        frame_idxs = [int(idx) for idx in re.findall(r"<FRAME_(\d+)_DESC>", "".join(item.get("text", "") for item in content))]
+        return BatchRefImageSelectionResponse(selections=[
+            FrameRefImageIndicesAndTextPrompt(frame_idx=frame_idx, ref_image_indices=[frame_idx % 2], text_prompt=f"prompt {frame_idx}")
+            for frame_idx in frame_idxs
+        ])
+
+
+class FakeBatchChatModel:
+    def __init__(self):
+        self.calls = []
+
+    def __or__(self, parser):
+        return FakeBatchChain(self.calls)
+
+
+class BatchReferenceSelectionTests(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_uploads_each_candidate_once_and_caches_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = []
+            for name in ["front", "frame"]:
+                path = Path(tmp) / f"{name}.png"
+                path.write_bytes(b"png")
+                pool.append((str(path), f"{name} image"))
+            chat_model = FakeBatchChatModel()
+            selector = ReferenceImageSelector(chat_model=chat_model)
+
+            outputs = await selector.select_reference_images_and_generate_prompts_batch(pool, ["shot a", "shot b", "shot c"])
+
+            self.assertEqual(len(chat_model.calls), 1)
+            images = [item for item in chat_model.calls[0] if item["type"] == "image_url"]
+            self.assertEqual(len(images), 2)
+            self.assertEqual([output["text_prompt"] for output in outputs], ["prompt 0", "prompt 1", "prompt 2"])
+            self.assertEqual(outputs[1]["reference_image_path_and_text_pairs"], [pool[1]])
+
+            # Same frame descriptions over the same candidates (in any order) are served from the cache.
+            cached = await selector.select_reference_images_and_generate_prompt(list(reversed(pool)), "shot b")
+            self.assertEqual(cached, outputs[1])
+            again = await selector.select_reference_images_and_generate_prompts_batch(pool, ["shot a", "shot d"])
+            self.assertEqual(len(chat_model.calls), 2)
+            self.assertEqual(again[0], outputs[0])
+            self.assertNotIn("shot a", "".join(item.get("text", "") for item in chat_model.calls[1]))
+
+    async def test_frames_pick_only_from_their_own_candidates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = []
+            for name in ["a", "b", "c"]:
+                path = Path(tmp) / f"{name}.png"
+                path.write_bytes(b"png")
+                pool.append((str(path), f"{name} image"))
+            chat_model = FakeBatchChatModel()
+            selector = ReferenceImageSelector(chat_model=chat_model)
+
+            outputs = await selector.select_reference_images_and_generate_prompts_batch(
+                pool, ["shot a", "shot b"], frame_image_path_and_text_pairs=[pool[:2], pool[1:]],
+            )
+
+            prompt = "".join(item.get("text", "") for item in chat_model.calls[0])
+            self.assertIn("Allowed images for frame 0: 0, 1", prompt)
+            self.assertIn("Allowed images for frame 1: 1, 2", prompt)
+            self.assertEqual(outputs[1]["reference_image_path_and_text_pairs"], [pool[1]])
+            # Cached under the frame's own candidates, not the shared pool.
+            self.assertEqual(selector.get_cached_selection(pool[1:], "shot b"), outputs[1])
+            self.assertIsNone(selector.get_cached_selection(pool, "shot b"))
+
+            # Frame 0 may not pick Image 0 when it only sees images 1 and 2.
+            with self.assertRaises(RetryError) as caught:
+                await selector.select_reference_images_and_generate_prompts_batch(
+                    pool, ["shot c", "shot d"], frame_image_path_and_text_pairs=[pool[1:], pool[:2]],
+                )
+            self.assertIn("outside its candidates", str(caught.exception.last_attempt.exception()))
+            self.assertIsNone(selector.get_cached_selection(pool[:2], "shot d"))
+
+
+class LocalReferenceResolverTests(unittest.IsolatedAsyncioTestCase):
+    portraits = [
+        ("alice_front.png", "A front view portrait of Alice."),
+        ("alice_side.png", "A side view portrait of Alice."),
+        ("alice_back.png", "A back view portrait of Alice."),
+    ]
+    scene = ("shots/0/first_frame.png", "The first frame of the camera.")
+
+    def test_picks_scene_frame_and_view_matching_portrait(self):
+        resolver = LocalReferenceResolver()
+
+        output = resolver.resolve([self.scene] + self.portraits, "Alice stands by the window, captured in profile view.")
+
+        self.assertEqual(output["reference_image_path_and_text_pairs"], [self.scene, self.portraits[1]])
+        self.assertIn("Image 0", output["text_prompt"])
+        self.assertIn("The appearance of Alice should reference Image 1.", output["text_prompt"])
+        self.assertEqual(resolver.hit_rate, 1.0)
+
+    def test_defaults_to_front_view_and_leaves_ambiguous_frames_to_the_model(self):
+        resolver = LocalReferenceResolver()
+        bob = ("bob_front.png", "A front view portrait of Bob.")
+
+        front = resolver.resolve(self.portraits, "Alice smiles.")
+        two_characters = resolver.resolve(self.portraits + [bob], "Alice talks to Bob.")
+        conflicting_views = resolver.resolve(self.portraits, "Alice, from behind, turns into a side view.")
+
+        self.assertEqual(front["reference_image_path_and_text_pairs"], [self.portraits[0]])
+        self.assertIsNone(two_characters)
+        self.assertIsNone(conflicting_views)
+        self.assertEqual((resolver.hits, resolver.lookups), (1, 3))
+
+    def test_novel2movie_portraits_are_front_views_and_unknown_candidates_go_to_the_model(self):
+        resolver = LocalReferenceResolver()
+        # The registry shape Novel2Movie builds for a scene.
+        registry = {"Alice": {"portrait": {"path": "character_portraits/event_0/scene_0/character_0_Alice.png", "description": "A portrait of Alice"}}}
+        portrait = (registry["Alice"]["portrait"]["path"], registry["Alice"]["portrait"]["description"])
+        plate = ("plate.png", "An establishing plate of the location INT. KITCHEN - NIGHT, with no characters.")
+
+        root_frame = resolver.resolve([portrait, plate], "Alice stands at the sink.")
+        unknown = resolver.resolve([portrait, ("sketch.png", "A rough sketch of the kitchen.")], "Alice stands at the sink.")
+
+        self.assertEqual(root_frame["reference_image_path_and_text_pairs"], [plate, portrait])
+        self.assertIn("The appearance of Alice should reference Image 1.", root_frame["text_prompt"])
+        self.assertIsNone(unknown)
+
+    async def test_batch_resolves_frames_from_their_own_candidates_without_a_model_call(self):
+        chat_model = FakeBatchChatModel()
+        selector = ReferenceImageSelector(chat_model=chat_model)
+        bob = ("bob_front.png", "A front view portrait of Bob.")
+
+        outputs = await selector.select_reference_images_and_generate_prompts_batch(
+            [self.scene] + self.portraits + [bob],
+            ["Alice looks back, from behind.", "Bob waves."],
+            frame_image_path_and_text_pairs=[[self.scene] + self.portraits, [self.scene, bob]],
+        )
+
+        self.assertEqual(chat_model.calls, [])
+        self.assertEqual(outputs[0]["reference_image_path_and_text_pairs"], [self.scene, self.portraits[2]])
+        self.assertEqual(outputs[1]["reference_image_path_and_text_pairs"], [self.scene, bob])
+
+
+if __name__ == "__main__":
+    unittest.main()
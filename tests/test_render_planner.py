@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import unittest
+
+from interfaces import Camera, ShotBriefDescription, ShotDescription
+from pipelines.idea2video_pipeline import Idea2VideoPipeline
+from pipelines.render_planner import RenderPlan, ProviderLimits
+from pipelines.script2video_pipeline import Script2VideoPipeline
+from utils.latency_stats import LatencyStats
+from utils.rate_limiter import RateLimiter
+
+
+class LimitedGenerator:
+    def __init__(self, rate_limiter=None):
+        self.rate_limiter = rate_limiter
+
+
+class ImageGenerator(LimitedGenerator):
+    pass
+
+
+class VideoGenerator(LimitedGenerator):
+    pass
+
+
+def _shot(idx, cam_idx, variation_type="small"):
+    return ShotDescription(idx=idx, is_last=idx == 2, cam_idx=cam_idx, visual_desc=f"shot {idx}", variation_type=variation_type, variation_reason="r", ff_desc="f", ff_vis_char_idxs=[0], lf_desc="l", lf_vis_char_idxs=[0], motion_desc="m", audio_desc="a")
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+class RenderPlannerTests(unittest.TestCase):
+    def _pipeline(self, tmp, **kwargs):
+        return Script2VideoPipeline(
+            chat_model=object(),
+            image_generator=ImageGenerator(),
+            video_generator=VideoGenerator(RateLimiter(max_requests_per_minute=2, max_requests_per_day=2)),
+            working_dir=tmp,
+            **kwargs,
+        )
+
+    def test_plans_only_missing_artifacts_of_a_resumed_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = self._pipeline(tmp, frame_candidates=2)
+            shots = [_shot(0, 0, "medium"), _shot(1, 1), _shot(2, 0)]
+            _write_json(os.path.join(tmp, "characters.json"), [{"idx": 0, "identifier_in_scene": "Alice", "is_visible": True, "static_features": "s", "dynamic_features": "d"}])
+            _write_json(os.path.join(tmp, "character_portraits_registry.json"), {"Alice": {"front": {"path": "a.png", "description": "A front view portrait of Alice."}}})
+            _write_json(os.path.join(tmp, "storyboard.json"), [ShotBriefDescription(idx=shot.idx, is_last=shot.is_last, cam_idx=shot.cam_idx, visual_desc=shot.visual_desc, audio_desc="a").model_dump() for shot in shots])
+            for shot in shots:
+                _write_json(os.path.join(tmp, "shots", f"{shot.idx}", "shot_description.json"), shot.model_dump())
+            _write_json(os.path.join(tmp, "camera_tree.json"), [
+                Camera(idx=0, active_shot_idxs=[0, 2]).model_dump(),
+                Camera(idx=1, active_shot_idxs=[1], parent_cam_idx=0, parent_shot_idx=0).model_dump(),
+            ])
+            for done in ("first_frame.png", "video.mp4"):
+                open(os.path.join(tmp, "shots", "0", done), "wb").close()
+            pipeline.latency_stats.record("ImageGenerator", 10.0)
+
+            plan = pipeline.plan_render(script="unused once the storyboard exists")
+
+            # The selection may be settled locally without its LLM call, so the
+            # counts are an upper bound rather than exact.
+            self.assertFalse(plan["exact"])
+            # One batched selection for camera 0's two following frames, two
+            # candidates per frame, one transition video for camera 1 and two clips.
+            self.assertEqual(plan["estimate"]["request_counts"], {"llm": 1, "image": 4, "video": 3})
+            self.assertIn(os.path.join(tmp, "final_video.mp4"), plan["missing_artifacts"])
+            self.assertNotIn(os.path.join(tmp, "shots", "0", "video.mp4"), plan["missing_artifacts"])
+            self.assertEqual(plan["estimate"]["latency_seconds"]["image"]["seconds"], 10.0)
+            self.assertEqual(len(plan["estimate"]["quota_warnings"]), 1)
+            with open(os.path.join(tmp, "render_plan.json"), encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["estimate"], plan["estimate"])
+
+    def test_fresh_render_is_estimated_from_the_script(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = self._pipeline(tmp, new_camera_strategy="image_edit")
+
+            plan = pipeline.plan_render(script="x" * 900)
+
+            self.assertFalse(plan["exact"])
+            purposes = [request["purpose"] for request in plan["requests"]]
+            self.assertEqual(purposes[:4], ["extract_characters", "storyboard", "decompose", "camera_tree"])
+            self.assertEqual(plan["estimate"]["request_counts"]["video"], 3)
+            self.assertGreater(plan["estimate"]["llm_tokens"], 0)
+
+    def test_idea_dry_run_does_not_create_scene_dirs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Idea2VideoPipeline(chat_model=object(), image_generator=ImageGenerator(), video_generator=VideoGenerator(), working_dir=tmp)
+            _write_json(os.path.join(tmp, "script.json"), ["x" * 300, "y" * 300])
+
+            plan = pipeline.plan_render()
+
+            self.assertGreater(plan["estimate"]["request_counts"]["video"], 0)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "scene_0")))
+            self.assertFalse(os.path.exists(os.path.join(tmp, "scene_1")))
+
+    def test_latency_samples_are_saved_in_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "latency_stats.json")
+            stats = LatencyStats(path, save_every=3)
+
+            stats.record("ImageGenerator", 1.0)
+            stats.record("ImageGenerator", 2.0)
+            self.assertFalse(os.path.exists(path))
+            stats.record("ImageGenerator", 3.0)
+            self.assertEqual(LatencyStats(path).count("ImageGenerator"), 3)
+            stats.record("ImageGenerator", 4.0)
+            stats.flush()
+            self.assertEqual(LatencyStats(path).mean("ImageGenerator"), 2.5)
+
+    def test_rate_limit_bounds_the_stage_time(self):
+        plan = RenderPlan(working_dir="w")
+        for idx in range(5):
+            plan.add("video", "video_clip", "videos", [f"{idx}.mp4"])
+        plan.extend_chain("videos", ["video"])
+
+        estimate = plan.estimate({"video": ProviderLimits(name="v", max_requests_per_minute=1)})
+
+        # The limiter lets one request through per minute; the last then takes 180s.
+        self.assertEqual(estimate["stages"]["videos"]["seconds"], 4 * 60 + 180)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch
+
+from tenacity import retry, stop_after_attempt
+
+from utils.rate_limiter import RateLimiter
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryBudget
+from utils.retry import retry_counting_successes, stop_on_retry_budget
+
+
+class HTTPError(RuntimeError):
+    def __init__(self, code):
+        self.code = code
+        super().__init__(f"HTTP {code}")
+
+
+class CircuitBreakerTests(unittest.IsolatedAsyncioTestCase):
+    def test_opens_after_consecutive_failures_and_probes_once(self):
+        breaker = CircuitBreaker("p", failure_threshold=2, reset_seconds=0)
+        breaker.record_failure()
+        breaker.check()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+        breaker.check()  # the reset time has passed: this call is the probe
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+        breaker.record_success()
+
+        self.assertEqual(breaker.state, "closed")
+        breaker.check()
+
+    async def test_slot_fails_fast_while_open_and_ignores_bad_requests(self):
+        breaker = CircuitBreaker("p", failure_threshold=2, reset_seconds=60)
+        limiter = RateLimiter(circuit_breaker=breaker)
+        for _ in range(3):
+            with self.assertRaises(HTTPError):
+                async with limiter.slot():
+                    raise HTTPError(400)
+        self.assertEqual(breaker.state, "closed")
+
+        for _ in range(2):
+            with self.assertRaises(HTTPError):
+                async with limiter.slot():
+                    raise HTTPError(503)
+
+        with self.assertRaises(CircuitOpenError):
+            async with limiter.slot():
+                self.fail("an open circuit must not let the call through")
+        self.assertEqual(breaker.rejected, 1)
+
+
+class RetryBudgetTests(unittest.TestCase):
+    def test_retries_are_capped_by_recent_successes(self):
+        budget = RetryBudget(ratio=0.5, min_retries=1)
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        for _ in range(4):
+            budget.record_success()
+
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        self.assertEqual(budget.stats()["denied"], 2)
+
+    def test_successes_outside_the_window_are_dropped_without_retries(self):
+        budget = RetryBudget(window_seconds=60)
+        with patch("utils.resilience.time.monotonic", return_value=0.0):
+            for _ in range(100):
+                budget.record_success()
+        with patch("utils.resilience.time.monotonic", return_value=120.0):
+            budget.record_success()
+
+        self.assertEqual(len(budget.successes), 1)
+
+    def test_tenacity_retries_stop_when_the_budget_is_spent(self):
+        calls = []
+
+        @retry(stop=stop_after_attempt(5) | stop_on_retry_budget, reraise=True)
+        def flaky():
+            calls.append(1)
+            raise HTTPError(503)
+
+        with patch("utils.retry.RETRY_BUDGET", RetryBudget(min_retries=2)):
+            with self.assertRaises(HTTPError):
+                flaky()
+        self.assertEqual(len(calls), 3)
+
+    def test_calls_outside_a_limiter_slot_earn_retries(self):
+        outcomes = [None] * 4 + [HTTPError(503)] * 4
+
+        @retry(stop=stop_after_attempt(5) | stop_on_retry_budget, retry=retry_counting_successes, reraise=True)
+        def llm_call():
+            outcome = outcomes.pop(0)
+            if outcome is not None:
+                raise outcome
+
+        budget = RetryBudget(ratio=0.5, min_retries=0)
+        with patch("utils.retry.RETRY_BUDGET", budget):
+            for _ in range(4):
+                llm_call()
+            with self.assertRaises(HTTPError):
+                llm_call()
+        self.assertEqual(budget.stats()["successes"], 4)
+        self.assertEqual(budget.stats()["retries"], 2)
+
+    def test_open_circuit_is_not_retried(self):
+        calls = []
+
+        @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, reraise=True)
+        def blocked():
+            calls.append(1)
+            raise CircuitOpenError("p", 30)
+
+        with self.assertRaises(CircuitOpenError):
+            blocked()
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
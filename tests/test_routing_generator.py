@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tenacity import retry, stop_after_attempt
+
+from tools.render_backend import RenderBackend
+from tools.routing_generator import HEDGE_MIN_SAMPLES, UNHEALTHY_AFTER_FAILURES, RoutingGenerator
+from utils.resilience import RetryBudget
+from utils.retry import stop_on_retry_budget
+
+
+class FakeVideoGenerator:
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_single_video(self, prompt, reference_image_paths=[], **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        progress = kwargs.get("progress")
+        if progress is not None:
+            progress(self.name)
+        return self.name
+
+
+class FailsOnceVideoGenerator(FakeVideoGenerator):
+    async def generate_single_video(self, prompt, reference_image_paths=[], **kwargs):
+        if self.calls == 0:
+            self.calls += 1
+            raise RuntimeError("HTTP 503")
+        return await super().generate_single_video(prompt, reference_image_paths, **kwargs)
+
+
+class RetryingVideoGenerator(FakeVideoGenerator):
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, reraise=True)
+    async def generate_single_video(self, prompt, reference_image_paths=[], **kwargs):
+        return await super().generate_single_video(prompt, reference_image_paths, **kwargs)
+
+
+class RoutingGeneratorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_fails_over_to_the_next_provider(self):
+        broken = FakeVideoGenerator("broken", error=RuntimeError("503"))
+        backup = FakeVideoGenerator("backup")
+        router = RoutingGenerator([broken, backup], names=["broken", "backup"])
+
+        self.assertEqual(await router.generate_single_video(prompt="p"), "backup")
+        self.assertEqual(router.health["broken"].failures, 1)
+        self.assertEqual(router.health["backup"].successes, 1)
+
+    async def test_repeated_failures_bench_a_provider(self):
+        broken = FakeVideoGenerator("broken", error=RuntimeError("503"))
+        backup = FakeVideoGenerator("backup")
+        router = RoutingGenerator([broken, backup], names=["broken", "backup"])
+        for _ in range(UNHEALTHY_AFTER_FAILURES + 2):
+            await router.generate_single_video(prompt="p")
+
+        self.assertEqual(broken.calls, UNHEALTHY_AFTER_FAILURES)
+        self.assertFalse(router.health_report()["broken"]["healthy"])
+
+    async def test_slow_request_is_hedged_past_its_p95(self):
+        slow = FakeVideoGenerator("slow")
+        fast = FakeVideoGenerator("fast")
+        router = RoutingGenerator([slow, fast], names=["slow", "fast"])
+        for _ in range(HEDGE_MIN_SAMPLES):
+            router.latency_stats.record("slow", 0.02)
+        slow.delay = 1.0
+
+        result = await asyncio.wait_for(router.generate_single_video(prompt="p"), timeout=0.5)
+
+        self.assertEqual(result, "fast")
+        self.assertEqual(slow.cancelled, 1)
+        self.assertEqual(router.health["fast"].hedges, 1)
+        self.assertEqual(router.health["fast"].hedge_wins, 1)
+
+    async def test_fails_over_without_retrying_in_place(self):
+        broken = RetryingVideoGenerator("broken", error=RuntimeError("503"))
+        backup = FakeVideoGenerator("backup")
+        router = RoutingGenerator([broken, backup], names=["broken", "backup"])
+
+        self.assertEqual(await router.generate_single_video(prompt="p"), "backup")
+        self.assertEqual(broken.calls, 1)
+
+    async def test_retries_once_every_provider_has_failed(self):
+        first = FailsOnceVideoGenerator("first")
+        second = FailsOnceVideoGenerator("second")
+        router = RoutingGenerator([first, second], names=["first", "second"])
+
+        # A fresh budget, not the one earlier tests in this process spent.
+        with patch("tools.routing_generator.EXHAUSTED_RETRY_BACKOFF_SECONDS", 0.0), \
+             patch("tools.routing_generator.RETRY_BUDGET", RetryBudget()):
+            self.assertEqual(await router.generate_single_video(prompt="p"), "first")
+        self.assertEqual((first.calls, second.calls), (2, 1))
+
+    async def test_last_provider_keeps_its_own_retries(self):
+        broken = RetryingVideoGenerator("broken", error=RuntimeError("503"))
+        flaky = RetryingVideoGenerator("flaky", error=RuntimeError("503"))
+        router = RoutingGenerator([broken, flaky], names=["broken", "flaky"])
+
+        with patch("tools.routing_generator.EXHAUSTED_RETRY_ATTEMPTS", 0), \
+             patch("utils.retry.RETRY_BUDGET", RetryBudget()), \
+             self.assertRaises(RuntimeError):
+            await router.generate_single_video(prompt="p")
+        self.assertEqual((broken.calls, flaky.calls), (1, 3))
+
+    async def test_only_the_primary_reports_progress(self):
+        slow = FakeVideoGenerator("slow")
+        fast = FakeVideoGenerator("fast")
+        router = RoutingGenerator([slow, fast], names=["slow", "fast"])
+        for _ in range(HEDGE_MIN_SAMPLES):
+            router.latency_stats.record("slow", 0.02)
+        slow.delay = 0.1
+        fast.delay = 0.05
+        reported = []
+
+        await router.generate_single_video(prompt="p", progress=reported.append)
+
+        # The hedge won, but its progress is not mixed into the primary's.
+        self.assertEqual(router.health["fast"].hedge_wins, 1)
+        self.assertEqual(reported, [])
+
+    async def test_no_hedge_without_latency_history(self):
+        slow = FakeVideoGenerator("slow", delay=0.05)
+        fast = FakeVideoGenerator("fast")
+        router = RoutingGenerator([slow, fast], names=["slow", "fast"])
+
+        self.assertEqual(await router.generate_single_video(prompt="p"), "slow")
+        self.assertEqual(fast.calls, 0)
+
+    def test_render_backend_builds_a_router_from_a_providers_list(self):
+        section = {"class_path": "tests.test_routing_generator.FakeVideoGenerator", "init_args": {"name": "x"}}
+        backend = RenderBackend.from_config({
+            "image_generator": section,
+            "video_generator": {"providers": [section, section], "hedge_percentile": 90},
+        })
+
+        self.assertIsInstance(backend.video_generator, RoutingGenerator)
+        self.assertEqual(backend.video_generator.names, ["FakeVideoGenerator#0", "FakeVideoGenerator#1"])
+        self.assertEqual(backend.video_generator.hedge_percentile, 90)
+
+    async def test_router_seeded_from_disk_hedges_its_first_slow_call(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "router_latency.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"FakeVideoGenerator#0": {"samples": [0.02] * HEDGE_MIN_SAMPLES}}, f)
+            backend = RenderBackend.from_config({
+                "image_generator": {"class_path": "tests.test_routing_generator.FakeVideoGenerator", "init_args": {"name": "x"}},
+                "video_generator": {
+                    "providers": [
+                        {"class_path": "tests.test_routing_generator.FakeVideoGenerator", "init_args": {"name": "slow", "delay": 1.0}},
+                        {"class_path": "tests.test_routing_generator.FakeVideoGenerator", "init_args": {"name": "fast"}},
+                    ],
+                    "latency_stats_path": path,
+                },
+            })
+
+            result = await asyncio.wait_for(backend.video_generator.generate_single_video(prompt="p"), timeout=0.5)
+
+            self.assertEqual(result, "fast")
+            self.assertEqual(backend.video_generator.health["FakeVideoGenerator#1"].hedge_wins, 1)
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertIn("FakeVideoGenerator#1", json.load(f))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
+import asyncio
 import tempfile
 import unittest
 from pathlib import Path
 
-from interfaces import Camera, ShotBriefDescription, ShotDescription
-from pipelines.script2video_pipeline import Script2VideoPipeline, _group_shots_into_cameras
+import numpy as np
+from PIL import Image
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from interfaces import Camera, ImageOutput, ShotBriefDescription, ShotDescription
+from agents.storyboard_artist import CONTINUED_CAMERA_IDX, StoryboardArtist, split_script_into_beats
+from pipelines.script2video_pipeline import Script2VideoPipeline, _cameras_for_shots, _frames_for_shots, _group_shots_into_cameras
+from tools.render_backend import RenderBackend
 
 
 class FlakyCameraImageGenerator:
@@ -17,6 +25,70 @@ class FlakyCameraImageGenerator:
         return cameras
 
 
+def _shot_description(shot):
+    return ShotDescription(idx=shot.idx, is_last=shot.is_last, cam_idx=shot.cam_idx, visual_desc=shot.visual_desc, variation_type="small", variation_reason="same", ff_desc="f", ff_vis_char_idxs=[], lf_desc="l", lf_vis_char_idxs=[], motion_desc="m", audio_desc=shot.audio_desc)
+
+
+class BatchingStoryboardArtist:
+    def __init__(self, fail_batches=False):
+        self.fail_batches = fail_batches
+        self.batch_sizes = []
+        self.single_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _track(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+
+    async def decompose_visual_descriptions_batch(self, shot_brief_descs, characters, retry_timeout=240):
+        await self._track()
+        self.batch_sizes.append(len(shot_brief_descs))
+        if self.fail_batches:
+            raise ValueError("bad batch")
+        return [_shot_description(shot) for shot in shot_brief_descs]
+
+    async def decompose_visual_description(self, shot_brief_desc, characters, retry_timeout=150):
+        await self._track()
+        self.single_calls += 1
+        return _shot_description(shot_brief_desc)
+
+
+class ChunkedStoryboardArtist:
+    def __init__(self):
+        self.contexts = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def design_storyboard_chunk(self, script_chunk, characters, user_requirement=None, preceding_context=None, retry_timeout=150):
+        self.contexts[script_chunk] = preceding_context
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        # Every chunk numbers its cameras from 0; "beat C" opens on the camera
+        # the previous chunk ended with, then cuts to a new one.
+        cam_idxs = [CONTINUED_CAMERA_IDX, 0] if script_chunk == "beat C" else [0, 1]
+        return [
+            ShotBriefDescription(idx=0, is_last=False, cam_idx=cam_idxs[0], visual_desc=f"{script_chunk} wide", audio_desc="none"),
+            ShotBriefDescription(idx=1, is_last=True, cam_idx=cam_idxs[1], visual_desc=f"{script_chunk} close", audio_desc="none"),
+        ]
+
+
+class StreamingStoryboardArtist(BatchingStoryboardArtist):
+    async def stream_storyboard(self, script, characters, shot_queue, user_requirement=None, retry_timeout=150):
+        streamed = [
+            ShotBriefDescription(idx=0, is_last=False, cam_idx=0, visual_desc="wide", audio_desc="none"),
+            ShotBriefDescription(idx=1, is_last=True, cam_idx=0, visual_desc="draft close", audio_desc="none"),
+        ]
+        for shot in streamed:
+            await shot_queue.put(shot)
+            await asyncio.sleep(0)
+        return [streamed[0], ShotBriefDescription(idx=1, is_last=True, cam_idx=0, visual_desc="final close", audio_desc="none")]
+
+
 class Script2VideoPipelineGuardTests(unittest.IsolatedAsyncioTestCase):
     def test_group_shots_into_cameras_does_not_use_camera_idx_as_list_index(self):
         shots = [
@@ -57,6 +129,221 @@ class Script2VideoPipelineGuardTests(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(result["camera_tree"][0].idx, 3)
             self.assertTrue((Path(tmp) / "camera_tree.json").exists())
 
+    async def test_decompose_visual_descriptions_batches_under_concurrency_cap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Script2VideoPipeline(chat_model=object(), image_generator=object(), video_generator=object(), working_dir=tmp, decompose_max_concurrency=2, decompose_batch_size=3)
+            pipeline.storyboard_artist = BatchingStoryboardArtist()
+            shots = [ShotBriefDescription(idx=idx, is_last=idx == 9, cam_idx=0, visual_desc=f"shot {idx}", audio_desc="none") for idx in range(10)]
+            Path(tmp, "shots", "4").mkdir(parents=True)
+            Path(tmp, "shots", "4", "shot_description.json").write_text(_shot_description(shots[4]).model_dump_json(), encoding="utf-8")
+
+            result = await pipeline.decompose_visual_descriptions(shots, characters=[], quiet=True)
+
+            self.assertEqual([shot.idx for shot in result], list(range(10)))
+            self.assertEqual(sum(pipeline.storyboard_artist.batch_sizes) + pipeline.storyboard_artist.single_calls, 9)
+            self.assertLessEqual(max(pipeline.storyboard_artist.batch_sizes), 3)
+            self.assertLessEqual(pipeline.storyboard_artist.max_in_flight, 2)
+            for idx in range(10):
+                self.assertTrue((Path(tmp) / "shots" / str(idx) / "shot_description.json").exists())
+                self.assertTrue(pipeline.shot_desc_events[idx].is_set())
+
+    async def test_decompose_visual_descriptions_falls_back_to_single_shots(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Script2VideoPipeline(chat_model=object(), image_generator=object(), video_generator=object(), working_dir=tmp, decompose_max_concurrency=1, decompose_batch_size=4)
+            pipeline.storyboard_artist = BatchingStoryboardArtist(fail_batches=True)
+            shots = [ShotBriefDescription(idx=idx, is_last=idx == 3, cam_idx=0, visual_desc=f"shot {idx}", audio_desc="none") for idx in range(4)]
+
+            result = await pipeline.decompose_visual_descriptions(shots, characters=[], quiet=True)
+
+            self.assertEqual([shot.idx for shot in result], [0, 1, 2, 3])
+            self.assertEqual(pipeline.storyboard_artist.batch_sizes, [4])
+            self.assertEqual(pipeline.storyboard_artist.single_calls, 4)
+
+    async def test_batch_decomposition_with_wrong_shots_is_not_retried(self):
+        calls = []
+
+        def reply(prompt):
+            calls.append(prompt)
+            return AIMessage(content='{"decompositions": []}')
+
+        artist = StoryboardArtist(chat_model=RunnableLambda(reply))
+        shots = [ShotBriefDescription(idx=idx, is_last=idx == 1, cam_idx=0, visual_desc=f"shot {idx}", audio_desc="none") for idx in range(2)]
+
+        with self.assertRaisesRegex(ValueError, "expected exactly"):
+            await artist.decompose_visual_descriptions_batch(shots, characters=[])
+        self.assertEqual(len(calls), 1)
+
+    async def test_design_storyboard_in_chunks_renumbers_and_persists_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Script2VideoPipeline(chat_model=object(), image_generator=object(), video_generator=object(), working_dir=tmp)
+            pipeline.storyboard_artist = ChunkedStoryboardArtist()
+            chunks_dir = Path(tmp) / "storyboard_chunks"
+            chunks_dir.mkdir()
+            saved = [ShotBriefDescription(idx=0, is_last=True, cam_idx=0, visual_desc="beat A saved", audio_desc="none")]
+            (chunks_dir / "chunk_0.json").write_text("[" + saved[0].model_dump_json() + "]", encoding="utf-8")
+
+            storyboard = await pipeline.design_storyboard_in_chunks(["beat A", "beat B", "beat C"], characters=[], user_requirement="", quiet=True)
+
+            self.assertEqual([shot.idx for shot in storyboard], [0, 1, 2, 3, 4])
+            # Beat B's camera 0 is a new camera, not beat A's; beat C explicitly
+            # continues beat B's last camera.
+            self.assertEqual([shot.cam_idx for shot in storyboard], [0, 1, 2, 2, 3])
+            self.assertEqual(pipeline.storyboard_artist.max_in_flight, 2)
+            self.assertEqual([shot.is_last for shot in storyboard], [False, False, False, False, True])
+            self.assertNotIn("beat A", pipeline.storyboard_artist.contexts)
+            self.assertIn("beat A saved", pipeline.storyboard_artist.contexts["beat B"])
+            # Beat B is designed alongside, so beat C gets the end of its script.
+            self.assertIn("End of the previous part of the script: beat B", pipeline.storyboard_artist.contexts["beat C"])
+            self.assertTrue((chunks_dir / "chunk_2.json").exists())
+
+    async def test_streamed_shots_are_decomposed_before_storyboard_returns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Script2VideoPipeline(chat_model=object(), image_generator=object(), video_generator=object(), working_dir=tmp)
+            pipeline.storyboard_artist = StreamingStoryboardArtist()
+
+            storyboard = await pipeline.design_storyboard("short script", characters=[], user_requirement="", quiet=True)
+
+            self.assertEqual([shot.visual_desc for shot in storyboard], ["wide", "final close"])
+            # Both streamed shots are flushed as one batch call when the stream ends.
+            self.assertEqual(pipeline.storyboard_artist.batch_sizes, [2])
+            self.assertEqual(pipeline.storyboard_artist.single_calls, 0)
+            self.assertTrue((Path(tmp) / "shots" / "0" / "shot_description.json").exists())
+            # The streamed draft of shot 1 differs from the final storyboard, so it must be redone.
+            self.assertFalse((Path(tmp) / "shots" / "1" / "shot_description.json").exists())
+
+    def test_split_script_into_beats_keeps_beats_whole(self):
+        script = "INT. ROOM - DAY\n\nAlice enters.\n\n" + "Bob talks. " * 20 + "\n\nThey leave."
+        chunks = split_script_into_beats(script, max_chars=60)
+        self.assertEqual(chunks[0], "INT. ROOM - DAY\n\nAlice enters.")
+        self.assertEqual(chunks[-1], "They leave.")
+        self.assertEqual(len(chunks), 3)
+
+
+class EditingCameraImageGenerator:
+    def __init__(self, image):
+        self.image = image
+        self.edits = 0
+
+    async def generate_new_camera_image_by_edit(self, first_shot_visual_desc, second_shot_visual_desc, first_shot_ff_path):
+        self.edits += 1
+        return ImageOutput(fmt="pil", ext="png", data=self.image)
+
+
+class NewCameraImageEditTests(unittest.IsolatedAsyncioTestCase):
+    async def _edit(self, tmp, parent, edited):
+        pipeline = Script2VideoPipeline(chat_model=object(), image_generator=object(), video_generator=object(), working_dir=tmp, new_camera_strategy="image_edit")
+        pipeline.camera_image_generator = EditingCameraImageGenerator(edited)
+        parent_path = str(Path(tmp) / "parent.png")
+        parent.save(parent_path)
+        new_camera_image_path = str(Path(tmp) / "shots" / "1" / "new_camera_1.png")
+        shots = [
+            ShotDescription(idx=idx, is_last=idx == 1, cam_idx=idx, visual_desc=f"shot {idx}", variation_type="small", variation_reason="same", ff_desc="f", ff_vis_char_idxs=[], lf_desc="l", lf_vis_char_idxs=[], motion_desc="m", audio_desc="a")
+            for idx in range(2)
+        ]
+        camera = Camera(idx=1, active_shot_idxs=[1], parent_cam_idx=0, parent_shot_idx=0)
+        await pipeline.generate_new_camera_image_by_edit(camera, shots, parent_path, new_camera_image_path)
+        return pipeline, new_camera_image_path
+
+    async def test_consistent_edit_becomes_the_new_camera_image(self):
+        rng = np.random.default_rng(0)
+        scene = Image.fromarray(rng.integers(40, 215, size=(540, 960, 3), dtype=np.uint8))
+        parent = scene.crop((0, 0, 800, 450))
+        reframed = scene.crop((160, 90, 960, 540)).transpose(Image.FLIP_LEFT_RIGHT)
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline, new_camera_image_path = await self._edit(tmp, parent, reframed)
+
+            self.assertEqual(pipeline.camera_image_generator.edits, 1)
+            self.assertTrue(Path(new_camera_image_path).exists())
+
+    async def test_unchanged_copy_is_rejected_for_the_transition_video_fallback(self):
+        rng = np.random.default_rng(1)
+        parent = Image.fromarray(rng.integers(40, 215, size=(450, 800, 3), dtype=np.uint8))
+        with tempfile.TemporaryDirectory() as tmp:
+            _, new_camera_image_path = await self._edit(tmp, parent, parent.copy())
+
+            self.assertFalse(Path(new_camera_image_path).exists())
+
+
+class RenderTierTests(unittest.TestCase):
+    def test_draft_tier_uses_draft_generators_and_its_own_render_dir(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            final_image, final_video, draft_image = object(), object(), object()
+            pipeline = Script2VideoPipeline(chat_model=object(), image_generator=final_image, video_generator=final_video, working_dir=tmp, draft_image_generator=draft_image, render_tier="draft")
+
+            self.assertIs(pipeline.frame_image_generator, draft_image)
+            self.assertIs(pipeline.camera_image_generator.image_generator, draft_image)
+            # No draft video generator configured: the draft tier keeps the final one.
+            self.assertIs(pipeline.video_generator, final_video)
+            self.assertEqual(pipeline.image_size, "800x450")
+            self.assertEqual(pipeline.render_dir, str(Path(tmp) / "draft"))
+
+            pipeline.set_render_tier("final")
+
+            self.assertIs(pipeline.frame_image_generator, final_image)
+            self.assertEqual(pipeline.camera_image_generator.image_size, "1600x900")
+            self.assertEqual(pipeline.render_dir, tmp)
+
+    def test_promoted_shots_reuse_draft_reference_selections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Script2VideoPipeline(chat_model=object(), image_generator=object(), video_generator=object(), working_dir=tmp)
+            outside = str(Path(tmp).parent / "portraits" / "alice.png")
+            draft_output = {
+                "reference_image_path_and_text_pairs": [[str(Path(tmp) / "draft" / "shots" / "0" / "first_frame.png"), "frame"], [outside, "portrait"]],
+                "text_prompt": "p",
+            }
+
+            retargeted = pipeline._retarget_selector_output(draft_output)
+
+            self.assertEqual(retargeted["reference_image_path_and_text_pairs"], [(str(Path(tmp) / "shots" / "0" / "first_frame.png"), "frame"), (outside, "portrait")])
+            self.assertEqual(retargeted["text_prompt"], "p")
+
+    def test_promoting_a_shot_renders_its_camera_ancestors(self):
+        camera_tree = [
+            Camera(idx=0, active_shot_idxs=[0, 3]),
+            Camera(idx=1, active_shot_idxs=[1], parent_cam_idx=0, parent_shot_idx=0),
+            Camera(idx=2, active_shot_idxs=[2, 4], parent_cam_idx=1, parent_shot_idx=1),
+            Camera(idx=3, active_shot_idxs=[5], parent_cam_idx=0, parent_shot_idx=3),
+        ]
+
+        self.assertEqual([camera.idx for camera in _cameras_for_shots(camera_tree, [4])], [0, 1, 2])
+        self.assertEqual([camera.idx for camera in _cameras_for_shots(camera_tree, [3])], [0])
+        # Ancestor cameras only render the parent shots' first frames.
+        self.assertEqual(_frames_for_shots(camera_tree, [4]), {(4, "first_frame"), (4, "last_frame"), (0, "first_frame"), (1, "first_frame")})
+
+    def test_backend_builds_draft_generators_from_config(self):
+        section = {"class_path": "tests.test_script2video_pipeline_guards.ConfiguredGenerator", "init_args": {"name": "x"}}
+        config = {
+            "image_generator": section,
+            "video_generator": section,
+            "draft": {"image_generator": {**section, "init_args": {"name": "draft"}}, "image_size": "640x360"},
+        }
+
+        backend = RenderBackend.from_config(config)
+
+        self.assertEqual(backend.draft_image_generator.name, "draft")
+        self.assertIsNone(backend.draft_video_generator)
+        self.assertEqual(backend.draft_image_size, "640x360")
+
+    def test_backend_raises_draft_size_to_the_provider_minimum(self):
+        section = {"class_path": "tests.test_script2video_pipeline_guards.MinimumSizeGenerator", "init_args": {"name": "x"}}
+
+        default = RenderBackend.from_config({"image_generator": section, "video_generator": section})
+        too_small = RenderBackend.from_config({"image_generator": section, "video_generator": section, "draft": {"image_size": "800x450"}})
+
+        for size in (default.draft_image_size, too_small.draft_image_size):
+            width, height = (int(value) for value in size.split("x"))
+            self.assertGreaterEqual(width * height, MinimumSizeGenerator.MIN_IMAGE_PIXELS)
+            self.assertAlmostEqual(width / height, 16 / 9, places=2)
+
+
+class ConfiguredGenerator:
+    def __init__(self, name):
+        self.name = name
+
+
+class MinimumSizeGenerator(ConfiguredGenerator):
+    MIN_IMAGE_PIXELS = 1024 * 1024
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from contextlib import suppress
+
+from tools.render_backend import _build_rate_limiter
+from utils.rate_limiter import RateLimiter
+from utils.shared_quota import SharedQuota, quota_key
+
+
+class SharedQuotaTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "quota.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _limiter(self, **kwargs):
+        # Each limiter stands in for a separate process with its own memory.
+        return RateLimiter(shared_quota=SharedQuota("provider:key", path=self.path), **kwargs)
+
+    async def test_processes_share_one_budget(self):
+        first = self._limiter(max_requests_per_day=2)
+        second = self._limiter(max_requests_per_day=2)
+        await first.acquire()
+        await second.acquire()
+
+        blocked = asyncio.create_task(first.acquire())
+        await asyncio.sleep(0.05)
+        self.assertFalse(blocked.done())
+        blocked.cancel()
+        with suppress(asyncio.CancelledError):
+            await blocked
+
+    async def test_a_pause_reaches_every_process(self):
+        first = self._limiter()
+        second = self._limiter()
+        first.pause(0.2)
+
+        waited = await second.acquire()
+
+        self.assertGreaterEqual(waited, 0.15)
+
+    async def test_slot_caps_concurrency_across_processes(self):
+        first = self._limiter(max_concurrent=1)
+        second = self._limiter(max_concurrent=1)
+        async with first.slot():
+            blocked = asyncio.create_task(second.slot().__aenter__())
+            await asyncio.sleep(0.05)
+            self.assertFalse(blocked.done())
+        await asyncio.wait_for(blocked, timeout=1)
+
+    def test_leases_of_dead_or_expired_holders_are_reclaimed(self):
+        quota = SharedQuota("provider:key", path=self.path)
+        with sqlite3.connect(self.path) as connection:
+            # A crashed process: no such pid.
+            connection.execute("INSERT INTO leases VALUES ('dead', 'provider:key', 2147483646, ?)", (time.time() + 60,))
+        self.assertIsNotNone(quota.acquire_lease(1))
+
+        expiring = SharedQuota("other", path=self.path, lease_ttl=0)
+        self.assertIsNotNone(expiring.acquire_lease(1))
+        self.assertIsNotNone(expiring.acquire_lease(1))
+
+    def test_a_locked_store_does_not_block_the_caller(self):
+        quota = SharedQuota("provider:key", path=self.path)
+        buckets = [("minute", 10.0, 1.0)]
+        holder = sqlite3.connect(self.path, isolation_level=None)
+        holder.execute("BEGIN IMMEDIATE")
+        try:
+            started = time.monotonic()
+            self.assertGreater(quota.take(buckets, 1), 0)
+            self.assertEqual(quota.take(buckets, 1, commit=False), 0.0)
+            self.assertIsNone(quota.acquire_lease(1))
+            quota.pause(60)
+            self.assertLess(time.monotonic() - started, 1.0)
+        finally:
+            holder.execute("COMMIT")
+            holder.close()
+
+        # The pause was finished in the background once the lock was gone.
+        deadline = time.monotonic() + 5
+        while quota.take(buckets, 1, commit=False) == 0.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreater(quota.take(buckets, 1, commit=False), 30)
+
+    def test_accounts_are_keyed_without_storing_the_api_key(self):
+        self.assertNotEqual(quota_key("tools.A", "k1"), quota_key("tools.A", "k2"))
+        self.assertNotIn("secret", quota_key("tools.A", "secret"))
+
+        limiter = _build_rate_limiter({"class_path": "tools.A", "init_args": {"api_key": "k"}, "shared_quota": self.path})
+        self.assertEqual(limiter.shared_quota.key, quota_key("tools.A", "k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from tools.video_generator_doubao_seedance_yunwu_api import VideoGeneratorDoubaoSeedanceYunwuAPI
+from utils.task_group import DependencyEvent, DependencyFailed, fail_events, run_task_group
+
+
+class TaskGroupTests(unittest.IsolatedAsyncioTestCase):
+    async def test_first_failure_cancels_siblings_and_is_raised_unwrapped(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def broken():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            await run_task_group([slow(), broken()])
+        self.assertTrue(cancelled.is_set())
+
+    async def test_results_come_back_in_order(self):
+        async def value(x, delay):
+            await asyncio.sleep(delay)
+            return x
+
+        self.assertEqual(await run_task_group([value(1, 0.02), value(2, 0)]), [1, 2])
+
+    async def test_failed_dependency_releases_its_waiters(self):
+        frame = DependencyEvent("first_frame of shot 0")
+        waiter = asyncio.create_task(frame.wait())
+        await asyncio.sleep(0)
+
+        fail_events([frame, asyncio.Event()], RuntimeError("HTTP 500"))
+
+        with self.assertRaises(DependencyFailed) as caught:
+            await waiter
+        self.assertIn("first_frame of shot 0", str(caught.exception))
+
+    async def test_root_cause_wins_over_dependency_failures(self):
+        frame = DependencyEvent("frame")
+
+        async def parent():
+            error = RuntimeError("parent failed")
+            fail_events([frame], error)
+            raise error
+
+        with self.assertRaisesRegex(RuntimeError, "parent failed"):
+            await run_task_group([frame.wait(), parent()])
+
+
+class UpstreamCancelTests(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_render_cancels_the_submitted_video_task(self):
+        generator = VideoGeneratorDoubaoSeedanceYunwuAPI(api_key="k")
+        polling = asyncio.Event()
+
+        async def never_finishes(task_id):
+            polling.set()
+            await asyncio.sleep(60)
+
+        cancel = AsyncMock()
+        with patch.object(generator, "create_video_generation_task", AsyncMock(return_value="task-1")), \
+                patch.object(generator, "query_video_generation_task", never_finishes), \
+                patch.object(generator, "cancel_video_generation_task", cancel):
+            render = asyncio.create_task(generator.generate_single_video(prompt="p", reference_image_paths=[]))
+            await polling.wait()
+            render.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await render
+
+        cancel.assert_awaited_once_with("task-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
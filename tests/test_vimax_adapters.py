@@ -14,6 +14,7 @@ from agent_runtime.vimax_adapters import ViMaxAdapters
 from agent_runtime.tools import ToolRuntimeContext
 from pipelines.idea2video_pipeline import Idea2VideoPipeline
 from pipelines.script2video_pipeline import Script2VideoPipeline
+from utils.deadline import with_deadline
 
 
 class FakeIdeaPipeline:
@@ -52,23 +53,29 @@ class FakeRevisionModel:
 
 
 class FailRenderIdeaPipeline(FakeIdeaPipeline):
-    async def __call__(self, idea, user_requirement, style, quiet=False):
+    async def __call__(self, idea, user_requirement, style, quiet=False, deadline_seconds=None):
         raise RuntimeError("render failed")
 
 
 class FailRender403IdeaPipeline(FakeIdeaPipeline):
-    async def __call__(self, idea, user_requirement, style, quiet=False):
+    async def __call__(self, idea, user_requirement, style, quiet=False, deadline_seconds=None):
         raise RuntimeError("OpenRouter video create failed with HTTP 403: {'error': {'message': 'Key limit exceeded (total limit). Manage it using token sk-short', 'code': 403}}")
 
 
 class NoisyRenderIdeaPipeline(FakeIdeaPipeline):
-    async def __call__(self, idea, user_requirement, style, quiet=False):
+    async def __call__(self, idea, user_requirement, style, quiet=False, deadline_seconds=None):
         print("NOISE_FROM_RENDER_PIPELINE")
         final = self.working_dir / "final_video.mp4"
         final.write_text("video", encoding="utf-8")
         return str(final)
 
 
+class NonCooperativeRenderIdeaPipeline(FakeIdeaPipeline):
+    @with_deadline
+    async def __call__(self, idea, user_requirement, style, quiet=False):
+        await asyncio.sleep(10)
+
+
 class FakeScriptPipeline:
     def __init__(self, chat_model, image_generator, video_generator, working_dir):
         self.working_dir = Path(working_dir)
@@ -458,6 +465,28 @@ class ViMaxAdapterTests(unittest.IsolatedAsyncioTestCase):
             self.assertTrue(result.ok)
             self.assertNotIn("NOISE_FROM_RENDER_PIPELINE", stdout.getvalue())
 
+    async def test_render_deadline_cancels_non_cooperative_await(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SessionIndex(tmp)
+            record = index.create(idea="x")
+            root = Path(tmp) / record["working_dir"] / "idea2video"
+            (root / "scene_0" / "shots" / "0").mkdir(parents=True, exist_ok=True)
+            (root / "story.txt").write_text("story", encoding="utf-8")
+            (root / "characters.json").write_text("[]", encoding="utf-8")
+            (root / "script.json").write_text("[]", encoding="utf-8")
+            (root / "scene_0" / "storyboard.json").write_text("[]", encoding="utf-8")
+            (root / "scene_0" / "camera_tree.json").write_text("[]", encoding="utf-8")
+            (root / "scene_0" / "shots" / "0" / "shot_description.json").write_text("{}", encoding="utf-8")
+            adapter = ViMaxAdapters(Path(tmp), index)
+            with patch("agent_runtime.vimax_adapters._build_chat_model", return_value=object()), \
+                 patch("agent_runtime.vimax_adapters._build_image_generator", return_value=object()), \
+                 patch("agent_runtime.vimax_adapters._build_video_generator", return_value=object()), \
+                 patch("agent_runtime.vimax_adapters.Idea2VideoPipeline", NonCooperativeRenderIdeaPipeline):
+                result = await asyncio.wait_for(adapter.vimax_render_video({"deadline_seconds": 0.05}), timeout=5)
+            self.assertFalse(result.ok)
+            self.assertEqual(result.metadata["error_type"], "render_failed")
+            self.assertIn("did not finish within", result.metadata["error"])
+
     async def test_render_dependency_missing(self):
         with tempfile.TemporaryDirectory() as tmp:
             index = SessionIndex(tmp)
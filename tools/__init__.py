@@ -1,6 +1,9 @@
 # rendering abstraction
 from .protocols import ImageGenerator, VideoGenerator
 from .render_backend import RenderBackend
+from .candidate_image_generator import CandidateImageGenerator, ImageQualityGate
+from .routing_generator import RoutingGenerator
+from .key_pool import KeyPool
 
 # image generators
 from .image_generator_doubao_seedream_yunwu_api import ImageGeneratorDoubaoSeedreamYunwuAPI
@@ -23,6 +26,10 @@ __all__ = [
     "ImageGenerator",
     "VideoGenerator",
     "RenderBackend",
+    "CandidateImageGenerator",
+    "ImageQualityGate",
+    "RoutingGenerator",
+    "KeyPool",
     "ImageGeneratorDoubaoSeedreamYunwuAPI",
     "ImageGeneratorNanobananaGoogleAPI",
     "ImageGeneratorNanobananaYunwuAPI",
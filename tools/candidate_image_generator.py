@@ -0,0 +1,187 @@
+"""CandidateImageGenerator: race several image requests, keep the first good one.
+
+Wraps any ImageGenerator. Each call requests ``candidates`` images at once
+(as concurrent calls, or as one ``n>1`` request when the wrapped generator
+offers ``generate_multiple_images``), runs every image through a cheap local
+quality gate as it arrives, returns the first one that passes and cancels
+the requests still in flight. URL outputs are downloaded first, so they go
+through the gate too, and are returned as the downloaded image. When no
+candidate passes, the best-scoring one is returned so a frame is never lost
+to the gate alone.
+"""
+
+import asyncio
+import base64
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, List, Optional, Tuple
+
+import cv2
+from PIL import Image
+
+from interfaces.image_output import ImageOutput
+from utils.image import fetch_image
+from utils.image_quality import ImageQuality, assess_pil_image
+
+
+@dataclass
+class ImageQualityGate:
+    """Local accept/reject rule for a freshly generated image.
+
+    Sharpness is the Laplacian variance measured by assess_pil_image; the
+    aspect ratio is checked against the requested ``size``/``aspect_ratio``
+    when one is known.
+    """
+
+    min_sharpness: float = 30.0
+    min_exposure: float = 0.5
+    aspect_ratio_tolerance: float = 0.1
+
+    def check(self, quality: ImageQuality, expected_aspect_ratio: Optional[float] = None) -> Tuple[bool, float]:
+        """Return (passed, score); the score ranks candidates when none pass."""
+        aspect_ok = expected_aspect_ratio is None or abs(quality.aspect_ratio / expected_aspect_ratio - 1.0) <= self.aspect_ratio_tolerance
+        passed = aspect_ok and quality.sharpness >= self.min_sharpness and quality.exposure >= self.min_exposure
+        score = min(1.0, quality.sharpness / self.min_sharpness) + quality.exposure + (1.0 if aspect_ok else 0.0)
+        return passed, score
+
+
+class CandidateImageGenerator:
+    """ImageGenerator that returns the first of several candidates to pass a quality gate."""
+
+    def __init__(
+        self,
+        image_generator: Any,
+        candidates: int = 2,
+        gate: Optional[ImageQualityGate] = None,
+        cost_per_request: float = 1.0,
+    ):
+        self.image_generator = image_generator
+        self.candidates = max(1, candidates)
+        self.gate = gate or ImageQualityGate()
+        self.cost_per_request = cost_per_request
+
+        self.requests = 0
+        self.cancelled = 0
+        self.accepted = 0
+
+    @property
+    def cost_per_accepted_frame(self) -> float:
+        """Requests issued per returned frame, times ``cost_per_request``.
+
+        Cancelled requests are counted: providers may bill them anyway.
+        """
+        return self.requests * self.cost_per_request / self.accepted if self.accepted else 0.0
+
+    async def generate_single_image(
+        self,
+        prompt: str,
+        reference_image_paths: List[str],
+        **kwargs,
+    ) -> ImageOutput:
+        expected_aspect_ratio = _expected_aspect_ratio(kwargs.get("size"), kwargs.get("aspect_ratio"))
+        if self.candidates > 1 and hasattr(self.image_generator, "generate_multiple_images"):
+            image = await self._generate_batched(prompt, reference_image_paths, expected_aspect_ratio, **kwargs)
+        else:
+            image = await self._generate_racing(prompt, reference_image_paths, expected_aspect_ratio, **kwargs)
+        self.accepted += 1
+        logging.info(f"Candidate image accepted; {self.requests} requests for {self.accepted} frames (cost per accepted frame {self.cost_per_accepted_frame:.2f})")
+        return image
+
+    async def _generate_racing(self, prompt, reference_image_paths, expected_aspect_ratio, **kwargs) -> ImageOutput:
+        tasks = [
+            asyncio.create_task(self.image_generator.generate_single_image(prompt=prompt, reference_image_paths=reference_image_paths, **kwargs))
+            for _ in range(self.candidates)
+        ]
+        self.requests += len(tasks)
+
+        fallback: Optional[Tuple[float, ImageOutput]] = None
+        last_error: Optional[BaseException] = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    image = await _fetched(await next_done)
+                except Exception as e:
+                    logging.warning(f"Candidate image request failed: {e}")
+                    last_error = e
+                    continue
+                passed, score = self._check(image, expected_aspect_ratio)
+                if passed:
+                    return image
+                if fallback is None or score > fallback[0]:
+                    fallback = (score, image)
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            self.cancelled += len(pending)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if fallback is None:
+            raise last_error or RuntimeError("No candidate image was generated")
+        logging.warning("No candidate image passed the quality gate; using the best-scoring one.")
+        return fallback[1]
+
+    async def _generate_batched(self, prompt, reference_image_paths, expected_aspect_ratio, **kwargs) -> ImageOutput:
+        images = await self.image_generator.generate_multiple_images(
+            prompt=prompt,
+            reference_image_paths=reference_image_paths,
+            n=self.candidates,
+            **kwargs,
+        )
+        self.requests += self.candidates
+        if not images:
+            raise RuntimeError("No candidate image was generated")
+        checked = []
+        last_error: Optional[BaseException] = None
+        for image in images:
+            try:
+                image = await _fetched(image)
+            except Exception as e:
+                logging.warning(f"Candidate image download failed: {e}")
+                last_error = e
+                continue
+            passed, score = self._check(image, expected_aspect_ratio)
+            if passed:
+                return image
+            checked.append((score, image))
+        if not checked:
+            raise last_error or RuntimeError("No candidate image was generated")
+        logging.warning("No candidate image passed the quality gate; using the best-scoring one.")
+        return max(checked, key=lambda item: item[0])[1]
+
+    def _check(self, image: ImageOutput, expected_aspect_ratio: Optional[float]) -> Tuple[bool, float]:
+        return self.gate.check(assess_pil_image(_image_output_to_pil(image)), expected_aspect_ratio)
+
+
+async def _fetched(image: ImageOutput) -> ImageOutput:
+    """The image itself, or for a URL output the downloaded image, so the gate can inspect it."""
+    if image.fmt != "url":
+        return image
+    return ImageOutput(fmt="pil", ext=image.ext, data=await asyncio.to_thread(fetch_image, image.data))
+
+
+def _image_output_to_pil(image: ImageOutput) -> Image.Image:
+    if image.fmt == "pil":
+        return image.data
+    if image.fmt == "b64":
+        data = image.data.split(",", 1)[-1] if image.data.startswith("data:") else image.data
+        return Image.open(BytesIO(base64.b64decode(data)))
+    if image.fmt == "np":
+        return Image.fromarray(cv2.cvtColor(image.data, cv2.COLOR_BGR2RGB))
+    raise ValueError(f"Cannot inspect an image output of format {image.fmt!r}")
+
+
+def _expected_aspect_ratio(size: Any, aspect_ratio: Any) -> Optional[float]:
+    for value, separators in ((size, "x*"), (aspect_ratio, ":")):
+        if not isinstance(value, str):
+            continue
+        for separator in separators:
+            if separator in value:
+                width, _, height = value.lower().partition(separator)
+                try:
+                    return int(width) / int(height)
+                except (ValueError, ZeroDivisionError):
+                    return None
+    return None
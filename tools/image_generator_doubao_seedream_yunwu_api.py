@@ -5,12 +5,20 @@ import logging
 import aiohttp
 from typing import List, Optional
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
-from utils.retry import after_func
+from utils.retry import after_func, stop_on_retry_budget
+from utils.deadline import cap_timeout
 from utils.image import image_path_to_b64
 from interfaces.image_output import ImageOutput
 
 
+# aiohttp's default total timeout, kept unless the deadline is tighter.
+IMAGE_REQUEST_TIMEOUT_SECONDS = 300.0
+
+
 class ImageGeneratorDoubaoSeedreamYunwuAPI:
+    # Smallest image (width * height) the endpoint accepts.
+    MIN_IMAGE_PIXELS = 1024 * 1024
+
     def __init__(
         self,
         api_key: str,
@@ -23,7 +31,7 @@ class ImageGeneratorDoubaoSeedreamYunwuAPI:
 
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
         wait=wait_exponential(multiplier=1, max=30),
         retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
         reraise=True,
@@ -64,7 +72,8 @@ class ImageGeneratorDoubaoSeedreamYunwuAPI:
             "Content-Type": "application/json",
         }
 
-        async with aiohttp.ClientSession() as session:
+        timeout = aiohttp.ClientTimeout(total=cap_timeout(IMAGE_REQUEST_TIMEOUT_SECONDS, "an image request"))
+        async with aiohttp.ClientSession(timeout=timeout) as session:
             async with session.post(self.base_url, json=payload, headers=headers) as response:
                 response_json = await response.json()
                 if response.status >= 400:
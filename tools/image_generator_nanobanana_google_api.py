@@ -1,7 +1,7 @@
 # https://ai.google.dev/gemini-api/docs/image-generation
 
-import logging
 import asyncio
+import logging
 from PIL import Image
 from typing import List, Optional
 from google import genai
@@ -11,8 +11,9 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from interfaces.image_output import ImageOutput
 from tools.image_orientation import ensure_not_portrait, landscape_guard_requested
 from tools.image_response import image_from_response_part
-from utils.retry import after_func
-from utils.rate_limiter import RateLimiter
+from utils.deadline import cap_timeout
+from utils.retry import after_func, stop_on_retry_budget
+from utils.rate_limiter import RateLimiter, retry_after_from_error
 
 
 class ImageGeneratorNanobananaGoogleAPI:
@@ -22,12 +23,13 @@ class ImageGeneratorNanobananaGoogleAPI:
         rate_limiter: Optional[RateLimiter] = None,
     ):
         self.model = "gemini-2.5-flash-image"
-        self.rate_limiter = rate_limiter
+        # Also created without configured limits, so 429s pause every caller.
+        self.rate_limiter = rate_limiter or RateLimiter()
         self.client = genai.Client(
             api_key=api_key,
         )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10), after=after_func, reraise=True)
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, wait=wait_exponential(multiplier=1, min=1, max=10), after=after_func, reraise=True)
     async def generate_single_image(
         self,
         prompt: str,
@@ -42,36 +44,31 @@ class ImageGeneratorNanobananaGoogleAPI:
 
         logging.info(f"Calling {self.model} to generate image...")
 
-        # Apply rate limiting if configured
-        if self.rate_limiter:
-            await self.rate_limiter.acquire()
-
         reference_images = [Image.open(path) for path in reference_image_paths]
 
-        # Retry logic for rate limit errors
-        max_retries = 3
-        retry_delay = 5
-
-        for attempt in range(max_retries):
+        # A 429 pauses the shared limiter, so when the @retry above tries
+        # again this call and every other caller wait out the same window.
+        async with self.rate_limiter.slot():
             try:
-                response = await self.client.aio.models.generate_content(
-                    model=self.model,
-                    contents=reference_images + [prompt],
-                    config=types.GenerateContentConfig(
-                        response_modalities=["IMAGE"],
-                        image_config=types.ImageConfig(
-                            aspect_ratio=aspect_ratio,
+                response = await asyncio.wait_for(
+                    self.client.aio.models.generate_content(
+                        model=self.model,
+                        contents=reference_images + [prompt],
+                        config=types.GenerateContentConfig(
+                            response_modalities=["IMAGE"],
+                            image_config=types.ImageConfig(
+                                aspect_ratio=aspect_ratio,
+                            ),
                         ),
                     ),
+                    timeout=cap_timeout(None, "an image request"),
                 )
-                break
             except ClientError as e:
-                if e.status_code == 429 and attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    logging.warning(f"Rate limit hit (429), retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise
+                # Reported inside the slot so adaptive concurrency sees the overload.
+                if e.code == 429:
+                    wait_time = self.rate_limiter.report_rate_limited(retry_after_from_error(e))
+                    logging.warning(f"Rate limit hit (429), pausing requests for {wait_time:.1f}s")
+                raise
 
         image = None
         text = ""
@@ -1,5 +1,6 @@
 # https://ai.google.dev/gemini-api/docs/image-generation?hl=zh-cn
 
+import asyncio
 import logging
 from PIL import Image
 from typing import List, Optional
@@ -9,7 +10,8 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from interfaces.image_output import ImageOutput
 from tools.image_orientation import ensure_not_portrait, landscape_guard_requested
 from tools.image_response import image_from_response_part
-from utils.retry import after_func
+from utils.deadline import cap_timeout
+from utils.retry import after_func, stop_on_retry_budget
 
 
 class ImageGeneratorNanobananaYunwuAPI:
@@ -29,7 +31,7 @@ class ImageGeneratorNanobananaYunwuAPI:
         self.model = model
 
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10), after=after_func, reraise=True)
+    @retry(stop=stop_after_attempt(3) | stop_on_retry_budget, wait=wait_exponential(multiplier=1, min=1, max=10), after=after_func, reraise=True)
     async def generate_single_image(
         self,
         prompt: str,
@@ -45,15 +47,18 @@ class ImageGeneratorNanobananaYunwuAPI:
 
         reference_images = [Image.open(path) for path in reference_image_paths]
 
-        response = await self.client.aio.models.generate_content(
-            model=self.model,
-            contents=reference_images + [prompt],
-            config=types.GenerateContentConfig(
-                response_modalities=["TEXT", "IMAGE"],
-                image_config=types.ImageConfig(
-                    aspect_ratio=aspect_ratio,
+        response = await asyncio.wait_for(
+            self.client.aio.models.generate_content(
+                model=self.model,
+                contents=reference_images + [prompt],
+                config=types.GenerateContentConfig(
+                    response_modalities=["TEXT", "IMAGE"],
+                    image_config=types.ImageConfig(
+                        aspect_ratio=aspect_ratio,
+                    ),
                 ),
             ),
+            timeout=cap_timeout(None, "an image request"),
         )
 
         image = None
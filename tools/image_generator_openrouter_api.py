@@ -13,9 +13,10 @@ from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponen
 
 from interfaces.image_output import ImageOutput
 from tools.image_orientation import ensure_not_portrait, landscape_guard_requested
+from utils.deadline import cap_timeout
 from utils.image import image_path_to_b64
 from utils.rate_limiter import RateLimiter
-from utils.retry import after_func
+from utils.retry import after_func, stop_on_retry_budget
 
 
 class OpenRouterImageAPIError(RuntimeError):
@@ -61,12 +62,13 @@ class ImageGeneratorOpenRouterAPI:
         self.quality = quality
         self.background = background
         self.output_compression = output_compression
-        self.rate_limiter = rate_limiter
+        # Also created without configured limits, so 429s pause every caller.
+        self.rate_limiter = rate_limiter or RateLimiter()
         self.http_referer = http_referer
         self.app_title = app_title
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
         wait=wait_exponential(multiplier=1, min=1, max=10),
         retry=retry_if_exception(_is_retryable_image_error),
         after=after_func,
@@ -79,11 +81,38 @@ class ImageGeneratorOpenRouterAPI:
         aspect_ratio: str | None = "16:9",
         **kwargs: Any,
     ) -> ImageOutput:
+        images = await self._generate(prompt, reference_image_paths, aspect_ratio, n=1, **kwargs)
+        return images[0]
+
+    @retry(
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        retry=retry_if_exception(_is_retryable_image_error),
+        after=after_func,
+        reraise=True,
+    )
+    async def generate_multiple_images(
+        self,
+        prompt: str,
+        reference_image_paths: List[str] | None = None,
+        n: int = 2,
+        aspect_ratio: str | None = "16:9",
+        **kwargs: Any,
+    ) -> List[ImageOutput]:
+        """Generate ``n`` alternatives of one prompt in a single request."""
+        return await self._generate(prompt, reference_image_paths, aspect_ratio, n=n, **kwargs)
+
+    async def _generate(
+        self,
+        prompt: str,
+        reference_image_paths: List[str] | None,
+        aspect_ratio: str | None,
+        n: int,
+        **kwargs: Any,
+    ) -> List[ImageOutput]:
         references = list(reference_image_paths or [])
         if len(references) > 16:
             raise ValueError("OpenRouter GPT Image supports at most 16 reference images")
-        if self.rate_limiter is not None:
-            await self.rate_limiter.acquire()
 
         enforce_landscape = landscape_guard_requested(
             size=kwargs.get("size"),
@@ -95,7 +124,7 @@ class ImageGeneratorOpenRouterAPI:
         payload: dict[str, Any] = {
             "model": self.model,
             "prompt": request_prompt,
-            "n": 1,
+            "n": n,
             "quality": kwargs.get("quality", self.quality),
             "background": kwargs.get("background", self.background),
         }
@@ -115,26 +144,31 @@ class ImageGeneratorOpenRouterAPI:
             f"Generating image with {self.model}",
             {"model": self.model, "reference_count": len(references)},
         )
-        timeout = aiohttp.ClientTimeout(total=_request_timeout_seconds())
-        status, response = await _post_json(
-            f"{self.base_url}/images",
-            headers=self._headers(),
-            payload=payload,
-            timeout=timeout,
-        )
-        if status >= 400:
-            raise OpenRouterImageAPIError(status, response)
-
-        image, extension = _decode_image_response(response)
+        async with self.rate_limiter.slot():
+            # Capped after the wait for the slot, so the request fits in what is left.
+            timeout = aiohttp.ClientTimeout(total=cap_timeout(_request_timeout_seconds(), "an image request"))
+            status, response, response_headers = await _post_json(
+                f"{self.base_url}/images",
+                headers=self._headers(),
+                payload=payload,
+                timeout=timeout,
+            )
+            self.rate_limiter.report_response(status, response_headers)
+            if status >= 400:
+                raise OpenRouterImageAPIError(status, response)
+
+        decoded = [_decode_image_response(response, index) for index in range(_response_image_count(response, n))]
         if enforce_landscape:
-            ensure_not_portrait(image)
+            for image, _ in decoded:
+                ensure_not_portrait(image)
+        image = decoded[0][0]
         _emit_progress(
             progress,
             "image_completed",
             "OpenRouter image generation completed",
-            {"model": self.model, "width": image.width, "height": image.height},
+            {"model": self.model, "width": image.width, "height": image.height, "count": len(decoded)},
         )
-        return ImageOutput(fmt="pil", ext=extension, data=image)
+        return [ImageOutput(fmt="pil", ext=extension, data=image) for image, extension in decoded]
 
     def _headers(self) -> dict[str, str]:
         headers = {
@@ -153,12 +187,17 @@ def _prompt_with_landscape_requirement(prompt: str, aspect_ratio: str | None) ->
     return f"{prompt}\n\nComposition requirement: create a landscape image with an approximate {ratio} aspect ratio; the width must be greater than the height."
 
 
-def _decode_image_response(payload: Any) -> tuple[Image.Image, str]:
+def _response_image_count(payload: Any, requested: int) -> int:
+    data = payload.get("data") if isinstance(payload, dict) else None
+    return max(1, min(requested, len(data) if isinstance(data, list) else 0))
+
+
+def _decode_image_response(payload: Any, index: int = 0) -> tuple[Image.Image, str]:
     data = payload.get("data") if isinstance(payload, dict) else None
-    item = data[0] if isinstance(data, list) and data and isinstance(data[0], dict) else None
+    item = data[index] if isinstance(data, list) and len(data) > index and isinstance(data[index], dict) else None
     encoded = item.get("b64_json") if item else None
     if not isinstance(encoded, str) or not encoded:
-        raise ValueError(f"OpenRouter image response missing data[0].b64_json: {payload}")
+        raise ValueError(f"OpenRouter image response missing data[{index}].b64_json: {payload}")
     if encoded.startswith("data:"):
         encoded = encoded.split(",", 1)[-1]
     try:
@@ -184,7 +223,7 @@ async def _post_json(
     headers: dict[str, str],
     payload: dict[str, Any],
     timeout: aiohttp.ClientTimeout,
-) -> tuple[int, Any]:
+) -> tuple[int, Any, dict[str, str]]:
     async with aiohttp.ClientSession(timeout=timeout) as session:
         async with session.post(url, headers=headers, json=payload) as response:
             text = await response.text()
@@ -192,4 +231,4 @@ async def _post_json(
                 body = json.loads(text)
             except json.JSONDecodeError:
                 body = {"message": text}
-            return response.status, body
+            return response.status, body, dict(response.headers)
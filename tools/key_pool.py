@@ -0,0 +1,159 @@
+"""KeyPool: spread one provider's requests over several API keys.
+
+Wraps one generator per key, each with its own RateLimiter, since quotas
+are granted per key. A call goes to the key that can send soonest and has
+the most quota left. A key that answers 429 is paused by its own limiter
+and the call moves on to another key at once (the generator does not retry
+the 429 itself, see utils.retry.no_retries). Once every usable key has
+answered 429, the call waits for the first key to come off its pause and
+tries again, within the deadline and the retry budget. A key rejected as
+unauthorized is set aside for longer. ``usage`` reports requests and quota per key, with
+keys shown only by their last characters.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from interfaces.image_output import ImageOutput
+from interfaces.video_output import VideoOutput
+from utils.deadline import remaining
+from utils.resilience import RETRY_BUDGET, error_status
+from utils.retry import no_retries
+
+
+# How long a key rejected with 401/403 is left out before it is tried again.
+AUTH_FAILURE_COOLDOWN_SECONDS = 3600.0
+
+
+def key_label(api_key: Optional[str]) -> str:
+    """A printable name for a key that does not reveal it."""
+    if not api_key:
+        return "(no key)"
+    return f"...{api_key[-4:]}" if len(api_key) > 8 else "..."
+
+
+@dataclass
+class KeyUsage:
+    label: str
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    auth_failures: int = 0
+    excluded_until: float = 0.0
+
+
+class KeyPool:
+    """ImageGenerator / VideoGenerator that rotates across one generator per API key."""
+
+    def __init__(self, generators: List[Any], labels: Optional[List[str]] = None):
+        if not generators:
+            raise ValueError("KeyPool needs at least one generator")
+        self.generators = list(generators)
+        labels = list(labels or [f"key {idx}" for idx in range(len(self.generators))])
+        self.usage_by_key = [KeyUsage(label=label) for label in labels]
+
+    async def generate_single_image(
+        self,
+        prompt: str,
+        reference_image_paths: List[str] = [],
+        **kwargs,
+    ) -> ImageOutput:
+        return await self._call("generate_single_image", prompt=prompt, reference_image_paths=reference_image_paths, **kwargs)
+
+    async def generate_single_video(
+        self,
+        prompt: str,
+        reference_image_paths: List[str] = [],
+        **kwargs,
+    ) -> VideoOutput:
+        return await self._call("generate_single_video", prompt=prompt, reference_image_paths=reference_image_paths, **kwargs)
+
+    def usage(self) -> Dict[str, Dict[str, Any]]:
+        """Requests, failures and remaining quota per key."""
+        now = time.monotonic()
+        report = {}
+        for generator, usage in zip(self.generators, self.usage_by_key):
+            rate_limiter = getattr(generator, "rate_limiter", None)
+            report[usage.label] = {
+                "requests": usage.requests,
+                "successes": usage.successes,
+                "failures": usage.failures,
+                "rate_limited": usage.rate_limited,
+                "auth_failures": usage.auth_failures,
+                "excluded_seconds": max(0.0, usage.excluded_until - now),
+                "available_in_seconds": rate_limiter.available_in() if rate_limiter is not None else 0.0,
+                "remaining_fraction": rate_limiter.remaining_fraction() if rate_limiter is not None else 1.0,
+            }
+        return report
+
+    async def _call(self, method: str, **kwargs) -> Any:
+        tried = set()
+        rate_limited = False
+        last_error: Optional[BaseException] = None
+        while True:
+            idx = self._pick(tried)
+            if idx is None and rate_limited:
+                # Every usable key is only rate limited: wait for the first to resume.
+                idx = await self._wait_for_rate_limited_key(last_error)
+                tried.clear()
+                rate_limited = False
+            if idx is None:
+                raise last_error or RuntimeError("Every API key in the pool is excluded")
+            tried.add(idx)
+            usage = self.usage_by_key[idx]
+            usage.requests += 1
+            try:
+                with no_retries(429, 401, 403):
+                    result = await getattr(self.generators[idx], method)(**kwargs)
+            except Exception as e:
+                usage.failures += 1
+                status = error_status(e)
+                if status == 429:
+                    # The key's limiter is already paused by the generator.
+                    usage.rate_limited += 1
+                    rate_limited = True
+                elif status in (401, 403):
+                    usage.auth_failures += 1
+                    usage.excluded_until = time.monotonic() + AUTH_FAILURE_COOLDOWN_SECONDS
+                    logging.warning(f"API key {usage.label} was rejected (HTTP {status}); leaving it out for {AUTH_FAILURE_COOLDOWN_SECONDS:.0f}s")
+                else:
+                    raise
+                last_error = e
+                continue
+            usage.successes += 1
+            return result
+
+    async def _wait_for_rate_limited_key(self, last_error: BaseException) -> Optional[int]:
+        """Sleep until the non-excluded key that resumes first may send; None if no key is usable."""
+        idx = self._pick(set())
+        if idx is None:
+            return None
+        rate_limiter = getattr(self.generators[idx], "rate_limiter", None)
+        wait = rate_limiter.available_in() if rate_limiter is not None else 0.0
+        left = remaining()
+        if left is not None and wait >= left:
+            logging.warning(f"Every API key is rate limited and the next resumes in {wait:.1f}s, after the deadline")
+            raise last_error
+        if not RETRY_BUDGET.try_spend():
+            logging.warning("Every API key is rate limited and the retry budget is exhausted")
+            raise last_error
+        logging.info(f"Every API key is rate limited; waiting {wait:.1f}s for {self.usage_by_key[idx].label}")
+        await asyncio.sleep(wait)
+        return idx
+
+    def _pick(self, tried: set) -> Optional[int]:
+        """The untried, non-excluded key that can send soonest, then the one with most quota left."""
+        now = time.monotonic()
+        candidates = []
+        for idx, (generator, usage) in enumerate(zip(self.generators, self.usage_by_key)):
+            if idx in tried or usage.excluded_until > now:
+                continue
+            rate_limiter = getattr(generator, "rate_limiter", None)
+            available_in = rate_limiter.available_in() if rate_limiter is not None else 0.0
+            remaining = rate_limiter.remaining_fraction() if rate_limiter is not None else 1.0
+            candidates.append((available_in, -remaining, usage.requests, idx))
+        return min(candidates)[-1] if candidates else None
@@ -2,7 +2,8 @@
 
 Reads the ``image_generator`` and ``video_generator`` sections from a
 ViMax YAML config, instantiates the concrete classes via *class_path*,
-and wires up rate limiters.
+and wires up rate limiters. An optional ``draft`` section configures the
+cheaper generators and smaller keyframe size of the draft render tier.
 
 Usage::
 
@@ -12,51 +13,191 @@ Usage::
 """
 
 import importlib
+import inspect
 import logging
+import math
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
+from tools.key_pool import KeyPool, key_label
+from tools.routing_generator import RoutingGenerator
+from utils.adaptive_concurrency import AdaptiveConcurrency
+from utils.latency_stats import shared_latency_stats
 from utils.rate_limiter import RateLimiter
+from utils.resilience import circuit_breaker
+from utils.shared_quota import SharedQuota, quota_key
 
 
 @dataclass
 class RenderBackend:
-    """Bundles an image generator and a video generator."""
+    """Bundles an image generator and a video generator, plus optional draft-tier ones."""
 
     image_generator: Any
     video_generator: Any
+    draft_image_generator: Any = None
+    draft_video_generator: Any = None
+    draft_image_size: Optional[str] = None
 
     @classmethod
     def from_config(cls, config: Dict[str, Any]) -> "RenderBackend":
         """Build a RenderBackend from a parsed YAML config dict.
 
         Rate limiters are created from ``max_requests_per_minute`` /
-        ``max_requests_per_day`` if present in each generator section.
+        ``max_requests_per_day`` if present in each generator section, and
+        ``max_concurrent_requests`` caps the requests in flight. With
+        ``shared_quota: true`` (or a SQLite path) the limits are shared by
+        every process on the host using the same class and API key.
+        ``adaptive_concurrency: true`` (or a mapping with ``initial`` and
+        ``max``) lets the number of requests in flight follow the
+        provider's latency and 429s instead.
+        A section with a ``providers`` list instead of a ``class_path``
+        builds a RoutingGenerator over one generator per entry (each entry
+        takes the shape above), with optional ``hedge`` and
+        ``hedge_percentile`` keys. An ``api_keys`` list builds a KeyPool
+        with one generator (and rate limiter) per key. Every endpoint
+        (class, ``base_url`` and, in a KeyPool, the key) gets a circuit
+        breaker unless the section sets ``circuit_breaker: false``.
+        ``draft.image_generator`` / ``draft.video_generator`` take the same
+        shape; a missing one leaves the draft tier on the final generator.
+        A ``draft.image_size`` below the draft image generator's
+        ``MIN_IMAGE_PIXELS`` is scaled up to it; without one, such a
+        generator gets the smallest 16:9 size it accepts.
         """
         img_cfg = config["image_generator"]
         vid_cfg = config["video_generator"]
 
-        image_gen = _instantiate(img_cfg, _build_rate_limiter(img_cfg))
-        video_gen = _instantiate(vid_cfg, _build_rate_limiter(vid_cfg))
+        image_gen = _build_generator(img_cfg)
+        video_gen = _build_generator(vid_cfg)
 
         logging.info("RenderBackend: image=%s, video=%s",
-                     img_cfg["class_path"], vid_cfg["class_path"])
-
-        return cls(image_generator=image_gen, video_generator=video_gen)
-
-
-def _build_rate_limiter(section: Dict[str, Any]) -> RateLimiter | None:
+                     _describe(img_cfg), _describe(vid_cfg))
+
+        draft_cfg = config.get("draft") or {}
+        draft_img_cfg = draft_cfg.get("image_generator")
+        draft_vid_cfg = draft_cfg.get("video_generator")
+        draft_image_gen = _build_generator(draft_img_cfg) if draft_img_cfg else None
+        draft_video_gen = _build_generator(draft_vid_cfg) if draft_vid_cfg else None
+        if draft_img_cfg or draft_vid_cfg:
+            logging.info("RenderBackend draft tier: image=%s, video=%s",
+                         _describe(draft_img_cfg or img_cfg),
+                         _describe(draft_vid_cfg or vid_cfg))
+
+        return cls(
+            image_generator=image_gen,
+            video_generator=video_gen,
+            draft_image_generator=draft_image_gen,
+            draft_video_generator=draft_video_gen,
+            draft_image_size=_draft_image_size(draft_cfg.get("image_size"), draft_image_gen or image_gen),
+        )
+
+
+def _draft_image_size(size: Optional[str], generator: Any) -> Optional[str]:
+    min_pixels = _min_image_pixels(generator)
+    if not min_pixels:
+        return size
+    width, height = (int(value) for value in (size or "16x9").split("x"))
+    if size is not None and width * height >= min_pixels:
+        return size
+    scale = math.sqrt(min_pixels / (width * height))
+    fitted = f"{math.ceil(width * scale)}x{math.ceil(height * scale)}"
+    if size is not None:
+        logging.warning("Draft image size %s is below the %d pixels the draft image generator accepts; using %s.", size, min_pixels, fitted)
+    return fitted
+
+
+def _min_image_pixels(generator: Any) -> int:
+    """The largest MIN_IMAGE_PIXELS among the generator and any it wraps."""
+    wrapped = getattr(generator, "generators", None) or getattr(generator, "providers", None) or []
+    return max([getattr(generator, "MIN_IMAGE_PIXELS", 0)] + [_min_image_pixels(inner) for inner in wrapped])
+
+
+def _build_generator(section: Dict[str, Any]) -> Any:
+    providers = section.get("providers")
+    if providers:
+        return _build_router(section, providers)
+    api_keys = section.get("api_keys")
+    if api_keys:
+        key_sections = [{**section, "init_args": {**(section.get("init_args") or {}), "api_key": api_key}} for api_key in api_keys]
+        # Each key gets its own breaker: one revoked or throttled key must
+        # not open the circuit for the keys that still work.
+        return KeyPool(
+            [_instantiate(key_section, _build_rate_limiter(key_section, per_key=True)) for key_section in key_sections],
+            labels=[key_label(api_key) for api_key in api_keys],
+        )
+    return _instantiate(section, _build_rate_limiter(section))
+
+
+def _build_router(section: Dict[str, Any], providers: List[Dict[str, Any]]) -> RoutingGenerator:
+    # Without a file the p95 starts empty in every process, and a render
+    # rarely makes enough calls to earn the samples hedging needs.
+    latency_stats_path = section.get("latency_stats_path")
+    return RoutingGenerator(
+        [_build_generator(provider) for provider in providers],
+        names=[provider["class_path"].rsplit(".", 1)[-1] for provider in providers],
+        hedge=section.get("hedge", True),
+        hedge_percentile=section.get("hedge_percentile", 95.0),
+        latency_stats=shared_latency_stats(latency_stats_path) if latency_stats_path else None,
+    )
+
+
+def _describe(section: Dict[str, Any]) -> str:
+    if section.get("providers"):
+        return " | ".join(provider["class_path"] for provider in section["providers"])
+    return section["class_path"]
+
+
+def _build_rate_limiter(section: Dict[str, Any], per_key: bool = False) -> RateLimiter | None:
     rpm = section.get("max_requests_per_minute")
     rpd = section.get("max_requests_per_day")
-    if rpm or rpd:
-        return RateLimiter(max_requests_per_minute=rpm, max_requests_per_day=rpd)
+    max_concurrent = section.get("max_concurrent_requests")
+    shared = section.get("shared_quota")
+    shared_quota = None
+    if shared:
+        api_key = (section.get("init_args") or {}).get("api_key")
+        shared_quota = SharedQuota(
+            quota_key(section["class_path"], api_key),
+            path=shared if isinstance(shared, str) else None,
+        )
+    adaptive = section.get("adaptive_concurrency")
+    adaptive_concurrency = None
+    if adaptive:
+        adaptive_cfg = adaptive if isinstance(adaptive, dict) else {}
+        adaptive_concurrency = AdaptiveConcurrency(
+            name=section["class_path"].rsplit(".", 1)[-1],
+            initial=adaptive_cfg.get("initial", 2),
+            max_limit=adaptive_cfg.get("max", max_concurrent or 16),
+        )
+    breaker = None
+    if section.get("circuit_breaker", True):
+        name = _endpoint(section)
+        if per_key:
+            name = quota_key(name, (section.get("init_args") or {}).get("api_key"))
+        breaker = circuit_breaker(name)
+    if rpm or rpd or max_concurrent or shared_quota is not None or adaptive_concurrency is not None or breaker is not None:
+        return RateLimiter(
+            max_requests_per_minute=rpm,
+            max_requests_per_day=rpd,
+            max_concurrent=max_concurrent,
+            shared_quota=shared_quota,
+            adaptive_concurrency=adaptive_concurrency,
+            circuit_breaker=breaker,
+        )
     return None
 
 
+def _endpoint(section: Dict[str, Any]) -> str:
+    base_url = (section.get("init_args") or {}).get("base_url")
+    return f"{section['class_path']}@{base_url}" if base_url else section["class_path"]
+
+
 def _instantiate(section: Dict[str, Any], rate_limiter: RateLimiter | None) -> Any:
     module_path, cls_name = section["class_path"].rsplit(".", 1)
     cls = getattr(importlib.import_module(module_path), cls_name)
     init_args = dict(section.get("init_args", {}))
-    if rate_limiter is not None:
+    # Generators without a rate_limiter argument cannot use one; that is only
+    # an error when the section asked for limits explicitly.
+    accepts_limiter = "rate_limiter" in inspect.signature(cls).parameters
+    explicit_limits = any(section.get(key) for key in ("max_requests_per_minute", "max_requests_per_day", "max_concurrent_requests"))
+    if rate_limiter is not None and (accepts_limiter or explicit_limits):
         init_args["rate_limiter"] = rate_limiter
     return cls(**init_args)
@@ -2,6 +2,7 @@ from typing import List
 import aiohttp
 import asyncio
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from utils.retry import stop_on_retry_budget
 import logging
 
 
@@ -19,7 +20,7 @@ class RerankerBgeSiliconapi:
 
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
         wait=wait_exponential(multiplier=1, max=30),
         retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
         reraise=True,
@@ -0,0 +1,218 @@
+"""RoutingGenerator: one generator interface over several providers.
+
+Wraps image or video generators that serve the same protocol. A call goes
+to the healthiest provider first and fails over to the next one when it
+raises; while untried providers remain, the providers' own retries are
+disabled (see utils.retry.no_retries) so a failure reaches the router at
+once. Once every provider has failed, the healthiest one is retried with
+backoff, within the retry budget and the deadline. Once a call has run longer than
+the provider's p95 latency, a hedged duplicate goes to the next provider
+and whichever finishes first wins; the other request is cancelled. Only
+the primary request reports progress. A provider that keeps failing is
+benched for a while and only tried after the healthy ones.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from interfaces.image_output import ImageOutput
+from interfaces.video_output import VideoOutput
+from utils.deadline import remaining
+from utils.latency_stats import LatencyStats
+from utils.resilience import RETRY_BUDGET
+from utils.retry import no_retries
+
+
+# Consecutive failures after which a provider is benched, and for how long.
+UNHEALTHY_AFTER_FAILURES = 3
+UNHEALTHY_COOLDOWN_SECONDS = 120.0
+# Successful calls a provider needs before its p95 is trusted as the hedge trigger.
+HEDGE_MIN_SAMPLES = 10
+# Retries of the healthiest provider once every provider has failed, and the
+# first backoff between them (doubled each time).
+EXHAUSTED_RETRY_ATTEMPTS = 2
+EXHAUSTED_RETRY_BACKOFF_SECONDS = 2.0
+
+
+@dataclass
+class ProviderHealth:
+    name: str
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    unhealthy_until: float = 0.0
+    last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+
+class RoutingGenerator:
+    """ImageGenerator / VideoGenerator that fails over and hedges across providers."""
+
+    def __init__(
+        self,
+        providers: List[Any],
+        names: Optional[List[str]] = None,
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        latency_stats: Optional[LatencyStats] = None,
+    ):
+        if not providers:
+            raise ValueError("RoutingGenerator needs at least one provider")
+        self.providers = list(providers)
+        names = list(names or [type(provider).__name__ for provider in self.providers])
+        # Two sections may use the same class (e.g. with different keys).
+        self.names = [name if names.count(name) == 1 else f"{name}#{idx}" for idx, name in enumerate(names)]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.latency_stats = latency_stats or LatencyStats()
+        self.health = {name: ProviderHealth(name=name) for name in self.names}
+
+    async def generate_single_image(
+        self,
+        prompt: str,
+        reference_image_paths: List[str] = [],
+        **kwargs,
+    ) -> ImageOutput:
+        return await self._route("generate_single_image", prompt=prompt, reference_image_paths=reference_image_paths, **kwargs)
+
+    async def generate_single_video(
+        self,
+        prompt: str,
+        reference_image_paths: List[str] = [],
+        **kwargs,
+    ) -> VideoOutput:
+        return await self._route("generate_single_video", prompt=prompt, reference_image_paths=reference_image_paths, **kwargs)
+
+    def health_report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider counters, health and latency, e.g. for logs or a dashboard."""
+        report = {}
+        for name, health in self.health.items():
+            report[name] = {
+                **asdict(health),
+                "healthy": health.healthy,
+                "mean_latency_seconds": self.latency_stats.mean(name),
+                "p95_latency_seconds": self.latency_stats.percentile(name, 95),
+            }
+        return report
+
+    async def _route(self, method: str, **kwargs) -> Any:
+        queue = self._order()
+        running: Dict[asyncio.Task, int] = {}
+        hedged = False
+        exhausted_retries = 0
+        last_error: Optional[BaseException] = None
+        try:
+            while True:
+                if not running:
+                    if not queue:
+                        if last_error is None or not await self._wait_to_retry(exhausted_retries, last_error):
+                            raise last_error or RuntimeError("No provider could serve the request")
+                        queue = [self._healthiest()]
+                        exhausted_retries += 1
+                    primary = queue.pop(0)
+                    primary_started = time.monotonic()
+                    # The last untried provider may retry in place; the router has nowhere else to go.
+                    fail_fast = bool(queue) or exhausted_retries > 0
+                    running[asyncio.create_task(self._call(primary, method, kwargs, fail_fast))] = primary
+
+                hedge_delay = None
+                if self.hedge and not hedged and queue and len(running) == 1:
+                    hedge_delay = self._hedge_delay(primary)
+                    if hedge_delay is not None:
+                        hedge_delay = max(0.0, hedge_delay - (time.monotonic() - primary_started))
+                done, _ = await asyncio.wait(running, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    backup = queue.pop(0)
+                    self.health[self.names[backup]].hedges += 1
+                    logging.info(f"{self.names[primary]} is past its p{self.hedge_percentile:g} latency; hedging with {self.names[backup]}")
+                    # The duplicate stays silent so progress is not reported twice.
+                    hedge_kwargs = {key: value for key, value in kwargs.items() if key != "progress"}
+                    running[asyncio.create_task(self._call(backup, method, hedge_kwargs, fail_fast=True))] = backup
+                    continue
+
+                for task in done:
+                    idx = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        logging.warning(f"{self.names[idx]} failed ({e}); failing over")
+                        continue
+                    if idx != primary:
+                        self.health[self.names[idx]].hedge_wins += 1
+                    return result
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def _call(self, idx: int, method: str, kwargs: Dict[str, Any], fail_fast: bool = True) -> Any:
+        name = self.names[idx]
+        health = self.health[name]
+        health.requests += 1
+        started = time.monotonic()
+        try:
+            if fail_fast:
+                with no_retries():
+                    result = await getattr(self.providers[idx], method)(**kwargs)
+            else:
+                result = await getattr(self.providers[idx], method)(**kwargs)
+        except Exception as e:
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = str(e)
+            if health.consecutive_failures >= UNHEALTHY_AFTER_FAILURES and health.healthy:
+                health.unhealthy_until = time.monotonic() + UNHEALTHY_COOLDOWN_SECONDS
+                logging.warning(f"{name} failed {health.consecutive_failures} times in a row; benching it for {UNHEALTHY_COOLDOWN_SECONDS:.0f}s")
+            raise
+        health.successes += 1
+        health.consecutive_failures = 0
+        health.unhealthy_until = 0.0
+        self.latency_stats.record(name, time.monotonic() - started)
+        return result
+
+    def _order(self) -> List[int]:
+        """Healthy providers in configured order, then benched ones by how soon they return."""
+        healthy = [idx for idx, name in enumerate(self.names) if self.health[name].healthy]
+        benched = sorted(
+            (idx for idx, name in enumerate(self.names) if not self.health[name].healthy),
+            key=lambda idx: self.health[self.names[idx]].unhealthy_until,
+        )
+        return healthy + benched
+
+    def _healthiest(self) -> int:
+        """The provider with the fewest consecutive failures, healthy ones and configured order first."""
+        return min(self._order(), key=lambda idx: self.health[self.names[idx]].consecutive_failures)
+
+    async def _wait_to_retry(self, attempt: int, last_error: BaseException) -> bool:
+        """Back off before retrying after every provider failed; False if no retry is allowed."""
+        if attempt >= EXHAUSTED_RETRY_ATTEMPTS:
+            return False
+        backoff = EXHAUSTED_RETRY_BACKOFF_SECONDS * 2 ** attempt
+        left = remaining()
+        if left is not None and backoff >= left:
+            return False
+        if not RETRY_BUDGET.try_spend():
+            logging.warning(f"Every provider failed ({last_error}) and the retry budget is exhausted")
+            return False
+        logging.warning(f"Every provider failed ({last_error}); retrying the healthiest in {backoff:.1f}s")
+        await asyncio.sleep(backoff)
+        return True
+
+    def _hedge_delay(self, idx: int) -> Optional[float]:
+        name = self.names[idx]
+        if self.latency_stats.count(name) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency_stats.percentile(name, self.hedge_percentile)
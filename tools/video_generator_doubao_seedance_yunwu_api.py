@@ -3,7 +3,9 @@ from typing import List, Literal
 import asyncio
 import aiohttp
 from interfaces.video_output import VideoOutput
+from utils.deadline import check_deadline
 from utils.image import image_path_to_b64
+from utils.task_group import cancel_upstream
 
 
 class VideoGeneratorDoubaoSeedanceYunwuAPI:
@@ -152,6 +154,7 @@ class VideoGeneratorDoubaoSeedanceYunwuAPI:
         while True:
             if attempts >= self.max_poll_attempts:
                 raise TimeoutError(f"Video generation did not complete after {attempts} polls.")
+            check_deadline(f"another poll of task {task_id}")
             attempts += 1
 
             try:
@@ -183,6 +186,26 @@ class VideoGeneratorDoubaoSeedanceYunwuAPI:
                 logging.info(f"Video generation is still in progress. Checking again in {self.poll_interval} seconds...")
                 await asyncio.sleep(self.poll_interval)
 
+    async def cancel_video_generation_task(
+        self,
+        task_id: str,
+    ) -> None:
+        """
+        Cancel a submitted task so it stops using quota (the API only cancels
+        tasks that are still queued; others are merely removed).
+
+        Args:
+            task_id: Task ID to cancel
+        """
+        url = f"https://yunwu.ai/volc/v1/contents/generations/tasks/{task_id}"
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+        }
+        async with aiohttp.ClientSession() as session:
+            async with session.delete(url, headers=headers) as response:
+                if response.status >= 400:
+                    raise RuntimeError(f"Cancelling video generation task failed with HTTP {response.status}: {await response.text()}")
+
     async def generate_single_video(
         self,
         prompt: str,
@@ -207,6 +230,11 @@ class VideoGeneratorDoubaoSeedanceYunwuAPI:
             VideoOutput containing the video URL
         """
         task_id = await self.create_video_generation_task(prompt, reference_image_paths, resolution, aspect_ratio, fps, duration)
-        video_url = await self.query_video_generation_task(task_id)
+        try:
+            video_url = await self.query_video_generation_task(task_id)
+        except (asyncio.CancelledError, TimeoutError):
+            # The render gave up on this clip; don't leave the task running upstream.
+            await cancel_upstream(self.cancel_video_generation_task(task_id), f"video generation task {task_id}")
+            raise
         return VideoOutput(fmt="url", ext="mp4", data=video_url)
 
@@ -5,8 +5,11 @@ from typing import List, Optional
 import aiohttp
 
 from interfaces.video_output import VideoOutput
+from utils.deadline import check_deadline
 from utils.image import image_path_to_b64
 from utils.rate_limiter import RateLimiter
+from utils.resilience import error_status
+from utils.retry import retries_disabled
 
 
 class VideoGeneratorOmniYunwuAPI:
@@ -34,7 +37,8 @@ class VideoGeneratorOmniYunwuAPI:
         self.poll_interval = poll_interval
         self.max_poll_attempts = max_poll_attempts
         self.max_create_attempts = max_create_attempts
-        self.rate_limiter = rate_limiter
+        # Also created without configured limits, so 429s pause every caller.
+        self.rate_limiter = rate_limiter or RateLimiter()
 
     def _headers(self) -> dict:
         return {
@@ -109,20 +113,29 @@ class VideoGeneratorOmniYunwuAPI:
 
         logging.info("Calling %s to generate video...", payload["model"])
 
-        if self.rate_limiter:
-            await self.rate_limiter.acquire()
-
         url = f"{self.base_url}/v1/video/create"
         last_error = None
         for attempt in range(1, self.max_create_attempts + 1):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=self._headers(), json=payload) as response:
-                        response_json = await response.json()
-                        http_status = response.status
+                async with self.rate_limiter.slot():
+                    async with aiohttp.ClientSession() as session:
+                        async with session.post(url, headers=self._headers(), json=payload) as response:
+                            response_json = await response.json()
+                            http_status = response.status
+                            self.rate_limiter.report_response(http_status, response.headers)
+                    if http_status >= 400:
+                        # Raised inside the slot so the limiter and breaker count the failure.
+                        raise RuntimeError(f"Video generation task creation failed with HTTP {http_status}: {response_json}")
                 logging.debug("Response: %s", response_json)
             except Exception as e:
                 last_error = e
+                status = error_status(e)
+                if status == 429 and attempt < self.max_create_attempts and not retries_disabled(429):
+                    # The limiter is paused now; the next acquire waits it out.
+                    logging.warning("%s (attempt %s/%s)", e, attempt, self.max_create_attempts)
+                    continue
+                if status is not None and status < 500:
+                    raise
                 logging.error(
                     "Error occurred while creating video generation task (attempt %s/%s): %s",
                     attempt,
@@ -133,16 +146,6 @@ class VideoGeneratorOmniYunwuAPI:
                     await asyncio.sleep(attempt)
                 continue
 
-            if http_status >= 400:
-                message = f"Video generation task creation failed with HTTP {http_status}: {response_json}"
-                if http_status < 500:
-                    raise RuntimeError(message)
-                last_error = RuntimeError(message)
-                logging.error("%s (attempt %s/%s)", message, attempt, self.max_create_attempts)
-                if attempt < self.max_create_attempts:
-                    await asyncio.sleep(attempt)
-                continue
-
             task_id = response_json.get("id")
             if not task_id:
                 raise RuntimeError(f"Video generation task creation returned no task id: {response_json}")
@@ -161,6 +164,7 @@ class VideoGeneratorOmniYunwuAPI:
         while True:
             if self.max_poll_attempts is not None and attempts >= self.max_poll_attempts:
                 raise TimeoutError(f"Video generation did not complete after {attempts} polls.")
+            check_deadline(f"another poll of task {task_id}")
             attempts += 1
 
             try:
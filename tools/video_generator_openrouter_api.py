@@ -7,6 +7,7 @@ from urllib.parse import urljoin
 import aiohttp
 
 from interfaces.video_output import VideoOutput
+from utils.deadline import cap_timeout, check_deadline
 from utils.image import image_path_to_b64
 
 
@@ -60,7 +61,7 @@ class VideoGeneratorOpenRouterAPI:
     ) -> VideoOutput:
         progress = kwargs.get("progress")
         request_timeout_seconds = _env_float("VIMAX_VIDEO_REQUEST_TIMEOUT_SECONDS", 60.0)
-        query_timeout_seconds = _env_float("VIMAX_VIDEO_QUERY_TIMEOUT_SECONDS", 600.0)
+        query_timeout_seconds = cap_timeout(_env_float("VIMAX_VIDEO_QUERY_TIMEOUT_SECONDS", 600.0), "a video generation task")
         poll_interval_seconds = _env_float("VIMAX_VIDEO_POLL_INTERVAL_SECONDS", 10.0)
         duration = _env_int("VIMAX_OPENROUTER_VIDEO_DURATION", 8)
         resolution = os.environ.get("VIMAX_OPENROUTER_VIDEO_RESOLUTION", "720p")
@@ -136,6 +137,7 @@ class VideoGeneratorOpenRouterAPI:
             if status in {"failed", "cancelled", "expired"}:
                 raise RuntimeError(f"OpenRouter video generation {status} for job {job_id}: {poll_payload.get('error') or poll_payload}")
 
+        check_deadline(f"another poll of job {job_id}")
         raise RuntimeError(f"OpenRouter video generation timed out after {query_timeout_seconds:g}s for job {job_id}; last_status={last_status}; last_payload={last_payload}")
 
     def _headers(self) -> dict[str, str]:
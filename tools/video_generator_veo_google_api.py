@@ -4,8 +4,11 @@ import asyncio
 from google import genai
 from google.genai import types
 from google.genai.errors import ClientError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 from interfaces.video_output import VideoOutput
-from utils.rate_limiter import RateLimiter
+from utils.deadline import check_deadline
+from utils.rate_limiter import RateLimiter, retry_after_from_error
+from utils.retry import after_func, stop_on_retry_budget
 
 # https://ai.google.dev/gemini-api/docs/video-generation?hl=zh-cn
 
@@ -23,7 +26,8 @@ class VideoGeneratorVeoGoogleAPI:
         self.t2v_model = t2v_model
         self.ff2v_model = ff2v_model
         self.flf2v_model = flf2v_model
-        self.rate_limiter = rate_limiter
+        # Also created without configured limits, so 429s pause every caller.
+        self.rate_limiter = rate_limiter or RateLimiter()
 
         self.client = genai.Client(
             api_key=api_key,
@@ -71,33 +75,10 @@ class VideoGeneratorVeoGoogleAPI:
 
         logging.info(f"Calling {params['model']} to generate video...")
 
-        # Apply rate limiting if configured
-        if self.rate_limiter:
-            await self.rate_limiter.acquire()
-
-        # Retry logic for rate limit errors
-        max_retries = 3
-        retry_delay = 5
-
-        for attempt in range(max_retries):
-            try:
-                operation = self.client.models.generate_videos(
-                    **params,
-                    config=types.GenerateVideosConfig(**config_params),
-                )
-                break
-            except ClientError as e:
-                # google.genai.errors.ClientError exposes the HTTP status
-                # as `.code`; `.status_code` does not exist, so this line
-                # raised AttributeError and masked every real ClientError.
-                if e.code == 429 and attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    logging.warning(f"Rate limit hit (429), retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise
+        operation = await self._submit(params, config_params)
 
         while not operation.done:
+            check_deadline("another poll of the video operation")
             await asyncio.sleep(2)
             operation = self.client.operations.get(operation)
             logging.info(f"Video generation not completed, waiting 2 seconds...")
@@ -127,3 +108,28 @@ class VideoGeneratorVeoGoogleAPI:
             data=generated_video.video.video_bytes,
         )
         return video_output
+
+    @retry(
+        stop=stop_after_attempt(3) | stop_on_retry_budget,
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        retry=retry_if_exception(lambda e: isinstance(e, ClientError) and e.code == 429),
+        after=after_func,
+        reraise=True,
+    )
+    async def _submit(self, params: dict, config_params: dict):
+        # A 429 pauses the shared limiter, so the retry and every other
+        # caller wait out the same window.
+        async with self.rate_limiter.slot():
+            try:
+                return self.client.models.generate_videos(
+                    **params,
+                    config=types.GenerateVideosConfig(**config_params),
+                )
+            except ClientError as e:
+                # google.genai.errors.ClientError exposes the HTTP status
+                # as `.code`; `.status_code` does not exist. Reported
+                # inside the slot so adaptive concurrency sees the overload.
+                if e.code == 429:
+                    wait_time = self.rate_limiter.report_rate_limited(retry_after_from_error(e))
+                    logging.warning(f"Rate limit hit (429), pausing requests for {wait_time:.1f}s")
+                raise
@@ -5,6 +5,7 @@ import asyncio
 import aiohttp
 import os
 from interfaces.video_output import VideoOutput
+from utils.deadline import cap_timeout, check_deadline
 from utils.image import image_path_to_b64
 
 
@@ -67,7 +68,7 @@ class VideoGeneratorVeoYunwuAPI:
     ) -> VideoOutput:
         progress = kwargs.get("progress")
         create_retries = _env_int("VIMAX_VIDEO_CREATE_RETRIES", 3)
-        query_timeout_seconds = _env_float("VIMAX_VIDEO_QUERY_TIMEOUT_SECONDS", 600.0)
+        query_timeout_seconds = cap_timeout(_env_float("VIMAX_VIDEO_QUERY_TIMEOUT_SECONDS", 600.0), "a video generation task")
         request_timeout_seconds = _env_float("VIMAX_VIDEO_REQUEST_TIMEOUT_SECONDS", 60.0)
         poll_interval_seconds = _env_float("VIMAX_VIDEO_POLL_INTERVAL_SECONDS", 5.0)
         max_query_errors = _env_int("VIMAX_VIDEO_MAX_QUERY_ERRORS", 5)
@@ -174,4 +175,5 @@ class VideoGeneratorVeoYunwuAPI:
                 _emit_progress(progress, "video_status", f"Video generation status: {status}", {"model": model, "task_id": task_id, "status": status})
                 await asyncio.sleep(poll_interval_seconds)
                 continue
+        check_deadline(f"another poll of task {task_id}")
         raise RuntimeError(f"Video generation timed out after {query_timeout_seconds:g}s for task {task_id}; last_status={last_status}")
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+# A request slower than this multiple of the provider's typical latency is a
+# latency spike and counts as overload, provided it is also this many seconds
+# slower, so jitter on fast requests is not mistaken for one.
+LATENCY_SPIKE_RATIO = 2.5
+LATENCY_SPIKE_MIN_SECONDS = 1.0
+# Successful requests observed before latency spikes are judged at all.
+LATENCY_BASELINE_MIN_SAMPLES = 5
+# Weight of each new sample in the moving average of healthy latency.
+LATENCY_BASELINE_ALPHA = 0.1
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on requests in flight.
+
+    Every healthy request that finishes while at least half the limit is in
+    use adds 1 / limit, so a busy provider's limit grows by about one per
+    round of successes while an idle one's stays put. A timeout,
+    a 429 or a latency spike multiplies it by `decrease_factor`. Only requests
+    started after the last cut can cut it again, so one burst of failures
+    from requests that were all in flight together counts once.
+    """
+
+    def __init__(
+        self,
+        name: str = "provider",
+        initial: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.credit = 0.0
+        self.last_decrease = float("-inf")
+        self.baseline_latency: Optional[float] = None
+        self.samples = 0
+        self.increases = 0
+        self.decreases = 0
+
+    async def acquire(self) -> float:
+        """Wait for a free slot (FIFO) and return its start time."""
+        if self.in_flight >= self.limit or self.waiters:
+            future = asyncio.get_running_loop().create_future()
+            self.waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just as the caller gave up: pass the slot on.
+                    self.in_flight -= 1
+                    self._wake()
+                raise
+        else:
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, outcome: str = "ok") -> None:
+        """Free a slot and adapt the limit to how its request went.
+
+        `outcome` is "ok", "error" (a failure that says nothing about load)
+        or "overload" (a timeout or a 429).
+        """
+        latency = time.monotonic() - started
+        saturated = self.in_flight * 2 >= self.limit
+        self.in_flight -= 1
+        if outcome == "overload":
+            self._decrease(started, "overload")
+        elif outcome == "ok":
+            spike = (
+                self.samples >= LATENCY_BASELINE_MIN_SAMPLES
+                and latency > LATENCY_SPIKE_RATIO * self.baseline_latency
+                and latency - self.baseline_latency > LATENCY_SPIKE_MIN_SECONDS
+            )
+            if spike:
+                self._decrease(started, f"latency spike ({latency:.1f}s)")
+            else:
+                self._observe_latency(latency)
+                if saturated:
+                    self._increase()
+        self._wake()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": sum(1 for future in self.waiters if not future.done()),
+            "baseline_latency_seconds": self.baseline_latency or 0.0,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+    def _observe_latency(self, latency: float) -> None:
+        self.samples += 1
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency += LATENCY_BASELINE_ALPHA * (latency - self.baseline_latency)
+
+    def _increase(self) -> None:
+        if self.limit >= self.max_limit:
+            return
+        self.credit += 1.0 / self.limit
+        if self.credit >= 1.0:
+            self.credit = 0.0
+            self.limit += 1
+            self.increases += 1
+            logging.info(f"{self.name}: concurrency limit raised to {self.limit}")
+
+    def _decrease(self, started: float, reason: str) -> None:
+        if started < self.last_decrease:
+            return
+        self.last_decrease = time.monotonic()
+        self.credit = 0.0
+        limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        if limit < self.limit:
+            self.limit = limit
+            self.decreases += 1
+            logging.warning(f"{self.name}: {reason}; concurrency limit cut to {self.limit}")
+
+    def _wake(self) -> None:
+        while self.waiters and self.in_flight < self.limit:
+            future = self.waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
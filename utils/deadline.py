@@ -0,0 +1,87 @@
+"""An end-to-end deadline carried through async calls in a context variable.
+
+A pipeline or render tool opens ``deadline(seconds)``; every agent, poller
+and retry below it reads the time left through ``remaining`` or
+``cap_timeout`` instead of trusting its own fixed timeout alone. Nested
+deadlines only ever tighten the outer one, and tasks created inside the
+scope inherit it. ``with_deadline`` also cancels a call that overruns it.
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+_deadline_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("_deadline_at", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The enclosing deadline passed (or would pass) before the work could finish."""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Finish everything inside within `seconds` (None or <= 0: no new deadline).
+
+    Yields the seconds left under the effective deadline, if any.
+    """
+    if seconds is None or seconds <= 0:
+        yield remaining()
+        return
+    at = time.monotonic() + seconds
+    current = _deadline_at.get()
+    token = _deadline_at.set(at if current is None else min(current, at))
+    try:
+        yield remaining()
+    finally:
+        _deadline_at.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    at = _deadline_at.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline(what: str = "work") -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline passed {-left:.1f}s ago; not starting {what}")
+
+
+def cap_timeout(timeout: Optional[float], what: str = "work") -> Optional[float]:
+    """The smaller of `timeout` and the time left; a timeout of None or <= 0 means unbounded."""
+    left = remaining()
+    if left is None:
+        return timeout
+    check_deadline(what)
+    if timeout is None or timeout <= 0:
+        return left
+    return min(timeout, left)
+
+
+def with_deadline(func):
+    """Let an async function take a `deadline_seconds` keyword that bounds its whole run.
+
+    The call is cancelled with DeadlineExceeded once the time is up, even if
+    the code below never reads the deadline.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, deadline_seconds: Optional[float] = None, **kwargs):
+        with deadline(deadline_seconds):
+            if deadline_seconds is None or deadline_seconds <= 0:
+                return await func(*args, **kwargs)
+            timeout = asyncio.timeout(deadline_seconds)
+            try:
+                async with timeout:
+                    return await func(*args, **kwargs)
+            except TimeoutError as e:
+                if not timeout.expired():
+                    raise
+                raise DeadlineExceeded(f"{func.__name__} did not finish within {deadline_seconds:.1f}s") from e
+
+    return wrapper
@@ -4,6 +4,7 @@ import base64
 import mimetypes
 from io import BytesIO
 import cv2
+from PIL import Image
 
 from utils.retry import download_retry
 
@@ -26,6 +27,16 @@ def download_image(url, save_path):
         raise e
 
 
+@download_retry
+def fetch_image(url) -> Image.Image:
+    """Download an image into memory, e.g. to inspect it before deciding to keep it."""
+    response = requests.get(url, timeout=(10, 300))
+    response.raise_for_status()
+    image = Image.open(BytesIO(response.content))
+    image.load()
+    return image
+
+
 def image_path_to_b64(image_path, mime: bool = True) -> str:
     with open(image_path, 'rb') as image_file:
         b64 = base64.b64encode(image_file.read()).decode('utf-8')
@@ -39,6 +50,24 @@ def image_path_to_b64(image_path, mime: bool = True) -> str:
     return b64
 
 
+def image_path_to_b64_downscaled(image_path, max_dimension: int, mime: bool = True) -> str:
+    """Like image_path_to_b64, but images larger than `max_dimension` on either
+    side are shrunk (keeping the aspect ratio) and sent as JPEG."""
+    with Image.open(image_path) as image:
+        if max(image.size) <= max_dimension:
+            return image_path_to_b64(image_path, mime=mime)
+        image = image.convert("RGB")
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        buffered = BytesIO()
+        image.save(buffered, format="JPEG", quality=90)
+    b64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+    if mime:
+        return f"data:image/jpeg;base64,{b64}"
+
+    return b64
+
+
 def pil_to_b64(image, mime: bool = True) -> str:
     buffered = BytesIO()
     image.save(buffered, format="PNG")
@@ -0,0 +1,113 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+# Images are measured on a grayscale copy no wider than this, so scoring a
+# 1600x900 frame costs about as much as scoring a thumbnail.
+_ANALYSIS_MAX_DIMENSION = 512
+
+# Pixels at or beyond these gray levels count as clipped shadows/highlights.
+_CLIP_LOW = 5
+_CLIP_HIGH = 250
+
+# Weights of the combined local score; sharpness is normalised across the
+# candidates being compared, exposure and reference similarity are absolute.
+_SHARPNESS_WEIGHT = 0.35
+_EXPOSURE_WEIGHT = 0.25
+_SIMILARITY_WEIGHT = 0.4
+
+
+@dataclass
+class ImageQuality:
+    """Cheap CPU measurements of one image."""
+
+    path: str
+    width: int
+    height: int
+    sharpness: float
+    exposure: float
+    phash: int
+
+    @property
+    def aspect_ratio(self) -> float:
+        return self.width / self.height
+
+
+def assess_image(path: str) -> ImageQuality:
+    """Measure sharpness (variance of the Laplacian), exposure and a perceptual hash.
+
+    Exposure is 1.0 for a mid-toned image with no clipping and falls towards
+    0.0 as the mean drifts to black or white and more pixels clip.
+    """
+    with Image.open(path) as image:
+        return assess_pil_image(image, path=path)
+
+
+def assess_pil_image(image: Image.Image, path: str = "") -> ImageQuality:
+    """assess_image for an image already in memory."""
+    width, height = image.size
+    gray = image.convert("L")
+    gray.thumbnail((_ANALYSIS_MAX_DIMENSION, _ANALYSIS_MAX_DIMENSION))
+    pixels = np.asarray(gray, dtype=np.float32)
+
+    sharpness = float(cv2.Laplacian(pixels, cv2.CV_32F).var())
+    clipped = float(np.mean((pixels <= _CLIP_LOW) | (pixels >= _CLIP_HIGH)))
+    mean_offset = abs(float(pixels.mean()) / 255.0 - 0.5) * 2
+    exposure = max(0.0, 1.0 - clipped - 0.5 * mean_offset)
+    return ImageQuality(path=path, width=width, height=height, sharpness=sharpness, exposure=exposure, phash=perceptual_hash(pixels))
+
+
+def perceptual_hash(pixels: np.ndarray) -> int:
+    """64-bit DCT perceptual hash of a grayscale pixel array."""
+    small = cv2.resize(pixels, (32, 32), interpolation=cv2.INTER_AREA)
+    low_frequencies = cv2.dct(small)[:8, :8].flatten()
+    # The DC term only encodes overall brightness; leave it out of the median.
+    median = np.median(low_frequencies[1:])
+    bits = 0
+    for value in low_frequencies:
+        bits = (bits << 1) | int(value > median)
+    return bits
+
+
+def hash_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def score_candidates(
+    candidates: Sequence[ImageQuality],
+    references: Sequence[ImageQuality] = (),
+    expected_aspect_ratio: Optional[float] = None,
+    aspect_ratio_tolerance: float = 0.1,
+) -> List[Optional[float]]:
+    """Score candidates in [0, 1]; None marks an aspect ratio outside tolerance.
+
+    Similarity is one minus the smallest hash distance to any reference,
+    scaled by the hash length; without references it is neutral (1.0). The
+    expected aspect ratio defaults to the candidates' median.
+    """
+    if not candidates:
+        return []
+    if expected_aspect_ratio is None:
+        expected_aspect_ratio = float(np.median([candidate.aspect_ratio for candidate in candidates]))
+    max_sharpness = max(candidate.sharpness for candidate in candidates) or 1.0
+
+    scores: List[Optional[float]] = []
+    for candidate in candidates:
+        if abs(candidate.aspect_ratio / expected_aspect_ratio - 1.0) > aspect_ratio_tolerance:
+            logging.info(f"Candidate {candidate.path} has aspect ratio {candidate.aspect_ratio:.2f}, expected {expected_aspect_ratio:.2f}")
+            scores.append(None)
+            continue
+        similarity = 1.0
+        if references:
+            similarity = 1.0 - min(hash_distance(candidate.phash, reference.phash) for reference in references) / 64
+        scores.append(
+            _SHARPNESS_WEIGHT * candidate.sharpness / max_sharpness
+            + _EXPOSURE_WEIGHT * candidate.exposure
+            + _SIMILARITY_WEIGHT * similarity
+        )
+    return scores
@@ -0,0 +1,84 @@
+import json
+from typing import Any, List, Optional
+
+from utils.robust_json_parser import strip_trailing_commas
+
+
+class JsonArrayStreamParser:
+    """Pull complete objects out of a JSON array while its text is still streaming.
+
+    Feed the model output as it arrives; `feed` returns every element object
+    of the target array that has been closed since the previous call. The
+    target is the first array value of `key` (or the first array at all when
+    `key` is None). Text before the JSON, such as Markdown fences, is skipped.
+    Objects that fail to decode are dropped here; the full response is still
+    parsed normally once the stream ends.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._array_found = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Any]:
+        self._buffer += text
+        if not self._array_found and not self._find_array():
+            return []
+
+        objects = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self._done:
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # The closing bracket of the target array itself.
+                    self._done = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._object_start is not None:
+                        decoded = self._decode(buffer[self._object_start:self._pos + 1])
+                        if decoded is not None:
+                            objects.append(decoded)
+                        self._object_start = None
+            self._pos += 1
+        return objects
+
+    def _find_array(self) -> bool:
+        if self.key is None:
+            start = self._buffer.find("[")
+        else:
+            key_pos = self._buffer.find(f'"{self.key}"')
+            if key_pos == -1:
+                return False
+            start = self._buffer.find("[", key_pos)
+        if start == -1:
+            return False
+        self._array_found = True
+        self._pos = start + 1
+        return True
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(strip_trailing_commas(text))
+        except json.JSONDecodeError:
+            return None
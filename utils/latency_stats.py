@@ -0,0 +1,109 @@
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+# Samples kept per provider; older ones are dropped so the statistics follow
+# the provider's current behaviour rather than its whole history.
+LATENCY_STATS_MAX_SAMPLES = 50
+
+# A file-backed instance writes its file after this many new samples; flush
+# writes the rest, e.g. when a render ends.
+LATENCY_STATS_SAVE_EVERY = 10
+
+
+class LatencyStats:
+    """
+    Observed request latencies per provider, optionally persisted as JSON.
+
+    Providers are keyed by name (usually the generator's class name). The file
+    maps each name to its most recent samples in seconds, so a later run (or a
+    dry-run render plan) can reuse what earlier runs measured.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_samples: int = LATENCY_STATS_MAX_SAMPLES, save_every: int = LATENCY_STATS_SAVE_EVERY):
+        self.path = path
+        self.max_samples = max(1, max_samples)
+        self.save_every = max(1, save_every)
+        self.samples: Dict[str, List[float]] = {}
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            self.samples = {
+                provider: [float(seconds) for seconds in item.get("samples", [])][-self.max_samples:]
+                for provider, item in loaded.items()
+            }
+
+    def record(self, provider: str, seconds: float) -> None:
+        """Add one observed latency; a file-backed instance saves every `save_every` samples."""
+        with self.lock:
+            samples = self.samples.setdefault(provider, [])
+            samples.append(float(seconds))
+            del samples[:-self.max_samples]
+            self.unsaved += 1
+            if self.path and self.unsaved >= self.save_every:
+                self._save()
+
+    def flush(self) -> None:
+        """Persist samples recorded since the last save."""
+        with self.lock:
+            if self.path and self.unsaved:
+                self._save()
+
+    def count(self, provider: str) -> int:
+        return len(self.samples.get(provider, []))
+
+    def mean(self, provider: str) -> Optional[float]:
+        samples = self.samples.get(provider)
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        """The q-th percentile (0-100, nearest rank) of the provider's samples."""
+        samples = self.samples.get(provider)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        rank = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            provider: {
+                "count": len(samples),
+                "mean": self.mean(provider),
+                "p95": self.percentile(provider, 95),
+            }
+            for provider, samples in self.samples.items()
+            if samples
+        }
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        payload = {provider: {"samples": samples, **self.summary().get(provider, {})} for provider, samples in self.samples.items()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+
+_shared_latency_stats: Dict[str, LatencyStats] = {}
+
+
+def shared_latency_stats(path: str) -> LatencyStats:
+    """The process-wide LatencyStats backed by `path`, created on first use.
+
+    Routers that name the same file share one instance, so they neither
+    split the samples nor overwrite each other's saves. A router records
+    only a handful of slow calls per render, so it saves after every one.
+    """
+    key = os.path.abspath(path)
+    if key not in _shared_latency_stats:
+        _shared_latency_stats[key] = LatencyStats(key, save_every=1)
+    return _shared_latency_stats[key]
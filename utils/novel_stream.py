@@ -0,0 +1,212 @@
+import json
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Preferred cut points, strongest first. A chunk is cut at the last occurrence
+# of the first separator found in its second half, mirroring what
+# RecursiveCharacterTextSplitter did for the same chunk sizes.
+_SEPARATORS = ("\n\n", "\n", "。", "！", "？", ". ", "! ", "? ", " ")
+
+# Worst-case UTF-8 width, used to size the byte window that holds `chunk_size` characters.
+_MAX_UTF8_BYTES_PER_CHAR = 4
+
+
+@dataclass(frozen=True)
+class NovelChunk:
+    """A lazy view of one chunk of a memory-mapped novel.
+
+    Only the byte offsets are held; the text is decoded from the mapping each
+    time it is read, so a sequence of chunks costs a few integers per chunk
+    instead of a second copy of the novel.
+    """
+
+    stream: "NovelStream"
+    index: int
+    start: int
+    end: int
+
+    @property
+    def text(self) -> str:
+        return self.stream.read(self.start, self.end)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def manifest_entry(self) -> dict:
+        return {"index": self.index, "start": self.start, "end": self.end}
+
+
+class NovelStream:
+    """Memory-mapped, read-only access to a UTF-8 novel file.
+
+    `iter_chunks` walks the file once and yields `NovelChunk` views whose
+    offsets are byte positions in the file, so compression, embedding and any
+    other consumer can share one mapping instead of each splitting its own
+    copy of the text.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def open(self) -> None:
+        if self._file is not None:
+            return
+        self._file = open(self.path, "rb")
+        # mmap refuses zero-length files; an empty novel simply yields no chunks.
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def size(self) -> int:
+        return len(self._mmap) if self._mmap is not None else 0
+
+    def read(self, start: int, end: int) -> str:
+        if self._mmap is None:
+            return ""
+        return self._mmap[start:end].decode("utf-8", errors="replace")
+
+    def _char_boundary(self, pos: int) -> int:
+        # Step back over UTF-8 continuation bytes (0b10xxxxxx) so a window
+        # never starts or ends in the middle of a multi-byte character.
+        while 0 < pos < self.size and (self._mmap[pos] & 0xC0) == 0x80:
+            pos -= 1
+        return pos
+
+    def iter_chunks(
+        self,
+        chunk_size: int,
+        chunk_overlap: int = 0,
+        manifest_path: Optional[str] = None,
+    ) -> Iterator[NovelChunk]:
+        """Yield chunk views of at most `chunk_size` characters.
+
+        Consecutive chunks overlap by roughly `chunk_overlap` characters. When
+        `manifest_path` is given, one JSON line per chunk is appended as it is
+        yielded, so a partially consumed stream still leaves a usable manifest.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        chunk_overlap = max(0, min(chunk_overlap, chunk_size // 2))
+        self.open()
+
+        manifest = open(manifest_path, "w", encoding="utf-8") if manifest_path else None
+        try:
+            index = 0
+            start = 0
+            while start < self.size:
+                window_end = self._char_boundary(min(self.size, start + chunk_size * _MAX_UTF8_BYTES_PER_CHAR))
+                window = self.read(start, window_end)
+                cut = len(window) if len(window) <= chunk_size else self._find_cut(window, chunk_size)
+                head = window[:cut]
+                end = start + len(head.encode("utf-8"))
+
+                # Leading whitespace carries no content; skip chunks that are only whitespace.
+                if head.strip():
+                    chunk = NovelChunk(stream=self, index=index, start=start, end=end)
+                    if manifest is not None:
+                        manifest.write(json.dumps(chunk.manifest_entry()) + "\n")
+                        manifest.flush()
+                    yield chunk
+                    index += 1
+
+                if end >= self.size:
+                    break
+                next_start = end
+                if chunk_overlap:
+                    overlap_from = self._find_overlap_start(head, chunk_overlap)
+                    next_start = start + len(head[:overlap_from].encode("utf-8"))
+                start = next_start if next_start > start else end
+        finally:
+            if manifest is not None:
+                manifest.close()
+
+    @staticmethod
+    def _find_cut(window: str, chunk_size: int) -> int:
+        head = window[:chunk_size]
+        for separator in _SEPARATORS:
+            pos = head.rfind(separator, chunk_size // 2)
+            if pos != -1:
+                return pos + len(separator)
+        return chunk_size
+
+    @staticmethod
+    def _find_overlap_start(head: str, chunk_overlap: int) -> int:
+        lower = max(0, len(head) - chunk_overlap)
+        # Begin the overlap at a separator so the next chunk does not open mid-word.
+        for separator in _SEPARATORS:
+            pos = head.find(separator, lower)
+            if pos != -1 and pos + len(separator) < len(head):
+                return pos + len(separator)
+        return lower
+
+
+def merge_relevant_chunks(
+    stream: NovelStream,
+    chunk_scores: Dict[str, float],
+    chunk_offsets: Dict[str, Tuple[int, int]],
+    char_budget: Optional[int] = None,
+) -> Dict[str, float]:
+    """Merge retrieved chunks that touch or overlap in the novel into passages.
+
+    Chunks with known byte offsets are grouped into contiguous spans and
+    re-read from `stream` as one passage scored with the best chunk score in
+    it; chunks without offsets are kept as they are. If `char_budget` is set,
+    passages are kept best-first until the budget is spent (the best passage
+    is always kept). The result is ordered by position in the novel.
+    """
+    spans = sorted(
+        (chunk_offsets[text][0], chunk_offsets[text][1], score)
+        for text, score in chunk_scores.items()
+        if text in chunk_offsets
+    )
+    merged: List[List] = []
+    for start, end, score in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+            merged[-1][2] = max(merged[-1][2], score)
+        else:
+            merged.append([start, end, score])
+
+    # (position, text, score); offset-less chunks sort after every mapped passage.
+    passages = [(start, stream.read(start, end), score) for start, end, score in merged]
+    passages += [
+        (stream.size + order, text, score)
+        for order, (text, score) in enumerate(chunk_scores.items())
+        if text not in chunk_offsets
+    ]
+
+    if char_budget is not None:
+        kept = []
+        used = 0
+        for passage in sorted(passages, key=lambda item: item[2], reverse=True):
+            if kept and used + len(passage[1]) > char_budget:
+                continue
+            kept.append(passage)
+            used += len(passage[1])
+        passages = kept
+
+    return {text: score for _, text, score in sorted(passages, key=lambda item: item[0])}
@@ -1,6 +1,114 @@
 import asyncio
+import contextvars
+import email.utils
+import logging
+import re
 import time
-from typing import Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Mapping, Optional, Tuple
+
+from utils.adaptive_concurrency import AdaptiveConcurrency
+from utils.deadline import DeadlineExceeded, remaining
+from utils.resilience import RETRY_BUDGET, CircuitBreaker, counts_as_provider_failure, error_status
+from utils.shared_quota import SharedQuota
+
+
+# Shared pause after a 429 that carries no Retry-After; it doubles with each
+# further 429 until a request succeeds again.
+RATE_LIMITED_BASE_PAUSE_SECONDS = 5.0
+RATE_LIMITED_MAX_PAUSE_SECONDS = 300.0
+# Pause when a response reports an exhausted quota without saying when it resets.
+QUOTA_EXHAUSTED_PAUSE_SECONDS = 60.0
+# How often a caller waiting for a cross-process concurrency slot polls for one.
+LEASE_POLL_SECONDS = 0.25
+
+_REMAINING_HEADERS = ("x-ratelimit-remaining-requests", "x-ratelimit-remaining", "ratelimit-remaining")
+_RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-reset", "ratelimit-reset")
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+# Set by a 429 reported inside `RateLimiter.slot`, so the slot counts as overloaded.
+_slot_rate_limited: contextvars.ContextVar[Optional[List[bool]]] = contextvars.ContextVar("_slot_rate_limited", default=None)
+
+
+class _TokenBucket:
+    """Tokens refill continuously at `rate` per second up to `capacity`."""
+
+    __slots__ = ("window", "capacity", "rate", "tokens", "updated")
+
+    def __init__(self, window: str, capacity: float, rate: float, now: float):
+        self.window = window
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, weight: float) -> float:
+        """Seconds until `weight` tokens can be taken (after refill)."""
+        # A request heavier than the bucket only has to wait for a full bucket;
+        # taking it leaves the bucket in debt, which delays the requests after it.
+        needed = min(weight, self.capacity)
+        if self.tokens + 1e-9 >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+def _header(headers: Optional[Mapping[str, Any]], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    for key, value in headers.items():
+        if key.lower() == name:
+            return str(value).strip()
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After value (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a quota resets, from "20", "1.5", "6m0s", "250ms" or a Unix timestamp."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = _DURATION_RE.findall(value)
+        if not parts or "".join(number + unit for number, unit in parts) != value.replace(" ", ""):
+            return None
+        scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+        return sum(float(number) * scale[unit] for number, unit in parts)
+    if seconds > 1e9:
+        # An absolute reset time rather than a delay.
+        return max(0.0, seconds - time.time())
+    return max(0.0, seconds)
+
+
+def retry_after_from_error(exc: BaseException) -> Optional[float]:
+    """Retry-After of a failed SDK call: the response header, else a google.rpc.RetryInfo delay."""
+    response = getattr(exc, "response", None)
+    retry_after = parse_retry_after(_header(getattr(response, "headers", None), "retry-after"))
+    if retry_after is not None:
+        return retry_after
+    details = getattr(exc, "details", None)
+    error = details.get("error") if isinstance(details, dict) else None
+    for detail in (error or {}).get("details") or []:
+        if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("RetryInfo"):
+            return parse_reset(str(detail.get("retryDelay", "")))
+    return None
 
 
 class RateLimiter:
@@ -9,12 +117,43 @@ class RateLimiter:
 
     Ensures that no more than max_requests_per_minute requests are made per minute
     and no more than max_requests_per_day requests are made per day.
+
+    Each limit is a token bucket: the per-minute bucket refills at
+    max_requests_per_minute / 60 tokens per second and holds `burst` tokens
+    (1 by default, which spaces requests evenly); the per-day bucket holds a
+    full day's budget and refills at max_requests_per_day / 86400 tokens per
+    second. Callers that cannot proceed wait in FIFO order, and a single timer
+    wakes the head of the queue exactly when both buckets can serve it, so
+    `acquire` does constant work instead of scanning a log of past requests.
+
+    Generators report provider responses through `report_response`: a 429,
+    a Retry-After header or an exhausted remaining-quota header pauses the
+    limiter for every caller of the provider, so one quota hit holds the
+    whole queue back instead of each task retrying into the same limit.
+    A limiter without static limits still honours these pauses.
+
+    With a `shared_quota` the buckets, the pause and the concurrency slots
+    of `slot` live in a SQLite file shared by every process on the host that
+    uses the same provider account, so parallel sessions split one quota
+    instead of each spending all of it. The FIFO queue stays per process.
+
+    With `adaptive_concurrency` the number of requests `slot` lets run at
+    once follows the provider's health instead of a fixed constant.
+
+    With a `circuit_breaker`, `slot` fails fast with CircuitOpenError while
+    the endpoint's circuit is open, and every call it wraps reports to the
+    breaker and, when it succeeds, to the process-wide retry budget.
     """
 
     def __init__(
         self,
         max_requests_per_minute: Optional[int] = None,
-        max_requests_per_day: Optional[int] = None
+        max_requests_per_day: Optional[int] = None,
+        burst: int = 1,
+        max_concurrent: Optional[int] = None,
+        shared_quota: Optional[SharedQuota] = None,
+        adaptive_concurrency: Optional[AdaptiveConcurrency] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
         """
         Initialize the rate limiter.
@@ -24,71 +163,338 @@ class RateLimiter:
                                      If None, no per-minute limit is enforced.
             max_requests_per_day: Maximum number of requests allowed per day.
                                   If None, no per-day limit is enforced.
+            burst: How many requests may go out back to back before the
+                   per-minute spacing applies.
+            max_concurrent: How many requests `slot` lets run at once.
+                            If None, concurrency is not limited.
+            shared_quota: Keep the limiter's state in this cross-process
+                          store instead of in memory.
+            adaptive_concurrency: Let `slot` adapt the number of requests in
+                                  flight; max_concurrent then only applies
+                                  across processes.
+            circuit_breaker: Breaker of the provider endpoint the calls go to.
         """
         self.max_requests_per_minute = max_requests_per_minute
         self.max_requests_per_day = max_requests_per_day
-        self.request_times = []
+        self.max_concurrent = max_concurrent
+        self.shared_quota = shared_quota
+        self.adaptive_concurrency = adaptive_concurrency
+        self.circuit_breaker = circuit_breaker
         self.lock = asyncio.Lock()
+        self.semaphore = None
+        if max_concurrent and shared_quota is None and adaptive_concurrency is None:
+            self.semaphore = asyncio.Semaphore(max_concurrent)
 
-        # If per-minute rate limiting is enabled, calculate the minimum delay between requests
+        now = time.monotonic()
+        self.buckets: List[_TokenBucket] = []
         if max_requests_per_minute and max_requests_per_minute > 0:
             self.min_delay = 60.0 / max_requests_per_minute
+            self.buckets.append(_TokenBucket("minute", capacity=max(1, burst), rate=max_requests_per_minute / 60.0, now=now))
         else:
             self.min_delay = 0
+        if max_requests_per_day and max_requests_per_day > 0:
+            self.buckets.append(_TokenBucket("day", capacity=max_requests_per_day, rate=max_requests_per_day / 86400.0, now=now))
+
+        self.waiters: Deque[Tuple[asyncio.Future, float]] = deque()
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # Provider feedback: no request is let through before paused_until.
+        self.paused_until = 0.0
+        self.consecutive_rate_limited = 0
+        self.rate_limited = 0
 
-    async def acquire(self):
+        # Wait-time metrics, see wait_stats().
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def acquire(self, weight: float = 1.0) -> float:
         """
         Acquire permission to make a request.
 
         This method will block until it's safe to make a request according to the rate limits.
 
-        The lock is only held while checking and recording, never while sleeping:
-        a caller waiting out a window (up to 24h for the daily limit) must not
-        block every other caller's check. After each sleep the limits are
-        re-checked, since another caller may have taken the freed slot.
+        Args:
+            weight: Tokens the request consumes from every bucket, e.g. the
+                    number of images or seconds of video it asks for.
+
+        Returns:
+            The seconds spent waiting.
+
+        The lock only guards the bookkeeping, never the wait: a waiting caller
+        parks on its own future in the FIFO queue.
+        """
+        if not self.buckets and self.shared_quota is None and time.monotonic() >= self.paused_until:
+            # Rate limiting is disabled and the provider has not asked us to wait
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self.lock:
+            if not self.waiters and self._try_take(weight):
+                self._record_wait(0.0)
+                return 0.0
+            future = loop.create_future()
+            self.waiters.append((future, weight))
+            if self.timer is None:
+                self._schedule()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller gave up: hand the tokens back.
+                if self.shared_quota is not None:
+                    self.shared_quota.refund(self._bucket_specs(), weight)
+                for bucket in self.buckets:
+                    bucket.tokens = min(bucket.capacity, bucket.tokens + weight)
+            # A cancelled head must not hold up the callers behind it.
+            self._dispatch()
+            raise
+
+        wait_time = loop.time() - started
+        self._record_wait(wait_time)
+        return wait_time
+
+    @asynccontextmanager
+    async def slot(self, weight: float = 1.0) -> AsyncIterator[float]:
         """
-        if not self.max_requests_per_minute and not self.max_requests_per_day:
-            # Rate limiting is disabled
+        Hold one of `max_concurrent` request slots, then acquire the rate limit.
+
+        Wrap the provider call in it so the slot is released when the call
+        returns. A shared slot is a lease in the SQLite store that lapses if
+        this process dies while holding it. Yields the seconds spent waiting.
+
+        With adaptive concurrency the call's latency and outcome (a timeout,
+        or a 429 reported inside the block or raised out of it, means
+        overload) adjust the limit.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.check()
+        left = remaining()
+        if left is not None and self.available_in(weight) >= left:
+            raise DeadlineExceeded(f"The rate limit would hold this request past the deadline ({max(0.0, left):.1f}s left)")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        adaptive_started = None
+        semaphore_held = False
+        lease_id = None
+        outcome = "error"
+        failure: Optional[BaseException] = None
+        rate_limited: List[bool] = []
+        token = _slot_rate_limited.set(rate_limited)
+        try:
+            if self.adaptive_concurrency is not None:
+                adaptive_started = await self.adaptive_concurrency.acquire()
+            if self.semaphore is not None:
+                await self.semaphore.acquire()
+                semaphore_held = True
+            elif self.shared_quota is not None and self.max_concurrent:
+                while (lease_id := self.shared_quota.acquire_lease(self.max_concurrent)) is None:
+                    await asyncio.sleep(LEASE_POLL_SECONDS)
+            await self.acquire(weight)
+            if adaptive_started is not None:
+                # Latency is measured from the request, not from the wait for a slot.
+                adaptive_started = time.monotonic()
+            try:
+                yield loop.time() - started
+                outcome = "ok"
+            except (TimeoutError, asyncio.TimeoutError) as e:
+                outcome = "overload"
+                failure = e
+                raise
+            except Exception as e:
+                failure = e
+                if error_status(e) == 429:
+                    # A 429 raised out of the block is overload even if nobody reported it.
+                    rate_limited.append(True)
+                raise
+        finally:
+            _slot_rate_limited.reset(token)
+            self._report_outcome(outcome, failure, rate_limited)
+            if adaptive_started is not None:
+                self.adaptive_concurrency.release(adaptive_started, "overload" if rate_limited else outcome)
+            if semaphore_held:
+                self.semaphore.release()
+            if lease_id is not None:
+                self.shared_quota.release_lease(lease_id)
+
+    def _report_outcome(self, outcome: str, failure: Optional[BaseException], rate_limited: List[bool]) -> None:
+        if outcome == "ok" and not rate_limited:
+            RETRY_BUDGET.record_success()
+            # The 429 burst is over; the next one starts from the base pause.
+            self.consecutive_rate_limited = 0
+        if self.circuit_breaker is None:
             return
+        if failure is None and not rate_limited:
+            if outcome == "ok":
+                self.circuit_breaker.record_success()
+            else:
+                # Cancelled, or never got to send: says nothing about the endpoint.
+                self.circuit_breaker.release_probe()
+        elif rate_limited or counts_as_provider_failure(error_status(failure)):
+            self.circuit_breaker.record_failure()
+        else:
+            # The endpoint answered; the request itself was bad.
+            self.circuit_breaker.record_success()
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds` (extends, never shortens, a pause)."""
+        if self.shared_quota is not None:
+            self.shared_quota.pause(seconds)
+        paused_until = time.monotonic() + max(0.0, seconds)
+        if paused_until <= self.paused_until:
+            return
+        self.paused_until = paused_until
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # Re-time the wake-up of any caller already waiting.
+        self._schedule()
+
+    def report_response(self, status: Optional[int], headers: Optional[Mapping[str, Any]] = None) -> None:
+        """Adjust to a provider response: its status code and rate-limit headers."""
+        retry_after = parse_retry_after(_header(headers, "retry-after"))
+        if status == 429:
+            self.report_rate_limited(retry_after)
+            return
+        if retry_after is not None and status is not None and status >= 500:
+            self.pause(retry_after)
+        if status is not None and status < 400:
+            self.consecutive_rate_limited = 0
+
+        remaining = next((_header(headers, name) for name in _REMAINING_HEADERS if _header(headers, name) is not None), None)
+        try:
+            remaining = float(remaining) if remaining is not None else None
+        except ValueError:
+            remaining = None
+        if remaining is not None and remaining <= 0:
+            reset = next((parse_reset(_header(headers, name)) for name in _RESET_HEADERS if _header(headers, name) is not None), None)
+            seconds = reset if reset is not None else QUOTA_EXHAUSTED_PAUSE_SECONDS
+            logging.warning(f"Provider quota exhausted; pausing requests for {seconds:.1f}s.")
+            self.pause(seconds)
+
+    def report_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """Pause all callers after a 429 and return the pause in seconds.
+
+        Without a Retry-After the pause backs off exponentially, but 429s that
+        arrive while a pause is already in force are the same burst (requests
+        sent before it began) and do not escalate it.
+        """
+        self.rate_limited += 1
+        slot_rate_limited = _slot_rate_limited.get()
+        if slot_rate_limited is not None:
+            slot_rate_limited.append(True)
+        if retry_after is None:
+            if time.monotonic() >= self.paused_until:
+                self.consecutive_rate_limited += 1
+            retry_after = min(
+                RATE_LIMITED_MAX_PAUSE_SECONDS,
+                RATE_LIMITED_BASE_PAUSE_SECONDS * 2 ** max(0, self.consecutive_rate_limited - 1),
+            )
+        logging.warning(f"Rate limited by provider (429); pausing requests for {retry_after:.1f}s.")
+        self.pause(retry_after)
+        return retry_after
+
+    def wait_stats(self) -> Dict[str, float]:
+        """Counts and durations of waits since the limiter was created."""
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "queued": sum(1 for future, _ in self.waiters if not future.done()),
+            "total_wait_seconds": self.total_wait_seconds,
+            "mean_wait_seconds": self.total_wait_seconds / self.acquired if self.acquired else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "rate_limited": self.rate_limited,
+            "concurrency_limit": self.concurrency_limit,
+        }
+
+    def available_in(self, weight: float = 1.0) -> float:
+        """Seconds until a request of `weight` could go out (0.0 if now)."""
+        now = time.monotonic()
+        if self.shared_quota is not None:
+            return max(self.shared_quota.take(self._bucket_specs(), weight, commit=False), self.paused_until - now, 0.0)
+        for bucket in self.buckets:
+            bucket.refill(now)
+        return max([bucket.delay(weight) for bucket in self.buckets] + [self.paused_until - now, 0.0])
+
+    def remaining_fraction(self) -> float:
+        """Share of the tightest local bucket still available (1.0 without limits)."""
+        now = time.monotonic()
+        for bucket in self.buckets:
+            bucket.refill(now)
+        return min([max(0.0, bucket.tokens) / bucket.capacity for bucket in self.buckets] + [1.0])
+
+    @property
+    def concurrency_limit(self) -> Optional[int]:
+        """Requests `slot` currently lets run at once (None if unlimited)."""
+        if self.adaptive_concurrency is not None:
+            return self.adaptive_concurrency.limit
+        return self.max_concurrent
+
+    def _bucket_specs(self) -> List[Tuple[str, float, float]]:
+        return [(bucket.window, bucket.capacity, bucket.rate) for bucket in self.buckets]
+
+    def _try_take(self, weight: float) -> bool:
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False
+        if self.shared_quota is not None:
+            return self.shared_quota.take(self._bucket_specs(), weight) <= 0
+        for bucket in self.buckets:
+            bucket.refill(now)
+        if any(bucket.delay(weight) > 0 for bucket in self.buckets):
+            return False
+        for bucket in self.buckets:
+            bucket.tokens -= weight
+        return True
+
+    def _dispatch(self) -> None:
+        """Grant queued callers in order while the buckets allow, then re-arm the timer."""
+        self.timer = None
+        while self.waiters:
+            future, weight = self.waiters[0]
+            if future.done():
+                self.waiters.popleft()
+                continue
+            if not self._try_take(weight):
+                break
+            self.waiters.popleft()
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.waiters and self.waiters[0][0].done():
+            self.waiters.popleft()
+        if not self.waiters:
+            return
+
+        _, weight = self.waiters[0]
+        now = time.monotonic()
+        if self.shared_quota is not None:
+            # Other processes may take tokens meanwhile; the timer only
+            # re-checks the store, it does not reserve anything.
+            wait_time = max(self.shared_quota.take(self._bucket_specs(), weight, commit=False), self.paused_until - now)
+        else:
+            for bucket in self.buckets:
+                bucket.refill(now)
+            wait_time = max([bucket.delay(weight) for bucket in self.buckets] + [self.paused_until - now])
+        if now < self.paused_until:
+            # Already reported when the pause was set.
+            pass
+        elif wait_time >= 3600:
+            print(f"Daily rate limit reached ({self.max_requests_per_day} requests/day). Waiting {wait_time / 3600:.1f} hours...")
+        elif wait_time >= 1:
+            print(f"Rate limit reached ({self.max_requests_per_minute} requests/min). Waiting {wait_time:.1f}s...")
+        self.timer = asyncio.get_running_loop().call_later(wait_time, self._dispatch)
 
-        while True:
-            message = None
-            async with self.lock:
-                current_time = time.time()
-
-                # Clean up old request times (keep requests from last 24 hours for daily limit)
-                if self.max_requests_per_day:
-                    self.request_times = [t for t in self.request_times if current_time - t < 86400]
-                elif self.max_requests_per_minute:
-                    self.request_times = [t for t in self.request_times if current_time - t < 60]
-
-                wait_time = 0.0
-
-                # Check daily limit first
-                if self.max_requests_per_day and self.max_requests_per_day > 0:
-                    daily_requests = [t for t in self.request_times if current_time - t < 86400]
-                    if len(daily_requests) >= self.max_requests_per_day:
-                        wait_time = 86400 - (current_time - daily_requests[0])
-                        hours = wait_time / 3600
-                        message = f"Daily rate limit reached ({self.max_requests_per_day} requests/day). Waiting {hours:.1f} hours..."
-
-                # Check per-minute limit
-                if wait_time <= 0 and self.max_requests_per_minute and self.max_requests_per_minute > 0:
-                    minute_requests = [t for t in self.request_times if current_time - t < 60]
-                    if len(minute_requests) >= self.max_requests_per_minute:
-                        wait_time = 60 - (current_time - minute_requests[0])
-                        message = f"Rate limit reached ({self.max_requests_per_minute} requests/min). Waiting {wait_time:.1f}s..."
-                    elif self.request_times and self.min_delay > 0:
-                        # Also ensure minimum delay between consecutive requests
-                        time_since_last = current_time - self.request_times[-1]
-                        if time_since_last < self.min_delay:
-                            wait_time = self.min_delay - time_since_last
-
-                if wait_time <= 0:
-                    # Record this request
-                    self.request_times.append(current_time)
-                    return
-
-            if message:
-                print(message)
-            await asyncio.sleep(wait_time)
+    def _record_wait(self, wait_time: float) -> None:
+        self.acquired += 1
+        if wait_time > 0:
+            self.waited += 1
+            self.total_wait_seconds += wait_time
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_time)
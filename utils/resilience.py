@@ -0,0 +1,168 @@
+"""Circuit breakers per provider endpoint and one retry budget per process.
+
+During an outage every task retrying on its own multiplies the load on a
+provider that is already failing, and nested retry layers multiply it
+again. A CircuitBreaker stops calling an endpoint after a run of failures
+and fails fast until a single probe succeeds. RETRY_BUDGET caps the
+retries of all tenacity decorators (see ``utils.retry.stop_on_retry_budget``)
+at a fraction of recent successful requests, so a failing render stops
+quickly and can be resumed instead of stalling.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+# Consecutive failures that open a circuit, and how long it stays open
+# before one probe request is let through.
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30.0
+# Retries allowed per successful request over the last RETRY_BUDGET_WINDOW_SECONDS,
+# plus a floor so a run that has not succeeded yet can still retry a little.
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MIN_RETRIES = 10
+RETRY_BUDGET_WINDOW_SECONDS = 60.0
+
+_HTTP_STATUS_RE = re.compile(r"\bHTTP (\d{3})\b")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit for {name} is open after repeated failures; retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> half-open probe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now."""
+        if self.state == "closed":
+            return
+        retry_after = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == "open" and retry_after <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probing:
+            # This call is the probe; everyone else keeps failing fast until it reports back.
+            self.probing = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.name, max(0.0, retry_after))
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logging.info(f"Circuit for {self.name} closed again")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logging.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures; failing fast for {self.reset_seconds:.0f}s")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release_probe(self) -> None:
+        """The probe ended without telling us anything (e.g. it was cancelled)."""
+        self.probing = False
+
+
+class RetryBudget:
+    """Allows retries up to `ratio` of the successes in a sliding window."""
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_retries: int = RETRY_BUDGET_MIN_RETRIES,
+        window_seconds: float = RETRY_BUDGET_WINDOW_SECONDS,
+    ):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self.successes: Deque[float] = deque()
+        self.retries: Deque[float] = deque()
+        self.denied = 0
+        # Tenacity's sync decorators may run in worker threads.
+        self.lock = threading.Lock()
+
+    def record_success(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            # A process that never retries never calls try_spend, so prune here too.
+            self._prune(self.successes, now)
+            self.successes.append(now)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False if it is exhausted."""
+        with self.lock:
+            now = time.monotonic()
+            for events in (self.successes, self.retries):
+                self._prune(events, now)
+            if len(self.retries) >= max(self.min_retries, self.ratio * len(self.successes)):
+                self.denied += 1
+                return False
+            self.retries.append(now)
+            return True
+
+    def _prune(self, events: Deque[float], now: float) -> None:
+        while events and events[0] < now - self.window_seconds:
+            events.popleft()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "successes": len(self.successes),
+            "retries": len(self.retries),
+            "denied": self.denied,
+        }
+
+
+RETRY_BUDGET = RetryBudget()
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker of an endpoint, created on first use."""
+    if name not in _circuit_breakers:
+        _circuit_breakers[name] = CircuitBreaker(name)
+    return _circuit_breakers[name]
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of a failed provider call, if the error carries one."""
+    for attr in ("code", "status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    match = _HTTP_STATUS_RE.search(str(exc))
+    return int(match.group(1)) if match else None
+
+
+def counts_as_provider_failure(status: Optional[int]) -> bool:
+    """Whether a failed call says the endpoint is unhealthy (not that the request was bad)."""
+    return status is None or status >= 500 or status in (408, 429)
@@ -1,8 +1,16 @@
+import contextvars
 import tenacity
 import traceback
 import logging
+from contextlib import contextmanager
+from typing import FrozenSet, Iterator, Optional, Union
 
 import requests
+from tenacity.retry import retry_base
+from tenacity.stop import stop_base
+
+from utils.deadline import DeadlineExceeded, remaining
+from utils.resilience import RETRY_BUDGET, CircuitOpenError, error_status
 
 def after_func(retry_state: tenacity.RetryCallState) -> None:
     if retry_state.outcome.failed:
@@ -11,6 +19,80 @@ def after_func(retry_state: tenacity.RetryCallState) -> None:
         logging.debug(traceback.format_exception(type(exc), exc, exc.__traceback__))
 
 
+# Set while the caller handles failures itself (e.g. by failing over to
+# another provider or API key), so retrying in place would only delay it:
+# True for every failure, or the HTTP statuses the caller handles.
+_retries_disabled: contextvars.ContextVar[Union[bool, FrozenSet[int]]] = contextvars.ContextVar("_retries_disabled", default=False)
+
+
+@contextmanager
+def no_retries(*statuses: int) -> Iterator[None]:
+    """Make every retry loop stopped by stop_on_retry_budget give up after its first attempt,
+    or only after a failure with one of `statuses` when any are given."""
+    outer = _retries_disabled.get()
+    if outer is True or not statuses:
+        token = _retries_disabled.set(True)
+    else:
+        token = _retries_disabled.set(frozenset(statuses) | (outer or frozenset()))
+    try:
+        yield
+    finally:
+        _retries_disabled.reset(token)
+
+
+def retries_disabled(status: Optional[int] = None) -> bool:
+    """Whether a failure with `status` must not be retried in place (see ``no_retries``)."""
+    disabled = _retries_disabled.get()
+    return disabled is True or (status is not None and bool(disabled) and status in disabled)
+
+
+class _StopOnRetryBudget(stop_base):
+    """Stop retrying when the endpoint's circuit is open, the process-wide retry budget
+    is spent, another attempt (as long as the average one so far) would overrun
+    the current deadline (see utils.deadline), or inside ``no_retries``.
+
+    Combine with the attempt limit, e.g. ``stop=stop_after_attempt(3) | stop_on_retry_budget``,
+    so a retry is only charged to the budget when the attempt limit allows it.
+    """
+
+    def __call__(self, retry_state: tenacity.RetryCallState) -> bool:
+        exc = retry_state.outcome.exception() if retry_state.outcome is not None else None
+        if retries_disabled(error_status(exc) if exc is not None else None):
+            return True
+        if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+            return True
+        left = remaining()
+        if left is not None and left < retry_state.seconds_since_start / retry_state.attempt_number:
+            logging.warning(f"Not retrying {retry_state.fn.__name__}: another attempt cannot finish before the deadline ({max(0.0, left):.1f}s left)")
+            return True
+        if not RETRY_BUDGET.try_spend():
+            logging.warning(f"Not retrying {retry_state.fn.__name__}: the retry budget is exhausted")
+            return True
+        return False
+
+
+stop_on_retry_budget = _StopOnRetryBudget()
+
+
+class _RetryCountingSuccesses(retry_base):
+    """Retry on any exception (tenacity's default) and credit every successful
+    attempt to the retry budget.
+
+    For calls that do not go through a RateLimiter slot, which credits its own
+    successes: without it, e.g. the agents' LLM calls would only ever get the
+    budget's floor of retries.
+    """
+
+    def __call__(self, retry_state: tenacity.RetryCallState) -> bool:
+        if retry_state.outcome.failed:
+            return True
+        RETRY_BUDGET.record_success()
+        return False
+
+
+retry_counting_successes = _RetryCountingSuccesses()
+
+
 def is_retryable_download_error(exc: BaseException) -> bool:
     """Network errors and 5xx responses are retryable; other HTTP errors (expired
     or invalid URLs, auth failures) will never succeed and must fail fast."""
@@ -21,7 +103,7 @@ def is_retryable_download_error(exc: BaseException) -> bool:
 
 
 download_retry = tenacity.retry(
-    stop=tenacity.stop_after_attempt(3),
+    stop=tenacity.stop_after_attempt(3) | stop_on_retry_budget,
     wait=tenacity.wait_exponential(multiplier=1, max=10),
     retry=tenacity.retry_if_exception(is_retryable_download_error),
     after=after_func,
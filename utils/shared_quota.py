@@ -0,0 +1,202 @@
+"""SharedQuota: rate-limit state shared by every ViMax process on the host.
+
+A RateLimiter keeps its token buckets in memory, so several processes using
+the same provider account each believe they own the whole quota. Given a
+SharedQuota, the limiter keeps the buckets, the provider-requested pause and
+the in-flight request leases in one SQLite file instead, keyed by provider
+and API key. Every update is one short ``BEGIN IMMEDIATE`` transaction, so
+processes never see a half-updated bucket, and a process that crashes holds
+nothing: its transactions roll back, and its leases are dropped once their
+owner is gone or their TTL runs out.
+
+The limiter calls in from the event loop, so the store never blocks for
+long: the database is in WAL mode (reads do not wait for writers), a busy
+store makes ``take`` report a short wait and ``acquire_lease`` report no
+free slot, and a write that must land (a pause, refund or lease release)
+finishes on a worker thread.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+
+# Where the shared state lives unless a path is given (VIMAX_QUOTA_DB overrides).
+DEFAULT_QUOTA_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "vimax", "quota.sqlite3")
+# An in-flight lease is dropped after this long even if its process still
+# runs, so a request that never released it cannot pin a slot forever.
+LEASE_TTL_SECONDS = 900.0
+
+# How long a call from the event loop waits for another process's write
+# lock; when it is busy beyond that, take() asks to be retried this much later.
+BUSY_TIMEOUT_SECONDS = 0.05
+# Writes handed to a worker thread (and schema setup) wait this long.
+BLOCKING_TIMEOUT_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (key TEXT, window TEXT, tokens REAL, updated REAL, PRIMARY KEY (key, window));
+CREATE TABLE IF NOT EXISTS pauses (key TEXT PRIMARY KEY, paused_until REAL);
+CREATE TABLE IF NOT EXISTS leases (lease_id TEXT PRIMARY KEY, key TEXT, pid INTEGER, expires_at REAL);
+"""
+
+
+def quota_key(provider: str, api_key: Optional[str] = None) -> str:
+    """Key of a provider account; the API key is hashed, never stored."""
+    if not api_key:
+        return provider
+    return f"{provider}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class SharedQuota:
+    """Token buckets, pause and leases of one provider account, stored in SQLite."""
+
+    def __init__(self, key: str, path: Optional[str] = None, lease_ttl: float = LEASE_TTL_SECONDS):
+        self.key = key
+        self.path = path or os.environ.get("VIMAX_QUOTA_DB") or DEFAULT_QUOTA_DB_PATH
+        self.lease_ttl = lease_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connection(BLOCKING_TIMEOUT_SECONDS) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    def take(self, buckets: List[Tuple[str, float, float]], weight: float, commit: bool = True) -> float:
+        """Take `weight` tokens from every (window, capacity, rate) bucket.
+
+        Returns 0.0 when the tokens were taken, otherwise the seconds until
+        they could be (nothing is taken then). With commit=False the buckets
+        are only read, without a write lock. A store busy for longer than
+        BUSY_TIMEOUT_SECONDS counts as a wait of that long.
+        """
+        try:
+            if not commit:
+                with self._connection() as connection:
+                    return self._wait_time(connection, buckets, weight, time.time())[0]
+            with self._transaction() as connection:
+                now = time.time()
+                wait_time, states = self._wait_time(connection, buckets, weight, now)
+                if wait_time <= 0:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO buckets (key, window, tokens, updated) VALUES (?, ?, ?, ?)",
+                        [(self.key, window, tokens - weight, now) for window, tokens in states],
+                    )
+            return wait_time
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            return BUSY_TIMEOUT_SECONDS
+
+    def _wait_time(self, connection: sqlite3.Connection, buckets: List[Tuple[str, float, float]], weight: float, now: float) -> Tuple[float, List[Tuple[str, float]]]:
+        row = connection.execute("SELECT paused_until FROM pauses WHERE key = ?", (self.key,)).fetchone()
+        wait_time = max(0.0, row[0] - now) if row else 0.0
+        states = []
+        for window, capacity, rate in buckets:
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ? AND window = ?", (self.key, window)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            needed = min(weight, capacity)
+            if tokens + 1e-9 < needed:
+                wait_time = max(wait_time, (needed - tokens) / rate)
+            states.append((window, tokens))
+        return wait_time, states
+
+    def refund(self, buckets: List[Tuple[str, float, float]], weight: float) -> None:
+        def write(connection: sqlite3.Connection) -> None:
+            for window, capacity, _ in buckets:
+                connection.execute(
+                    "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE key = ? AND window = ?",
+                    (capacity, weight, self.key, window),
+                )
+
+        self._write(write)
+
+    def pause(self, seconds: float) -> None:
+        """Pause every process using this account; extends, never shortens, a pause."""
+        paused_until = time.time() + max(0.0, seconds)
+        self._write(lambda connection: connection.execute(
+            "INSERT INTO pauses (key, paused_until) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET paused_until = MAX(paused_until, excluded.paused_until)",
+            (self.key, paused_until),
+        ))
+
+    def acquire_lease(self, max_concurrent: int) -> Optional[str]:
+        """Claim one of `max_concurrent` in-flight slots; None if all are taken or the store is busy."""
+        now = time.time()
+        try:
+            with self._transaction() as connection:
+                leases = connection.execute("SELECT lease_id, pid, expires_at FROM leases WHERE key = ?", (self.key,)).fetchall()
+                stale = [lease_id for lease_id, pid, expires_at in leases if expires_at <= now or not _process_alive(pid)]
+                connection.executemany("DELETE FROM leases WHERE lease_id = ?", [(lease_id,) for lease_id in stale])
+                lease_id = None
+                if len(leases) - len(stale) < max_concurrent:
+                    lease_id = uuid.uuid4().hex
+                    connection.execute(
+                        "INSERT INTO leases (lease_id, key, pid, expires_at) VALUES (?, ?, ?, ?)",
+                        (lease_id, self.key, os.getpid(), now + self.lease_ttl),
+                    )
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            return None
+        return lease_id
+
+    def release_lease(self, lease_id: str) -> None:
+        self._write(lambda connection: connection.execute("DELETE FROM leases WHERE lease_id = ?", (lease_id,)))
+
+    def _write(self, write: Callable[[sqlite3.Connection], object]) -> None:
+        """Run a write that must not be lost; if the store is busy, finish it on a worker thread."""
+        try:
+            with self._connection() as connection:
+                write(connection)
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            threading.Thread(target=self._write_blocking, args=(write,), daemon=True).start()
+
+    def _write_blocking(self, write: Callable[[sqlite3.Connection], object]) -> None:
+        try:
+            with self._connection(BLOCKING_TIMEOUT_SECONDS) as connection:
+                write(connection)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not update the shared quota store {self.path}: {e}")
+
+    @contextmanager
+    def _connection(self, timeout: float = BUSY_TIMEOUT_SECONDS) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode: single statements commit on their own and
+        # read-modify-write sequences open a transaction explicitly.
+        connection = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write-locked transaction: other processes wait until it commits."""
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
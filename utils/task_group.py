@@ -0,0 +1,96 @@
+"""Structured concurrency for render steps that wait on each other.
+
+``run_task_group`` runs steps in one asyncio.TaskGroup: the first failure
+cancels every step still running instead of leaving them to finish (and
+spend quota) in the background, and is re-raised as is. A step that others
+wait on signals through a DependencyEvent; when it fails, ``fail_events``
+wakes the waiters with DependencyFailed so none of them hang. In keep-going
+mode the steps that do not depend on a failure still finish.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Iterable, List, Optional
+
+
+# How long a provider-side cancel request may take before it is abandoned.
+UPSTREAM_CANCEL_TIMEOUT_SECONDS = 10.0
+
+
+class DependencyFailed(RuntimeError):
+    """The step this one waits on failed, so this one cannot run."""
+
+    def __init__(self, dependency: str, cause: BaseException):
+        self.dependency = dependency
+        self.cause = cause
+        super().__init__(f"{dependency} failed: {cause}")
+
+
+class DependencyEvent(asyncio.Event):
+    """An asyncio.Event that can also be failed; ``wait`` then raises DependencyFailed."""
+
+    def __init__(self, name: str = "dependency"):
+        super().__init__()
+        self.name = name
+        self.error: Optional[BaseException] = None
+
+    def fail(self, error: BaseException) -> None:
+        if self.is_set():
+            return
+        self.error = error
+        self.set()
+
+    async def wait(self) -> bool:
+        await super().wait()
+        if self.error is not None:
+            raise DependencyFailed(self.name, self.error)
+        return True
+
+
+def fail_events(events: Iterable[asyncio.Event], error: BaseException) -> None:
+    """Release the waiters of every pending DependencyEvent with `error`."""
+    for event in events:
+        if isinstance(event, DependencyEvent):
+            event.fail(error)
+
+
+async def run_task_group(aws: Iterable[Awaitable[Any]], keep_going: bool = False) -> List[Any]:
+    """Run the coroutines concurrently and return their results in order.
+
+    The first failure cancels the others and is raised itself (not wrapped
+    in an ExceptionGroup); a DependencyFailed is only raised if nothing
+    else failed. With `keep_going`, every coroutine runs to its end and a
+    failure comes back in place of its result.
+    """
+    if keep_going:
+        return await asyncio.gather(*aws, return_exceptions=True)
+    tasks = []
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(aw) for aw in aws]
+    except BaseExceptionGroup as errors:
+        leaves = _leaf_exceptions(errors)
+        root = next((e for e in leaves if not isinstance(e, DependencyFailed)), leaves[0])
+        if len(leaves) > 1:
+            logging.info(f"{len(leaves) - 1} more step(s) failed alongside: {root}")
+        raise root from None
+    return [task.result() for task in tasks]
+
+
+async def cancel_upstream(cancel: Awaitable[Any], what: str) -> None:
+    """Best-effort provider-side cancel, run even while the caller is being cancelled."""
+    try:
+        await asyncio.shield(asyncio.wait_for(cancel, timeout=UPSTREAM_CANCEL_TIMEOUT_SECONDS))
+        logging.info(f"Cancelled {what} upstream")
+    except Exception as e:
+        logging.warning(f"Could not cancel {what} upstream: {e}")
+
+
+def _leaf_exceptions(errors: BaseExceptionGroup) -> List[BaseException]:
+    leaves = []
+    for error in errors.exceptions:
+        if isinstance(error, BaseExceptionGroup):
+            leaves.extend(_leaf_exceptions(error))
+        else:
+            leaves.append(error)
+    return leaves
@@ -1,9 +1,16 @@
 import logging
+import numpy as np
 import requests
-from moviepy import VideoFileClip, concatenate_videoclips
+from typing import List, Optional, Tuple
+from moviepy import ImageClip, VideoFileClip, concatenate_videoclips
+from PIL import Image, ImageDraw
 from utils.retry import download_retry
 
 
+# Length of a placeholder slate when no rendered clip gives a typical length.
+DEFAULT_SLATE_SECONDS = 3.0
+
+
 @download_retry
 def download_video(url, save_path):
     try:
@@ -42,3 +49,44 @@ def concatenate_video_files(video_paths, output_path, codec="libx264", preset="m
         for clip in clips:
             clip.close()
     return output_path
+
+
+def slate_frame(text: str, size: Tuple[int, int]) -> np.ndarray:
+    """A black frame of `size` (width, height) with `text` centred on it."""
+    image = Image.new("RGB", size, (0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.multiline_textbbox((0, 0), text, align="center")
+    position = ((size[0] - (right - left)) / 2, (size[1] - (bottom - top)) / 2)
+    draw.multiline_text(position, text, fill=(255, 255, 255), align="center")
+    return np.array(image)
+
+
+def concatenate_with_slates(video_paths: List[Optional[str]], slate_texts: List[str], output_path, codec="libx264", preset="medium"):
+    """Concatenate video files, putting a placeholder slate wherever a path is None.
+
+    Slates match the size of the rendered clips and last as long as they do
+    on average, so the cut keeps its pacing. Every reader is released as in
+    concatenate_video_files.
+    """
+    clips = {}
+    final = None
+    try:
+        for idx, path in enumerate(video_paths):
+            if path is not None:
+                clips[idx] = VideoFileClip(path)
+        if not clips:
+            raise ValueError("Cannot assemble a video from placeholders only")
+        size = next(iter(clips.values())).size
+        slate_seconds = sum(clip.duration for clip in clips.values()) / len(clips) or DEFAULT_SLATE_SECONDS
+        sequence = [
+            clips[idx] if idx in clips else ImageClip(slate_frame(slate_texts[idx], size)).with_duration(slate_seconds)
+            for idx in range(len(video_paths))
+        ]
+        final = concatenate_videoclips(sequence)
+        final.write_videofile(output_path, codec=codec, preset=preset, fps=next(iter(clips.values())).fps)
+    finally:
+        if final is not None:
+            final.close()
+        for clip in clips.values():
+            clip.close()
+    return output_path